@@ -0,0 +1,33 @@
+"""
+Module: benchmarks
+
+This package implements the performance benchmark suite of the Python modules and API.
+Features:
+- Synthetic Data: ``generators`` builds a reproducible workspace at a configurable scale
+- Module Benchmarks: ``bench_*`` modules time the hot functions of each module and the
+  Flask routes against that workspace
+- Comparable Results: ``runner`` writes machine-readable results per commit and compares
+  two result files
+
+Run ``python -m benchmarks --help`` from the repository root.
+"""
+
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(REPO_DIR, "src")
+
+# The modules under test are flat modules in src/ (and the repository root)
+for path in (SRC_DIR, REPO_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Benchmark modules, imported (and so registered) in this order
+BENCHMARK_MODULES = (
+    "benchmarks.bench_implementation",
+    "benchmarks.bench_design",
+    "benchmarks.bench_maintenance",
+    "benchmarks.bench_community",
+    "benchmarks.bench_api"
+)
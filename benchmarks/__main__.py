@@ -0,0 +1,143 @@
+"""
+Module: __main__.py
+
+This module implements the command line of the benchmark suite.
+Features:
+- run: Builds a synthetic workspace in a temporary directory, times the benchmarks and
+  writes the results to ``benchmarks/results/<commit>-<scale>.json``
+- compare: Compares two result files and exits with status 1 when a benchmark regressed
+- list: Lists the registered benchmarks
+- load: Load tests the API with a traffic mix and a ramp of concurrent users (see ``load_test``)
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import importlib
+import tempfile
+
+from benchmarks import REPO_DIR, BENCHMARK_MODULES
+from benchmarks import runner, load_test
+from benchmarks.generators import SCALES, SyntheticData
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+
+def _load_benchmarks():
+    for module in BENCHMARK_MODULES:
+        importlib.import_module(module)
+
+
+def _parse_overrides(values):
+    overrides = {}
+    for value in values or []:
+        key, separator, count = value.partition("=")
+        if not separator or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"Expected key=count, got {value!r}")
+        overrides[key] = int(count)
+    return overrides
+
+
+def _default_output(scale: str) -> str:
+    commit = runner.environment(SyntheticData(scale))["commit"]
+    return os.path.join(RESULTS_DIR, f"{(commit or 'unknown')[:10]}-{scale}.json")
+
+
+def run(args) -> int:
+    """Build the workspace, run the benchmarks and write the results."""
+    try:
+        data = SyntheticData(args.scale, args.seed, _parse_overrides(args.set))
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    # Resolve the output path before moving into the workspace
+    output = os.path.abspath(args.output or _default_output(args.scale))
+    workspace = os.path.abspath(args.workspace) if args.workspace else tempfile.mkdtemp(prefix="bench-")
+    os.makedirs(workspace, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        print(f"Building {args.scale} workspace in {workspace} ...", file=sys.stderr)
+        data.build()
+        _load_benchmarks()
+        print(f"{'benchmark':<52} {'median':>10} {'min':>10} {'iqr':>10} rounds", file=sys.stderr)
+        results = runner.run_benchmarks(data, args.patterns, args.rounds, args.max_time,
+                                        report=lambda result: runner.print_result(result, sys.stderr))
+    finally:
+        os.chdir(cwd)
+        if not args.workspace and not args.keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+    runner.write_results(output, data, results)
+    print(f"Results written to {output}", file=sys.stderr)
+    return 1 if any("error" in result for result in results) else 0
+
+
+def compare(args) -> int:
+    """Compare two result files."""
+    with open(args.base) as file:
+        base = json.load(file)
+    with open(args.head) as file:
+        head = json.load(file)
+    if (base.get("scale"), base.get("sizes")) != (head.get("scale"), head.get("sizes")):
+        print("Warning: the runs used different data sizes", file=sys.stderr)
+    rows = runner.compare(base, head, args.threshold)
+    print(f"{'benchmark':<52} {'base':>10} {'head':>10} {'ratio':>7} status")
+    for row in rows:
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+        print(f"{row['name']:<52} {runner.format_seconds(row['base']):>10} "
+              f"{runner.format_seconds(row['head']):>10} {ratio:>7} {row['status']}")
+    regressed = [row["name"] for row in rows if row["status"] == "regressed"]
+    if regressed:
+        print(f"{len(regressed)} benchmark(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def list_benchmarks(args) -> int:
+    """List the registered benchmarks."""
+    _load_benchmarks()
+    for name in runner.BENCHMARKS:
+        print(name)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Performance benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--scale", choices=list(SCALES), default="small", help="Data size preset")
+    run_parser.add_argument("--seed", type=int, default=42, help="Random seed of the generated data")
+    run_parser.add_argument("--set", action="append", metavar="KEY=COUNT",
+                            help="Override one entity count of the scale (repeatable)")
+    run_parser.add_argument("-k", dest="patterns", action="append", metavar="PATTERN",
+                            help="Only run benchmarks matching this glob, e.g. 'api.*' (repeatable)")
+    run_parser.add_argument("--rounds", type=int, default=7, help="Timed rounds per benchmark")
+    run_parser.add_argument("--max-time", type=float, default=2.0, help="Time budget per benchmark, in seconds")
+    run_parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>-<scale>.json)")
+    run_parser.add_argument("--workspace", help="Build the data in this directory and keep it")
+    run_parser.add_argument("--keep", action="store_true", help="Keep the temporary workspace")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("base", help="Baseline result file")
+    compare_parser.add_argument("head", help="Result file to check")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="Relative median slowdown counted as a regression (default: 0.1)")
+    compare_parser.set_defaults(handler=compare)
+
+    list_parser = commands.add_parser("list", help="List the benchmarks")
+    list_parser.set_defaults(handler=list_benchmarks)
+
+    load_parser = commands.add_parser("load", help="Load test the API with a ramp of concurrent users")
+    load_test.add_arguments(load_parser)
+    load_parser.set_defaults(handler=load_test.load_test)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Module: bench_api.py
+
+This module implements the benchmarks of the Flask routes.
+Features:
+- Full Request Cycle: Requests go through the application's test client, so routing,
+  metrics, conditional validation, JSON serialization and compression are included
+- Route Coverage: Timeline reads (full and revalidated), patches, the portfolio, funding
+  matching (with and without admission control) and deadlines, compliance, survey
+  results, time series, batches and metrics
+"""
+
+import itertools
+
+from benchmarks.runner import benchmark
+
+# Request headers of a browser client
+HEADERS = {"Accept": "application/json", "Accept-Encoding": "br, gzip"}
+
+_apps = {}
+
+
+def _client(admission_control: bool = False):
+    """Get a test client of a shared application, creating it on first use.
+
+    Admission control is off unless asked for, since one client sending requests
+    back to back would soon be rate limited.
+    """
+    if admission_control not in _apps:
+        from api import create_app
+        _apps[admission_control] = create_app({"ADMISSION_CONTROL": admission_control})
+    return _apps[admission_control].test_client()
+
+
+def _get(client, path: str, headers=None):
+    """Make a GET request and check that it succeeded."""
+    def request():
+        response = client.get(path, headers=headers or HEADERS)
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"GET {path} returned {response.status_code}")
+        return response
+    return request
+
+
+def _post(client, path: str, body_of):
+    """Make a POST request with the JSON body returned by body_of and check that it succeeded."""
+    def request():
+        response = client.post(path, json=body_of(), headers=HEADERS)
+        if response.status_code != 200:
+            raise RuntimeError(f"POST {path} returned {response.status_code}")
+        return response
+    return request
+
+
+@benchmark("api")
+def get_timeline(data):
+    client = _client()
+    paths = itertools.cycle([f"/api/implementation-timeline/{project_id}" for project_id in data.project_ids])
+    return lambda: _get(client, next(paths))()
+
+
+@benchmark("api")
+def get_timeline_not_modified(data):
+    client = _client()
+    path = f"/api/implementation-timeline/{data.project_ids[0]}"
+    etag = client.get(path, headers=HEADERS).headers["ETag"]
+    return _get(client, path, {**HEADERS, "If-None-Match": etag})
+
+
+@benchmark("api")
+def patch_timeline(data):
+    client = _client()
+    client.post("/api/implementation-timeline/bench-api-patch", json=data.timeline("bench-api-patch"))
+    progress = itertools.cycle(range(0, 101, 5))
+    task_id = "bench-api-patch-task-0"
+
+    def patch():
+        operation = {"op": "upsert", "collection": "tasks", "id": task_id, "value": {"progress": next(progress)}}
+        response = client.patch("/api/implementation-timeline/bench-api-patch", json={"operations": [operation]})
+        if response.status_code != 200:
+            raise RuntimeError(f"PATCH returned {response.status_code}")
+    return patch
+
+
+@benchmark("api")
+def get_portfolio(data):
+    return _get(_client(), "/api/portfolio/timeline?status=in-progress,not-started&page_size=100")
+
+
+@benchmark("api")
+def match_funding(data):
+    client = _client()
+    bodies = itertools.cycle([{"project_characteristics": data.project_characteristics(),
+                               "community_priorities": data.community_priorities()} for _ in range(50)])
+    return _post(client, "/api/funding-sources", lambda: next(bodies))
+
+
+@benchmark("api")
+def match_funding_admitted(data):
+    """The funding match with the admission control bookkeeping of every request."""
+    client = _client(admission_control=True)
+    _apps[True].config["ADMISSION_LIMITS"] = {"compute": {"rate": 1e9, "burst": 1e9}}
+    bodies = itertools.cycle([{"project_characteristics": data.project_characteristics(),
+                               "community_priorities": data.community_priorities()} for _ in range(50)])
+    return _post(client, "/api/funding-sources", lambda: next(bodies))
+
+
+@benchmark("api")
+def get_funding_deadlines(data):
+    return _get(_client(), "/api/funding-deadlines?days=90")
+
+
+@benchmark("api")
+def get_compliance(data):
+    client = _client()
+    paths = itertools.cycle([f"/api/regulatory-compliance/{project_id}" for project_id in data.project_ids])
+    return lambda: _get(client, next(paths))()
+
+
+@benchmark("api")
+def get_compliance_dashboard(data):
+    return _get(_client(), "/api/regulatory-compliance/dashboard?page_size=50")
+
+
+@benchmark("api")
+def get_survey_results(data):
+    return _get(_client(), f"/api/outcome-measurement/{data.survey_project_ids[0]}/results")
+
+
+@benchmark("api")
+def get_timeseries(data):
+    return _get(_client(), f"/api/outcome-measurement/{data.survey_project_ids[0]}/timeseries/m1?resolution=day")
+
+
+@benchmark("api")
+def dashboard_batch(data):
+    client = _client()
+    project_id = data.project_ids[0]
+    body = {"requests": [
+        {"path": f"/api/implementation-timeline/{project_id}"},
+        {"path": f"/api/regulatory-compliance/{project_id}"},
+        {"path": f"/api/outcome-measurement/{data.survey_project_ids[0]}/results"},
+        {"path": "/api/funding-deadlines"},
+        {"path": "/api/portfolio/timeline?page_size=20"}
+    ]}
+    return _post(client, "/api/batch", lambda: body)
+
+
+@benchmark("api")
+def get_metrics(data):
+    return _get(_client(), "/api/metrics", {"Accept": "text/plain"})
@@ -0,0 +1,163 @@
+"""
+Module: bench_community.py
+
+This module implements the benchmarks of the community, equity and knowledge modules.
+Features:
+- Accessibility: Universal design checks and cultural sensitivity analysis
+- Cross-Departmental Collaboration: Shared impact assessments
+- Data Privacy: PII redaction of long comments and profile anonymization
+- Education: Case study and process guide creation
+- Emergency Resilience: Climate resilience assessment and risk mitigation planning
+- Global Knowledge Exchange: Best practice search over the generated catalog,
+  contextual adaptation and benchmarking dashboards
+- Engagement: Scenario comparison
+"""
+
+import itertools
+
+from benchmarks.runner import benchmark
+from accessibility_inclusive_design import AccessibilityInclusiveDesign
+from cross_departmental_collaboration import CrossDepartmentalCollaboration
+from data_privacy_security import DataPrivacySecurity
+from educational_components import EducationalComponents
+from emergency_resilience_planning import EmergencyResiliencePlanning
+from global_knowledge_exchange import GlobalKnowledgeExchange
+from engagement_enhancements import EngagementEnhancements
+
+DEPARTMENTS = ["transportation", "public works", "parks", "planning", "utilities", "police", "fire"]
+
+
+@benchmark("accessibility")
+def universal_design_compliance(data):
+    design = AccessibilityInclusiveDesign()
+    plan = {"sidewalk_width": 1.2, "curb_ramps": [], "crossings": data.rng.randrange(4, 40)}
+    return lambda: design.check_universal_design_compliance(plan, ["ADA", "ISO21542"])
+
+
+@benchmark("accessibility")
+def cultural_sensitivity_analysis(data):
+    design = AccessibilityInclusiveDesign()
+    demographics = {"religious_diversity": True, "language_diversity": 0.4}
+    elements = [{"type": data.rng.choice(["public_art", "gathering_space", "bench", "signage"])}
+                for _ in range(100)]
+    return lambda: design.perform_cultural_sensitivity_analysis("project-1", demographics, elements)
+
+
+@benchmark("collaboration")
+def shared_impact_assessment(data):
+    collaboration = CrossDepartmentalCollaboration()
+    impacts = {department: [{"id": f"{department}-{i}", "severity": data.rng.choice(["low", "medium", "high"]),
+                             "description": data.sentence(6)} for i in range(20)]
+               for department in DEPARTMENTS}
+    return lambda: collaboration.conduct_shared_impact_assessment(
+        "project-1", "Project 1", DEPARTMENTS[0], DEPARTMENTS[1:], impacts)
+
+
+@benchmark("privacy")
+def sanitize_comment(data):
+    privacy = DataPrivacySecurity()
+    parts = []
+    for i in range(40):
+        parts.append(data.sentence(15))
+        if i % 4 == 0:
+            parts.append(f"Email me at resident{i}@example.com or call 555-{i:03d}-{1000 + i}.")
+    text = " ".join(parts)
+    return lambda: privacy.sanitize_user_input(text)
+
+
+@benchmark("privacy")
+def anonymized_profile(data):
+    privacy = DataPrivacySecurity()
+    users = itertools.cycle([{
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "email": f"user{i}@example.com",
+        "location": {"street": f"{i} Main St", "neighborhood": "Downtown", "city": "Metropolis"},
+        "contact_info": {"phone": "555-123-4567"}
+    } for i in range(100)])
+    levels = itertools.cycle(["default", "full_anonymity", "verified_public"])
+    return lambda: privacy.create_anonymized_profile("user-1", next(users), next(levels))
+
+
+@benchmark("education")
+def add_case_study(data):
+    education = EducationalComponents()
+    narrative = " ".join(data.sentence(20) for _ in range(20))
+    return lambda: education.add_case_study("Case study", "City 1", "bike_lane", narrative,
+                                            {"ridership_change": 25}, challenges=["funding"],
+                                            lessons_learned=["engage early"])
+
+
+@benchmark("education")
+def create_process_guide(data):
+    education = EducationalComponents()
+    steps = [{"title": f"Step {i}", "description": data.sentence(10)} for i in range(20)]
+    return lambda: education.create_process_guide("Capital project delivery", data.sentence(), steps, DEPARTMENTS)
+
+
+@benchmark("resilience")
+def climate_resilience_assessment(data):
+    planning = EmergencyResiliencePlanning()
+    scenarios = [{"name": f"Scenario {i}", "temperature_increase": i * 0.5, "sea_level_rise_m": i * 0.1}
+                 for i in range(10)]
+    project = {"location": data.location(), "materials": ["asphalt", "steel"], "design_life_years": 50}
+    return lambda: planning.assess_climate_resilience("project-1", project, scenarios, [2030, 2040, 2050, 2075, 2100])
+
+
+@benchmark("resilience")
+def risk_mitigation_plan(data):
+    planning = EmergencyResiliencePlanning()
+    risks = [{"id": f"risk-{i}", "impact_score": data.rng.randrange(1, 11), "likelihood_score": data.rng.randrange(1, 11)}
+             for i in range(200)]
+    strategies = [{"id": f"strategy-{i}", "risk_ids": [f"risk-{i}"]} for i in range(200)]
+    return lambda: planning.develop_risk_mitigation_plan("network-1", "road", [dict(risk) for risk in risks], strategies)
+
+
+def _knowledge_exchange(data) -> GlobalKnowledgeExchange:
+    """Get a knowledge exchange holding the generated best practices."""
+    exchange = GlobalKnowledgeExchange()
+    for i in range(data.sizes["best_practices"]):
+        exchange.add_best_practice(**data.best_practice(i))
+    return exchange
+
+
+@benchmark("knowledge")
+def search_best_practices(data):
+    exchange = _knowledge_exchange(data)
+    queries = itertools.cycle(["lane", "signal", "school", "transit", "bike path"])
+    return lambda: exchange.search_best_practices(next(queries))
+
+
+@benchmark("knowledge")
+def search_best_practices_by_category(data):
+    exchange = _knowledge_exchange(data)
+    return lambda: exchange.search_best_practices(category="cycling", min_rating=0)
+
+
+@benchmark("knowledge")
+def contextual_adaptation(data):
+    exchange = _knowledge_exchange(data)
+    needs = [{"id": f"need-{i}", "factor": data.rng.choice(["climate", "density", "funding", "culture"]),
+              "adaptation_difficulty": data.rng.choice(["low", "medium", "high"])} for i in range(20)]
+    return lambda: exchange.assess_contextual_adaptation("bp-0", {"city": "City 1", "country": "Country 1"},
+                                                         {"density": "medium"}, needs)
+
+
+@benchmark("knowledge")
+def benchmarking_dashboard(data):
+    exchange = GlobalKnowledgeExchange()
+    metric_names = [f"metric_{i}" for i in range(20)]
+
+    def city(i):
+        return {"name": f"City {i}", "metrics": {name: data.rng.random() * 100 for name in metric_names}}
+    peers = [city(i) for i in range(1, 50)]
+    metrics = {name: {"higher_is_better": i % 2 == 0} for i, name in enumerate(metric_names)}
+    return lambda: exchange.create_benchmarking_dashboard("dashboard-1", city(0), peers, metrics, "2025")
+
+
+@benchmark("engagement")
+def compare_scenarios(data):
+    engagement = EngagementEnhancements()
+    for i in range(50):
+        engagement.add_scenario("area-1", f"Scenario {i}", {"description": data.sentence(), "cost": i * 10000})
+    return lambda: engagement.compare_scenarios("area-1")
@@ -0,0 +1,76 @@
+"""
+Module: bench_design.py
+
+This module implements the benchmarks of the collaborative design tools.
+Features:
+- Reads: Alternatives of a project, one alternative, its version history, its comments
+  and its GeoJSON export
+- Writes: Creating alternatives, saving versions and adding comments
+"""
+
+import itertools
+
+from benchmarks.runner import benchmark
+from collaborative_design_tools import CollaborativeDesignTools
+
+
+def _tools():
+    return CollaborativeDesignTools("data/designs")
+
+
+@benchmark("design")
+def get_design_alternatives(data):
+    tools = _tools()
+    project_ids = itertools.cycle(data.design_project_ids)
+    return lambda: tools.get_design_alternatives(next(project_ids))
+
+
+@benchmark("design")
+def get_design_alternative(data):
+    tools = _tools()
+    alternative_ids = itertools.cycle(data.alternative_ids)
+    return lambda: tools.get_design_alternative(next(alternative_ids))
+
+
+@benchmark("design")
+def get_versions(data):
+    tools = _tools()
+    alternative_ids = itertools.cycle(data.alternative_ids)
+    return lambda: tools.get_versions(next(alternative_ids))
+
+
+@benchmark("design")
+def get_comments(data):
+    tools = _tools()
+    alternative_ids = itertools.cycle(data.alternative_ids)
+    return lambda: tools.get_comments(next(alternative_ids))
+
+
+@benchmark("design")
+def export_geojson(data):
+    tools = _tools()
+    alternative_ids = itertools.cycle(data.alternative_ids)
+    return lambda: tools.export_design(next(alternative_ids), "geojson")
+
+
+@benchmark("design")
+def create_design_alternative(data):
+    tools = _tools()
+    features = data.design_features()
+    return lambda: tools.create_design_alternative("bench-design", "Benchmark alternative", "", "user-1", features)
+
+
+@benchmark("design")
+def save_version(data):
+    tools = _tools()
+    alternative_id = data.alternative_ids[-1]
+    features = data.design_features()
+    return lambda: tools.save_version(alternative_id, "user-1", "Benchmark revision", features)
+
+
+@benchmark("design")
+def add_comment(data):
+    tools = _tools()
+    alternative_id = data.alternative_ids[-1]
+    text = data.sentence(20)
+    return lambda: tools.add_comment(alternative_id, "user-1", "User 1", text, [-122.4, 37.7])
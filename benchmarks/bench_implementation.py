@@ -0,0 +1,171 @@
+"""
+Module: bench_implementation.py
+
+This module implements the benchmarks of the implementation tools and their stores.
+Features:
+- Timeline: Visualizer, full save, patch, change feed, portfolio query and the HTML
+  and PDF renderers
+- Funding: Single and batch funding source matching and the deadline calendar
+- Compliance: Tracker lookups, the portfolio dashboard and blocked-project queries
+- Outcomes: Survey ingestion and results, time-series queries and indicator analysis
+"""
+
+import itertools
+
+from benchmarks.runner import benchmark
+from implementation_tools import (
+    implementation_timeline_visualizer,
+    save_timeline_data,
+    patch_timeline_data,
+    get_timeline_changes,
+    funding_source_matching,
+    batch_funding_source_matching,
+    regulatory_compliance_tracker
+)
+from timeline_rendering import _layout, render_html, render_pdf
+from timeline_scheduling import get_timeline_schedule
+from portfolio_timeline import portfolio_timeline
+from funding_deadlines import get_deadline_scheduler
+from compliance_index import compliance_dashboard
+from compliance_scheduling import projects_blocked_on
+from survey_responses import ingest_survey_responses, survey_results
+from timeseries_store import query_timeseries
+from outcome_analysis import analyze_indicators
+
+
+# Timeline
+
+@benchmark("timeline")
+def visualizer_json(data):
+    project_ids = itertools.cycle(data.project_ids)
+    return lambda: implementation_timeline_visualizer(next(project_ids), "json")
+
+
+@benchmark("timeline")
+def save_timeline(data):
+    timeline = data.timeline("bench-save")
+    return lambda: save_timeline_data("bench-save", dict(timeline))
+
+
+def _task_patch(task, progress):
+    return [{"op": "upsert", "collection": "tasks", "id": task["id"], "value": {**task, "progress": progress}}]
+
+
+@benchmark("timeline")
+def patch_task(data):
+    timeline = data.timeline("bench-patch")
+    save_timeline_data("bench-patch", timeline)
+    task = timeline["tasks"][0]
+    progress = itertools.cycle(range(0, 101, 5))
+    return lambda: patch_timeline_data("bench-patch", _task_patch(task, next(progress)))
+
+
+@benchmark("timeline")
+def change_feed(data):
+    timeline = data.timeline("bench-changes")
+    save_timeline_data("bench-changes", timeline)
+    for i in range(100):
+        patch_timeline_data("bench-changes", _task_patch(timeline["tasks"][i % len(timeline["tasks"])], i % 101))
+    return lambda: get_timeline_changes("bench-changes", 50)
+
+
+@benchmark("timeline")
+def portfolio_page(data):
+    return lambda: portfolio_timeline(["in-progress", "not-started"], page_size=100)
+
+
+def _chart(data):
+    project_id = data.project_ids[0]
+    timeline = implementation_timeline_visualizer(project_id, "json")["data"]
+    rows, start, end = _layout(timeline, get_timeline_schedule(project_id, timeline))
+    return rows, start, end, data.today
+
+
+@benchmark("timeline")
+def render_html_gantt(data):
+    rows, start, end, today = _chart(data)
+    return lambda: render_html("Benchmark", "Revision 1", rows, start, end, today)
+
+
+@benchmark("timeline")
+def render_pdf_gantt(data):
+    rows, start, end, today = _chart(data)
+    return lambda: render_pdf("Benchmark", "Revision 1", rows, start, end, today)
+
+
+# Funding
+
+@benchmark("funding")
+def match_project(data):
+    projects = itertools.cycle([(data.project_characteristics(), data.community_priorities()) for _ in range(50)])
+    return lambda: funding_source_matching(*next(projects))
+
+
+@benchmark("funding")
+def match_portfolio(data):
+    projects = [{
+        "project_id": f"batch-{i}",
+        "project_characteristics": data.project_characteristics(),
+        "community_priorities": data.community_priorities()
+    } for i in range(min(100, max(1, data.sizes["projects"])))]
+    return lambda: batch_funding_source_matching(projects, top_k=5)
+
+
+@benchmark("funding")
+def deadline_calendar(data):
+    scheduler = get_deadline_scheduler()
+    return lambda: scheduler.upcoming(days=90)
+
+
+# Compliance
+
+@benchmark("compliance")
+def tracker_lookup(data):
+    project_ids = itertools.cycle(data.project_ids)
+    return lambda: regulatory_compliance_tracker(next(project_ids))
+
+
+@benchmark("compliance")
+def dashboard(data):
+    return lambda: compliance_dashboard(page_size=50)
+
+
+@benchmark("compliance")
+def blocked_projects(data):
+    requirements = regulatory_compliance_tracker(data.project_ids[0])["data"]["requirements"]
+    requirement = requirements[0]["name"]
+    return lambda: projects_blocked_on(requirement)
+
+
+# Outcomes
+
+@benchmark("outcomes")
+def ingest_responses(data):
+    batches = itertools.cycle([[data.survey_response(10_000_000 + b * 100 + i) for i in range(100)]
+                               for b in range(100)])
+    return lambda: ingest_survey_responses("bench-ingest", next(batches))
+
+
+@benchmark("outcomes")
+def survey_results_lookup(data):
+    project_id = data.survey_project_ids[0]
+    return lambda: survey_results(project_id)
+
+
+@benchmark("outcomes")
+def timeseries_daily(data):
+    project_id = data.survey_project_ids[0]
+    return lambda: query_timeseries(project_id, "m1", resolution="day")
+
+
+@benchmark("outcomes")
+def timeseries_raw_window(data):
+    project_id = data.survey_project_ids[0]
+    start = data.today.replace(day=1).isoformat()
+    return lambda: query_timeseries(project_id, "m1", start=start, resolution="raw", max_points=10 ** 6)
+
+
+@benchmark("outcomes")
+def analyze_portfolio_indicators(data):
+    indicators = data.indicators()
+    return lambda: analyze_indicators(indicators, resamples=200)
@@ -0,0 +1,85 @@
+"""
+Module: bench_maintenance.py
+
+This module implements the benchmarks of the long-term maintenance planning module.
+Features:
+- Planning: Lifecycle cost projections, five-year maintenance schedules and
+  preventive maintenance optimization from condition histories
+- Community Reports: Submitting reports and voting on them with the generated
+  number of reports already on file
+"""
+
+import random
+import itertools
+
+from benchmarks.runner import benchmark
+from benchmarks.generators import ASSET_TYPES
+from long_term_maintenance_planning import LongTermMaintenancePlanning
+
+
+@benchmark("maintenance")
+def calculate_lifecycle_costs(data):
+    planner = LongTermMaintenancePlanning()
+    replacements = [{"year": year, "cost": data.rng.randrange(10, 500) * 1000} for year in range(5, 50, 5)]
+    costs = {"inspection": 12000.0, "cleaning": 8000.0, "repairs": 25000.0}
+    return lambda: planner.calculate_lifecycle_costs("asset-1", "Asset 1", "bridge", 2_500_000, 50, costs, replacements)
+
+
+@benchmark("maintenance")
+def generate_maintenance_schedule(data):
+    planner = LongTermMaintenancePlanning()
+    assets = itertools.cycle([
+        (f"asset-{i}", data.rng.choice(ASSET_TYPES), data.maintenance_tasks())
+        for i in range(min(50, max(1, data.sizes["assets"])))
+    ])
+    start = data.today.isoformat()
+
+    def schedule():
+        # The schedule jitters event dates randomly; seed it so every run does the same work
+        random.seed(data.seed)
+        asset_id, asset_type, tasks = next(assets)
+        return planner.generate_maintenance_schedule(f"schedule-{asset_id}", asset_id, asset_id, start, asset_type, tasks)
+    return schedule
+
+
+@benchmark("maintenance")
+def optimize_preventive_maintenance(data):
+    planner = LongTermMaintenancePlanning()
+    assets = itertools.cycle([
+        (f"asset-{i}", data.condition_data(), data.maintenance_options())
+        for i in range(min(50, max(1, data.sizes["assets"])))
+    ])
+    cost_factors = {"maintenance_threshold": 0.8}
+
+    def optimize():
+        asset_id, conditions, options = next(assets)
+        return planner.optimize_preventive_maintenance(asset_id, asset_id, conditions, {}, options, cost_factors)
+    return optimize
+
+
+def _planner_with_reports(data) -> LongTermMaintenancePlanning:
+    """Get a planner holding the generated number of community reports."""
+    planner = LongTermMaintenancePlanning()
+    for i in range(data.sizes["reports"]):
+        planner.submit_maintenance_report(
+            f"report-{i}", f"asset-{i % max(1, data.sizes['assets'])}", data.location(), f"user-{i % 500}",
+            data.rng.choice(["pothole", "lighting", "signage", "debris"]), data.sentence(),
+            data.rng.choice(["low", "medium", "high"]))
+    return planner
+
+
+@benchmark("maintenance")
+def submit_maintenance_report(data):
+    planner = _planner_with_reports(data)
+    report_ids = (f"bench-report-{i}" for i in itertools.count())
+    location = data.location()
+    description = data.sentence()
+    return lambda: planner.submit_maintenance_report(next(report_ids), "asset-1", location, "user-1",
+                                                     "pothole", description, "medium")
+
+
+@benchmark("maintenance")
+def vote_on_maintenance_report(data):
+    planner = _planner_with_reports(data)
+    report_ids = itertools.cycle(list(planner.maintenance_reports))
+    return lambda: planner.vote_on_maintenance_report(next(report_ids), "voter-1")
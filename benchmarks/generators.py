@@ -0,0 +1,391 @@
+"""
+Module: generators.py
+
+This module implements the synthetic data generators of the benchmark suite.
+Features:
+- Scales: Named presets (small, medium, large) for the number of projects, design
+  alternatives, versions, comments, funding sources, assets, reports and survey
+  responses, each of which can be overridden individually
+- Reproducible Data: Every generator draws from one seeded random generator, so the
+  same scale and seed produce the same workspace on every commit
+- Realistic Shapes: Records follow the formats the modules read and write (timelines
+  with phases, tasks and dependencies, GeoJSON design features, funding sources with
+  budgets, geographies and deadlines, maintenance tasks and condition histories)
+- Workspace Builder: ``SyntheticData.build()`` writes the on-disk stores under
+  ``data/`` of the current directory through the modules' own APIs
+"""
+
+import os
+import random
+import datetime
+import contextlib
+from typing import Dict, List, Optional
+
+# Entity counts per scale
+SCALES = {
+    "small": {
+        "projects": 20,
+        "tasks": 20,
+        "design_projects": 2,
+        "alternatives": 5,
+        "versions": 3,
+        "comments": 10,
+        "features": 20,
+        "funding_sources": 50,
+        "assets": 20,
+        "maintenance_tasks": 5,
+        "condition_records": 10,
+        "reports": 100,
+        "survey_projects": 2,
+        "responses": 500,
+        "series": 2,
+        "readings_days": 30,
+        "indicators": 5,
+        "best_practices": 100
+    },
+    "medium": {
+        "projects": 200,
+        "tasks": 50,
+        "design_projects": 5,
+        "alternatives": 20,
+        "versions": 10,
+        "comments": 50,
+        "features": 100,
+        "funding_sources": 500,
+        "assets": 200,
+        "maintenance_tasks": 10,
+        "condition_records": 40,
+        "reports": 2000,
+        "survey_projects": 5,
+        "responses": 5000,
+        "series": 4,
+        "readings_days": 180,
+        "indicators": 20,
+        "best_practices": 1000
+    },
+    "large": {
+        "projects": 1000,
+        "tasks": 100,
+        "design_projects": 10,
+        "alternatives": 50,
+        "versions": 25,
+        "comments": 100,
+        "features": 500,
+        "funding_sources": 5000,
+        "assets": 1000,
+        "maintenance_tasks": 20,
+        "condition_records": 120,
+        "reports": 20000,
+        "survey_projects": 10,
+        "responses": 50000,
+        "series": 8,
+        "readings_days": 365,
+        "indicators": 50,
+        "best_practices": 10000
+    }
+}
+
+PROJECT_TYPES = ["bicycle", "pedestrian", "transit", "multi-modal", "road", "bridge",
+                 "intersection", "traffic calming", "electric vehicle", "green infrastructure"]
+PRIORITIES = ["equity", "sustainability", "accessibility", "safety", "congestion", "air quality",
+              "economic development", "vision zero", "emissions reduction", "last-mile connectivity"]
+FOCUS_AREAS = ["innovation", "community engagement", "infrastructure", "maintenance", "school routes",
+               "electrification", "data collection", "connectivity", "education", "smart technology"]
+GEOGRAPHIES = ["nationwide", "urban", "rural", "metropolitan", "suburban", "CA", "NY", "TX", "WA", "OR"]
+STATES = ["CA", "NY", "TX", "WA", "OR", "IL", "MA", "CO"]
+AREA_TYPES = ["urban", "suburban", "rural", "metropolitan"]
+PHASE_NAMES = ["Planning", "Design", "Permitting", "Procurement", "Construction", "Evaluation"]
+ASSET_TYPES = ["bike_lane", "sidewalk", "bridge", "traffic_signal", "bus_shelter", "road_segment"]
+WORDS = ("safe protected lane crossing signal bus stop corridor sidewalk ramp lighting bench "
+         "shade tree parking speed school transit route access bike path curb intersection "
+         "wayfinding repair pothole drainage snow plow community neighborhood").split()
+
+
+class SyntheticData:
+    """Generator of a reproducible benchmark workspace."""
+
+    def __init__(self, scale: str = "small", seed: int = 42, overrides: Optional[Dict[str, int]] = None):
+        """Configure the generator.
+
+        Args:
+            scale: One of ``SCALES``
+            seed: Seed of the random generator
+            overrides: Entity counts replacing those of the scale
+        """
+        if scale not in SCALES:
+            raise ValueError(f"Unknown scale: {scale} (expected one of {', '.join(SCALES)})")
+        unknown = set(overrides or {}) - set(SCALES[scale])
+        if unknown:
+            raise ValueError(f"Unknown sizes: {', '.join(sorted(unknown))}")
+        self.scale = scale
+        self.seed = seed
+        self.sizes = {**SCALES[scale], **(overrides or {})}
+        self.rng = random.Random(seed)
+        self.today = datetime.date.today()
+
+        # Filled in by build()
+        self.project_ids: List[str] = []
+        self.design_project_ids: List[str] = []
+        self.alternative_ids: List[str] = []
+        self.survey_project_ids: List[str] = []
+
+    # Records
+
+    def sentence(self, words: int = 12) -> str:
+        """Get a sentence of random vocabulary words."""
+        return " ".join(self.rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+    def location(self) -> Dict:
+        """Get a project location."""
+        return {
+            "city": f"City {self.rng.randrange(50)}",
+            "state": self.rng.choice(STATES),
+            "county": f"County {self.rng.randrange(20)}",
+            "area_type": self.rng.choice(AREA_TYPES),
+            "near_water": self.rng.random() < 0.2
+        }
+
+    def project_characteristics(self) -> Dict:
+        """Get the characteristics of a project for funding matching."""
+        return {
+            "type": self.rng.choice(PROJECT_TYPES),
+            "budget": self.rng.randrange(20, 3000) * 1000,
+            "location": self.location(),
+            "focus_areas": self.rng.sample(FOCUS_AREAS, 3)
+        }
+
+    def community_priorities(self) -> List[str]:
+        """Get a project's community priorities."""
+        return self.rng.sample(PRIORITIES, 3)
+
+    def timeline(self, project_id: str) -> Dict:
+        """Get a project timeline with phases, tasks with dependencies and milestones."""
+        start = self.today - datetime.timedelta(days=self.rng.randrange(0, 720))
+        phases = []
+        tasks = []
+        milestones = []
+        task_count = self.sizes["tasks"]
+        per_phase = max(1, -(-task_count // len(PHASE_NAMES)))
+        day = start
+        for p, name in enumerate(PHASE_NAMES):
+            length = self.rng.randrange(30, 180)
+            phase = {
+                "id": f"{project_id}-phase-{p}",
+                "name": name,
+                "startDate": day.isoformat(),
+                "endDate": (day + datetime.timedelta(days=length)).isoformat(),
+                "status": "not-started",
+                "progress": 0
+            }
+            phases.append(phase)
+            for t in range(per_phase):
+                index = len(tasks)
+                if index >= task_count:
+                    break
+                task_start = day + datetime.timedelta(days=self.rng.randrange(0, max(1, length - 14)))
+                dependencies = [tasks[-1]["id"]] if tasks and self.rng.random() < 0.6 else []
+                tasks.append({
+                    "id": f"{project_id}-task-{index}",
+                    "phaseId": phase["id"],
+                    "name": f"{name} task {t + 1}: {self.sentence(3)}",
+                    "startDate": task_start.isoformat(),
+                    "endDate": (task_start + datetime.timedelta(days=self.rng.randrange(3, 60))).isoformat(),
+                    "status": self.rng.choice(["not-started", "in-progress", "completed"]),
+                    "progress": self.rng.randrange(0, 101, 10),
+                    "assignedTo": f"member-{self.rng.randrange(10)}",
+                    "dependencies": dependencies
+                })
+            milestones.append({
+                "id": f"{project_id}-milestone-{p}",
+                "phaseId": phase["id"],
+                "name": f"{name} complete",
+                "date": phase["endDate"],
+                "status": "not-started"
+            })
+            day += datetime.timedelta(days=length)
+        return {
+            "project": {"id": project_id, "name": f"Project {project_id}"},
+            "phases": phases,
+            "tasks": tasks,
+            "milestones": milestones,
+            "teamMembers": [{"id": f"member-{i}", "name": f"Member {i}"} for i in range(10)],
+            "comments": []
+        }
+
+    def design_features(self, count: Optional[int] = None) -> List[Dict]:
+        """Get GeoJSON features of a design alternative."""
+        features = []
+        for i in range(self.sizes["features"] if count is None else count):
+            lon, lat = -122.4 + self.rng.random() * 0.1, 37.7 + self.rng.random() * 0.1
+            if i % 3 == 0:
+                geometry = {"type": "Point", "coordinates": [lon, lat]}
+            else:
+                geometry = {"type": "LineString", "coordinates": [
+                    [lon + self.rng.random() * 0.01, lat + self.rng.random() * 0.01] for _ in range(8)]}
+            features.append({
+                "type": "Feature",
+                "id": f"feature-{i}",
+                "geometry": geometry,
+                "properties": {"name": f"Element {i}", "elementType": self.rng.choice(ASSET_TYPES),
+                               "description": self.sentence(8)}
+            })
+        return features
+
+    def funding_source(self, index: int) -> Dict:
+        """Get a funding source record."""
+        minimum = self.rng.randrange(10, 500) * 1000
+        return {
+            "id": f"fs-{index:05d}",
+            "name": f"{self.rng.choice(PRIORITIES).title()} {self.rng.choice(['Grant', 'Fund', 'Program'])} {index}",
+            "organization": f"Agency {self.rng.randrange(100)}",
+            "description": self.sentence(15),
+            "eligible_project_types": self.rng.sample(PROJECT_TYPES, 3),
+            "minimum_budget": minimum,
+            "maximum_budget": minimum * self.rng.randrange(2, 20),
+            "deadline": (self.today + datetime.timedelta(days=self.rng.randrange(-30, 365))).isoformat(),
+            "geographic_eligibility": self.rng.sample(GEOGRAPHIES, 2),
+            "priority_areas": self.rng.sample(PRIORITIES, 3),
+            "focus_areas": self.rng.sample(FOCUS_AREAS, 3),
+            "available_funding": self.rng.randrange(1, 50) * 100000,
+            "application_url": f"https://grants.example.org/{index}",
+            "contact_info": f"grants{index}@example.org"
+        }
+
+    def maintenance_tasks(self) -> List[Dict]:
+        """Get the maintenance tasks of an asset."""
+        return [{
+            "task_id": f"mt-{i}",
+            "task_name": f"{self.rng.choice(['Inspect', 'Clean', 'Repair', 'Repaint', 'Resurface'])} {self.rng.choice(WORDS)}",
+            "frequency_days": self.rng.choice([7, 14, 30, 90, 180, 365]),
+            "priority": self.rng.choice(["low", "medium", "high"]),
+            "duration_hours": self.rng.randrange(1, 12),
+            "affected_by_usage": self.rng.random() < 0.5,
+            "affected_by_climate": self.rng.random() < 0.5,
+            "resources_needed": {"crew": self.rng.randrange(1, 5)}
+        } for i in range(self.sizes["maintenance_tasks"])]
+
+    def condition_data(self) -> List[Dict]:
+        """Get an asset's condition assessment history (scores from 1 down)."""
+        records = []
+        score = 1.0
+        day = self.today - datetime.timedelta(days=30 * self.sizes["condition_records"])
+        for _ in range(self.sizes["condition_records"]):
+            score = max(0.0, score - self.rng.random() * 0.02)
+            records.append({"assessment_date": day.isoformat(), "condition_score": round(score, 3)})
+            day += datetime.timedelta(days=30)
+        self.rng.shuffle(records)
+        return records
+
+    def maintenance_options(self) -> List[Dict]:
+        """Get maintenance intervention options."""
+        return [{"name": f"Option {i}", "condition_improvement": round(self.rng.uniform(0.1, 0.5), 2),
+                 "cost": self.rng.randrange(5, 200) * 1000} for i in range(8)]
+
+    def survey_response(self, index: int) -> Dict:
+        """Get a survey response to the default survey template."""
+        submitted = datetime.datetime.combine(self.today, datetime.time()) - datetime.timedelta(
+            seconds=self.rng.randrange(0, 90 * 86400))
+        return {
+            "response_id": f"r-{index}",
+            "submitted_at": submitted.isoformat(),
+            "device_id": f"device-{index}",
+            "ip": f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+            "duration_seconds": self.rng.randrange(60, 900),
+            "answers": {
+                "q1": self.rng.randrange(6),
+                "q2": self.rng.randrange(5),
+                "q3": self.rng.randrange(5),
+                "q4": self.sentence(self.rng.randrange(4, 20)),
+                "q5": self.sentence(self.rng.randrange(4, 20)),
+                "q6": self.rng.randrange(4),
+                "q7": self.rng.randrange(5),
+                "q8": self.rng.randrange(8),
+                "q9": self.rng.randrange(5)
+            }
+        }
+
+    def counter_series(self) -> Dict[str, Dict]:
+        """Get hourly counter readings for each series of a usage metric."""
+        days = self.sizes["readings_days"]
+        start = datetime.datetime.combine(self.today - datetime.timedelta(days=days), datetime.time())
+        return {
+            f"counter-{s}": {
+                "start": start.isoformat(),
+                "interval": 3600,
+                "values": [float(self.rng.randrange(0, 200)) for _ in range(days * 24)]
+            } for s in range(self.sizes["series"])
+        }
+
+    def indicators(self) -> List[Dict]:
+        """Get outcome indicators over the generated counter series."""
+        days = self.sizes["readings_days"]
+        middle = (self.today - datetime.timedelta(days=days // 2)).isoformat()
+        indicators = []
+        for i in range(self.sizes["indicators"]):
+            project_id = self.survey_project_ids[i % len(self.survey_project_ids)]
+            indicators.append({
+                "id": f"indicator-{i}",
+                "target": self.rng.choice(["+10% in usage", "+5% in usage", "-20% in crashes"]),
+                "source": {"type": "timeseries", "project_id": project_id, "metric": "m1", "resolution": "day"},
+                "baseline": {"end": middle},
+                "post": {"start": middle}
+            })
+        return indicators
+
+    def best_practice(self, index: int) -> Dict:
+        """Get the arguments of a best practice record."""
+        return {
+            "practice_id": f"bp-{index}",
+            "title": f"{self.rng.choice(WORDS).title()} {self.rng.choice(WORDS)} program {index}",
+            "location": {"city": f"City {index % 300}", "country": f"Country {index % 40}",
+                         "region": self.rng.choice(["Europe", "Asia", "Americas", "Africa", "Oceania"])},
+            "category": self.rng.choice(["cycling", "transit", "walking", "safety", "freight"]),
+            "description": self.sentence(25),
+            "outcomes": {"ridership_change": self.rng.randrange(-10, 60)},
+            "implementation_details": {"cost": self.rng.randrange(1, 100) * 100000, "years": self.rng.randrange(1, 8)}
+        }
+
+    # Workspace
+
+    def build(self):
+        """Write the on-disk stores under ``data/`` of the current directory."""
+        # The modules read their stores relative to the working directory
+        from implementation_tools import save_timeline_data, regulatory_compliance_tracker
+        from collaborative_design_tools import CollaborativeDesignTools
+        from survey_responses import ingest_survey_responses
+        from timeseries_store import ingest_timeseries
+        from serialization import dump_file
+
+        os.makedirs("data", exist_ok=True)
+        dump_file([self.funding_source(i) for i in range(self.sizes["funding_sources"])], "data/funding_sources.json")
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for i in range(self.sizes["projects"]):
+                project_id = f"proj-{i:05d}"
+                self.project_ids.append(project_id)
+                save_timeline_data(project_id, self.timeline(project_id))
+                regulatory_compliance_tracker(project_id, self.rng.choice(PROJECT_TYPES), self.location())
+
+            tools = CollaborativeDesignTools("data/designs")
+            for d in range(self.sizes["design_projects"]):
+                project_id = self.project_ids[d % len(self.project_ids)] if self.project_ids else f"design-{d}"
+                self.design_project_ids.append(project_id)
+                for a in range(self.sizes["alternatives"]):
+                    features = self.design_features()
+                    alternative = tools.create_design_alternative(
+                        project_id, f"Alternative {a + 1}", self.sentence(), f"user-{a % 7}", features, a % 2 == 0)
+                    self.alternative_ids.append(alternative.id)
+                    for v in range(self.sizes["versions"] - 1):
+                        features = features[1:] + self.design_features(1)
+                        tools.save_version(alternative.id, f"user-{v % 7}", f"Revision {v + 2}", features)
+                    for c in range(self.sizes["comments"]):
+                        tools.add_comment(alternative.id, f"user-{c % 13}", f"User {c % 13}", self.sentence(),
+                                          [-122.4 + self.rng.random() * 0.1, 37.7 + self.rng.random() * 0.1])
+
+            for s in range(self.sizes["survey_projects"]):
+                project_id = self.project_ids[s % len(self.project_ids)] if self.project_ids else f"survey-{s}"
+                self.survey_project_ids.append(project_id)
+                responses = [self.survey_response(s * self.sizes["responses"] + r) for r in range(self.sizes["responses"])]
+                for offset in range(0, len(responses), 1000):
+                    ingest_survey_responses(project_id, responses[offset:offset + 1000])
+                ingest_timeseries(project_id, "m1", self.counter_series())
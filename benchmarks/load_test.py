@@ -0,0 +1,562 @@
+"""
+Module: load_test.py
+
+This module implements the load generator of the API.
+Features:
+- Self-Contained Server: Builds a synthetic workspace and starts the API on it with
+  gunicorn (as configured by ``src/gunicorn.conf.py``) or the development server, or
+  targets an already running server with ``--url``
+- Traffic Mixes: Virtual users send a weighted mix of requests: timeline polling with
+  ``If-None-Match``, timeline views and edits, funding matches, compliance views and
+  generation, survey results and submissions, dashboards and batches
+- Concurrency Ramp: Runs one step per concurrency level, with optional think time
+  between a user's requests, and stops early once the error rate passes a limit
+- Reporting: Throughput, error rate, rejection rate (``429``/``503`` from admission
+  control) and latency percentiles per step and per route, printed as tables and
+  written as a JSON result file; throughput, latencies and the peak step count admitted
+  requests only
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import subprocess
+import http.client
+import urllib.parse
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import SRC_DIR
+from benchmarks.runner import environment
+from benchmarks.generators import PROJECT_TYPES, SyntheticData
+
+# Development server entry point, with per-request logging disabled
+DEV_SERVER = (
+    "import logging, os\n"
+    "from api import create_app\n"
+    "logging.getLogger('werkzeug').setLevel(logging.ERROR)\n"
+    "create_app().run(host='127.0.0.1', port=int(os.environ['SERVER_PORT']), threaded=True)\n"
+)
+
+# Seconds to wait for a started server to answer its health check
+STARTUP_TIMEOUT = 60
+
+# Per-request socket timeout, in seconds
+REQUEST_TIMEOUT = 30
+
+# Compliance generation writes one file per project; reuse this many project ids
+GENERATED_PROJECTS = 50
+
+# Traffic mixes: route -> relative weight
+MIXES = {
+    "hearing": {
+        "timeline_poll": 40,
+        "timeline_view": 10,
+        "portfolio": 5,
+        "funding_match": 10,
+        "funding_deadlines": 3,
+        "compliance_view": 10,
+        "compliance_generate": 5,
+        "compliance_dashboard": 3,
+        "survey_results": 5,
+        "survey_submit": 5,
+        "timeline_edit": 2,
+        "dashboard_batch": 2
+    },
+    "read-only": {
+        "timeline_poll": 40,
+        "timeline_view": 15,
+        "portfolio": 10,
+        "funding_deadlines": 5,
+        "compliance_view": 15,
+        "compliance_dashboard": 5,
+        "survey_results": 5,
+        "dashboard_batch": 5
+    },
+    "staff": {
+        "timeline_view": 20,
+        "timeline_edit": 30,
+        "funding_match": 20,
+        "compliance_generate": 30
+    }
+}
+
+
+class Target:
+    """The projects and tasks of the server under test, discovered through the API."""
+
+    def __init__(self, project_ids: List[str], task_ids: Dict[str, List[str]]):
+        self.project_ids = project_ids
+        self.task_ids = task_ids
+        self.edit_project_ids = [project_id for project_id in project_ids if task_ids.get(project_id)]
+
+
+class User:
+    """A virtual user: one keep-alive connection, its own random inputs and ETag cache."""
+
+    def __init__(self, index: int, host: str, port: int, target: Target, data: SyntheticData):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.target = target
+        self.data = data
+        self.rng = data.rng
+        self.etags: Dict[str, str] = {}
+        self.sequence = 0
+        # Users at a hearing watch a few popular projects
+        self.watched = self.rng.choice(target.project_ids[:5])
+        self.connection: Optional[http.client.HTTPConnection] = None
+        # Each user is a separate client to the server's per-client rate limits
+        self.headers = {"X-Forwarded-For": f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"}
+
+    def request(self, method: str, path: str, body=None, headers: Optional[Dict] = None):
+        """Send a request on the user's connection, reconnecting after a failure.
+
+        Returns:
+            The status, the response headers and the body
+        """
+        headers = {"Accept": "application/json", "Accept-Encoding": "gzip", **self.headers, **(headers or {})}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        reused = self.connection is not None
+        if not reused:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+        try:
+            self.connection.request(method, path, payload, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            self.close()
+            # The server closed an idle keep-alive connection; retry safe requests as browsers do
+            if reused and method == "GET":
+                return self.request(method, path, body, headers)
+            raise
+        except Exception:
+            self.close()
+            raise
+        if response.getheader("Connection", "").lower() == "close":
+            self.close()
+        return response.status, response, content
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def project_id(self) -> str:
+        return self.rng.choice(self.target.project_ids)
+
+
+# Routes: name -> function(user) sending one request and returning its status
+
+def timeline_poll(user: User) -> int:
+    path = f"/api/implementation-timeline/{user.watched}"
+    headers = {"If-None-Match": user.etags[path]} if path in user.etags else {}
+    status, response, _ = user.request("GET", path, headers=headers)
+    if response.getheader("ETag"):
+        user.etags[path] = response.getheader("ETag")
+    return status
+
+
+def timeline_view(user: User) -> int:
+    return user.request("GET", f"/api/implementation-timeline/{user.project_id()}")[0]
+
+
+def timeline_edit(user: User) -> int:
+    project_id = user.rng.choice(user.target.edit_project_ids)
+    task_id = user.rng.choice(user.target.task_ids[project_id])
+    operation = {"op": "upsert", "collection": "tasks", "id": task_id,
+                 "value": {"progress": user.rng.randrange(0, 101, 5)}}
+    return user.request("PATCH", f"/api/implementation-timeline/{project_id}", {"operations": [operation]})[0]
+
+
+def portfolio(user: User) -> int:
+    pages = max(1, len(user.target.project_ids) // 50)
+    return user.request("GET", f"/api/portfolio/timeline?page_size=50&page={user.rng.randrange(pages) + 1}")[0]
+
+
+def funding_match(user: User) -> int:
+    body = {"project_characteristics": user.data.project_characteristics(),
+            "community_priorities": user.data.community_priorities()}
+    return user.request("POST", "/api/funding-sources", body)[0]
+
+
+def funding_deadlines(user: User) -> int:
+    return user.request("GET", "/api/funding-deadlines?days=90")[0]
+
+
+def compliance_view(user: User) -> int:
+    return user.request("GET", f"/api/regulatory-compliance/{user.project_id()}")[0]
+
+
+def compliance_generate(user: User) -> int:
+    body = {"project_id": f"load-test-{user.rng.randrange(GENERATED_PROJECTS)}",
+            "project_type": user.rng.choice(PROJECT_TYPES), "location": user.data.location()}
+    return user.request("POST", "/api/regulatory-compliance", body)[0]
+
+
+def compliance_dashboard(user: User) -> int:
+    return user.request("GET", "/api/regulatory-compliance/dashboard?page_size=50")[0]
+
+
+def survey_results(user: User) -> int:
+    return user.request("GET", f"/api/outcome-measurement/{user.project_id()}/results")[0]
+
+
+def survey_submit(user: User) -> int:
+    user.sequence += 1
+    response = user.data.survey_response(0)
+    response.update(response_id=f"load-{user.index}-{user.sequence}", device_id=f"load-{user.index}")
+    response.pop("ip")
+    return user.request("POST", f"/api/outcome-measurement/{user.watched}/responses", response)[0]
+
+
+def dashboard_batch(user: User) -> int:
+    project_id = user.watched
+    body = {"requests": [
+        {"path": f"/api/implementation-timeline/{project_id}"},
+        {"path": f"/api/regulatory-compliance/{project_id}"},
+        {"path": f"/api/outcome-measurement/{project_id}/results"},
+        {"path": "/api/funding-deadlines"}
+    ]}
+    return user.request("POST", "/api/batch", body)[0]
+
+
+ROUTES: Dict[str, Callable[[User], int]] = {
+    function.__name__: function for function in (
+        timeline_poll, timeline_view, timeline_edit, portfolio, funding_match, funding_deadlines,
+        compliance_view, compliance_generate, compliance_dashboard, survey_results, survey_submit,
+        dashboard_batch
+    )
+}
+
+
+def discover(host: str, port: int, edit_projects: int = 20) -> Target:
+    """Find the projects of the server and the task ids of some of them."""
+    user = User.__new__(User)
+    user.host, user.port, user.connection, user.headers = host, port, None, {}
+    try:
+        status, _, content = user.request("GET", "/api/portfolio/timeline?page_size=500")
+        if status != 200:
+            raise RuntimeError(f"Portfolio request returned {status}")
+        project_ids = [project["project_id"] for project in json.loads(_decode(content))["projects"]]
+        if not project_ids:
+            raise RuntimeError("The server has no project timelines")
+        task_ids = {}
+        for project_id in project_ids[:edit_projects]:
+            status, _, content = user.request("GET", f"/api/implementation-timeline/{project_id}")
+            if status == 200:
+                tasks = json.loads(_decode(content)).get("data", {}).get("tasks", [])
+                task_ids[project_id] = [task["id"] for task in tasks if task.get("id")]
+        return Target(project_ids, task_ids)
+    finally:
+        user.close()
+
+
+def _decode(content: bytes) -> bytes:
+    """Undo the gzip encoding of a response body."""
+    if content[:2] == b"\x1f\x8b":
+        import gzip
+        return gzip.decompress(content)
+    return content
+
+
+def _user_loop(user: User, routes: List[str], weights: List[float], think_time: float,
+               record_from: float, stop: float, records: List[tuple]):
+    """Send requests until the step ends, recording those started after the warm-up."""
+    functions = [ROUTES[route] for route in routes]
+    try:
+        while True:
+            start = time.perf_counter()
+            if start >= stop:
+                break
+            index = user.rng.choices(range(len(routes)), weights)[0]
+            try:
+                status = functions[index](user)
+            except Exception as e:
+                status = type(e).__name__
+            end = time.perf_counter()
+            if start >= record_from:
+                # list.append is atomic, so the users share one list
+                records.append((routes[index], status, end - start))
+            if think_time:
+                time.sleep(min(user.rng.expovariate(1 / think_time), max(0.0, stop - time.perf_counter())))
+    finally:
+        user.close()
+
+
+def run_step(host: str, port: int, target: Target, concurrency: int, mix: Dict[str, float],
+             duration: float, warmup: float, think_time: float, seed: int, scale: str) -> Dict:
+    """Run one concurrency level and summarize it."""
+    routes = [route for route, weight in mix.items() if weight > 0]
+    weights = [mix[route] for route in routes]
+    records: List[tuple] = []
+    start = time.perf_counter()
+    record_from = start + warmup
+    stop = record_from + duration
+    threads = []
+    for index in range(concurrency):
+        user = User(index, host, port, target, SyntheticData(scale, seed=seed * 100_003 + index))
+        thread = threading.Thread(target=_user_loop, daemon=True,
+                                  args=(user, routes, weights, think_time, record_from, stop, records))
+        threads.append(thread)
+        thread.start()
+    for thread in threads:
+        thread.join(stop - time.perf_counter() + REQUEST_TIMEOUT + 1)
+    step = {"concurrency": concurrency, **summarize(records, duration)}
+    step["routes"] = {route: summarize([record for record in records if record[0] == route], duration)
+                      for route in routes}
+    return step
+
+
+def summarize(records: List[tuple], duration: float) -> Dict:
+    """Get the throughput, error rate, status counts and latency percentiles of requests.
+
+    Throughput and latencies count admitted requests only, since requests rejected by
+    admission control (``429``/``503``) return at once; ``offered_throughput`` counts all.
+    """
+    statuses: Dict[str, int] = {}
+    for _, status, _ in records:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    rejected = statuses.get("429", 0) + statuses.get("503", 0)
+    errors = sum(count for status, count in statuses.items()
+                 if not (status.isdigit() and int(status) < 400)) - rejected
+    latencies = sorted(record[2] for record in records if record[1] not in (429, 503))
+    return {
+        "requests": len(records),
+        "throughput": len(latencies) / duration,
+        "offered_throughput": len(records) / duration,
+        "errors": errors,
+        "error_rate": errors / len(records) if records else 0.0,
+        "rejected": rejected,
+        "rejected_rate": rejected / len(records) if records else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+        "latency": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+            "mean": sum(latencies) / len(latencies) if latencies else None
+        }
+    }
+
+
+def percentile(ordered: List[float], percent: float) -> Optional[float]:
+    """Get a nearest-rank percentile of sorted values."""
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+class Server:
+    """An API server started on a workspace for the duration of a load test."""
+
+    def __init__(self, kind: str, workspace: str, workers: Optional[int] = None):
+        self.kind = kind
+        self.workspace = workspace
+        self.workers = workers
+        self.port = _free_port()
+        self.log_path = os.path.join(workspace, "server.log")
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self):
+        # Rate limit the virtual users separately, by the address they send
+        env = {**os.environ, "SERVER_PORT": str(self.port), "API_CLIENT_HEADER": "X-Forwarded-For",
+               "PYTHONPATH": os.pathsep.join(filter(None, [SRC_DIR, os.environ.get("PYTHONPATH")]))}
+        if self.kind == "gunicorn":
+            command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(SRC_DIR, "gunicorn.conf.py"),
+                       "--bind", f"127.0.0.1:{self.port}", "wsgi:app"]
+            if self.workers:
+                command += ["--workers", str(self.workers)]
+        else:
+            command = [sys.executable, "-c", DEV_SERVER]
+        with open(self.log_path, 'wb') as log:
+            self.process = subprocess.Popen(command, cwd=self.workspace, env=env,
+                                            stdout=log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"The {self.kind} server exited:\n{self.log_tail()}")
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=2)
+                connection.request("GET", "/api/health")
+                if connection.getresponse().status == 200:
+                    connection.close()
+                    return
+                connection.close()
+            except OSError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"The {self.kind} server did not start within {STARTUP_TIMEOUT} s:\n{self.log_tail()}")
+
+    def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(35)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def log_tail(self, lines: int = 20) -> str:
+        try:
+            with open(self.log_path, errors="replace") as log:
+                return "".join(log.readlines()[-lines:])
+        except OSError:
+            return ""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _gunicorn_available() -> bool:
+    try:
+        import gunicorn  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def parse_mix(name: str, weights: Optional[List[str]]) -> Dict[str, float]:
+    """Get the weights of a named mix with ``route=weight`` overrides applied."""
+    if name not in MIXES:
+        raise ValueError(f"Unknown mix: {name} (expected one of {', '.join(MIXES)})")
+    mix = dict(MIXES[name])
+    for value in weights or []:
+        route, separator, weight = value.partition("=")
+        if not separator or route not in ROUTES:
+            raise ValueError(f"Expected route=weight with a route of: {', '.join(ROUTES)}; got {value!r}")
+        try:
+            mix[route] = float(weight)
+        except ValueError:
+            raise ValueError(f"Invalid weight in {value!r}")
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The mix has no route with a positive weight")
+    return mix
+
+
+def format_step(step: Dict, label: str) -> str:
+    latency = step["latency"]
+
+    def ms(seconds):
+        return f"{seconds * 1000:.1f}" if seconds is not None else "-"
+    return (f"{label:<22} {step['requests']:>8} {step['throughput']:>9.1f} {step['error_rate']:>7.1%} "
+            f"{step['rejected_rate']:>9.1%} "
+            f"{ms(latency['p50']):>8} {ms(latency['p90']):>8} {ms(latency['p99']):>8} {ms(latency['max']):>8}")
+
+
+STEP_HEADER = f"{'':<22} {'requests':>8} {'req/s':>9} {'errors':>7} {'rejected':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+
+
+def load_test(args) -> int:
+    """Run a load test from the parsed command line arguments."""
+    try:
+        mix = parse_mix(args.mix, args.weight)
+        levels = sorted({int(level) for level in args.concurrency.split(",")})
+        if not levels or levels[0] < 1:
+            raise ValueError("Concurrency levels must be positive")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    data = SyntheticData(args.scale, args.seed)
+    output = os.path.abspath(args.output) if args.output else None
+
+    server = None
+    workspace = None
+    if args.url:
+        url = urllib.parse.urlsplit(args.url)
+        host, port, server_kind = url.hostname, url.port or 80, args.url
+    else:
+        server_kind = args.server or ("gunicorn" if _gunicorn_available() else "dev")
+        workspace = os.path.abspath(args.workspace) if args.workspace else tempfile.mkdtemp(prefix="load-")
+        os.makedirs(workspace, exist_ok=True)
+        cwd = os.getcwd()
+        os.chdir(workspace)
+        try:
+            if not os.path.isdir("data/implementation"):
+                print(f"Building {args.scale} workspace in {workspace} ...", file=sys.stderr)
+                data.build()
+        finally:
+            os.chdir(cwd)
+        server = Server(server_kind, workspace, args.workers)
+
+    steps = []
+    try:
+        if server is not None:
+            server.start()
+            host, port = "127.0.0.1", server.port
+            print(f"Started {server_kind} server on port {port}", file=sys.stderr)
+        target = discover(host, port)
+        print(f"Mix {args.mix}: " + ", ".join(f"{route}={weight:g}" for route, weight in mix.items() if weight > 0),
+              file=sys.stderr)
+        print(f"{len(target.project_ids)} projects, {args.duration:g} s per step"
+              + (f", think time {args.think_time:g} s" if args.think_time else ""), file=sys.stderr)
+        print(STEP_HEADER.replace(" " * 22, f"{'users':<22}", 1), file=sys.stderr)
+        for concurrency in levels:
+            step = run_step(host, port, target, concurrency, mix, args.duration, args.warmup,
+                            args.think_time, args.seed, args.scale)
+            steps.append(step)
+            print(format_step(step, str(concurrency)), file=sys.stderr)
+            if step["error_rate"] > args.max_error_rate:
+                print(f"Stopping: error rate above {args.max_error_rate:.0%}", file=sys.stderr)
+                break
+    except (OSError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if server is not None:
+            server.stop()
+        if workspace and not args.workspace and not args.keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    if steps:
+        peak = max(steps, key=lambda step: step["throughput"])
+        print(f"\nPeak throughput {peak['throughput']:.1f} req/s at {peak['concurrency']} users", file=sys.stderr)
+        print(STEP_HEADER.replace(" " * 22, f"{'route':<22}", 1), file=sys.stderr)
+        for route, summary in peak["routes"].items():
+            print(format_step(summary, route), file=sys.stderr)
+    if output:
+        document = {**environment(data), "server": server_kind, "mix": args.mix, "weights": mix,
+                    "duration": args.duration, "warmup": args.warmup, "think_time": args.think_time,
+                    "steps": steps}
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, 'w') as file:
+            json.dump(document, file, indent=2)
+        print(f"Results written to {output}", file=sys.stderr)
+    return 0
+
+
+def add_arguments(parser):
+    """Add the load test options to an argument parser."""
+    parser.add_argument("--url", help="Test a running server (e.g. http://127.0.0.1:5001) instead of starting one")
+    parser.add_argument("--server", choices=["gunicorn", "dev"],
+                        help="Server to start (default: gunicorn when installed, else the development server)")
+    parser.add_argument("--workers", type=int, help="gunicorn workers (default: gunicorn.conf.py)")
+    parser.add_argument("--scale", default="small", help="Data size preset of the started server's workspace")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the data and the users")
+    parser.add_argument("--mix", default="hearing", help=f"Traffic mix: {', '.join(MIXES)} (default: hearing)")
+    parser.add_argument("--weight", action="append", metavar="ROUTE=WEIGHT",
+                        help=f"Override the weight of a route of the mix (repeatable). Routes: {', '.join(ROUTES)}")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated concurrent users per step")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per step")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds at the start of each step")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="Mean pause between a user's requests, in seconds (default: 0, back to back)")
+    parser.add_argument("--max-error-rate", type=float, default=0.05,
+                        help="Stop ramping once a step's error rate is above this (default: 0.05)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--workspace", help="Build (or reuse) the server's data in this directory and keep it")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary workspace")
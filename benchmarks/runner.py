@@ -0,0 +1,229 @@
+"""
+Module: runner.py
+
+This module implements the registry, timing loop and result files of the benchmark suite.
+Features:
+- Registration: ``@benchmark(group)`` registers a setup function that receives the
+  generated data and returns the zero-argument callable to time
+- Timing: Calibrates the number of calls per round (as ``timeit`` does), then times
+  a fixed number of rounds with garbage collection disabled and module output silenced,
+  reporting per-call min, median, mean, standard deviation and interquartile range
+- Results: One JSON document per run with the commit, interpreter, platform, scale and
+  entity counts, so results of different commits can be compared
+- Comparison: Matches the benchmarks of two result files and flags those whose
+  median slowed down by more than a threshold
+"""
+
+import gc
+import io
+import os
+import sys
+import time
+import json
+import fnmatch
+import platform
+import datetime
+import statistics
+import subprocess
+import contextlib
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import REPO_DIR
+
+# Result file format version
+RESULTS_VERSION = 1
+
+# Target duration of one timing round, in seconds
+ROUND_TIME = 0.02
+
+# Registered benchmarks: name -> (group, setup function)
+BENCHMARKS: Dict[str, tuple] = {}
+
+
+def benchmark(group: str, name: Optional[str] = None):
+    """Register a benchmark.
+
+    The decorated function receives the ``SyntheticData`` of the run and returns the
+    callable to time. Work done in the function itself (loading, building inputs)
+    is not timed.
+
+    Args:
+        group: The group (usually the module) the benchmark belongs to
+        name: The benchmark name within the group, defaults to the function name
+    """
+    def decorator(setup):
+        BENCHMARKS[f"{group}.{name or setup.__name__}"] = (group, setup)
+        return setup
+    return decorator
+
+
+def run_benchmarks(data, patterns: Optional[List[str]] = None, rounds: int = 7,
+                   max_time: float = 2.0, report: Callable[[Dict], None] = None) -> List[Dict]:
+    """Time the registered benchmarks.
+
+    Args:
+        data: The generated data (``SyntheticData``), already built in the working directory
+        patterns: Only run benchmarks whose name matches one of these glob patterns
+        rounds: Number of timed rounds per benchmark
+        max_time: Stop timing a benchmark after this many seconds (at least 3 rounds)
+        report: Called with each result as it completes
+
+    Returns:
+        One result per benchmark, with its per-call timing statistics or its error
+    """
+    results = []
+    for name, (group, setup) in BENCHMARKS.items():
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        result = {"name": name, "group": group}
+        # Each benchmark draws the same inputs whichever benchmarks ran before it
+        data.rng.seed(f"{data.seed}:{name}")
+        try:
+            with _silenced():
+                function = setup(data)
+                result["stats"] = _time(function, rounds, max_time)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        results.append(result)
+        if report is not None:
+            report(result)
+    return results
+
+
+def _time(function: Callable[[], object], rounds: int, max_time: float) -> Dict:
+    """Time a callable, returning per-call statistics in seconds."""
+    # Warm up caches and calibrate the calls per round
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= ROUND_TIME or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(ROUND_TIME / elapsed) + 1))
+
+    timings = []
+    deadline = time.perf_counter() + max_time
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            timings.append((time.perf_counter() - start) / number)
+            if len(timings) >= 3 and time.perf_counter() > deadline:
+                break
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    quartiles = statistics.quantiles(timings, n=4) if len(timings) > 1 else [timings[0]] * 3
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "iqr": quartiles[2] - quartiles[0],
+        "rounds": len(timings),
+        "iterations": number
+    }
+
+
+@contextlib.contextmanager
+def _silenced():
+    """Discard what the modules print while a benchmark runs."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def environment(data) -> Dict:
+    """Describe the run: commit, interpreter, platform and data sizes."""
+    def git(*args) -> str:
+        try:
+            return subprocess.run(["git", *args], cwd=REPO_DIR, capture_output=True, text=True,
+                                  timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    return {
+        "version": RESULTS_VERSION,
+        "commit": git("rev-parse", "HEAD") or None,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scale": data.scale,
+        "seed": data.seed,
+        "sizes": data.sizes
+    }
+
+
+def write_results(path: str, data, results: List[Dict]):
+    """Write the results of a run to a JSON file."""
+    document = {**environment(data), "benchmarks": results}
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(document, file, indent=2)
+
+
+def compare(base: Dict, head: Dict, threshold: float = 0.1) -> List[Dict]:
+    """Compare the medians of the benchmarks two runs have in common.
+
+    Args:
+        base: The baseline result document
+        head: The result document to check
+        threshold: Relative slowdown of the median above which a benchmark regressed
+
+    Returns:
+        Per benchmark: the base and head medians, their ratio and a status
+        ("regressed", "improved", "unchanged", "added", "removed" or "error")
+    """
+    base_stats = {result["name"]: result.get("stats") for result in base["benchmarks"]}
+    head_stats = {result["name"]: result.get("stats") for result in head["benchmarks"]}
+    rows = []
+    for name in list(base_stats) + [name for name in head_stats if name not in base_stats]:
+        before, after = base_stats.get(name), head_stats.get(name)
+        row = {"name": name, "base": before and before["median"], "head": after and after["median"], "ratio": None}
+        if name not in head_stats:
+            row["status"] = "removed"
+        elif name not in base_stats:
+            row["status"] = "added"
+        elif before is None or after is None:
+            row["status"] = "error"
+        else:
+            row["ratio"] = after["median"] / before["median"] if before["median"] else None
+            if row["ratio"] is not None and row["ratio"] > 1 + threshold:
+                row["status"] = "regressed"
+            elif row["ratio"] is not None and row["ratio"] < 1 / (1 + threshold):
+                row["status"] = "improved"
+            else:
+                row["status"] = "unchanged"
+        rows.append(row)
+    return rows
+
+
+def format_seconds(seconds: Optional[float]) -> str:
+    """Format a duration with a readable unit."""
+    if seconds is None:
+        return "-"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def print_result(result: Dict, stream=None):
+    """Print one benchmark result as a table row."""
+    stream = stream or sys.stdout
+    if "error" in result:
+        print(f"{result['name']:<52} ERROR {result['error']}", file=stream)
+        return
+    stats = result["stats"]
+    print(f"{result['name']:<52} {format_seconds(stats['median']):>10} {format_seconds(stats['min']):>10} "
+          f"{format_seconds(stats['iqr']):>10} {stats['rounds']:>4} x {stats['iterations']}", file=stream)
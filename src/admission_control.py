@@ -0,0 +1,261 @@
+"""
+Module: admission_control.py
+
+This module implements admission control and per-client rate limiting for the
+expensive endpoints of the API.
+Features:
+- Route Classes: Endpoints that write data files (``write``), run matching or analyses
+  (``compute``) or fan out sub-requests (``batch``) are limited per class; reads are not
+- Per-Client Token Buckets: Each client may send ``rate`` requests per second to a
+  class, with bursts of up to ``burst``; a batch costs one token per sub-request, and
+  each sub-request is also admitted against its own class (as the batch's client)
+- Bounded Concurrency: At most ``concurrency`` requests of a class run at once across
+  all workers, so a burst of expensive requests cannot occupy every worker thread
+- Fast Rejection: Requests over a client's rate get ``429`` and requests arriving while
+  their class is saturated get ``503``, both at once and with ``Retry-After``
+- Shared State: Buckets and running-request leases live in a SQLite database under
+  ``data/admission/`` (WAL mode, no fsync), so all gunicorn workers enforce the same
+  limits; leases expire, so a worker that dies mid-request cannot leak capacity
+"""
+
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+import functools
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from flask import current_app, jsonify, request
+
+# Default limits per route class: client rate (requests/s), client burst, and
+# concurrent requests of the class across all workers
+DEFAULT_LIMITS = {
+    "write": {"rate": 5.0, "burst": 20, "concurrency": max(2, os.cpu_count() or 1)},
+    "compute": {"rate": 5.0, "burst": 20, "concurrency": max(2, os.cpu_count() or 1)},
+    "batch": {"rate": 20.0, "burst": 40, "concurrency": max(2, os.cpu_count() or 1)}
+}
+
+# Default location of the shared limiter state
+DEFAULT_DB = os.path.join("data", "admission", "limits.db")
+
+# Seconds a running-request lease is held at most (gunicorn's worker timeout)
+LEASE_TIMEOUT = 60.0
+
+# Retry-After of a request rejected because its class is saturated
+BUSY_RETRY_AFTER = 1
+
+# Largest unread request body a rejection reads before responding
+MAX_DRAIN_BYTES = 1024 * 1024
+
+# Seconds between removals of expired leases and of the buckets of idle clients
+PRUNE_INTERVAL = 60.0
+
+logger = logging.getLogger(__name__)
+
+_stores: Dict[str, "AdmissionStore"] = {}
+_stores_lock = threading.Lock()
+
+
+class AdmissionStore:
+    """Token buckets and running-request leases shared by the worker processes."""
+
+    def __init__(self, path: str = DEFAULT_DB):
+        """Open (and create) the limiter database.
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._last_prune = 0.0
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "client TEXT NOT NULL, route_class TEXT NOT NULL, tokens REAL NOT NULL, updated REAL NOT NULL, "
+            "full_at REAL NOT NULL, "
+            "PRIMARY KEY (client, route_class)) WITHOUT ROWID"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "id INTEGER PRIMARY KEY, route_class TEXT NOT NULL, pid INTEGER NOT NULL, expires REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS leases_class ON leases (route_class, expires)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            # The state is short-lived; losing it in a power cut only resets the limits
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+        return connection
+
+    def admit(self, client: str, route_class: str, limits: Dict, cost: float = 1.0) -> Tuple[int, int, Optional[int]]:
+        """Take tokens from a client's bucket and a running slot of a route class.
+
+        Args:
+            client: The client identity (address or configured header)
+            route_class: The route class of the request
+            limits: The ``rate``, ``burst`` and ``concurrency`` of the class
+            cost: Tokens the request takes
+
+        Returns:
+            (status, retry_after, lease_id): status 200 with the lease to release when
+            admitted, 429 when the client is over its rate, 503 when the class is saturated
+        """
+        rate, burst = float(limits["rate"]), float(limits["burst"])
+        # A request costing more than the burst could never be admitted; charge it a full bucket
+        cost = min(cost, burst)
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM buckets WHERE client = ? AND route_class = ?",
+                (client, route_class)
+            ).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+            if tokens < cost:
+                connection.execute("COMMIT")
+                return 429, max(1, math.ceil((cost - tokens) / rate)), None
+
+            running = connection.execute(
+                "SELECT COUNT(*) FROM leases WHERE route_class = ? AND expires > ?", (route_class, now)
+            ).fetchone()[0]
+            if running >= limits["concurrency"]:
+                connection.execute("COMMIT")
+                return 503, BUSY_RETRY_AFTER, None
+
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (client, route_class, tokens, updated, full_at) VALUES (?, ?, ?, ?, ?)",
+                (client, route_class, tokens - cost, now, now + (burst - tokens + cost) / rate)
+            )
+            lease_id = connection.execute(
+                "INSERT INTO leases (route_class, pid, expires) VALUES (?, ?, ?)",
+                (route_class, os.getpid(), now + LEASE_TIMEOUT)
+            ).lastrowid
+            if now - self._last_prune >= PRUNE_INTERVAL:
+                self._prune(connection, now)
+            connection.execute("COMMIT")
+            return 200, 0, lease_id
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def release(self, lease_id: int):
+        """Free the running slot of a finished request."""
+        self._connection().execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+    def _prune(self, connection: sqlite3.Connection, now: float):
+        """Drop expired leases and the buckets that have refilled (a missing bucket is full)."""
+        self._last_prune = now
+        connection.execute("DELETE FROM leases WHERE expires <= ?", (now,))
+        connection.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+
+
+def get_admission_store(path: str = DEFAULT_DB) -> AdmissionStore:
+    """Get the shared admission store of a database file, opening it on first use.
+
+    Args:
+        path: Path of the SQLite database file
+
+    Returns:
+        The admission store
+    """
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = AdmissionStore(path)
+        return store
+
+
+def client_header() -> Optional[str]:
+    """Get the header a trusted proxy sets to identify the client, if one is configured."""
+    return current_app.config.get("ADMISSION_CLIENT_HEADER", os.environ.get("API_CLIENT_HEADER"))
+
+
+def client_identity() -> str:
+    """Get the identity of the client of the current request.
+
+    The ``ADMISSION_CLIENT_HEADER`` setting names a header set by a trusted proxy
+    (e.g. ``X-Forwarded-For``, whose first address is used); otherwise the peer
+    address identifies the client.
+    """
+    header = client_header()
+    if header:
+        value = request.headers.get(header, "").split(",")[0].strip()
+        if value:
+            return value
+    return request.remote_addr or "unknown"
+
+
+def admission(route_class: str, cost=None):
+    """Limit a view by the per-client rate and the concurrency of its route class.
+
+    Settings (Flask config, with environment variable fallbacks):
+    ``ADMISSION_CONTROL`` (``API_ADMISSION_CONTROL``, default on) enables the limits,
+    ``ADMISSION_DB`` (``API_ADMISSION_DB``) is the shared database and
+    ``ADMISSION_LIMITS`` overrides ``DEFAULT_LIMITS`` per class.
+
+    Args:
+        route_class: The route class of the view (a key of ``DEFAULT_LIMITS``)
+        cost: Called during the request, returns the tokens the request takes (default 1)
+
+    Returns:
+        The view decorator
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            config = current_app.config
+            if not config.get(
+                    "ADMISSION_CONTROL", os.environ.get("API_ADMISSION_CONTROL", "1") != "0"):
+                return view(**kwargs)
+
+            limits = {**DEFAULT_LIMITS[route_class], **config.get("ADMISSION_LIMITS", {}).get(route_class, {})}
+            try:
+                store = get_admission_store(config.get("ADMISSION_DB", os.environ.get("API_ADMISSION_DB", DEFAULT_DB)))
+                status, retry_after, lease_id = store.admit(
+                    client_identity(), route_class, limits, cost() if cost else 1.0)
+            except sqlite3.Error as e:
+                # The limiter must never take the API down with it
+                logger.warning("Admission control unavailable, admitting request: %s", e)
+                return view(**kwargs)
+
+            if status == 429:
+                return _rejection(429, f"Too many {route_class} requests; retry in {retry_after} s", retry_after)
+            if status == 503:
+                return _rejection(503, f"Server busy with {route_class} requests; retry in {retry_after} s",
+                                  retry_after)
+
+            try:
+                return view(**kwargs)
+            finally:
+                try:
+                    store.release(lease_id)
+                except sqlite3.Error as e:
+                    # The lease expires after LEASE_TIMEOUT
+                    logger.warning("Could not release admission lease %s: %s", lease_id, e)
+        return wrapper
+    return decorator
+
+
+def _rejection(status: int, message: str, retry_after: int):
+    """Build a rejection response."""
+    response = jsonify({"success": False, "message": message})
+    response.status_code = status
+    response.headers["Retry-After"] = str(retry_after)
+    # Consume the unread body, or gunicorn's threaded workers may stall on the
+    # connection's next keep-alive request; close the connection instead of
+    # reading a large one
+    if (request.content_length or 0) <= MAX_DRAIN_BYTES:
+        request.get_data(cache=False)
+    else:
+        response.headers["Connection"] = "close"
+    return response
@@ -3,34 +3,144 @@ API for Implementation Tools
 
 This module provides a Flask API for the implementation tools in implementation_tools.py.
 This allows the frontend timeline visualizer to connect to the backend.
+
+The routes live on a blueprint and ``create_app`` builds the application, so the
+development server (``python api.py``) and production WSGI servers (``wsgi.py``
+with ``gunicorn.conf.py``) share the same setup.
 """
 
-from flask import Flask, request, jsonify, abort
+from flask import Blueprint, Flask, current_app, request, jsonify, abort, send_file
 from flask_cors import CORS
 import json
 import os
 import sys
+import datetime
 from pathlib import Path
 
 # Import implementation tools
 from implementation_tools import (
     implementation_timeline_visualizer,
     save_timeline_data,
+    patch_timeline_data,
+    get_timeline_changes,
+    timeline_document,
     funding_source_matching,
+    batch_funding_source_matching,
+    validate_funding_project,
+    validate_funding_batch,
+    validate_compliance_project,
     regulatory_compliance_tracker,
-    outcome_measurement
+    update_compliance_requirements,
+    outcome_measurement,
+    _timeline_paths
+)
+import implementation_tools
+from compliance_scheduling import projects_blocked_on, blocked_on_version
+from compliance_index import compliance_dashboard, get_compliance_index
+from survey_responses import (
+    ingest_survey_responses,
+    survey_results,
+    flagged_survey_responses,
+    parse_csv_responses,
+    close_response_stores
 )
+from timeseries_store import ingest_timeseries, query_timeseries
+from outcome_analysis import analyze_indicators, validate_analysis, exceeds_sync_budget, DEFAULT_RESAMPLES, DEFAULT_CONFIDENCE
+from portfolio_timeline import portfolio_timeline, get_portfolio_index
+from funding_deadlines import MAX_CALENDAR_DAYS, get_deadline_scheduler, validate_project_id
+from funding_catalog import get_funding_catalog
+from funding_geography import get_geography_index
+from regulatory_rules import get_rules_engine
+import serialization
+import metrics
+import request_profiling
+from conditional_requests import conditional, module_file, STATIC_CACHE_CONTROL
+from batch_requests import validate_batch, execute_batch, shutdown_executor
+from admission_control import admission, client_identity
+from job_queue import JobError, get_job_queue, start_job_runner, shutdown_job_queues, JOB_TYPES
+
+# Data directories created when the application is built
+DATA_DIRECTORIES = ("data/implementation", "data/regulatory", "data/outcomes", "data/designs", "data/jobs",
+                    "data/admission")
+
+# Files read by the funding and compliance endpoints
+FUNDING_SOURCES_FILE = Path("data/funding_sources.json")
+REGULATORY_RULES_FILE = Path("data/regulatory_rules.json")
+
+api_blueprint = Blueprint('api', __name__)
+
+
+def create_app(config: dict = None) -> Flask:
+    """Build the API application.
+    
+    Args:
+        config: Flask configuration overrides. ``WARM_UP`` (default True) preloads
+            the shared catalogs and indexes before the first request; see
+            ``serialization.init_app`` for ``JSON_BACKEND`` and ``COMPRESS_RESPONSES``,
+            ``admission_control.admission`` for the ``ADMISSION_*`` settings and
+            ``request_profiling`` for the ``PROFILE_*`` settings.
+        
+    Returns:
+        The Flask application.
+    """
+    app = Flask(__name__)
+    app.config["WARM_UP"] = True
+    if config:
+        app.config.update(config)
+    CORS(app)  # Enable Cross-Origin Resource Sharing
+    # Profiling goes first so a profile covers the other hooks
+    request_profiling.init_app(app)
+    # Metrics go next so the recorded latency and response size include compression
+    metrics.init_app(app)
+    serialization.init_app(app)
+    
+    ensure_data_directories()
+    app.register_blueprint(api_blueprint)
+    if app.config["WARM_UP"]:
+        warm_up(app)
+    return app
+
 
-app = Flask(__name__)
-CORS(app)  # Enable Cross-Origin Resource Sharing
+def ensure_data_directories():
+    """Create the data directories the API writes to."""
+    for directory in DATA_DIRECTORIES:
+        Path(directory).mkdir(parents=True, exist_ok=True)
 
-# Ensure data directories exist
-Path("data/implementation").mkdir(parents=True, exist_ok=True)
-Path("data/regulatory").mkdir(parents=True, exist_ok=True)
-Path("data/outcomes").mkdir(parents=True, exist_ok=True)
-Path("data/designs").mkdir(parents=True, exist_ok=True)
 
-@app.route('/api/implementation-timeline/<project_id>', methods=['GET'])
+def warm_up(app: Flask):
+    """Preload the shared catalogs and indexes so the first requests don't pay for them.
+    
+    Args:
+        app: The application, used for logging
+    """
+    loaders = [
+        ("compliance index", get_compliance_index),
+        ("regulatory rules", get_rules_engine),
+        ("funding deadlines", get_deadline_scheduler),
+        ("job runner", start_job_runner)
+    ]
+    if FUNDING_SOURCES_FILE.exists():
+        loaders.append(("funding catalog", get_funding_catalog))
+    if Path("data/funding_geographies.json").exists():
+        loaders.append(("funding geographies", get_geography_index))
+    
+    for name, loader in loaders:
+        try:
+            loader()
+        except (OSError, ValueError) as e:
+            # A bad data file fails its own requests; it must not keep the server from starting
+            app.logger.warning("Could not preload %s: %s", name, e)
+
+
+def shutdown():
+    """Flush and close the open stores. Called when a server worker exits."""
+    shutdown_executor()
+    shutdown_job_queues()
+    close_response_stores()
+    metrics.flush()
+
+@api_blueprint.route('/api/implementation-timeline/<project_id>', methods=['GET'])
+@conditional(_timeline_paths, daily=True)
 def get_implementation_timeline(project_id):
     """Get the implementation timeline for a project.
     
@@ -44,7 +154,8 @@ def get_implementation_timeline(project_id):
     result = implementation_timeline_visualizer(project_id, output_format)
     return jsonify(result)
 
-@app.route('/api/implementation-timeline/<project_id>', methods=['POST'])
+@api_blueprint.route('/api/implementation-timeline/<project_id>', methods=['POST'])
+@admission("write")
 def update_implementation_timeline(project_id):
     """Update the implementation timeline for a project.
     
@@ -55,13 +166,119 @@ def update_implementation_timeline(project_id):
         JSON response with status.
     """
     timeline_data = request.json
-    if not timeline_data:
+    if not timeline_data or not isinstance(timeline_data, dict):
         return jsonify({"success": False, "message": "No data provided"}), 400
+    revision = timeline_data.get('revision')
+    if revision is not None and (isinstance(revision, bool) or not isinstance(revision, int)):
+        return jsonify({"success": False, "message": "revision must be an integer"}), 400
     
     result = save_timeline_data(project_id, timeline_data)
+    if result.get("conflict"):
+        return jsonify(result), 409
     return jsonify(result)
 
-@app.route('/api/funding-sources', methods=['POST'])
+@api_blueprint.route('/api/implementation-timeline/<project_id>', methods=['PATCH'])
+@admission("write")
+def patch_implementation_timeline(project_id):
+    """Apply incremental changes to the implementation timeline for a project.
+    
+    The request body holds the ``revision`` the client last saw and a list of
+    ``operations`` (per-entity upserts and deletes keyed by id).
+    
+    Args:
+        project_id: The ID of the project.
+        
+    Returns:
+        JSON response with the new revision and the affected entity ids.
+    """
+    data = request.json
+    if not data or not isinstance(data, dict):
+        return jsonify({"success": False, "message": "No data provided"}), 400
+    
+    result = patch_timeline_data(project_id, data.get('operations', []), data.get('revision'))
+    if result.get("conflict"):
+        return jsonify(result), 409
+    if result.get("not_found"):
+        return jsonify(result), 404
+    if not result["success"]:
+        return jsonify(result), 400
+    return jsonify(result)
+
+@api_blueprint.route('/api/implementation-timeline/<project_id>/changes', methods=['GET'])
+@conditional(_timeline_paths)
+def get_implementation_timeline_changes(project_id):
+    """Get the timeline change events after a given revision.
+    
+    Args:
+        project_id: The ID of the project.
+        
+    Returns:
+        JSON response with the current revision and the changes since ``?since=``.
+    """
+    since_revision = request.args.get('since', 0, type=int)
+    result = get_timeline_changes(project_id, since_revision)
+    return jsonify(result)
+
+@api_blueprint.route('/api/implementation-timeline/<project_id>/document', methods=['GET'])
+def get_implementation_timeline_document(project_id):
+    """Download the printable timeline of a project as an HTML Gantt or a PDF.
+    
+    The document is rendered once per timeline revision and day and then served
+    from disk, with ETag/Last-Modified validation.
+    
+    Args:
+        project_id: The ID of the project.
+        
+    Returns:
+        The document for ``?format=pdf`` (default) or ``?format=html``.
+    """
+    output_format = request.args.get('format', 'pdf')
+    result = timeline_document(project_id, output_format)
+    if not result["success"]:
+        status = 400 if output_format not in ("html", "pdf") else 409 if result.get("conflict") else 404
+        return jsonify(result), status
+    
+    # Served from the already open file, which a concurrent render may unlink
+    document = result["data"]
+    stat = os.fstat(document["file"].fileno())
+    response = send_file(
+        document["file"],
+        mimetype=document["mimetype"],
+        as_attachment=output_format == "pdf",
+        download_name=f"timeline_{project_id}_r{document['revision']}.{output_format}",
+        conditional=True,
+        etag=f"{Path(document['path']).name}-{stat.st_mtime_ns}-{stat.st_size}",
+        last_modified=stat.st_mtime
+    )
+    if response.status_code == 200:
+        response.content_length = stat.st_size
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@api_blueprint.route('/api/portfolio/timeline', methods=['GET'])
+@conditional(version=lambda: get_portfolio_index().version(), daily=True)
+def get_portfolio_timeline():
+    """Get the agency-wide portfolio timeline across all projects.
+    
+    Query parameters: ``status`` (comma-separated), ``start`` and ``end`` (ISO date
+    window), ``phase`` (current phase name), ``page`` and ``page_size``.
+    
+    Returns:
+        JSON response with one page of projects and aggregates over all matches.
+    """
+    statuses = [s for s in request.args.get('status', '').split(',') if s]
+    result = portfolio_timeline(
+        statuses=statuses or None,
+        window_start=request.args.get('start'),
+        window_end=request.args.get('end'),
+        phase=request.args.get('phase'),
+        page=request.args.get('page', 1, type=int),
+        page_size=request.args.get('page_size', 50, type=int)
+    )
+    return jsonify(result)
+
+@api_blueprint.route('/api/funding-sources', methods=['POST'])
+@admission("compute")
 def match_funding_sources():
     """Find matching funding sources based on project characteristics and community priorities.
     
@@ -69,16 +286,106 @@ def match_funding_sources():
         JSON response with matching funding sources.
     """
     data = request.json
-    if not data:
+    if not data or not isinstance(data, dict):
         return jsonify({"success": False, "message": "No data provided"}), 400
     
     project_characteristics = data.get('project_characteristics', {})
     community_priorities = data.get('community_priorities', [])
+    error = validate_funding_project(project_characteristics, community_priorities)
+    if not error and data.get('project_id') is not None:
+        error = validate_project_id(data['project_id'])
+    if error:
+        return jsonify({"success": False, "message": error}), 400
     
     result = funding_source_matching(project_characteristics, community_priorities)
+    
+    # Save the profile of identified projects so they receive deadline alerts
+    if data.get('project_id') and result["success"]:
+        get_deadline_scheduler().save_project_profile(
+            data['project_id'], project_characteristics, community_priorities
+        )
+    return jsonify(result)
+
+@api_blueprint.route('/api/funding-sources/batch', methods=['POST'])
+@admission("compute")
+def match_funding_sources_batch():
+    """Match a portfolio of projects against the funding sources in one request.
+    
+    The request body holds a list of ``projects`` (each with ``project_id``,
+    ``project_characteristics`` and ``community_priorities``), an optional
+    ``top_k`` and optional ``source_caps`` mapping source IDs to available funds.
+    
+    Returns:
+        JSON response with top matches per project and the portfolio view.
+    """
+    data = request.json
+    if not isinstance(data, dict) or not data.get('projects'):
+        return jsonify({"success": False, "message": "No projects provided"}), 400
+    
+    top_k = data.get('top_k', 5)
+    if isinstance(top_k, str) and top_k.isdigit():
+        top_k = int(top_k)
+    error = validate_funding_batch(data['projects'], top_k, data.get('source_caps'))
+    if error:
+        return jsonify({"success": False, "message": error}), 400
+    
+    result = batch_funding_source_matching(
+        data['projects'],
+        top_k=top_k,
+        source_caps=data.get('source_caps')
+    )
     return jsonify(result)
 
-@app.route('/api/regulatory-compliance/<project_id>', methods=['GET'])
+@api_blueprint.route('/api/funding-deadlines', methods=['GET'])
+@conditional(lambda: [FUNDING_SOURCES_FILE, Path("data/funding")], daily=True)
+def get_funding_deadlines():
+    """Get the funding deadline calendar with the saved projects matching each source.
+    
+    Returns:
+        JSON response with the deadlines in the next ``?days=`` days (default 60,
+        at most ``MAX_CALENDAR_DAYS``).
+    """
+    days = request.args.get('days', 60, type=int)
+    if not 1 <= days <= MAX_CALENDAR_DAYS:
+        return jsonify({"success": False, "message": f"days must be between 1 and {MAX_CALENDAR_DAYS}"}), 400
+    deadlines = get_deadline_scheduler().upcoming(days=days)
+    return jsonify({
+        "success": True,
+        "message": f"Found {len(deadlines)} funding deadlines in the next {days} days",
+        "deadlines": deadlines
+    })
+
+@api_blueprint.route('/api/funding-deadlines/run', methods=['POST'])
+@admission("compute")
+def run_funding_deadline_alerts():
+    """Emit the digest of funding deadline alerts due since the previous run.
+    
+    Intended to be called once a day (e.g. from cron). An optional ``date`` in the
+    request body overrides the run date.
+    
+    Returns:
+        JSON response with the digest.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "message": "Request body must be an object"}), 400
+    today = None
+    if data.get('date'):
+        try:
+            today = datetime.date.fromisoformat(data['date'])
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "message": "Invalid date"}), 400
+    
+    digest = get_deadline_scheduler().run(today)
+    return jsonify({
+        "success": True,
+        "message": f"Emitted {digest['alert_count']} funding deadline alerts",
+        "digest": digest
+    })
+
+@api_blueprint.route('/api/regulatory-compliance/<project_id>', methods=['GET'])
+@conditional(lambda project_id: [Path("data/regulatory") / f"{project_id}_compliance.json", REGULATORY_RULES_FILE],
+             daily=True)
 def get_regulatory_compliance(project_id):
     """Get regulatory compliance requirements for a project.
     
@@ -91,7 +398,8 @@ def get_regulatory_compliance(project_id):
     result = regulatory_compliance_tracker(project_id)
     return jsonify(result)
 
-@app.route('/api/regulatory-compliance', methods=['POST'])
+@api_blueprint.route('/api/regulatory-compliance', methods=['POST'])
+@admission("write")
 def generate_regulatory_compliance():
     """Generate regulatory compliance requirements based on project type and location.
     
@@ -99,20 +407,99 @@ def generate_regulatory_compliance():
         JSON response with generated compliance requirements.
     """
     data = request.json
-    if not data:
+    if not data or not isinstance(data, dict):
         return jsonify({"success": False, "message": "No data provided"}), 400
     
     project_id = data.get('project_id')
     project_type = data.get('project_type')
     location = data.get('location', {})
+    funding_sources = data.get('funding_sources', [])
     
-    if not project_type:
-        return jsonify({"success": False, "message": "Project type is required"}), 400
+    error = validate_compliance_project(project_type, location, funding_sources)
+    if error:
+        return jsonify({"success": False, "message": error}), 400
     
-    result = regulatory_compliance_tracker(project_id, project_type, location)
+    result = regulatory_compliance_tracker(project_id, project_type, location, funding_sources)
     return jsonify(result)
 
-@app.route('/api/outcome-measurement/<project_id>', methods=['GET'])
+@api_blueprint.route('/api/regulatory-compliance/<project_id>/requirements', methods=['PATCH'])
+@admission("write")
+def update_regulatory_requirements(project_id):
+    """Update the status and dates of individual regulatory requirements.
+    
+    The request body holds a list of ``requirements`` updates, each with the
+    requirement ``id`` and the fields to change (``status``, ``started_date``,
+    ``completed_date``, ``depends_on``, ``notes``).
+    
+    Args:
+        project_id: The ID of the project.
+        
+    Returns:
+        JSON response with the updated compliance data and permit schedule.
+    """
+    data = request.json
+    if not isinstance(data, dict) or not data.get('requirements') or not isinstance(data['requirements'], list):
+        return jsonify({"success": False, "message": "No requirement updates provided"}), 400
+    
+    result = update_compliance_requirements(project_id, data['requirements'])
+    if result.get("not_found"):
+        return jsonify(result), 404
+    if not result["success"]:
+        return jsonify(result), 400
+    return jsonify(result)
+
+@api_blueprint.route('/api/regulatory-compliance/blocked', methods=['GET'])
+@conditional(version=blocked_on_version, daily=True)
+def get_projects_blocked_on():
+    """Get all projects whose outstanding requirements are waiting on a requirement.
+    
+    Query parameters: ``requirement`` (requirement id or name) and ``critical``
+    (``true`` to only include projects where it is on the critical chain).
+    
+    Returns:
+        JSON response with the blocked projects.
+    """
+    requirement = request.args.get('requirement')
+    if not requirement:
+        return jsonify({"success": False, "message": "Requirement is required"}), 400
+    
+    critical_only = request.args.get('critical', 'false').lower() == 'true'
+    projects = projects_blocked_on(requirement, critical_only)
+    return jsonify({
+        "success": True,
+        "message": f"Found {len(projects)} projects blocked on {requirement}",
+        "projects": projects
+    })
+
+@api_blueprint.route('/api/regulatory-compliance/dashboard', methods=['GET'])
+@conditional(version=lambda: get_compliance_index().version())
+def get_compliance_dashboard():
+    """Query regulatory requirement statuses across all projects.
+    
+    Query parameters (comma-separated values): ``requirement`` (ids or names),
+    ``status``, ``authority``, ``state``, ``project_type`` and ``group_by``,
+    plus ``page`` and ``page_size``.
+    
+    Returns:
+        JSON response with matching requirement rows, counts and aggregates.
+    """
+    def values(name):
+        return [value for value in request.args.get(name, '').split(',') if value] or None
+    
+    result = compliance_dashboard(
+        requirements=values('requirement'),
+        statuses=values('status'),
+        authorities=values('authority'),
+        states=values('state'),
+        project_types=values('project_type'),
+        group_by=values('group_by'),
+        page=request.args.get('page', 1, type=int),
+        page_size=request.args.get('page_size', 50, type=int)
+    )
+    return jsonify(result)
+
+@api_blueprint.route('/api/outcome-measurement/<project_id>', methods=['GET'])
+@conditional(lambda project_id: [Path("data/outcomes") / f"{project_id}_{request.args.get('type', 'survey')}.json"])
 def get_outcome_measurement(project_id):
     """Get outcome measurement data for a project.
     
@@ -126,7 +513,164 @@ def get_outcome_measurement(project_id):
     result = outcome_measurement(project_id, measurement_type)
     return jsonify(result)
 
-@app.route('/api/outcome-measurement/templates', methods=['GET'])
+@api_blueprint.route('/api/outcome-measurement/<project_id>/responses', methods=['POST'])
+@admission("write")
+def upload_survey_responses(project_id):
+    """Ingest a batch of post-implementation survey responses for a project.
+    
+    The body is either JSON (a list of responses, an object with a ``responses``
+    list, or a single response with an ``answers`` object) or CSV
+    (``Content-Type: text/csv``) with a header row of question ids. Every response
+    is screened with the client address (see ``client_identity``) as its ``ip``,
+    replacing any ``ip`` given in the body; the upload counts once against the
+    address's rate window.
+    
+    Args:
+        project_id: The ID of the project.
+        
+    Returns:
+        JSON response with the accepted count and the rejected and flagged responses.
+    """
+    if request.mimetype == 'text/csv':
+        responses = parse_csv_responses(request.get_data(as_text=True))
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict) and isinstance(data.get('answers'), dict):
+            responses = [data]
+        else:
+            responses = data.get('responses') if isinstance(data, dict) else data
+    if not responses or not isinstance(responses, list):
+        return jsonify({"success": False, "message": "No responses provided"}), 400
+    
+    address = client_identity()
+    responses = [{**response, "ip": address} if isinstance(response, dict) else response for response in responses]
+    
+    result = ingest_survey_responses(project_id, responses)
+    if not result["success"]:
+        return jsonify(result), 400
+    return jsonify(result)
+
+@api_blueprint.route('/api/outcome-measurement/<project_id>/responses/flagged', methods=['GET'])
+@conditional(lambda project_id: [Path("data/outcomes/responses") / project_id / "flagged.jsonl"])
+def get_flagged_survey_responses(project_id):
+    """Get the survey responses held back for review by duplicate and fraud screening.
+    
+    Args:
+        project_id: The ID of the project.
+        
+    Returns:
+        JSON response with the flagged count, counts per reason and one page of flagged responses.
+    """
+    page = request.args.get('page', 1, type=int)
+    page_size = request.args.get('page_size', 50, type=int)
+    result = flagged_survey_responses(project_id, page, page_size)
+    return jsonify(result)
+
+@api_blueprint.route('/api/outcome-measurement/<project_id>/results', methods=['GET'])
+@conditional(lambda project_id: [Path("data/outcomes/responses") / project_id / name
+                                  for name in ("schema.json", "aggregates.json")])
+def get_survey_results(project_id):
+    """Get the aggregated post-implementation survey results for a project.
+    
+    Args:
+        project_id: The ID of the project.
+        
+    Returns:
+        JSON response with per-question and demographic aggregates.
+    """
+    result = survey_results(project_id)
+    return jsonify(result)
+
+@api_blueprint.route('/api/outcome-measurement/<project_id>/timeseries/<metric>', methods=['POST'])
+@admission("write")
+def upload_timeseries(project_id, metric):
+    """Append automated counter readings to a project metric.
+    
+    The request body maps ``series`` ids (e.g. counter ids) to their readings, given
+    either as ``start``, ``interval`` (seconds) and ``values``, or as ``timestamps``
+    and ``values``.
+    
+    Args:
+        project_id: The ID of the project.
+        metric: The metric the readings belong to.
+        
+    Returns:
+        JSON response with the appended reading counts per series.
+    """
+    data = request.json
+    if not data or not isinstance(data.get('series'), dict):
+        return jsonify({"success": False, "message": "No series provided"}), 400
+    
+    result = ingest_timeseries(project_id, metric, data['series'])
+    if not result["success"]:
+        return jsonify(result), 400
+    return jsonify(result)
+
+@api_blueprint.route('/api/outcome-measurement/<project_id>/timeseries/<metric>', methods=['GET'])
+@conditional(lambda project_id, metric: [Path("data/outcomes/timeseries") / project_id / metric])
+def get_timeseries(project_id, metric):
+    """Get a project metric's readings over a date range, downsampled for charting.
+    
+    Query parameters: ``series`` (comma-separated, default all, summed), ``start``,
+    ``end``, ``resolution`` (raw, hour, day, month or auto) and ``max_points``.
+    
+    Args:
+        project_id: The ID of the project.
+        metric: The metric to query.
+        
+    Returns:
+        JSON response with the resolution used and the points.
+    """
+    series_ids = [s for s in request.args.get('series', '').split(',') if s]
+    result = query_timeseries(
+        project_id, metric,
+        series_ids=series_ids or None,
+        start=request.args.get('start'),
+        end=request.args.get('end'),
+        resolution=request.args.get('resolution', 'auto'),
+        max_points=request.args.get('max_points', 1000, type=int)
+    )
+    if result.get("not_found"):
+        return jsonify(result), 404
+    if not result["success"]:
+        return jsonify(result), 400
+    return jsonify(result)
+
+@api_blueprint.route('/api/outcome-measurement/analysis', methods=['POST'])
+@admission("compute")
+def analyze_outcome_indicators():
+    """Evaluate a batch of outcome indicators against their targets.
+    
+    The request body holds the ``indicators`` to evaluate (each with ``id``,
+    ``target``, a ``source`` series, optional ``controls`` and ``baseline``/``post``
+    windows), and optional ``resamples``, ``confidence`` and ``seed``. Batches whose
+    bootstrap work exceeds the request budget are queued as an ``indicator_analysis`` job.
+    
+    Returns:
+        JSON response with per-indicator before/after, trend, difference-in-differences
+        and confidence interval results; for large batches, the queued job (202).
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict) or not data.get('indicators'):
+        return jsonify({"success": False, "message": "No indicators provided"}), 400
+    
+    resamples = data.get('resamples', DEFAULT_RESAMPLES)
+    confidence = data.get('confidence', DEFAULT_CONFIDENCE)
+    seed = data.get('seed', 0)
+    error = validate_analysis(data['indicators'], resamples, confidence, seed)
+    if error:
+        return jsonify({"success": False, "message": error}), 400
+    
+    if exceeds_sync_budget(data['indicators'], resamples):
+        params = {"indicators": data['indicators'], "resamples": resamples, "confidence": confidence, "seed": seed}
+        job = get_job_queue().submit("indicator_analysis", params)
+        return jsonify({"success": True, "message": job["message"], "job": job}), 200 if job["cached"] else 202
+    
+    result = analyze_indicators(data['indicators'], resamples=resamples, confidence=confidence, seed=seed)
+    return jsonify(result)
+
+@api_blueprint.route('/api/outcome-measurement/templates', methods=['GET'])
+@conditional(lambda: module_file(implementation_tools), cache_control=STATIC_CACHE_CONTROL)
 def get_outcome_templates():
     """Get outcome measurement templates.
     
@@ -137,7 +681,158 @@ def get_outcome_templates():
     result = outcome_measurement(None, measurement_type)
     return jsonify(result)
 
-@app.route('/api/health', methods=['GET'])
+def _batch_cost() -> int:
+    """Charge a batch one rate-limit token per sub-request."""
+    data = request.get_json(silent=True)
+    items = data.get('requests') if isinstance(data, dict) else data
+    return len(items) if isinstance(items, list) else 1
+
+@api_blueprint.route('/api/batch', methods=['POST'])
+@admission("batch", cost=_batch_cost)
+def run_batch():
+    """Execute several API requests in one round trip.
+    
+    The request body holds a ``requests`` list of sub-requests, each with a
+    ``path`` and optional ``method``, ``query``, ``body``, ``headers`` and ``id``.
+    The sub-requests run concurrently and share the data files they read.
+    
+    Returns:
+        JSON response with one result (id, status, headers, body) per sub-request.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"success": False, "message": "No data provided"}), 400
+    
+    items = data.get('requests') if isinstance(data, dict) else data
+    error = validate_batch(items)
+    if error:
+        return jsonify({"success": False, "message": error}), 400
+    
+    results = execute_batch(current_app._get_current_object(), items)
+    return jsonify({
+        "success": True,
+        "message": f"Executed {len(results)} requests",
+        "results": results
+    })
+
+@api_blueprint.route('/api/jobs', methods=['POST'])
+@admission("write")
+def submit_job():
+    """Submit a background job (timeline_export, portfolio_export or indicator_analysis).
+    
+    The request body holds the job ``type`` and its ``params``. If an identical
+    job already ran on unchanged inputs, the job completes at once with the
+    cached result.
+    
+    Returns:
+        JSON response with the job; 202 while it is queued, 200 if it is already completed.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"success": False, "message": "No data provided"}), 400
+    
+    try:
+        job = get_job_queue().submit(data.get('type'), data.get('params') or {})
+    except JobError as e:
+        return jsonify({"success": False, "message": str(e), "job_types": list(JOB_TYPES)}), 400
+    
+    return jsonify({"success": True, "message": job["message"], "job": job}), 200 if job["cached"] else 202
+
+@api_blueprint.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List background jobs, newest first.
+    
+    Query parameters:
+        status: Only include jobs with this status (queued, running, completed, failed, cancelled)
+        type: Only include jobs of this type
+    
+    Returns:
+        JSON response with the jobs.
+    """
+    jobs = get_job_queue().list(request.args.get('status'), request.args.get('type'))
+    return jsonify({"success": True, "message": f"Found {len(jobs)} jobs", "jobs": jobs})
+
+@api_blueprint.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status and progress of a background job.
+    
+    Args:
+        job_id: The ID of the job.
+        
+    Returns:
+        JSON response with the job.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": f"Job {job_id} not found"}), 404
+    return jsonify({"success": True, "message": job["message"], "job": job})
+
+@api_blueprint.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running background job.
+    
+    Args:
+        job_id: The ID of the job.
+        
+    Returns:
+        JSON response with the job; 409 if the job has already finished.
+    """
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": f"Job {job_id} not found"}), 404
+    if job["status"] in ("completed", "failed"):
+        return jsonify({"success": False, "message": f"Job {job_id} has already {job['status']}", "job": job}), 409
+    message = "Job cancelled" if job["status"] == "cancelled" else "Cancellation requested"
+    return jsonify({"success": True, "message": message, "job": job})
+
+@api_blueprint.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Get the result of a completed background job.
+    
+    Args:
+        job_id: The ID of the job.
+        
+    Returns:
+        JSON response with the result; 409 if the job has not completed.
+    """
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": f"Job {job_id} not found"}), 404
+    result = queue.result(job_id)
+    if result is None:
+        return jsonify({"success": False, "message": f"Job {job_id} is {job['status']}", "job": job}), 409
+    return jsonify({"success": True, "message": job["message"], "job": job, "result": result})
+
+@api_blueprint.route('/api/jobs/<job_id>/download', methods=['GET'])
+def download_job_file(job_id):
+    """Download the file exported by a completed background job.
+    
+    Args:
+        job_id: The ID of the job.
+        
+    Returns:
+        The exported CSV or JSON file; 409 if the job has no exported file.
+    """
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": f"Job {job_id} not found"}), 404
+    path = queue.result_file(job_id)
+    if path is None:
+        return jsonify({"success": False, "message": f"Job {job_id} has no exported file", "job": job}), 409
+    return send_file(path.resolve(), as_attachment=True, download_name=f"{job['type']}_{job_id}{path.suffix}")
+
+@api_blueprint.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint with the request and data I/O metrics of all workers.
+    
+    Returns:
+        Prometheus text format response.
+    """
+    return metrics.metrics_response()
+
+@api_blueprint.route('/api/health', methods=['GET'])
 def health_check():
     """API health check endpoint.
     
@@ -153,5 +848,5 @@ def health_check():
 if __name__ == '__main__':
     # Get port from environment variable or use default
     port = int(os.environ.get('SERVER_PORT', 5001))
-    # Run the Flask app
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    # Run the Flask development server (use wsgi.py with gunicorn in production)
+    create_app().run(host='0.0.0.0', port=port, debug=True)
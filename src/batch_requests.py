@@ -0,0 +1,165 @@
+"""
+Module: batch_requests.py
+
+This module implements batch execution of API sub-requests.
+Features:
+- One Round Trip: Runs a list of sub-requests (method, path, query, body, headers)
+  against the API and returns every result with its own status code
+- Concurrent Execution: Dispatches the sub-requests on a shared thread pool
+- Shared File Cache: Sub-requests of one batch share the bytes of the data files they
+  read, so a dashboard's requests read each file once
+- Isolation: A failing sub-request yields a 500 item without affecting the others
+- Client Identity: Sub-requests inherit the batch request's peer address and proxy headers,
+  which their own headers cannot override, so rate limits and screening see the real client
+"""
+
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, has_request_context, request
+from werkzeug.test import EnvironBuilder
+
+from serialization import shared_file_cache
+from admission_control import client_header
+
+# Maximum number of sub-requests in one batch
+MAX_BATCH_SIZE = 20
+
+# Threads executing sub-requests, shared by all batches of a process
+BATCH_WORKERS = 8
+
+# HTTP methods a sub-request may use
+BATCH_METHODS = ("GET", "POST", "PATCH", "PUT", "DELETE")
+
+# Response headers copied into each batch item
+FORWARDED_HEADERS = ("ETag", "Last-Modified", "Cache-Control", "Content-Type")
+
+# Request headers set by a proxy to describe the client; sub-requests take them from the
+# batch request (along with the configured client header), never from the batch body
+CLIENT_HEADERS = ("X-Forwarded-For", "X-Forwarded-Proto", "X-Forwarded-Host", "X-Real-IP", "Forwarded")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def validate_batch(items) -> Optional[str]:
+    """Check the sub-requests of a batch.
+
+    Args:
+        items: The sub-requests
+
+    Returns:
+        The reason the batch is invalid, or None if it is valid
+    """
+    if not isinstance(items, list) or not items:
+        return "No requests provided"
+    if len(items) > MAX_BATCH_SIZE:
+        return f"A batch can hold at most {MAX_BATCH_SIZE} requests"
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            return f"Request {i} must be an object with a path"
+        path = item["path"]
+        if not path.startswith("/api/") or path.split("?", 1)[0].rstrip("/") == "/api/batch":
+            return f"Request {i} has an invalid path: {path}"
+        if str(item.get("method", "GET")).upper() not in BATCH_METHODS:
+            return f"Request {i} has an unsupported method: {item.get('method')}"
+        if item.get("headers") is not None and not isinstance(item["headers"], dict):
+            return f"Request {i} has headers that are not an object"
+    return None
+
+
+def execute_batch(app: Flask, items: List[Dict]) -> List[Dict]:
+    """Execute validated sub-requests concurrently.
+
+    Each sub-request is ``{"path": ..., "method": "GET", "query": {...}, "body": ...,
+    "headers": {...}, "id": ...}``. Only ``path`` is required.
+
+    Args:
+        app: The application to dispatch the sub-requests to
+        items: The sub-requests (see ``validate_batch``)
+
+    Returns:
+        One ``{"id", "status", "headers", "body"}`` result per sub-request, in order
+    """
+    client = _client_environ()
+    with shared_file_cache():
+        executor = _get_executor()
+        # Each sub-request runs in a copy of this context, so they all share the file cache
+        futures = [executor.submit(contextvars.copy_context().run, _dispatch, app, item, client) for item in items]
+        results = [future.result() for future in futures]
+
+    return [
+        {"id": item.get("id", i), "status": status, "headers": headers, "body": body}
+        for i, (item, (status, headers, body)) in enumerate(zip(items, results))
+    ]
+
+
+def _client_environ() -> Tuple[Dict, Dict, set]:
+    """Get the client address and headers of the batch request, which every sub-request inherits.
+
+    Returns:
+        The environ base, the client headers present and the lower-case names of all client headers
+    """
+    if not has_request_context():
+        return {}, {}, set()
+    names = set(CLIENT_HEADERS)
+    configured = client_header()
+    if configured:
+        names.add(configured)
+    environ_base = {"REMOTE_ADDR": request.remote_addr} if request.remote_addr else {}
+    headers = {name: request.headers[name] for name in names if name in request.headers}
+    return environ_base, headers, {name.lower() for name in names}
+
+
+def _dispatch(app: Flask, item: Dict, client: Tuple[Dict, Dict, set]) -> Tuple[int, Dict, object]:
+    """Run one sub-request through the application as the batch request's client."""
+    path, _, query_string = item["path"].partition("?")
+    environ_base, client_headers, client_names = client
+    headers = {name: value for name, value in (item.get("headers") or {}).items()
+               if str(name).lower() not in client_names}
+    headers.update(client_headers)
+    builder = EnvironBuilder(
+        path=path,
+        method=str(item.get("method", "GET")).upper(),
+        query_string=item.get("query") or query_string or None,
+        headers=headers,
+        json=item.get("body"),
+        environ_base=environ_base
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    with app.request_context(environ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            app.logger.exception("Batch sub-request %s failed", path)
+            return 500, {}, {"success": False, "message": f"Error processing request: {e}"}
+        headers = {name: response.headers[name] for name in FORWARDED_HEADERS if name in response.headers}
+        if response.is_json:
+            body = response.get_json()
+        else:
+            body = response.get_data(as_text=True)
+        return response.status_code, headers, body
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the shared sub-request thread pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+        return _executor
+
+
+def shutdown_executor():
+    """Stop the sub-request thread pool after the running sub-requests finish."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -21,6 +21,8 @@ import datetime
 import uuid
 from typing import Dict, List, Tuple, Optional, Any, Union
 
+from serialization import dump_file
+
 # Type definitions
 class DesignElement:
     """Represents a single design element (point, line, polygon) on the map."""
@@ -355,8 +357,7 @@ class CollaborativeDesignTools:
         """
         filepath = os.path.join(self.data_dir, "alternatives", f"{alternative.id}.json")
         
-        with open(filepath, 'w') as f:
-            json.dump(alternative.to_dict(), f, indent=2)
+        dump_file(alternative.to_dict(), filepath)
     
     # Version History Management
     
@@ -392,8 +393,7 @@ class CollaborativeDesignTools:
             f"{alternative_id}_{version.id}.json"
         )
         
-        with open(filepath, 'w') as f:
-            json.dump(version.to_dict(), f, indent=2)
+        dump_file(version.to_dict(), filepath)
         
         return version
     
@@ -499,8 +499,7 @@ class CollaborativeDesignTools:
             f"{alternative_id}_{comment.id}.json"
         )
         
-        with open(filepath, 'w') as f:
-            json.dump(comment.to_dict(), f, indent=2)
+        dump_file(comment.to_dict(), filepath)
         
         return comment
     
@@ -577,8 +576,7 @@ class CollaborativeDesignTools:
         )
         
         # Save the updated comment
-        with open(filepath, 'w') as f:
-            json.dump(comment.to_dict(), f, indent=2)
+        dump_file(comment.to_dict(), filepath)
         
         return comment
     
@@ -618,8 +616,7 @@ class CollaborativeDesignTools:
         # Save the template
         filepath = os.path.join(self.data_dir, "templates", f"{template_id}.json")
         
-        with open(filepath, 'w') as f:
-            json.dump(template, f, indent=2)
+        dump_file(template, filepath)
         
         return template
     
@@ -0,0 +1,325 @@
+"""
+Module: compliance_index.py
+
+This module implements the cross-project index over regulatory compliance data.
+Features:
+- Maintained Status Index: Keeps one row per requirement of every
+  ``data/regulatory/*_compliance.json`` file, with inverted indexes by requirement,
+  status, issuing authority, state and project type
+- Live Updates: Applies compliance change events as they are written, and rescans file
+  signatures periodically to pick up files written by other processes
+- Startup Rebuild: Rebuilds itself from the compliance files when first created
+- Dashboard Queries: Filters by any combination of the indexed fields by intersecting
+  the posting sets, and aggregates counts over all matches
+"""
+
+import os
+import json
+import datetime
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from implementation_tools import register_compliance_listener
+from serialization import load_file
+
+# Seconds between directory rescans that pick up compliance files written by other processes
+COMPLIANCE_RESCAN_INTERVAL = 5.0
+
+# Default and maximum number of requirement rows per page
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+COMPLIANCE_SUFFIX = "_compliance.json"
+
+# Indexed row fields, usable as filters and aggregate groupings
+INDEXED_FIELDS = ("requirement_id", "requirement_name", "status", "issuing_authority", "state", "project_type")
+
+
+class ComplianceStatusIndex:
+    """Inverted index over the requirements of all projects' compliance data."""
+
+    def __init__(self, data_dir: str = "data/regulatory"):
+        """Initialize the index and build it from the compliance files on disk.
+
+        Args:
+            data_dir: Directory holding the compliance files
+        """
+        self.data_dir = Path(data_dir)
+        # Requirement rows keyed by (project id, requirement id)
+        self.rows: Dict[Tuple[str, str], Dict] = {}
+        # Field -> lower-case value -> row keys
+        self.postings: Dict[str, Dict[str, Set[Tuple[str, str]]]] = {field: {} for field in INDEXED_FIELDS}
+        self.project_rows: Dict[str, List[Tuple[str, str]]] = {}
+        self.signatures: Dict[str, Tuple] = {}
+        self.last_scan = 0.0
+        self._lock = threading.Lock()
+        with self._lock:
+            self.refresh(force=True)
+
+    # Index maintenance
+
+    def refresh(self, force: bool = False):
+        """Bring the index up to date with the compliance files on disk.
+
+        Args:
+            force: Rescan the directory even if the rescan interval has not elapsed
+        """
+        now = datetime.datetime.now().timestamp()
+        if not force and now - self.last_scan < COMPLIANCE_RESCAN_INTERVAL:
+            return
+        self.last_scan = now
+        if not self.data_dir.exists():
+            return
+
+        signatures: Dict[str, Tuple] = {}
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(COMPLIANCE_SUFFIX):
+                    stat = entry.stat()
+                    signatures[entry.name[:-len(COMPLIANCE_SUFFIX)]] = (stat.st_mtime_ns, stat.st_size)
+
+        for project_id in list(self.project_rows):
+            if project_id not in signatures:
+                self._remove_project(project_id)
+        for project_id, signature in signatures.items():
+            if self.signatures.get(project_id) != signature:
+                self._load_project(project_id, signature)
+
+    def version(self) -> Dict[str, Tuple]:
+        """Rescan the compliance files and get the signatures the index now reflects.
+
+        Returns:
+            Project ID -> (mtime_ns, size) of its indexed compliance file
+        """
+        with self._lock:
+            self.refresh(force=True)
+            return dict(self.signatures)
+
+    def apply_change(self, project_id: str, compliance_data: Optional[Dict]):
+        """Replace the rows of one project with its newly written compliance data.
+
+        Args:
+            project_id: The ID of the project
+            compliance_data: The written compliance data, None if it was removed
+        """
+        with self._lock:
+            if compliance_data is None:
+                self._remove_project(project_id)
+                return
+            self._index_project(project_id, compliance_data)
+            # Skip re-reading the file on the next rescan
+            try:
+                stat = (self.data_dir / f"{project_id}{COMPLIANCE_SUFFIX}").stat()
+                self.signatures[project_id] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                self.signatures.pop(project_id, None)
+
+    def _load_project(self, project_id: str, signature: Tuple):
+        """Re-read the compliance file of one project and re-index it."""
+        try:
+            compliance_data = load_file(self.data_dir / f"{project_id}{COMPLIANCE_SUFFIX}")
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._remove_project(project_id)
+            return
+        self._index_project(project_id, compliance_data)
+        self.signatures[project_id] = signature
+
+    def _index_project(self, project_id: str, compliance_data: Dict):
+        """Replace the rows and postings of one project."""
+        self._remove_project(project_id)
+        location = compliance_data.get("location") or {}
+        keys = []
+        for requirement in compliance_data.get("requirements", []):
+            req_id = requirement.get("id")
+            if req_id is None:
+                continue
+            key = (project_id, req_id)
+            row = {
+                "project_id": project_id,
+                "requirement_id": req_id,
+                "requirement_name": requirement.get("name"),
+                "status": requirement.get("status"),
+                "issuing_authority": requirement.get("issuing_authority"),
+                "state": location.get("state"),
+                "county": location.get("county"),
+                "project_type": compliance_data.get("project_type"),
+                "estimated_cost": requirement.get("estimated_cost") or 0,
+                "last_updated": compliance_data.get("last_updated")
+            }
+            self.rows[key] = row
+            for field in INDEXED_FIELDS:
+                self.postings[field].setdefault(_normalize(row[field]), set()).add(key)
+            keys.append(key)
+        self.project_rows[project_id] = keys
+
+    def _remove_project(self, project_id: str):
+        """Drop the rows and postings of one project."""
+        for key in self.project_rows.pop(project_id, []):
+            row = self.rows.pop(key)
+            for field in INDEXED_FIELDS:
+                value = _normalize(row[field])
+                posting = self.postings[field].get(value)
+                if posting is not None:
+                    posting.discard(key)
+                    if not posting:
+                        del self.postings[field][value]
+        self.signatures.pop(project_id, None)
+
+    # Queries
+
+    def _matching_keys(self, filters: Dict[str, List[str]]) -> Optional[Set[Tuple[str, str]]]:
+        """Intersect the posting sets of the filters, smallest first.
+
+        Args:
+            filters: Field -> accepted values (any of them matches)
+
+        Returns:
+            The matching row keys, or None if no filter was given
+        """
+        candidates = []
+        for field, values in filters.items():
+            keys: Set[Tuple[str, str]] = set()
+            for value in values:
+                keys |= self.postings[field].get(_normalize(value), set())
+                if field == "requirement_id":
+                    # Requirements can be named by id or by name
+                    keys |= self.postings["requirement_name"].get(_normalize(value), set())
+            candidates.append(keys)
+        if not candidates:
+            return None
+        candidates.sort(key=len)
+        matches = set(candidates[0])
+        for keys in candidates[1:]:
+            matches &= keys
+            if not matches:
+                break
+        return matches
+
+    def query(self, requirements: Optional[List[str]] = None, statuses: Optional[List[str]] = None,
+              authorities: Optional[List[str]] = None, states: Optional[List[str]] = None,
+              project_types: Optional[List[str]] = None, group_by: Optional[List[str]] = None,
+              page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> Dict:
+        """Filter and aggregate requirements across all projects.
+
+        Args:
+            requirements: Requirement ids or names to include
+            statuses: Requirement statuses to include
+            authorities: Issuing authorities to include
+            states: Project states to include
+            project_types: Project types to include
+            group_by: Fields to count the matches by. Defaults to status, requirement,
+                issuing authority and state.
+            page: 1-based page number of the matching requirement rows
+            page_size: Number of rows per page
+
+        Returns:
+            Match and project counts, aggregates over all matches and one page of rows
+        """
+        filters = {
+            field: values for field, values in (
+                ("requirement_id", requirements), ("status", statuses),
+                ("issuing_authority", authorities), ("state", states),
+                ("project_type", project_types)
+            ) if values
+        }
+        group_by = [field for field in (group_by or ("status", "requirement_name", "issuing_authority", "state"))
+                    if field in INDEXED_FIELDS]
+
+        with self._lock:
+            self.refresh()
+            matches = self._matching_keys(filters)
+            keys = list(self.rows) if matches is None else list(matches)
+
+            aggregates: Dict[str, Dict[str, int]] = {field: {} for field in group_by}
+            projects = set()
+            estimated_cost = 0
+            for key in keys:
+                row = self.rows[key]
+                projects.add(row["project_id"])
+                estimated_cost += row["estimated_cost"] if isinstance(row["estimated_cost"], (int, float)) else 0
+                for field in group_by:
+                    value = str(row[field]) if row[field] is not None else "None"
+                    aggregates[field][value] = aggregates[field].get(value, 0) + 1
+
+            keys.sort()
+            page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+            page = max(1, page)
+            offset = (page - 1) * page_size
+            rows = [dict(self.rows[key]) for key in keys[offset:offset + page_size]]
+
+        return {
+            "success": True,
+            "message": f"Found {len(keys)} matching requirements in {len(projects)} projects",
+            "total": len(keys),
+            "project_count": len(projects),
+            "page": page,
+            "page_size": page_size,
+            "requirements": rows,
+            "aggregates": {
+                **{f"{field}_counts": dict(sorted(counts.items())) for field, counts in aggregates.items()},
+                "estimated_cost_total": estimated_cost
+            }
+        }
+
+
+def get_compliance_index(data_dir: str = "data/regulatory") -> ComplianceStatusIndex:
+    """Get the shared compliance index for a data directory, building it on first use.
+
+    Args:
+        data_dir: Directory holding the compliance files
+
+    Returns:
+        The compliance index
+    """
+    with _indexes_lock:
+        index = _indexes.get(data_dir)
+        if index is None:
+            index = ComplianceStatusIndex(data_dir)
+            _indexes[data_dir] = index
+        return index
+
+
+def compliance_dashboard(requirements: Optional[List[str]] = None, statuses: Optional[List[str]] = None,
+                         authorities: Optional[List[str]] = None, states: Optional[List[str]] = None,
+                         project_types: Optional[List[str]] = None, group_by: Optional[List[str]] = None,
+                         page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> Dict:
+    """Query regulatory requirement statuses across all projects.
+
+    For example, the projects waiting on a Right-of-Way Permit in CA are
+    ``compliance_dashboard(["Right-of-Way Permit"], ["not-started", "in-progress"], states=["CA"])``.
+
+    Args:
+        requirements: Requirement ids or names to include
+        statuses: Requirement statuses to include
+        authorities: Issuing authorities to include
+        states: Project states to include
+        project_types: Project types to include
+        group_by: Fields to aggregate the matches by
+        page: 1-based page number
+        page_size: Number of requirement rows per page
+
+    Returns:
+        Dict: The matching requirement rows, counts and aggregates.
+    """
+    return get_compliance_index().query(requirements, statuses, authorities, states,
+                                        project_types, group_by, page, page_size)
+
+
+def _handle_compliance_change(event: Dict):
+    """Apply a compliance change event to every compliance index."""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.apply_change(event.get("project_id"), event.get("data"))
+
+
+def _normalize(value) -> str:
+    """Normalize an indexed value for case-insensitive matching."""
+    return str(value).strip().lower() if value is not None else ""
+
+
+_indexes: Dict[str, ComplianceStatusIndex] = {}
+_indexes_lock = threading.Lock()
+
+register_compliance_listener(_handle_compliance_change)
@@ -0,0 +1,581 @@
+"""
+Module: compliance_scheduling.py
+
+This module implements dependency-aware scheduling of regulatory requirements.
+Features:
+- Permit Dependency Graph: Builds the graph between a project's requirements from each
+  requirement's ``depends_on`` list (e.g. the building permit waits for CEQA review)
+- Duration Ranges: Parses free-text timelines such as "4-6 weeks" into day ranges
+- Permit-Complete Date: Computes the earliest feasible completion of every requirement and
+  of the whole permit package (shortest durations), alongside the expected completion
+  (longest durations)
+- Critical Chain: Identifies the chain of requirements that drives the permit-complete date
+- Incremental Rescheduling: Status changes re-propagate only through the dependent requirements
+- Blocked-On Index: Maps every outstanding requirement to the projects whose other
+  requirements are waiting on it, for cross-project "blocked on X" queries; compliance
+  change events update it at once, and periodic file signature rescans pick up the
+  files written by other processes
+
+Requirements whose status is one of ``COMPLETE_STATUSES`` are done; ``in-progress``
+requirements count from their ``started_date`` (or today); all others can start once
+their prerequisites are done, but never before today.
+"""
+
+import os
+import re
+import json
+import heapq
+import datetime
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# Statuses of requirements that no longer block anything
+COMPLETE_STATUSES = {"completed", "approved", "not-required"}
+
+# Seconds between rescans of the compliance files by the blocked-on index
+BLOCKED_RESCAN_INTERVAL = 5.0
+
+COMPLIANCE_SUFFIX = "_compliance.json"
+
+# Fields of a requirement that affect the schedule
+SCHEDULE_FIELDS = ("timeline", "depends_on", "status", "started_date", "completed_date")
+
+_UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+_DURATION_PATTERN = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(?:(?:-|to|–)\s*(\d+(?:\.\d+)?))?\s*(day|week|month|year)s?", re.IGNORECASE
+)
+
+# Schedulers cached per project, kept current by compliance change events
+_schedulers: Dict[str, "ComplianceScheduler"] = {}
+_schedulers_lock = threading.Lock()
+
+
+class DependencyCycleError(ValueError):
+    """Raised when requirement dependencies contain a cycle."""
+
+
+def parse_duration(timeline: Optional[str]) -> Tuple[int, int]:
+    """Parse a free-text requirement timeline into a range of days.
+
+    Args:
+        timeline: Text such as "4-6 weeks", "12 to 24 weeks" or "30 days"
+
+    Returns:
+        (shortest, longest) duration in days, (0, 0) if the text has no duration
+    """
+    match = _DURATION_PATTERN.search(timeline or "")
+    if not match:
+        return (0, 0)
+    low = float(match.group(1))
+    high = float(match.group(2)) if match.group(2) else low
+    unit = _UNIT_DAYS[match.group(3).lower()]
+    low, high = sorted((low, high))
+    return (round(low * unit), round(high * unit))
+
+
+class ComplianceScheduler:
+    """Earliest-completion scheduler over the requirements of one project."""
+
+    def __init__(self, requirements: List[Dict], today: Optional[datetime.date] = None):
+        """Build the dependency graph and compute the initial schedule.
+
+        Args:
+            requirements: Compliance requirements with ``id``, ``timeline``, ``status`` and ``depends_on``
+            today: The date the schedule is computed for. Defaults to today.
+
+        Raises:
+            DependencyCycleError: If the requirement dependencies contain a cycle
+        """
+        self.today = (today or datetime.date.today()).toordinal()
+        # The ``last_updated`` stamp of the compliance data the schedule reflects
+        self.last_updated: Optional[str] = None
+        self.requirements: Dict[str, Dict] = {}
+        self.names: Dict[str, str] = {}
+        for requirement in requirements if isinstance(requirements, list) else []:
+            # Malformed entries (e.g. written by hand) are skipped rather than failing every schedule
+            if isinstance(requirement, dict) and isinstance(requirement.get("id"), str):
+                self.requirements[requirement["id"]] = {field: _schedule_value(field, requirement.get(field))
+                                                        for field in SCHEDULE_FIELDS}
+                self.names[requirement["id"]] = _requirement_name(requirement)
+        self._rebuild()
+
+    # Graph construction
+
+    def _rebuild(self):
+        """Rebuild the graph and topological order, then recompute the whole schedule."""
+        self.duration: Dict[str, Tuple[int, int]] = {}
+        self.predecessors: Dict[str, List[str]] = {}
+        self.successors: Dict[str, List[str]] = {req_id: [] for req_id in self.requirements}
+        for req_id, requirement in self.requirements.items():
+            self.duration[req_id] = parse_duration(requirement.get("timeline"))
+            preds = [dep for dep in (requirement.get("depends_on") or []) if dep in self.requirements and dep != req_id]
+            self.predecessors[req_id] = preds
+            for pred in preds:
+                self.successors[pred].append(req_id)
+
+        self.order = self._topological_order()
+        self.position = {req_id: i for i, req_id in enumerate(self.order)}
+
+        # Per requirement: (earliest start, earliest finish, expected finish) as date ordinals
+        self.start: Dict[str, int] = {}
+        self.finish: Dict[str, int] = {}
+        self.expected_finish: Dict[str, int] = {}
+        for req_id in self.order:
+            self._compute(req_id)
+
+    def _topological_order(self) -> List[str]:
+        """Order the requirements so that every requirement follows its prerequisites.
+
+        Raises:
+            DependencyCycleError: If the requirement dependencies contain a cycle
+        """
+        in_degree = {req_id: len(preds) for req_id, preds in self.predecessors.items()}
+        ready = [req_id for req_id, degree in in_degree.items() if degree == 0]
+        order = []
+        while ready:
+            req_id = ready.pop()
+            order.append(req_id)
+            for succ in self.successors[req_id]:
+                in_degree[succ] -= 1
+                if in_degree[succ] == 0:
+                    ready.append(succ)
+
+        if len(order) != len(self.requirements):
+            cyclic = sorted(req_id for req_id, degree in in_degree.items() if degree > 0)
+            raise DependencyCycleError(f"Requirement dependencies contain a cycle involving: {', '.join(cyclic[:10])}")
+        return order
+
+    # Forward pass
+
+    def is_complete(self, req_id: str) -> bool:
+        """Check whether a requirement is done."""
+        return (self.requirements[req_id].get("status") or "") in COMPLETE_STATUSES
+
+    def _compute(self, req_id: str) -> bool:
+        """Compute the earliest and expected completion of a requirement from its prerequisites.
+
+        Returns:
+            True if either completion date changed
+        """
+        requirement = self.requirements[req_id]
+        shortest, longest = self.duration[req_id]
+        if self.is_complete(req_id):
+            done = _to_ordinal(requirement.get("completed_date")) or self.today
+            start, finish, expected = done, done, done
+        elif requirement.get("status") == "in-progress":
+            start = _to_ordinal(requirement.get("started_date")) or self.today
+            finish = max(start + shortest, self.today)
+            expected = max(start + longest, self.today)
+        else:
+            start = self.today
+            expected_start = self.today
+            for pred in self.predecessors[req_id]:
+                start = max(start, self.finish[pred])
+                expected_start = max(expected_start, self.expected_finish[pred])
+            finish = start + shortest
+            expected = expected_start + longest
+
+        changed = self.finish.get(req_id) != finish or self.expected_finish.get(req_id) != expected
+        self.start[req_id] = start
+        self.finish[req_id] = finish
+        self.expected_finish[req_id] = expected
+        return changed
+
+    def _propagate(self, seeds: List[str]):
+        """Recompute completion dates downstream of the seed requirements, stopping where nothing changes."""
+        heap = [(self.position[req_id], req_id) for req_id in seeds]
+        heapq.heapify(heap)
+        queued = set(seeds)
+        while heap:
+            _, req_id = heapq.heappop(heap)
+            if self._compute(req_id):
+                for succ in self.successors[req_id]:
+                    if succ not in queued:
+                        queued.add(succ)
+                        heapq.heappush(heap, (self.position[succ], succ))
+
+    # Incremental updates
+
+    def update_requirements(self, requirements: List[Dict]):
+        """Apply changed requirements and reschedule only what they affect.
+
+        Status and date changes re-propagate through the dependent requirements;
+        added requirements and changed durations or dependencies rebuild the graph.
+
+        Args:
+            requirements: The changed requirements (full or partial, keyed by ``id``)
+
+        Raises:
+            DependencyCycleError: If the change introduces a dependency cycle
+        """
+        structural = False
+        changed = []
+        for update in requirements:
+            req_id = update.get("id") if isinstance(update, dict) else None
+            if not isinstance(req_id, str):
+                continue
+            if req_id not in self.requirements:
+                self.requirements[req_id] = {field: None for field in SCHEDULE_FIELDS}
+                structural = True
+            requirement = self.requirements[req_id]
+            for field in SCHEDULE_FIELDS:
+                if field in update:
+                    value = _schedule_value(field, update[field])
+                    if field in ("timeline", "depends_on") and value != requirement.get(field):
+                        structural = True
+                    requirement[field] = value
+            if "name" in update:
+                self.names[req_id] = _requirement_name(update)
+            changed.append(req_id)
+
+        if structural:
+            self._rebuild()
+        elif changed:
+            self._propagate(changed)
+
+    def set_today(self, today: datetime.date):
+        """Move the schedule to another date, recomputing it if the date changed."""
+        if today.toordinal() != self.today:
+            self.today = today.toordinal()
+            for req_id in self.order:
+                self._compute(req_id)
+
+    # Results
+
+    def permit_complete(self) -> Optional[int]:
+        """Get the earliest feasible completion of the whole permit package as a date ordinal."""
+        return max(self.finish.values(), default=None)
+
+    def critical_chain(self) -> List[str]:
+        """Get the chain of outstanding requirements that drives the permit-complete date.
+
+        Returns:
+            Requirement ids, from the first prerequisite to the last requirement to finish
+        """
+        outstanding = [req_id for req_id in self.order if not self.is_complete(req_id)]
+        if not outstanding:
+            return []
+        req_id = max(outstanding, key=lambda r: (self.finish[r], self.expected_finish[r], -self.position[r]))
+        chain = [req_id]
+        while True:
+            # Follow the outstanding prerequisite that the requirement's start waits for
+            drivers = [pred for pred in self.predecessors[req_id]
+                       if not self.is_complete(pred) and self.finish[pred] == self.start[req_id]]
+            if not drivers or self.requirements[req_id].get("status") == "in-progress":
+                break
+            req_id = max(drivers, key=lambda r: self.expected_finish[r])
+            chain.append(req_id)
+        chain.reverse()
+        return chain
+
+    def blocking(self) -> Dict[str, Set[str]]:
+        """Get, for each outstanding requirement, the outstanding requirements waiting on it.
+
+        Returns:
+            Mapping of requirement id to the ids of its outstanding (transitive) dependents
+        """
+        waiting: Dict[str, Set[str]] = {}
+        for req_id in reversed(self.order):
+            if self.is_complete(req_id):
+                continue
+            dependents = set()
+            for succ in self.successors[req_id]:
+                if not self.is_complete(succ):
+                    dependents.add(succ)
+                    dependents |= waiting.get(succ, set())
+            waiting[req_id] = dependents
+        return {req_id: dependents for req_id, dependents in waiting.items() if dependents}
+
+    def to_dict(self) -> Dict:
+        """Convert the schedule to a dictionary for JSON serialization."""
+        chain = self.critical_chain()
+        on_chain = set(chain)
+        blocking = self.blocking()
+        requirements = {}
+        for req_id in self.order:
+            shortest, longest = self.duration[req_id]
+            requirements[req_id] = {
+                "earliestStart": _from_ordinal(self.start[req_id]),
+                "earliestFinish": _from_ordinal(self.finish[req_id]),
+                "expectedFinish": _from_ordinal(self.expected_finish[req_id]),
+                "durationDays": [shortest, longest],
+                "dependsOn": list(self.predecessors[req_id]),
+                "blocks": sorted(blocking.get(req_id, ())),
+                "complete": self.is_complete(req_id),
+                "critical": req_id in on_chain
+            }
+        permit_complete = self.permit_complete()
+        expected_complete = max(self.expected_finish.values(), default=None)
+        return {
+            "asOf": _from_ordinal(self.today),
+            "permitComplete": _from_ordinal(permit_complete) if permit_complete is not None else None,
+            "expectedPermitComplete": _from_ordinal(expected_complete) if expected_complete is not None else None,
+            "criticalChain": chain,
+            "requirements": requirements
+        }
+
+
+class BlockedOnIndex:
+    """Cross-project index of the projects waiting on each outstanding requirement."""
+
+    def __init__(self, data_dir: str = "data/regulatory"):
+        """Initialize the index. It is built from the compliance files on first use.
+
+        Args:
+            data_dir: Directory holding the ``{project_id}_compliance.json`` files
+        """
+        self.data_dir = Path(data_dir)
+        self.built = False
+        # Requirement id -> project id -> entry, and the reverse mapping for updates
+        self.blocked_on: Dict[str, Dict[str, Dict]] = {}
+        self.project_keys: Dict[str, List[str]] = {}
+        # Lower-case requirement names -> requirement ids
+        self.name_ids: Dict[str, Set[str]] = {}
+        # Signature of the compliance file each project was indexed from
+        self.signatures: Dict[str, Tuple] = {}
+        self.last_scan = 0.0
+
+    def refresh(self, force: bool = False):
+        """Bring the index up to date with the compliance files on disk. Callers hold the lock.
+
+        Only files whose signature changed since they were indexed are re-read.
+
+        Args:
+            force: Rescan the directory even if the rescan interval has not elapsed
+        """
+        now = datetime.datetime.now().timestamp()
+        if not force and self.built and now - self.last_scan < BLOCKED_RESCAN_INTERVAL:
+            return
+        self.last_scan = now
+        self.built = True
+
+        signatures: Dict[str, Tuple] = {}
+        if self.data_dir.exists():
+            with os.scandir(self.data_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(COMPLIANCE_SUFFIX):
+                        stat = entry.stat()
+                        signatures[entry.name[:-len(COMPLIANCE_SUFFIX)]] = (stat.st_mtime_ns, stat.st_size)
+
+        for project_id in list(self.signatures):
+            if project_id not in signatures:
+                self.update_project(project_id, None, None)
+                del self.signatures[project_id]
+        for project_id, signature in signatures.items():
+            if self.signatures.get(project_id) != signature:
+                self._load_project(project_id, signature)
+
+    def _load_project(self, project_id: str, signature: Tuple):
+        """Re-read the compliance file of one project and re-index it."""
+        try:
+            with open(self.data_dir / f"{project_id}{COMPLIANCE_SUFFIX}", 'r') as file:
+                compliance_data = json.load(file)
+            if not isinstance(compliance_data, dict):
+                raise ValueError("Compliance data is not an object")
+        except (OSError, ValueError):
+            self.update_project(project_id, None, None)
+            self.signatures.pop(project_id, None)
+            return
+        try:
+            scheduler = _get_scheduler(project_id, compliance_data)
+        except DependencyCycleError:
+            scheduler = None
+        self.update_project(project_id, compliance_data, scheduler)
+        self.signatures[project_id] = signature
+
+    def apply_change(self, project_id: str, compliance_data: Optional[Dict],
+                     scheduler: Optional[ComplianceScheduler]):
+        """Re-index a project whose compliance file was just written by this process.
+
+        Args:
+            project_id: The ID of the project
+            compliance_data: The written compliance data, None if it was removed
+            scheduler: The project's scheduler, None to only remove its entries
+        """
+        self.update_project(project_id, compliance_data, scheduler)
+        # Skip re-reading the file on the next rescan
+        try:
+            stat = (self.data_dir / f"{project_id}{COMPLIANCE_SUFFIX}").stat()
+            self.signatures[project_id] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            self.signatures.pop(project_id, None)
+
+    def update_project(self, project_id: str, compliance_data: Optional[Dict],
+                       scheduler: Optional[ComplianceScheduler]):
+        """Replace the index entries of one project.
+
+        Args:
+            project_id: The ID of the project
+            compliance_data: The project's compliance data, None if it was removed
+            scheduler: The project's scheduler, None to only remove its entries
+        """
+        for req_id in self.project_keys.pop(project_id, []):
+            projects = self.blocked_on.get(req_id)
+            if projects is not None:
+                projects.pop(project_id, None)
+                if not projects:
+                    del self.blocked_on[req_id]
+        if scheduler is None or compliance_data is None:
+            return
+
+        chain = set(scheduler.critical_chain())
+        location = compliance_data.get("location")
+        keys = []
+        for req_id, dependents in scheduler.blocking().items():
+            self.blocked_on.setdefault(req_id, {})[project_id] = {
+                "project_id": project_id,
+                "requirement_id": req_id,
+                "requirement_name": scheduler.names.get(req_id, req_id),
+                "status": scheduler.requirements[req_id].get("status"),
+                "blocks": sorted(dependents),
+                "critical": req_id in chain,
+                "earliest_finish": _from_ordinal(scheduler.finish[req_id]),
+                "state": location.get("state") if isinstance(location, dict) else None
+            }
+            self.name_ids.setdefault(scheduler.names.get(req_id, req_id).lower(), set()).add(req_id)
+            keys.append(req_id)
+        self.project_keys[project_id] = keys
+
+    def query(self, requirement: str, critical_only: bool = False) -> List[Dict]:
+        """Get the projects blocked on a requirement.
+
+        Args:
+            requirement: Requirement id or (case-insensitive) name
+            critical_only: Only return projects where the requirement is on the critical chain
+
+        Returns:
+            One entry per blocked project, ordered by project id
+        """
+        req_ids = {requirement} | self.name_ids.get(requirement.lower(), set())
+        entries = [entry for req_id in req_ids for entry in self.blocked_on.get(req_id, {}).values()]
+        if critical_only:
+            entries = [entry for entry in entries if entry["critical"]]
+        entries.sort(key=lambda entry: (entry["project_id"], entry["requirement_id"]))
+        return entries
+
+
+_blocked_index = BlockedOnIndex()
+
+
+def _get_scheduler(project_id: str, compliance_data: Dict,
+                   today: Optional[datetime.date] = None) -> ComplianceScheduler:
+    """Get the cached scheduler of a project, building it if needed. Callers hold the lock.
+
+    Raises:
+        DependencyCycleError: If the requirement dependencies contain a cycle
+    """
+    today = today or datetime.date.today()
+    scheduler = _schedulers.get(project_id)
+    if scheduler is None or scheduler.last_updated != compliance_data.get("last_updated"):
+        scheduler = ComplianceScheduler(compliance_data.get("requirements", []), today)
+        scheduler.last_updated = compliance_data.get("last_updated")
+        _schedulers[project_id] = scheduler
+    else:
+        scheduler.set_today(today)
+    return scheduler
+
+
+def get_compliance_schedule(project_id: Optional[str], compliance_data: Dict,
+                            today: Optional[datetime.date] = None) -> Dict:
+    """Get the dependency-aware schedule of a project's regulatory requirements.
+
+    Args:
+        project_id: The ID of the project, None for unsaved requirement lists
+        compliance_data: The compliance data, including its ``requirements``
+        today: The date to schedule from. Defaults to today.
+
+    Returns:
+        The schedule dictionary, or an ``error`` entry if the dependencies are cyclic
+    """
+    try:
+        if project_id is None:
+            return ComplianceScheduler(compliance_data.get("requirements", []), today).to_dict()
+        with _schedulers_lock:
+            return _get_scheduler(project_id, compliance_data, today).to_dict()
+    except DependencyCycleError as e:
+        with _schedulers_lock:
+            _schedulers.pop(project_id, None)
+        return {"error": str(e)}
+
+
+def projects_blocked_on(requirement: str, critical_only: bool = False) -> List[Dict]:
+    """Get all projects with outstanding requirements waiting on a requirement.
+
+    Args:
+        requirement: Requirement id (e.g. "req-006") or name (e.g. "CEQA Environmental Review")
+        critical_only: Only return projects where the requirement is on the critical chain
+
+    Returns:
+        One entry per blocked project
+    """
+    with _schedulers_lock:
+        _blocked_index.refresh()
+        return _blocked_index.query(requirement, critical_only)
+
+
+def blocked_on_version() -> Dict[str, Tuple]:
+    """Rescan the compliance files and get the signatures the blocked-on index now reflects.
+
+    Returns:
+        Project ID -> (mtime_ns, size) of its indexed compliance file
+    """
+    with _schedulers_lock:
+        _blocked_index.refresh(force=True)
+        return dict(_blocked_index.signatures)
+
+
+def handle_compliance_change(event: Dict):
+    """Keep the cached scheduler and the blocked-on index current with a compliance change event.
+
+    Args:
+        event: A change event emitted by the implementation tools
+    """
+    project_id = event.get("project_id")
+    compliance_data = event.get("data")
+    with _schedulers_lock:
+        scheduler = _schedulers.get(project_id)
+        try:
+            if compliance_data is None:
+                _schedulers.pop(project_id, None)
+                scheduler = None
+            elif scheduler is not None and not event.get("reset"):
+                scheduler.set_today(datetime.date.today())
+                scheduler.update_requirements(event.get("requirements", []))
+                scheduler.last_updated = compliance_data.get("last_updated")
+            else:
+                _schedulers.pop(project_id, None)
+                scheduler = _get_scheduler(project_id, compliance_data)
+        except DependencyCycleError:
+            _schedulers.pop(project_id, None)
+            scheduler = None
+        if _blocked_index.built:
+            _blocked_index.apply_change(project_id, compliance_data, scheduler)
+
+
+def _schedule_value(field: str, value):
+    """Get the value of a schedule field, or None if it is malformed."""
+    if field == "depends_on":
+        return [dep for dep in value if isinstance(dep, str)] if isinstance(value, list) else None
+    return value if isinstance(value, str) else None
+
+
+def _requirement_name(requirement: Dict) -> str:
+    """Get the display name of a requirement, falling back to its id."""
+    name = requirement.get("name")
+    return name if isinstance(name, str) else requirement["id"]
+
+
+def _to_ordinal(date_str: Optional[str]) -> Optional[int]:
+    """Convert an ISO format date (or datetime) string to a date ordinal."""
+    if not date_str:
+        return None
+    try:
+        return datetime.date.fromisoformat(str(date_str)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def _from_ordinal(ordinal: int) -> str:
+    """Convert a date ordinal to an ISO format date string."""
+    return datetime.date.fromordinal(ordinal).isoformat()
@@ -0,0 +1,175 @@
+"""
+Module: conditional_requests.py
+
+This module implements conditional GET support for the read endpoints of the API.
+Features:
+- Cheap Validators: Derives a weak ETag and Last-Modified date from the modification
+  times and sizes of the data files (or directories) an endpoint reads, the request
+  path and query, and the current day for endpoints whose output depends on it
+- Index Versions: Endpoints served from an in-memory index derive their validators from
+  the file signatures the index was just refreshed to, so an ETag never names data the
+  index has not loaded yet
+- Not Modified Responses: Answers ``If-None-Match`` / ``If-Modified-Since`` with 304
+  before the endpoint runs, so unchanged resources are never re-read or re-serialized
+- Cache-Control: ``no-cache`` (always revalidate) for data endpoints and a
+  long-lived public policy for static template endpoints
+"""
+
+import os
+import stat
+import hashlib
+import datetime
+import functools
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Response, make_response, request
+
+# Data endpoints may be stored but must be revalidated on every use
+DYNAMIC_CACHE_CONTROL = "no-cache"
+
+# Static endpoints (templates) may be reused for a day without revalidation
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+
+
+def conditional(resources: Optional[Callable[..., Iterable]] = None, daily: bool = False,
+                cache_control: str = DYNAMIC_CACHE_CONTROL,
+                version: Optional[Callable[..., Dict[str, Sequence]]] = None):
+    """Add ETag/Last-Modified validation to a GET view.
+
+    Args:
+        resources: Called with the view arguments (during the request), returns the
+            files and directories the response is computed from
+        daily: The response also depends on the current date (e.g. schedules)
+        cache_control: The Cache-Control header of successful responses
+        version: Used instead of ``resources`` for views served from an in-memory index.
+            Called with the view arguments, it refreshes the index and returns the
+            (mtime_ns, ...) signature of each file it was built from.
+
+    Returns:
+        The view decorator
+    """
+    def validators(kwargs):
+        if version is not None:
+            return _validators(*index_signature(version(**kwargs)), daily)
+        return _validators(*resource_signature(resources(**kwargs)), daily)
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            etag, last_modified = validators(kwargs)
+            if _not_modified(etag, last_modified):
+                response = Response(status=304)
+                _set_validators(response, etag, last_modified, cache_control)
+                return response
+
+            response = make_response(view(**kwargs))
+            if response.status_code == 200:
+                if version is None:
+                    # Recompute in case the view itself wrote the files (e.g. created defaults)
+                    etag, last_modified = validators(kwargs)
+                # An index only moves forward, so the view never served data older than its version
+                _set_validators(response, etag, last_modified, cache_control)
+            return response
+        return wrapper
+    return decorator
+
+
+def resource_signature(paths: Iterable) -> Tuple[List[Tuple], Optional[float]]:
+    """Get the modification signature of files and directories.
+
+    Directories are walked recursively, so adding, removing or changing any file
+    in them changes the signature.
+
+    Args:
+        paths: The files and directories
+
+    Returns:
+        (path, mtime_ns, size) entries and the latest modification time (POSIX seconds)
+    """
+    entries = []
+    latest = None
+    for path in paths:
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            entries.append((str(path), None, None))
+            continue
+        if stat.S_ISDIR(info.st_mode):
+            files = _walk(str(path))
+        else:
+            files = [(str(path), info.st_mtime_ns, info.st_size)]
+        entries.extend(files)
+        for _, mtime_ns, _ in files:
+            if latest is None or mtime_ns / 1e9 > latest:
+                latest = mtime_ns / 1e9
+    return entries, latest
+
+
+def index_signature(signatures: Dict[str, Sequence]) -> Tuple[List[Tuple], Optional[float]]:
+    """Get the modification signature of an in-memory index.
+
+    Args:
+        signatures: Key -> (mtime_ns, ...) signature of each file the index was built from
+
+    Returns:
+        Sorted (key, *signature) entries and the latest modification time (POSIX seconds)
+    """
+    entries = sorted((key, *signature) for key, signature in signatures.items())
+    latest = max((entry[1] for entry in entries if entry[1] is not None), default=None)
+    return entries, latest / 1e9 if latest is not None else None
+
+
+def _walk(directory: str) -> List[Tuple]:
+    """Get the (path, mtime_ns, size) of every file under a directory."""
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                files.extend(_walk(entry.path))
+            elif not entry.name.endswith(".tmp"):
+                info = entry.stat()
+                files.append((entry.path, info.st_mtime_ns, info.st_size))
+    files.sort()
+    return files
+
+
+def _validators(entries: List[Tuple], latest: Optional[float],
+                daily: bool) -> Tuple[str, Optional[datetime.datetime]]:
+    """Compute the ETag and Last-Modified date of the current request from a signature."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(request.full_path.encode())
+    for entry in entries:
+        digest.update(repr(entry).encode())
+    if daily:
+        today = datetime.date.today()
+        digest.update(today.isoformat().encode())
+        midnight = datetime.datetime.combine(today, datetime.time()).timestamp()
+        latest = max(latest or midnight, midnight)
+    last_modified = (datetime.datetime.fromtimestamp(int(latest), datetime.timezone.utc)
+                     if latest is not None else None)
+    return digest.hexdigest(), last_modified
+
+
+def _not_modified(etag: str, last_modified: Optional[datetime.datetime]) -> bool:
+    """Check the request's validators against the current ones."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _set_validators(response: Response, etag: str, last_modified: Optional[datetime.datetime],
+                    cache_control: str):
+    """Set the validator and caching headers of a response."""
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+
+
+def module_file(module) -> List[Path]:
+    """Get the source file of a module, for endpoints whose output is defined in code."""
+    return [Path(module.__file__)]
@@ -0,0 +1,84 @@
+"""
+Module: file_locks.py
+
+This module implements inter-process locks for the data files the API writes.
+Features:
+- File Locks: ``file_lock`` holds an exclusive ``flock`` on a lock file, so the writes of
+  all gunicorn workers to the data guarded by it are serialized; readers that must not see
+  a write half done take it shared
+- Ownership Locks: ``try_lock`` takes an exclusive lock without waiting and keeps it until
+  its file is closed, so one process can own a role (e.g. the job runner) while the others
+  retry
+- Thread Queueing: Threads of one process first queue on a process-local lock per lock
+  file, so only one of them at a time waits on the operating system lock
+- Portability: Where ``fcntl`` is unavailable (development servers on Windows, which run
+  a single process) only the process-local lock is taken
+"""
+
+import threading
+import contextlib
+from pathlib import Path
+from typing import IO, Dict, Iterator, Optional, Union
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def file_lock(lock_file: Union[str, Path], shared: bool = False) -> Iterator[None]:
+    """Hold a lock shared by all threads and processes.
+
+    The lock file is created on first use and never removed; lock a separate file
+    rather than a data file that is replaced with ``os.replace``, whose new inode
+    would not be locked.
+
+    Args:
+        lock_file: Path of the lock file
+        shared: Take the lock shared, so other processes' shared holders may hold it
+            at the same time but exclusive holders may not
+
+    Yields:
+        None, while the lock is held
+    """
+    lock_file = Path(lock_file)
+    key = str(lock_file)
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(key, threading.Lock())
+
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        lock_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_file, 'a') as file:
+            fcntl.flock(file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def try_lock(lock_file: Union[str, Path]) -> Optional[IO]:
+    """Take an exclusive lock without waiting, held until the returned file is closed.
+
+    Args:
+        lock_file: Path of the lock file
+
+    Returns:
+        The open lock file, or None if another process holds the lock
+    """
+    lock_file = Path(lock_file)
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    file = open(lock_file, 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return None
+    return file
@@ -0,0 +1,367 @@
+"""
+Module: funding_catalog.py
+
+This module implements the in-memory funding catalog used by funding source matching.
+Features:
+- Load Once, Hot Reload: Parses ``data/funding_sources.json`` once and reloads it only when
+  the file changes on disk
+- Inverted Indexes: Maps eligible project types, priority areas, focus areas and geographic
+  eligibility terms to the sources that list them
+- Geographic Eligibility: Matches eligibility terms ("urban", "rural", state names) as whole
+  words, and sources with ``eligible_geographies`` by point/polygon containment against the
+  polygons in ``data/funding_geographies.json`` (see funding_geography.py)
+- Budget Interval Index: Finds the sources whose budget range contains a project budget
+  without scanning the catalog
+- Candidate Scoring: Scores only the sources reached through at least one index
+"""
+
+import os
+import re
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from funding_geography import locate_project, project_location_geometry
+from serialization import load_file
+
+# Score contributed by each matching criterion
+TYPE_MATCH_SCORE = 30
+BUDGET_MATCH_SCORE = 20
+GEOGRAPHIC_MATCH_SCORE = 15
+PRIORITY_MATCH_SCORE = 10
+FOCUS_MATCH_SCORE = 5
+
+# Sources must score above this to be reported as matches
+MINIMUM_MATCH_SCORE = 20
+
+# Geographic eligibility terms that match any project location
+NATIONWIDE_TERMS = {"nationwide", "national", "any"}
+
+_catalogs: Dict[str, "FundingCatalog"] = {}
+_catalogs_lock = threading.Lock()
+
+
+class IntervalIndex:
+    """Centered interval tree answering "which ranges contain x" queries."""
+
+    def __init__(self, intervals: List[Tuple[float, float, int]]):
+        """Build the tree.
+
+        Args:
+            intervals: (low, high, item) triples with inclusive bounds
+        """
+        self.root = self._build(intervals)
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        endpoints = sorted(value for low, high, _ in intervals for value in (low, high)
+                           if value != float('inf'))
+        center = endpoints[len(endpoints) // 2] if endpoints else 0
+        left = [interval for interval in intervals if interval[1] < center]
+        right = [interval for interval in intervals if interval[0] > center]
+        overlapping = [interval for interval in intervals if interval[0] <= center <= interval[1]]
+        return (
+            center,
+            sorted(overlapping, key=lambda interval: interval[0]),
+            sorted(overlapping, key=lambda interval: interval[1], reverse=True),
+            self._build(left),
+            self._build(right)
+        )
+
+    def stab(self, x: float) -> List[int]:
+        """Get the items whose interval contains x.
+
+        Args:
+            x: The query point
+
+        Returns:
+            The matching items
+        """
+        items = []
+        node = self.root
+        while node is not None:
+            center, by_low, by_high, left, right = node
+            if x < center:
+                for low, _, item in by_low:
+                    if low > x:
+                        break
+                    items.append(item)
+                node = left
+            elif x > center:
+                for _, high, item in by_high:
+                    if high < x:
+                        break
+                    items.append(item)
+                node = right
+            else:
+                items.extend(item for _, _, item in by_low)
+                node = None
+        return items
+
+
+class FundingCatalog:
+    """Indexed, read-only view of a funding sources file."""
+
+    def __init__(self, sources: List[Dict], signature: Optional[Tuple] = None):
+        """Build the catalog indexes.
+
+        Args:
+            sources: Funding source records
+            signature: The on-disk signature of the file the sources were read from
+        """
+        self.sources = sources
+        self.signature = signature
+        self.by_type: Dict[str, List[int]] = {}
+        self.by_priority: Dict[str, List[int]] = {}
+        self.by_focus: Dict[str, List[int]] = {}
+        self.by_geography: Dict[str, List[int]] = {}
+        self.by_feature: Dict[str, List[int]] = {}
+        self.geometry_sources: set = set()
+        self.summaries: List[Dict] = []
+        budget_ranges = []
+
+        for i, source in enumerate(sources):
+            for project_type in {t.lower() for t in source.get("eligible_project_types", [])}:
+                self.by_type.setdefault(project_type, []).append(i)
+            for priority in set(source.get("priority_areas", [])):
+                self.by_priority.setdefault(priority, []).append(i)
+            for focus in set(source.get("focus_areas", [])):
+                self.by_focus.setdefault(focus, []).append(i)
+            for geography in {g.lower() for g in source.get("geographic_eligibility", [])}:
+                self.by_geography.setdefault(geography, []).append(i)
+            for feature_id in {str(f) for f in source.get("eligible_geographies", [])}:
+                self.by_feature.setdefault(feature_id, []).append(i)
+                self.geometry_sources.add(i)
+
+            minimum = source.get("minimum_budget", 0) or 0
+            maximum = source.get("maximum_budget")
+            budget_ranges.append((minimum, float('inf') if maximum is None else maximum, i))
+            self.summaries.append(_summarize_source(source))
+
+        self.budget_index = IntervalIndex(budget_ranges)
+        self.budget_ranges = {i: (low, high) for low, high, i in budget_ranges}
+        self.geography_patterns = {
+            geography: re.compile(r'(?<![a-z0-9])' + re.escape(geography) + r'(?![a-z0-9])')
+            for geography in self.by_geography
+        }
+
+    @classmethod
+    def from_file(cls, path: Path) -> "FundingCatalog":
+        """Load a catalog from a funding sources JSON file.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            json.JSONDecodeError: If the file is not valid JSON
+        """
+        signature = _file_signature(path)
+        return cls(load_file(path), signature)
+
+    def score(self, project_characteristics: Dict, community_priorities: List[str],
+              memo: Optional[Dict] = None) -> Dict[int, Dict]:
+        """Score the candidate sources for a project.
+
+        Args:
+            project_characteristics: Project attributes ('type', 'budget', 'location', 'focus_areas')
+            community_priorities: Community priority areas
+            memo: Index lookups shared across the projects of a batch
+
+        Returns:
+            Per-source criterion results for every source reached through an index
+        """
+        memo = {} if memo is None else memo
+        project_type = project_characteristics.get("type", "").lower()
+        project_budget = project_characteristics.get("budget", 0)
+        project_location = project_characteristics.get("location", {})
+        location_text = str(project_location).lower()
+        priorities = frozenset(community_priorities)
+        focus_areas = frozenset(project_characteristics.get("focus_areas", []))
+
+        candidates: Dict[int, Dict] = {}
+
+        def candidate(i):
+            entry = candidates.get(i)
+            if entry is None:
+                entry = candidates[i] = {"type": False, "budget": False, "geo": False,
+                                         "priorities": 0, "focus": 0}
+            return entry
+
+        for i in _memoized(memo, ("type", project_type), lambda: self.by_type.get(project_type, [])):
+            candidate(i)["type"] = True
+        for i in _memoized(memo, ("budget", project_budget), lambda: self.budget_index.stab(project_budget)):
+            candidate(i)["budget"] = True
+        for i in _memoized(memo, ("geo", location_text),
+                           lambda: self._geographic_matches(project_location, location_text)):
+            candidate(i)["geo"] = True
+        for i, count in _memoized(memo, ("priorities", priorities),
+                                  lambda: _count_hits(self.by_priority, priorities)).items():
+            candidate(i)["priorities"] = count
+        for i, count in _memoized(memo, ("focus", focus_areas),
+                                  lambda: _count_hits(self.by_focus, focus_areas)).items():
+            candidate(i)["focus"] = count
+        return candidates
+
+    def _geographic_matches(self, project_location: Dict, location_text: str) -> set:
+        """Get the sources whose geographic eligibility matches a project location.
+
+        Sources with ``eligible_geographies`` are matched by containment when the
+        location has a geometry; otherwise eligibility terms must appear in the
+        location as whole words, so "urban" does not match "suburban".
+
+        Args:
+            project_location: Location information for the project
+            location_text: The lower-cased text of the project location
+
+        Returns:
+            Indexes of the matching sources
+        """
+        matches = set()
+        if project_location:
+            for geography, indexes in self.by_geography.items():
+                if geography in NATIONWIDE_TERMS or self.geography_patterns[geography].search(location_text):
+                    matches.update(indexes)
+
+        if self.by_feature and project_location_geometry(project_location) is not None:
+            matches -= self.geometry_sources
+            for feature_id in locate_project(project_location):
+                matches.update(self.by_feature.get(feature_id, []))
+        return matches
+
+    def rank(self, project_characteristics: Dict, community_priorities: List[str],
+             memo: Optional[Dict] = None) -> List[Tuple[int, int, Dict]]:
+        """Rank the sources matching a project, best first.
+
+        Args:
+            project_characteristics: Project attributes ('type', 'budget', 'location', 'focus_areas')
+            community_priorities: Community priority areas
+            memo: Index lookups shared across the projects of a batch
+
+        Returns:
+            (source index, score, criterion results) for sources above the minimum score
+        """
+        ranked = []
+        for i, result in self.score(project_characteristics, community_priorities, memo).items():
+            score = (TYPE_MATCH_SCORE * result["type"]
+                     + BUDGET_MATCH_SCORE * result["budget"]
+                     + GEOGRAPHIC_MATCH_SCORE * result["geo"]
+                     + PRIORITY_MATCH_SCORE * result["priorities"]
+                     + FOCUS_MATCH_SCORE * result["focus"])
+            if score > MINIMUM_MATCH_SCORE:
+                ranked.append((i, score, result))
+        ranked.sort(key=lambda entry: (-entry[1], entry[0]))
+        return ranked
+
+    def build_match(self, i: int, score: int, result: Dict, project_characteristics: Dict) -> Dict:
+        """Build the match dictionary reported for a ranked source.
+
+        Args:
+            i: Index of the source in the catalog
+            score: The matching score
+            result: The criterion results from ``score``
+            project_characteristics: Project attributes
+
+        Returns:
+            The source summary with the matching score and reasons
+        """
+        reasons = []
+        if result["type"]:
+            reasons.append(f"Project type '{project_characteristics.get('type', '').lower()}' matches eligible types")
+        if result["budget"]:
+            low, high = self.budget_ranges[i]
+            reasons.append(f"Budget ${project_characteristics.get('budget', 0):,} is within range (${low:,} - ${high:,})")
+        if result["geo"]:
+            reasons.append("Project location matches geographic eligibility")
+        if result["priorities"]:
+            reasons.append(f"Matches {result['priorities']} community priorities")
+        if result["focus"]:
+            reasons.append(f"Matches {result['focus']} focus areas")
+        return {
+            **self.summaries[i],
+            "matching_score": score,
+            "matching_reasons": reasons
+        }
+
+    def match(self, project_characteristics: Dict, community_priorities: List[str]) -> List[Dict]:
+        """Find the funding sources matching a project, best first.
+
+        Args:
+            project_characteristics: Project attributes ('type', 'budget', 'location', 'focus_areas')
+            community_priorities: Community priority areas
+
+        Returns:
+            Match dictionaries with the matching score and reasons
+        """
+        return [
+            self.build_match(i, score, result, project_characteristics)
+            for i, score, result in self.rank(project_characteristics, community_priorities)
+        ]
+
+
+def get_funding_catalog(path: str = "data/funding_sources.json") -> FundingCatalog:
+    """Get the shared catalog for a funding sources file, reloading it if the file changed.
+
+    Args:
+        path: Path to the funding sources JSON file
+
+    Returns:
+        The funding catalog
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    key = str(path)
+    catalog = _catalogs.get(key)
+    signature = _file_signature(Path(path))
+    if catalog is not None and catalog.signature == signature:
+        return catalog
+
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None or catalog.signature != _file_signature(Path(path)):
+            catalog = FundingCatalog.from_file(Path(path))
+            _catalogs[key] = catalog
+        return catalog
+
+
+def _memoized(memo: Dict, key: Tuple, compute):
+    """Get a value from the memo, computing and storing it on a miss."""
+    value = memo.get(key)
+    if value is None:
+        value = memo[key] = compute()
+    return value
+
+
+def _count_hits(index: Dict[str, List[int]], terms: frozenset) -> Dict[int, int]:
+    """Count how many of the terms each source lists in an inverted index."""
+    counts: Dict[int, int] = {}
+    for term in terms:
+        for i in index.get(term, []):
+            counts[i] = counts.get(i, 0) + 1
+    return counts
+
+
+def _file_signature(path: Path) -> Optional[Tuple]:
+    """Get the modification time and size of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _summarize_source(source: Dict) -> Dict:
+    """Build the part of a match dictionary that depends only on the source."""
+    minimum = source.get('minimum_budget', 0)
+    maximum = source.get('maximum_budget')
+    return {
+        "id": source.get("id"),
+        "name": source.get("name"),
+        "organization": source.get("organization"),
+        "description": source.get("description"),
+        "amount_range": f"${minimum:,} - " + (f"${maximum:,}" if maximum is not None else "No maximum"),
+        "deadline": source.get("deadline"),
+        "application_url": source.get("application_url"),
+        "contact_info": source.get("contact_info")
+    }
@@ -0,0 +1,344 @@
+"""
+Module: funding_deadlines.py
+
+This module implements the funding deadline calendar and alert scheduler.
+Features:
+- Deadline Calendar: Indexes every funding source deadline, and the alert dates N days before
+  each one, in a time-ordered list
+- Saved Project Profiles: Stores the characteristics of projects that staff want alerts for
+- Precomputed Matches: Keeps which saved projects match each funding source, updated when a
+  profile is saved and rebuilt only when the funding catalog changes
+- Daily Digests: Each run visits only the alerts that came due since the previous run and
+  writes one digest per day under ``data/funding/digests``
+- Multi-process Safety: Profile saves, calendar reads and runs hold an inter-process lock,
+  and each worker reloads the match index whenever another worker has rewritten it
+"""
+
+import os
+import json
+import bisect
+import datetime
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from funding_catalog import get_funding_catalog
+from serialization import dump_file
+from file_locks import file_lock
+from implementation_tools import _create_sample_funding_database
+
+# Days before a deadline on which an alert is sent
+DEFAULT_LEAD_DAYS = (30, 14, 7, 1)
+
+# Longest calendar window, in days
+MAX_CALENDAR_DAYS = 3650
+
+# Callbacks notified with each digest (e.g. to send email)
+_digest_listeners: List[Callable[[Dict], None]] = []
+
+
+class FundingDeadlineScheduler:
+    """Time-ordered deadline index with per-source project matches."""
+
+    def __init__(self, data_dir: str = "data/funding", catalog_path: str = "data/funding_sources.json",
+                 lead_days: Tuple[int, ...] = DEFAULT_LEAD_DAYS):
+        """Initialize the scheduler.
+
+        Args:
+            data_dir: Directory for saved project profiles, match index, state and digests
+            catalog_path: Path to the funding sources JSON file
+            lead_days: Days before each deadline on which to send an alert
+        """
+        self.data_dir = Path(data_dir)
+        self.catalog_path = catalog_path
+        self.lead_days = tuple(sorted(set(lead_days), reverse=True))
+        self.state_file = self.data_dir / "alert_state.json"
+        self.matches_file = self.data_dir / "deadline_matches.json"
+        self.lock_file = self.data_dir / "scheduler.lock"
+        self._lock = threading.Lock()
+        self._ensure_data_directory()
+
+        # Sorted (alert date, deadline, source id, lead days) entries
+        self.alerts: List[Tuple[str, str, str, int]] = []
+        self.alerts_signature = None
+        # Saved project -> matching source ids, and the reverse mapping
+        self.project_matches: Dict[str, List[str]] = {}
+        self.source_projects: Dict[str, set] = {}
+        self.matches_signature = None
+        # Signature of the match index file the in-memory matches were read from or written to
+        self.matches_file_signature = None
+        self._load_matches()
+
+    def _ensure_data_directory(self):
+        """Ensure the data directories exist."""
+        os.makedirs(self.data_dir / "profiles", exist_ok=True)
+        os.makedirs(self.data_dir / "digests", exist_ok=True)
+
+    # Catalog and match maintenance
+
+    def _catalog(self):
+        """Get the funding catalog, creating the sample database if needed."""
+        if not Path(self.catalog_path).exists():
+            _create_sample_funding_database()
+        return get_funding_catalog(self.catalog_path)
+
+    def _refresh(self):
+        """Rebuild the deadline index and the match index if the catalog changed.
+
+        Callers hold the lock, so the match index loaded here is current.
+        """
+        self._load_matches()
+        catalog = self._catalog()
+        if catalog.signature != self.alerts_signature:
+            alerts = []
+            for source in catalog.sources:
+                deadline = _parse_date(source.get("deadline"))
+                if deadline is None or source.get("id") is None:
+                    continue
+                for lead in self.lead_days:
+                    alert_date = deadline - datetime.timedelta(days=lead)
+                    alerts.append((alert_date.isoformat(), deadline.isoformat(), source["id"], lead))
+            alerts.sort()
+            self.alerts = alerts
+            self.alerts_signature = catalog.signature
+
+        if catalog.signature != self.matches_signature:
+            # The catalog changed, so every saved profile must be matched again
+            self.project_matches = {}
+            self.source_projects = {}
+            for profile_file in (self.data_dir / "profiles").glob("*.json"):
+                try:
+                    with open(profile_file, 'r') as file:
+                        profile = json.load(file)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(profile, dict) or validate_project_id(profile.get("project_id")):
+                    continue
+                self._index_profile(catalog, profile)
+            self.matches_signature = catalog.signature
+            self._save_matches()
+        return catalog
+
+    def _index_profile(self, catalog, profile: Dict):
+        """Match one saved profile against the catalog and update the match index."""
+        project_id = profile["project_id"]
+        for source_id in self.project_matches.pop(project_id, []):
+            self.source_projects.get(source_id, set()).discard(project_id)
+
+        ranked = catalog.rank(profile.get("project_characteristics", {}), profile.get("community_priorities", []))
+        source_ids = [catalog.sources[i].get("id") for i, _, _ in ranked]
+        self.project_matches[project_id] = source_ids
+        for source_id in source_ids:
+            self.source_projects.setdefault(source_id, set()).add(project_id)
+
+    def _load_matches(self):
+        """Load the persisted match index, unless it is unchanged since it was last loaded or saved."""
+        signature = _file_signature(self.matches_file)
+        if signature is None or signature == self.matches_file_signature:
+            return
+        try:
+            with open(self.matches_file, 'r') as file:
+                stored = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.matches_file_signature = signature
+        self.matches_signature = tuple(stored["catalog_signature"]) if stored.get("catalog_signature") else None
+        self.project_matches = stored.get("project_matches", {})
+        self.source_projects = {}
+        for project_id, source_ids in self.project_matches.items():
+            for source_id in source_ids:
+                self.source_projects.setdefault(source_id, set()).add(project_id)
+
+    def _save_matches(self):
+        """Persist the match index."""
+        dump_file({
+            "catalog_signature": list(self.matches_signature) if self.matches_signature else None,
+            "project_matches": self.project_matches
+        }, self.matches_file, atomic=True)
+        self.matches_file_signature = _file_signature(self.matches_file)
+
+    # Saved projects
+
+    def save_project_profile(self, project_id: str, project_characteristics: Dict,
+                             community_priorities: List[str]) -> Dict:
+        """Save a project's funding profile and precompute its matching sources.
+
+        Args:
+            project_id: The ID of the project
+            project_characteristics: Project attributes used for funding matching
+            community_priorities: Community priority areas
+
+        Returns:
+            The saved profile with its matching source ids
+
+        Raises:
+            ValueError: If the project id is not a valid file name (see ``validate_project_id``)
+        """
+        error = validate_project_id(project_id)
+        if error:
+            raise ValueError(error)
+        profile = {
+            "project_id": project_id,
+            "project_characteristics": project_characteristics,
+            "community_priorities": community_priorities,
+            "updated_at": datetime.datetime.now().isoformat()
+        }
+        with self._lock, file_lock(self.lock_file):
+            catalog = self._refresh()
+            dump_file(profile, self.data_dir / "profiles" / f"{project_id}.json")
+            self._index_profile(catalog, profile)
+            self._save_matches()
+            return {**profile, "matching_sources": self.project_matches[project_id]}
+
+    # Calendar and alerts
+
+    def upcoming(self, today: Optional[datetime.date] = None, days: int = 60) -> List[Dict]:
+        """List the deadlines within a window, with the saved projects matching each source.
+
+        Args:
+            today: The first day of the window. Defaults to today.
+            days: Length of the window in days, from 1 to MAX_CALENDAR_DAYS
+
+        Returns:
+            Calendar entries ordered by deadline
+
+        Raises:
+            ValueError: If the window length is out of range
+        """
+        if not 1 <= days <= MAX_CALENDAR_DAYS:
+            raise ValueError(f"days must be between 1 and {MAX_CALENDAR_DAYS}")
+        today = today or datetime.date.today()
+        end = today + datetime.timedelta(days=days)
+        with self._lock, file_lock(self.lock_file):
+            catalog = self._refresh()
+            sources = {source.get("id"): source for source in catalog.sources}
+            deadlines = sorted({(deadline, source_id) for _, deadline, source_id, _ in self.alerts
+                                if today.isoformat() <= deadline <= end.isoformat()})
+            return [
+                self._alert_item(sources[source_id], deadline, today)
+                for deadline, source_id in deadlines
+            ]
+
+    def run(self, today: Optional[datetime.date] = None) -> Dict:
+        """Emit the digest of alerts that came due since the previous run.
+
+        Only the slice of the time-ordered alert index between the previous run
+        date and today is visited.
+
+        Args:
+            today: The run date. Defaults to today.
+
+        Returns:
+            The digest, which is also written to ``digests/{date}.json``
+        """
+        today = today or datetime.date.today()
+        with self._lock, file_lock(self.lock_file):
+            catalog = self._refresh()
+            state = self._load_state()
+            last_run = state.get("last_run") or (today - datetime.timedelta(days=1)).isoformat()
+
+            start = bisect.bisect_right(self.alerts, (last_run, "\uffff"))
+            end = bisect.bisect_right(self.alerts, (today.isoformat(), "\uffff"))
+            sources = {source.get("id"): source for source in catalog.sources}
+            items = []
+            for alert_date, deadline, source_id, lead in self.alerts[start:end]:
+                if deadline < today.isoformat() or source_id not in sources:
+                    continue
+                item = self._alert_item(sources[source_id], deadline, today)
+                item["alert_lead_days"] = lead
+                items.append(item)
+
+            digest = {
+                "date": today.isoformat(),
+                "covers_since": last_run,
+                "alert_count": len(items),
+                "alerts": items
+            }
+            dump_file(digest, self.data_dir / "digests" / f"{today.isoformat()}.json")
+            self._save_state({"last_run": max(last_run, today.isoformat())})
+
+        for callback in list(_digest_listeners):
+            try:
+                callback(digest)
+            except Exception as e:
+                print(f"Error in funding deadline digest listener: {e}")
+        return digest
+
+    def _alert_item(self, source: Dict, deadline: str, today: datetime.date) -> Dict:
+        """Build the calendar/alert entry of one source deadline."""
+        return {
+            "source_id": source.get("id"),
+            "name": source.get("name"),
+            "organization": source.get("organization"),
+            "deadline": deadline,
+            "days_remaining": (datetime.date.fromisoformat(deadline) - today).days,
+            "application_url": source.get("application_url"),
+            "matching_projects": sorted(self.source_projects.get(source.get("id"), ()))
+        }
+
+    def _load_state(self) -> Dict:
+        """Load the scheduler run state."""
+        try:
+            with open(self.state_file, 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, state: Dict):
+        """Persist the scheduler run state."""
+        dump_file(state, self.state_file, atomic=True)
+
+
+def get_deadline_scheduler(data_dir: str = "data/funding") -> FundingDeadlineScheduler:
+    """Get the shared deadline scheduler for a data directory, creating it on first use."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(data_dir)
+        if scheduler is None:
+            scheduler = _schedulers[data_dir] = FundingDeadlineScheduler(data_dir)
+        return scheduler
+
+
+def register_digest_listener(callback: Callable[[Dict], None]) -> None:
+    """Register a callback that receives each deadline digest.
+
+    Args:
+        callback: Called with the digest dictionary
+    """
+    if callback not in _digest_listeners:
+        _digest_listeners.append(callback)
+
+
+def validate_project_id(project_id) -> Optional[str]:
+    """Check a project id that names a saved profile file.
+
+    Returns:
+        The reason the id is invalid, or None if it is valid
+    """
+    if not isinstance(project_id, str) or not project_id.strip():
+        return "project_id must be a non-empty string"
+    if "/" in project_id or "\\" in project_id or ".." in project_id or "\0" in project_id:
+        return "project_id must not contain path separators or '..'"
+    return None
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """Get a file's (inode, mtime_ns, size), or None if it doesn't exist."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _parse_date(date_str: Optional[str]) -> Optional[datetime.date]:
+    """Parse an ISO format date (or datetime) string to a date."""
+    if not date_str:
+        return None
+    try:
+        return datetime.date.fromisoformat(str(date_str)[:10])
+    except ValueError:
+        return None
+
+
+_schedulers: Dict[str, FundingDeadlineScheduler] = {}
+_schedulers_lock = threading.Lock()
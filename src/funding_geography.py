@@ -0,0 +1,338 @@
+"""
+Module: funding_geography.py
+
+This module implements geometry-based geographic eligibility for funding sources.
+Features:
+- Eligibility Geometries: Loads tracts, counties, urbanized areas, disadvantaged-community
+  polygons and other eligibility areas from a local GeoJSON file (``data/funding_geographies.json``)
+- Spatial Index: Buckets polygon bounding boxes into a uniform grid so a lookup only tests the
+  few polygons near the project
+- Containment Tests: Point-in-polygon (with holes and multipolygons) for point locations; line
+  and polygon project geometries must have every vertex inside one polygon, no edge crossing
+  its boundary and (for polygons) no hole of it inside them
+- Hot Reload: Rebuilds the index when the geographies file changes on disk
+
+Each feature needs an ``id`` (on the feature or in its properties). Funding sources reference
+features through an ``eligible_geographies`` list of those ids.
+"""
+
+import os
+import json
+import math
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# Target number of polygons per grid cell when sizing the spatial index
+POLYGONS_PER_CELL = 2
+
+_indexes: Dict[str, "GeographyIndex"] = {}
+_indexes_lock = threading.Lock()
+
+
+class GeographyIndex:
+    """Grid-bucketed spatial index over eligibility polygons."""
+
+    def __init__(self, features: List[Dict], signature: Optional[Tuple] = None):
+        """Build the spatial index.
+
+        Args:
+            features: GeoJSON features with Polygon or MultiPolygon geometries
+            signature: The on-disk signature of the file the features were read from
+        """
+        self.signature = signature
+        # One entry per polygon part: (feature id, rings, bounding box)
+        self.polygons: List[Tuple[str, List[List[Tuple[float, float]]], Tuple[float, float, float, float]]] = []
+        self.features: Dict[str, Dict] = {}
+
+        for feature in features:
+            properties = feature.get("properties") or {}
+            feature_id = feature.get("id", properties.get("id"))
+            geometry = feature.get("geometry") or {}
+            if feature_id is None:
+                continue
+            feature_id = str(feature_id)
+            self.features[feature_id] = properties
+            if geometry.get("type") == "Polygon":
+                parts = [geometry["coordinates"]]
+            elif geometry.get("type") == "MultiPolygon":
+                parts = geometry["coordinates"]
+            else:
+                continue
+            for part in parts:
+                rings = [[(float(x), float(y)) for x, y, *_ in ring] for ring in part if ring]
+                if rings:
+                    self.polygons.append((feature_id, rings, _bounding_box(rings[0])))
+
+        self._build_grid()
+
+    @classmethod
+    def from_file(cls, path: Path) -> "GeographyIndex":
+        """Load an index from a GeoJSON FeatureCollection file, or an empty one if it doesn't exist.
+
+        Raises:
+            json.JSONDecodeError: If the file is not valid JSON
+        """
+        signature = _file_signature(path)
+        if signature is None:
+            return cls([], None)
+        with open(path, 'r') as file:
+            collection = json.load(file)
+        return cls(collection.get("features", []), signature)
+
+    def _build_grid(self):
+        """Bucket polygon bounding boxes into grid cells."""
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        if not self.polygons:
+            self.origin = (0.0, 0.0)
+            self.cell_size = 1.0
+            return
+
+        min_x = min(box[0] for _, _, box in self.polygons)
+        min_y = min(box[1] for _, _, box in self.polygons)
+        max_x = max(box[2] for _, _, box in self.polygons)
+        max_y = max(box[3] for _, _, box in self.polygons)
+        cells_per_side = max(1, int(math.sqrt(len(self.polygons) / POLYGONS_PER_CELL)))
+        self.origin = (min_x, min_y)
+        self.cell_size = max(max_x - min_x, max_y - min_y, 1e-9) / cells_per_side
+
+        for i, (_, _, box) in enumerate(self.polygons):
+            x0, y0 = self._cell(box[0], box[1])
+            x1, y1 = self._cell(box[2], box[3])
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    self.cells.setdefault((cx, cy), []).append(i)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        """Get the grid cell containing a coordinate."""
+        return (int((x - self.origin[0]) // self.cell_size),
+                int((y - self.origin[1]) // self.cell_size))
+
+    def features_containing_point(self, x: float, y: float) -> Set[str]:
+        """Get the ids of the features containing a point.
+
+        Args:
+            x: Longitude
+            y: Latitude
+
+        Returns:
+            The ids of the containing features
+        """
+        found = set()
+        for i in self.cells.get(self._cell(x, y), ()):
+            feature_id, rings, box = self.polygons[i]
+            if feature_id in found or not (box[0] <= x <= box[2] and box[1] <= y <= box[3]):
+                continue
+            if _point_in_polygon(x, y, rings):
+                found.add(feature_id)
+        return found
+
+    def features_containing(self, geometry: Dict) -> Set[str]:
+        """Get the ids of the features containing a GeoJSON geometry.
+
+        Points use a point-in-polygon test. Lines and polygons are contained in a
+        polygon of a feature when every vertex is inside it and none of their edges
+        crosses its boundary, which catches edges that leave a concave area between
+        two vertices; a project polygon must also not surround a hole of the area.
+
+        Args:
+            geometry: A GeoJSON geometry
+
+        Returns:
+            The ids of the containing features
+        """
+        vertices = _vertices(geometry)
+        if not vertices:
+            return set()
+        paths = _paths(geometry)
+        if not paths:
+            found = self.features_containing_point(*vertices[0])
+            for x, y in vertices[1:]:
+                if not found:
+                    break
+                found &= self.features_containing_point(x, y)
+            return found
+
+        box = _bounding_box(vertices)
+        outlines = paths if geometry.get("type") in ("Polygon", "MultiPolygon") else []
+        found = set()
+        # A polygon containing the geometry contains its first vertex, so it is bucketed in that cell
+        for i in self.cells.get(self._cell(*vertices[0]), ()):
+            feature_id, rings, part_box = self.polygons[i]
+            if feature_id in found or not (part_box[0] <= box[0] and part_box[1] <= box[1]
+                                           and box[2] <= part_box[2] and box[3] <= part_box[3]):
+                continue
+            if not all(_point_in_polygon(x, y, rings) for x, y in vertices):
+                continue
+            if _paths_cross_rings(paths, rings, box):
+                continue
+            if any(_point_in_ring(*hole[0], outline) for hole in rings[1:] for outline in outlines):
+                continue
+            found.add(feature_id)
+        return found
+
+
+def get_geography_index(path: str = "data/funding_geographies.json") -> GeographyIndex:
+    """Get the shared geography index for a file, reloading it if the file changed.
+
+    Args:
+        path: Path to the GeoJSON file of eligibility geometries
+
+    Returns:
+        The geography index
+    """
+    key = str(path)
+    index = _indexes.get(key)
+    if index is not None and index.signature == _file_signature(Path(path)):
+        return index
+
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.signature != _file_signature(Path(path)):
+            index = GeographyIndex.from_file(Path(path))
+            _indexes[key] = index
+        return index
+
+
+def locate_project(project_location: Dict, path: str = "data/funding_geographies.json") -> Set[str]:
+    """Get the eligibility features that contain a project location.
+
+    The location may carry a GeoJSON ``geometry``, a ``coordinates`` [longitude, latitude]
+    pair, or ``longitude``/``latitude`` (or ``lng``/``lat``) values.
+
+    Args:
+        project_location: Location information for the project
+        path: Path to the GeoJSON file of eligibility geometries
+
+    Returns:
+        The ids of the containing features, empty if the location has no geometry
+    """
+    geometry = project_location_geometry(project_location)
+    if geometry is None:
+        return set()
+    try:
+        index = get_geography_index(path)
+    except json.JSONDecodeError:
+        return set()
+    return index.features_containing(geometry)
+
+
+def project_location_geometry(project_location: Dict) -> Optional[Dict]:
+    """Extract a GeoJSON geometry from a project location, if it has one."""
+    if not isinstance(project_location, dict):
+        return None
+    geometry = project_location.get("geometry")
+    if isinstance(geometry, dict) and geometry.get("type"):
+        return geometry
+    coordinates = project_location.get("coordinates")
+    if isinstance(coordinates, (list, tuple)) and len(coordinates) >= 2:
+        return {"type": "Point", "coordinates": list(coordinates[:2])}
+    longitude = project_location.get("longitude", project_location.get("lng", project_location.get("lon")))
+    latitude = project_location.get("latitude", project_location.get("lat"))
+    if longitude is not None and latitude is not None:
+        return {"type": "Point", "coordinates": [longitude, latitude]}
+    return None
+
+
+def _file_signature(path: Path) -> Optional[Tuple]:
+    """Get the modification time and size of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _vertices(geometry: Dict) -> List[Tuple[float, float]]:
+    """Flatten the coordinates of a GeoJSON geometry into (x, y) vertices."""
+    geometry_type = geometry.get("type")
+    coordinates = geometry.get("coordinates") or []
+    try:
+        if geometry_type == "Point":
+            return [(float(coordinates[0]), float(coordinates[1]))]
+        if geometry_type in ("MultiPoint", "LineString"):
+            return [(float(c[0]), float(c[1])) for c in coordinates]
+        if geometry_type in ("MultiLineString", "Polygon"):
+            # Holes of a project polygon lie inside its outer ring, so only the outer rings matter
+            lines = coordinates[:1] if geometry_type == "Polygon" else coordinates
+            return [(float(c[0]), float(c[1])) for line in lines for c in line]
+        if geometry_type == "MultiPolygon":
+            return [(float(c[0]), float(c[1])) for polygon in coordinates for c in polygon[0]]
+    except (TypeError, ValueError, IndexError):
+        return []
+    return []
+
+
+def _paths(geometry: Dict) -> List[List[Tuple[float, float]]]:
+    """Get the edge paths of a line or polygon geometry; polygon outer rings are closed."""
+    geometry_type = geometry.get("type")
+    coordinates = geometry.get("coordinates") or []
+    try:
+        if geometry_type == "LineString":
+            lines = [coordinates]
+        elif geometry_type == "MultiLineString":
+            lines = coordinates
+        elif geometry_type == "Polygon":
+            lines = coordinates[:1]
+        elif geometry_type == "MultiPolygon":
+            lines = [polygon[0] for polygon in coordinates if polygon]
+        else:
+            return []
+        paths = [[(float(c[0]), float(c[1])) for c in line] for line in lines]
+    except (TypeError, ValueError, IndexError):
+        return []
+    if geometry_type in ("Polygon", "MultiPolygon"):
+        paths = [path + path[:1] if path and path[0] != path[-1] else path for path in paths]
+    return [path for path in paths if len(path) >= 2]
+
+
+def _paths_cross_rings(paths: List[List[Tuple[float, float]]], rings: List[List[Tuple[float, float]]],
+                       box: Tuple[float, float, float, float]) -> bool:
+    """Test whether any edge of the paths properly crosses an edge of the rings.
+
+    Only ring edges overlapping the bounding box of the paths are compared.
+    """
+    segments = [(path[k - 1], path[k]) for path in paths for k in range(1, len(path))]
+    for ring in rings:
+        c = ring[-1]
+        for d in ring:
+            if (max(c[0], d[0]) >= box[0] and min(c[0], d[0]) <= box[2]
+                    and max(c[1], d[1]) >= box[1] and min(c[1], d[1]) <= box[3]):
+                for a, b in segments:
+                    if _segments_cross(a, b, c, d):
+                        return True
+            c = d
+    return False
+
+
+def _segments_cross(a: Tuple[float, float], b: Tuple[float, float],
+                    c: Tuple[float, float], d: Tuple[float, float]) -> bool:
+    """Test whether segments ab and cd cross at a point inside both (touching does not count)."""
+    def side(p, q, r):
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+    return side(c, d, a) * side(c, d, b) < 0 and side(a, b, c) * side(a, b, d) < 0
+
+
+def _bounding_box(ring: List[Tuple[float, float]]) -> Tuple[float, float, float, float]:
+    """Get the (min x, min y, max x, max y) bounding box of a ring."""
+    xs = [x for x, _ in ring]
+    ys = [y for _, y in ring]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def _point_in_ring(x: float, y: float, ring: List[Tuple[float, float]]) -> bool:
+    """Ray-casting test of whether a point lies inside a ring."""
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def _point_in_polygon(x: float, y: float, rings: List[List[Tuple[float, float]]]) -> bool:
+    """Test whether a point lies inside a polygon's outer ring and outside its holes."""
+    if not _point_in_ring(x, y, rings[0]):
+        return False
+    return not any(_point_in_ring(x, y, hole) for hole in rings[1:])
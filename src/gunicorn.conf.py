@@ -0,0 +1,52 @@
+"""
+Gunicorn configuration for the Implementation Tools API.
+
+Workers and threads are sized from the CPU count and can be overridden with the
+``WEB_CONCURRENCY`` and ``GUNICORN_THREADS`` environment variables. Requests mostly
+wait on data file I/O, so each worker runs a small thread pool.
+
+Workers share the data directory, so every store that writes to it serializes
+its writers with an inter-process file lock (``file_locks.file_lock``) and
+re-reads what other workers wrote under that lock before changing it.
+"""
+
+import os
+import shutil
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('SERVER_PORT', 5001)}"
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Each worker builds and warms its own application after the fork, so shared
+# indexes, locks and memory maps are never inherited across processes
+preload_app = False
+
+# Seconds a silent worker may run before it is restarted, and that in-flight
+# requests get to finish after SIGTERM before workers are killed
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth of the in-memory indexes
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = "-"
+
+# Workers write their metric totals here so /api/metrics can sum all workers
+os.environ.setdefault('API_METRICS_DIR', os.path.join('data', 'metrics'))
+
+
+def on_starting(server):
+    """Clear the metric totals of the previous server run."""
+    shutil.rmtree(os.environ['API_METRICS_DIR'], ignore_errors=True)
+
+
+def worker_exit(server, worker):
+    """Flush the open stores of a worker when it exits."""
+    from api import shutdown
+    shutdown()
@@ -20,10 +20,44 @@ Note: These functions are stubs and should be implemented with actual logic as n
 import sys
 import os
 import json
+import copy
 import datetime
-from typing import Dict, List, Optional, Union, Any
+import threading
+from typing import Callable, Dict, List, Optional, Union, Any
 from pathlib import Path
 from collaborative_design_tools import CollaborativeDesignTools
+from compliance_scheduling import get_compliance_schedule, handle_compliance_change
+from funding_catalog import get_funding_catalog
+from regulatory_rules import get_rules_engine
+from timeline_scheduling import get_timeline_schedule, handle_timeline_change
+from serialization import dump_file, load_file
+from file_locks import file_lock
+from timeline_rendering import RENDER_FORMATS, cached_render, render_timeline
+
+# Entity collections of a timeline that can be patched individually
+TIMELINE_COLLECTIONS = ("phases", "tasks", "milestones", "teamMembers", "comments")
+
+# Timeline collections whose entries are scheduled, and the fields a new entry must give
+SCHEDULED_COLLECTIONS = ("phases", "tasks")
+SCHEDULED_FIELDS = ("startDate", "endDate", "status")
+
+# Number of journal entries after which a timeline snapshot is rewritten
+TIMELINE_COMPACTION_THRESHOLD = 200
+
+# Times a timeline document is looked up again when a newer render pruned it before it was opened
+DOCUMENT_OPEN_ATTEMPTS = 3
+
+# Parsed-timeline cache keyed by file signature
+_timeline_cache: Dict[str, tuple] = {}
+
+# Callbacks notified with a change event whenever a timeline is written
+_timeline_listeners: List[Callable[[Dict], None]] = []
+
+# Fields of a compliance requirement that can be updated individually
+COMPLIANCE_UPDATE_FIELDS = ("status", "started_date", "completed_date", "depends_on", "notes")
+
+# Callbacks notified whenever compliance data is written
+_compliance_listeners: List[Callable[[Dict], None]] = []
 
 def implementation_timeline_visualizer(project_id: str = None, output_format: str = "json") -> Dict:
     """Display a visual representation of the project implementation timeline with real-time progress tracking.
@@ -54,29 +88,24 @@ def implementation_timeline_visualizer(project_id: str = None, output_format: st
             }
         }
     
-    # Construct the path to the project timeline file
-    timeline_file = data_dir / f"{project_id}_timeline.json"
+    # Load the timeline snapshot with any journaled patches applied
+    try:
+        timeline_data = _load_timeline(project_id)
+    except json.JSONDecodeError:
+        return {
+            "success": False,
+            "message": "Error reading timeline data",
+            "data": {
+                "project": None,
+                "phases": [],
+                "tasks": [],
+                "milestones": [],
+                "teamMembers": [],
+                "comments": []
+            }
+        }
     
-    # Check if the timeline data exists for this project
-    if timeline_file.exists():
-        # Read the timeline data from the file
-        with open(timeline_file, 'r') as file:
-            try:
-                timeline_data = json.load(file)
-            except json.JSONDecodeError:
-                return {
-                    "success": False,
-                    "message": "Error reading timeline data",
-                    "data": {
-                        "project": None,
-                        "phases": [],
-                        "tasks": [],
-                        "milestones": [],
-                        "teamMembers": [],
-                        "comments": []
-                    }
-                }
-    else:
+    if timeline_data is None:
         # Return empty timeline structure
         return {
             "success": False,
@@ -129,28 +158,40 @@ def implementation_timeline_visualizer(project_id: str = None, output_format: st
                 if task["status"] != "completed":
                     task["status"] = "not-started"
     
+    # Compute the critical-path schedule and flag the tasks that drive the finish date
+    schedule = get_timeline_schedule(project_id, timeline_data)
+    if "tasks" in timeline_data and "tasks" in schedule:
+        for task in timeline_data["tasks"]:
+            task_schedule = schedule["tasks"].get(task.get("id"))
+            if task_schedule:
+                task["isCriticalPath"] = task_schedule["critical"]
+    
     # Return the timeline data in the requested format
     if output_format == "json":
         return {
             "success": True,
             "message": "Timeline data retrieved successfully",
-            "data": timeline_data
+            "data": timeline_data,
+            "schedule": schedule
         }
     elif output_format == "html":
-        # In a real implementation, this would generate HTML
+        path = render_timeline(project_id, timeline_data, schedule, "html")
         return {
             "success": True,
-            "message": "HTML output not fully implemented",
+            "message": "Timeline rendered as HTML",
             "data": timeline_data,
-            "html": f"<div>Timeline for Project {project_id}</div>"
+            "schedule": schedule,
+            "html": path.read_text(encoding="utf-8"),
+            "html_path": str(path)
         }
     elif output_format == "pdf":
-        # In a real implementation, this would generate a PDF
+        path = render_timeline(project_id, timeline_data, schedule, "pdf")
         return {
             "success": True,
-            "message": "PDF output not fully implemented",
+            "message": "Timeline rendered as PDF",
             "data": timeline_data,
-            "pdf_path": f"exports/timeline_{project_id}.pdf"
+            "schedule": schedule,
+            "pdf_path": str(path)
         }
     else:
         return {
@@ -159,9 +200,66 @@ def implementation_timeline_visualizer(project_id: str = None, output_format: st
             "data": timeline_data
         }
 
+def timeline_document(project_id: str, output_format: str = "pdf") -> Dict:
+    """Get the printable HTML or PDF document of a project timeline.
+    
+    Today's rendering of the current timeline revision is served from the render
+    cache; the document is only rendered when the timeline or the day changed.
+    The document is opened here, since a concurrent render of a newer revision
+    prunes older renderings; if it is pruned before it is opened, the current
+    revision is looked up again.
+    
+    Args:
+        project_id (str): The ID of the project.
+        output_format (str, optional): 'html' or 'pdf'. Defaults to "pdf".
+        
+    Returns:
+        Dict: The status, with the document ``path``, its open binary ``file`` (which
+        the caller must close), ``mimetype`` and timeline ``revision``.
+    """
+    if output_format not in RENDER_FORMATS:
+        return {"success": False, "message": f"Unsupported output format: {output_format}", "data": None}
+    
+    for _ in range(DOCUMENT_OPEN_ATTEMPTS):
+        try:
+            timeline_data = _load_timeline(project_id)
+        except json.JSONDecodeError:
+            return {"success": False, "message": "Error reading timeline data", "data": None}
+        if timeline_data is None:
+            return {"success": False, "message": f"No timeline data found for project {project_id}", "data": None}
+        
+        revision = timeline_data.get("revision", 0)
+        path = cached_render(project_id, revision, output_format)
+        if path is None:
+            result = implementation_timeline_visualizer(project_id, output_format)
+            if not result["success"]:
+                return {"success": False, "message": result["message"], "data": None}
+            path = Path(result[f"{output_format}_path"])
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            continue
+        
+        return {
+            "success": True,
+            "message": f"Timeline document for project {project_id}",
+            "data": {
+                "path": str(path),
+                "file": file,
+                "mimetype": RENDER_FORMATS[output_format],
+                "revision": revision
+            }
+        }
+    return {"success": False, "message": f"The timeline of project {project_id} is changing too quickly to render",
+            "conflict": True, "data": None}
+
 def save_timeline_data(project_id: str, timeline_data: Dict) -> Dict:
     """Save timeline data for a project.
     
+    The whole timeline is replaced and its revision is incremented. If the
+    submitted data carries a ``revision`` it must match the stored revision,
+    otherwise the save is rejected as a conflict.
+    
     Args:
         project_id (str): The ID of the project.
         timeline_data (Dict): The timeline data to save.
@@ -173,23 +271,202 @@ def save_timeline_data(project_id: str, timeline_data: Dict) -> Dict:
     data_dir = Path("data/implementation")
     data_dir.mkdir(parents=True, exist_ok=True)
     
-    # Construct the path to the project timeline file
-    timeline_file = data_dir / f"{project_id}_timeline.json"
+    with _get_timeline_lock(project_id):
+        try:
+            current = _load_timeline(project_id)
+        except json.JSONDecodeError:
+            current = None
+        current_revision = current.get("revision", 0) if current else 0
+        
+        submitted_revision = timeline_data.get("revision")
+        if current and submitted_revision is not None and submitted_revision != current_revision:
+            return {
+                "success": False,
+                "conflict": True,
+                "message": f"Timeline revision {submitted_revision} is stale (current revision is {current_revision})",
+                "revision": current_revision
+            }
+        
+        revision = current_revision + 1
+        snapshot = dict(timeline_data)
+        snapshot["revision"] = revision
+        entry = {
+            "revision": revision,
+            "timestamp": datetime.datetime.now().isoformat(),
+            "reset": True,
+            "operations": [],
+            "affected": {}
+        }
+        
+        try:
+            # Write the timeline data to the file and record the replacement
+            snapshot_file, journal_file = _timeline_paths(project_id)
+            _write_json_atomic(snapshot_file, snapshot)
+            with open(journal_file, 'a') as file:
+                file.write(json.dumps(entry) + "\n")
+            _cache_timeline(project_id, snapshot, revision)
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Error saving timeline data: {str(e)}"
+            }
     
-    try:
-        # Write the timeline data to the file
-        with open(timeline_file, 'w') as file:
-            json.dump(timeline_data, file, indent=2)
+    _emit_timeline_change({"type": "timeline.replaced", "project_id": project_id, **entry})
+    
+    return {
+        "success": True,
+        "message": f"Timeline data saved for project {project_id}",
+        "revision": revision
+    }
+
+def patch_timeline_data(project_id: str, operations: List[Dict], base_revision: Optional[int] = None) -> Dict:
+    """Apply incremental changes to a project timeline.
+    
+    Each operation upserts or deletes a single entity keyed by its id, e.g.
+    ``{"op": "upsert", "collection": "tasks", "id": "task-3", "value": {...}}``.
+    Upserts merge the given fields into an existing entity or append a new one;
+    ``{"op": "upsert", "collection": "project", "value": {...}}`` merges into the
+    project record. Only the operations are persisted, as one journal entry.
+    
+    Args:
+        project_id (str): The ID of the project.
+        operations (List[Dict]): The operations to apply, in order.
+        base_revision (int, optional): The revision the client edited. When given,
+            the patch is rejected if the timeline has changed since. Defaults to None.
         
-        return {
-            "success": True,
-            "message": f"Timeline data saved for project {project_id}"
+    Returns:
+        Dict: Status of the patch operation, the new revision and the affected entity ids.
+    """
+    if not operations or not isinstance(operations, list):
+        return {"success": False, "message": "No operations provided"}
+    if base_revision is not None and (isinstance(base_revision, bool) or not isinstance(base_revision, int)):
+        return {"success": False, "message": "revision must be an integer"}
+    
+    for operation in operations:
+        error = _validate_timeline_operation(operation)
+        if error:
+            return {"success": False, "message": error}
+    
+    with _get_timeline_lock(project_id):
+        try:
+            timeline_data = _load_timeline(project_id)
+        except json.JSONDecodeError:
+            return {"success": False, "message": "Error reading timeline data"}
+        
+        if timeline_data is None:
+            return {
+                "success": False,
+                "not_found": True,
+                "message": f"No timeline data found for project {project_id}"
+            }
+        
+        current_revision = timeline_data.get("revision", 0)
+        snapshot_revision = _timeline_cache[project_id][2]
+        if base_revision is not None and base_revision != current_revision:
+            return {
+                "success": False,
+                "conflict": True,
+                "message": f"Timeline revision {base_revision} is stale (current revision is {current_revision})",
+                "revision": current_revision
+            }
+        
+        affected = {}
+        for operation in operations:
+            # Checked against the timeline as changed by the preceding operations
+            error = _missing_entity_fields(timeline_data, operation)
+            if error:
+                return {"success": False, "message": error}
+            _apply_timeline_operation(timeline_data, operation)
+            ids = affected.setdefault(operation["collection"], [])
+            entity_id = operation.get("id")
+            if entity_id is not None and entity_id not in ids:
+                ids.append(entity_id)
+        
+        revision = current_revision + 1
+        timeline_data["revision"] = revision
+        entry = {
+            "revision": revision,
+            "timestamp": datetime.datetime.now().isoformat(),
+            "operations": operations,
+            "affected": affected
         }
-    except Exception as e:
+        
+        try:
+            snapshot_file, journal_file = _timeline_paths(project_id)
+            with open(journal_file, 'a') as file:
+                file.write(json.dumps(entry) + "\n")
+            if revision - snapshot_revision >= TIMELINE_COMPACTION_THRESHOLD:
+                _compact_timeline(project_id, timeline_data)
+                snapshot_revision = revision
+            _cache_timeline(project_id, timeline_data, snapshot_revision)
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Error saving timeline changes: {str(e)}"
+            }
+    
+    _emit_timeline_change({"type": "timeline.patched", "project_id": project_id, **entry})
+    
+    return {
+        "success": True,
+        "message": f"Applied {len(operations)} change(s) to timeline for project {project_id}",
+        "revision": revision,
+        "affected": affected
+    }
+
+def get_timeline_changes(project_id: str, since_revision: int = 0) -> Dict:
+    """Get the timeline changes made after a given revision.
+    
+    Viewers poll this with the last revision they rendered and refresh only the
+    affected rows. ``reset`` is True when the timeline was replaced wholesale or
+    the requested history has been compacted away, in which case the viewer
+    should reload the full timeline.
+    
+    Args:
+        project_id (str): The ID of the project.
+        since_revision (int, optional): The last revision seen by the client. Defaults to 0.
+        
+    Returns:
+        Dict: The current revision and the journaled change events after since_revision.
+    """
+    snapshot_file, journal_file = _timeline_paths(project_id)
+    if not snapshot_file.exists():
         return {
             "success": False,
-            "message": f"Error saving timeline data: {str(e)}"
+            "message": f"No timeline data found for project {project_id}",
+            "revision": 0,
+            "reset": True,
+            "changes": []
         }
+    
+    entries = _read_timeline_journal(journal_file)
+    revision = entries[-1]["revision"] if entries else _read_snapshot_revision(snapshot_file)
+    changes = [entry for entry in entries if entry["revision"] > since_revision]
+    
+    # The feed is incomplete if the oldest available entry is not the next one
+    reset = any(entry.get("reset") for entry in changes)
+    if revision > since_revision and (not changes or changes[0]["revision"] != since_revision + 1):
+        reset = True
+    
+    return {
+        "success": True,
+        "message": f"Found {len(changes)} change(s) since revision {since_revision}",
+        "revision": revision,
+        "reset": reset,
+        "changes": [] if reset else changes
+    }
+
+def register_timeline_listener(callback: Callable[[Dict], None]) -> None:
+    """Register a callback that receives an event for every timeline write.
+    
+    Args:
+        callback (Callable[[Dict], None]): Called with the change event dictionary.
+    """
+    if callback not in _timeline_listeners:
+        _timeline_listeners.append(callback)
+
+# Keep cached critical-path schedules current as timelines are patched
+register_timeline_listener(handle_timeline_change)
 
 def funding_source_matching(project_characteristics: Dict, community_priorities: List[str]) -> Dict:
     """Suggest potential funding sources or grants based on project characteristics and community priorities.
@@ -209,8 +486,7 @@ def funding_source_matching(project_characteristics: Dict, community_priorities:
         _create_sample_funding_database()
     
     try:
-        with open(funding_db_path, 'r') as file:
-            funding_sources = json.load(file)
+        catalog = get_funding_catalog(str(funding_db_path))
     except (json.JSONDecodeError, FileNotFoundError):
         return {
             "success": False,
@@ -218,73 +494,8 @@ def funding_source_matching(project_characteristics: Dict, community_priorities:
             "matches": []
         }
     
-    # Match project with funding sources
-    matches = []
-    
-    # Extract relevant project characteristics for matching
-    project_type = project_characteristics.get("type", "").lower()
-    project_budget = project_characteristics.get("budget", 0)
-    project_location = project_characteristics.get("location", {})
-    project_timeline = project_characteristics.get("timeline", {})
-    project_focus_areas = project_characteristics.get("focus_areas", [])
-    
-    for source in funding_sources:
-        score = 0
-        reasons = []
-        
-        # Match project type
-        if project_type in [t.lower() for t in source.get("eligible_project_types", [])]:
-            score += 30
-            reasons.append(f"Project type '{project_type}' matches eligible types")
-        
-        # Match budget range
-        min_budget = source.get("minimum_budget", 0)
-        max_budget = source.get("maximum_budget", float('inf'))
-        if min_budget <= project_budget <= max_budget:
-            score += 20
-            reasons.append(f"Budget ${project_budget:,} is within range (${min_budget:,} - ${max_budget:,})")
-        
-        # Match geographic eligibility
-        if "geographic_eligibility" in source:
-            geo_match = False
-            for geo in source["geographic_eligibility"]:
-                if geo.lower() in str(project_location).lower():
-                    geo_match = True
-                    break
-            
-            if geo_match:
-                score += 15
-                reasons.append("Project location matches geographic eligibility")
-        
-        # Match community priorities
-        priority_matches = set(community_priorities) & set(source.get("priority_areas", []))
-        if priority_matches:
-            score += len(priority_matches) * 10
-            reasons.append(f"Matches {len(priority_matches)} community priorities")
-        
-        # Match focus areas
-        focus_matches = set(project_focus_areas) & set(source.get("focus_areas", []))
-        if focus_matches:
-            score += len(focus_matches) * 5
-            reasons.append(f"Matches {len(focus_matches)} focus areas")
-        
-        # Add to matches if score is significant
-        if score > 20:
-            matches.append({
-                "id": source.get("id"),
-                "name": source.get("name"),
-                "organization": source.get("organization"),
-                "description": source.get("description"),
-                "amount_range": f"${source.get('minimum_budget', 0):,} - ${source.get('maximum_budget', 'No maximum'):,}",
-                "deadline": source.get("deadline"),
-                "matching_score": score,
-                "matching_reasons": reasons,
-                "application_url": source.get("application_url"),
-                "contact_info": source.get("contact_info")
-            })
-    
-    # Sort matches by score (highest first)
-    matches.sort(key=lambda x: x["matching_score"], reverse=True)
+    # Score only the sources reached through the catalog indexes
+    matches = catalog.match(project_characteristics, community_priorities)
     
     return {
         "success": True,
@@ -292,13 +503,160 @@ def funding_source_matching(project_characteristics: Dict, community_priorities:
         "matches": matches
     }
 
-def regulatory_compliance_tracker(project_id: str = None, project_type: str = None, location: Dict = None) -> Dict:
+def validate_funding_project(project_characteristics, community_priorities) -> Optional[str]:
+    """Check the characteristics and priorities of a project to match against funding sources.
+    
+    Args:
+        project_characteristics: Project attributes ('type', 'budget', 'location', 'focus_areas').
+        community_priorities: Community priority areas.
+        
+    Returns:
+        str: The reason the project is invalid, or None if it is valid.
+    """
+    if not isinstance(project_characteristics, dict):
+        return "project_characteristics must be an object"
+    if not isinstance(project_characteristics.get("type", ""), str):
+        return "Project type must be a string"
+    budget = project_characteristics.get("budget", 0)
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)):
+        return "Project budget must be a number"
+    if not isinstance(project_characteristics.get("location", {}), (dict, str)):
+        return "Project location must be an object or a string"
+    for name, values in (("focus_areas", project_characteristics.get("focus_areas", [])),
+                         ("community_priorities", community_priorities)):
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            return f"{name} must be a list of strings"
+    return None
+
+def validate_funding_batch(projects, top_k, source_caps) -> Optional[str]:
+    """Check the input of a batch funding match.
+    
+    Args:
+        projects: The projects to match.
+        top_k: Number of matches to return per project.
+        source_caps: Total funds available per source ID, or None.
+        
+    Returns:
+        str: The reason the batch is invalid, or None if it is valid.
+    """
+    if not isinstance(projects, list) or not projects:
+        return "projects must be a non-empty list"
+    if isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1:
+        return "top_k must be a positive integer"
+    if source_caps is not None:
+        if not isinstance(source_caps, dict) or not all(
+                isinstance(cap, (int, float)) and not isinstance(cap, bool) for cap in source_caps.values()):
+            return "source_caps must map source IDs to amounts"
+    for n, project in enumerate(projects):
+        if not isinstance(project, dict):
+            return f"Project {n} must be an object"
+        error = validate_funding_project(project.get("project_characteristics", {}),
+                                         project.get("community_priorities", []))
+        if error:
+            return f"Project {n}: {error}"
+    return None
+
+def validate_compliance_project(project_type, location, funding_sources) -> Optional[str]:
+    """Check the inputs of a regulatory compliance request.
+    
+    Args:
+        project_type: Type of project.
+        location: Location information ('state', 'county', 'near_water').
+        funding_sources: IDs of the funding sources the project uses.
+        
+    Returns:
+        str: The reason the request is invalid, or None if it is valid.
+    """
+    if not isinstance(project_type, str) or not project_type.strip():
+        return "Project type is required"
+    if location is not None and not isinstance(location, dict):
+        return "location must be an object"
+    if funding_sources is not None and (not isinstance(funding_sources, list)
+                                        or not all(isinstance(source, str) for source in funding_sources)):
+        return "funding_sources must be a list of funding source IDs"
+    return None
+
+def batch_funding_source_matching(projects: List[Dict], top_k: int = 5, source_caps: Optional[Dict[str, float]] = None) -> Dict:
+    """Match a whole portfolio of projects against the funding catalog in one pass.
+    
+    Index lookups are shared across projects with the same type, budget, location,
+    priorities or focus areas. Besides the top matches per project, the result
+    includes a portfolio view: how many projects each source matches, and a greedy
+    assignment of projects to sources that respects each source's budget cap.
+    
+    Args:
+        projects (List[Dict]): Projects with 'project_id', 'project_characteristics'
+            and 'community_priorities'.
+        top_k (int, optional): Number of matches to return per project. Defaults to 5.
+        source_caps (Dict[str, float], optional): Total funds available per source ID.
+            Defaults to each source's 'available_funding', or no cap if it has none.
+        
+    Returns:
+        Dict: Top matches per project, source popularity and the funding assignment.
+    """
+    funding_db_path = Path("data/funding_sources.json")
+    if not funding_db_path.exists():
+        _create_sample_funding_database()
+    
+    try:
+        catalog = get_funding_catalog(str(funding_db_path))
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {
+            "success": False,
+            "message": "Error loading funding sources database",
+            "results": []
+        }
+    
+    memo = {}
+    results = []
+    match_counts: Dict[int, int] = {}
+    candidate_pairs = []
+    for n, project in enumerate(projects):
+        project_id = project.get("project_id", f"project-{n + 1}")
+        characteristics = project.get("project_characteristics", {})
+        ranked = catalog.rank(characteristics, project.get("community_priorities", []), memo)
+        
+        results.append({
+            "project_id": project_id,
+            "match_count": len(ranked),
+            "matches": [catalog.build_match(i, score, result, characteristics)
+                        for i, score, result in ranked[:top_k]]
+        })
+        for i, score, _ in ranked:
+            match_counts[i] = match_counts.get(i, 0) + 1
+            candidate_pairs.append((score, n, i))
+    
+    popular_sources = sorted(match_counts.items(), key=lambda item: (-item[1], item[0]))
+    assignments, unassigned, remaining = _assign_funding_greedily(catalog, projects, candidate_pairs, source_caps or {})
+    
+    return {
+        "success": True,
+        "message": f"Matched {len(projects)} projects against {len(catalog.sources)} funding sources",
+        "results": results,
+        "portfolio": {
+            "source_match_counts": [
+                {
+                    "id": catalog.sources[i].get("id"),
+                    "name": catalog.sources[i].get("name"),
+                    "matched_projects": count
+                }
+                for i, count in popular_sources
+            ],
+            "assignments": assignments,
+            "unassigned_projects": unassigned,
+            "remaining_funding": remaining
+        }
+    }
+
+def regulatory_compliance_tracker(project_id: str = None, project_type: str = None, location: Dict = None,
+                                  funding_sources: List[str] = None) -> Dict:
     """Help track necessary permits, environmental reviews, and other regulatory requirements.
     
     Args:
         project_id (str, optional): The ID of the project to track. Defaults to None.
         project_type (str, optional): The type of project. Defaults to None.
         location (Dict, optional): Location information. Defaults to None.
+        funding_sources (List[str], optional): IDs of the funding sources the project uses. Defaults to None.
         
     Returns:
         Dict: A dictionary containing regulatory requirements and their statuses.
@@ -312,13 +670,13 @@ def regulatory_compliance_tracker(project_id: str = None, project_type: str = No
         compliance_file = data_dir / f"{project_id}_compliance.json"
         if compliance_file.exists():
             try:
-                with open(compliance_file, 'r') as file:
-                    compliance_data = json.load(file)
+                compliance_data = load_file(compliance_file)
                     
                 return {
                     "success": True,
                     "message": "Compliance data retrieved successfully",
-                    "data": compliance_data
+                    "data": compliance_data,
+                    "schedule": get_compliance_schedule(project_id, compliance_data)
                 }
             except json.JSONDecodeError:
                 # If file exists but is invalid, continue to create new data
@@ -334,7 +692,14 @@ def regulatory_compliance_tracker(project_id: str = None, project_type: str = No
         }
     
     # Generate regulatory requirements based on project type
-    requirements = _generate_regulatory_requirements(project_type, location)
+    try:
+        requirements = _generate_regulatory_requirements(project_type, location, funding_sources)
+    except json.JSONDecodeError:
+        return {
+            "success": False,
+            "message": "Error loading regulatory rules",
+            "data": {"requirements": []}
+        }
     
     compliance_data = {
         "project_id": project_id,
@@ -348,21 +713,134 @@ def regulatory_compliance_tracker(project_id: str = None, project_type: str = No
     if project_id:
         compliance_file = data_dir / f"{project_id}_compliance.json"
         try:
-            with open(compliance_file, 'w') as file:
-                json.dump(compliance_data, file, indent=2)
+            with _get_compliance_lock(project_id):
+                dump_file(compliance_data, compliance_file)
         except Exception as e:
             return {
                 "success": False,
                 "message": f"Error saving compliance data: {str(e)}",
                 "data": compliance_data
             }
+        _emit_compliance_change({"type": "compliance.replaced", "project_id": project_id,
+                                 "reset": True, "data": compliance_data})
     
     return {
         "success": True,
         "message": "Generated regulatory compliance requirements",
-        "data": compliance_data
+        "data": compliance_data,
+        "schedule": get_compliance_schedule(project_id, compliance_data)
     }
 
+def update_compliance_requirements(project_id: str, updates: List[Dict]) -> Dict:
+    """Update the status and dates of individual regulatory requirements of a project.
+    
+    Each update names a requirement ``id`` and the fields to change, e.g.
+    ``{"id": "req-006", "status": "completed", "completed_date": "2024-05-01"}``.
+    The project's permit schedule is rescheduled incrementally.
+    
+    Args:
+        project_id (str): The ID of the project.
+        updates (List[Dict]): The requirement updates.
+        
+    Returns:
+        Dict: The updated compliance data and schedule, with a ``not_found`` flag
+        if the project or a requirement doesn't exist.
+    """
+    for update in updates:
+        if not isinstance(update, dict) or not update.get("id"):
+            return {"success": False, "message": "Each update needs a requirement id"}
+        unknown = [field for field in update if field != "id" and field not in COMPLIANCE_UPDATE_FIELDS]
+        if unknown:
+            return {"success": False, "message": f"Fields cannot be updated: {', '.join(unknown)}"}
+        error = _validate_compliance_update(update)
+        if error:
+            return {"success": False, "message": f"Requirement {update['id']}: {error}"}
+    
+    compliance_file = Path("data/regulatory") / f"{project_id}_compliance.json"
+    with _get_compliance_lock(project_id):
+        try:
+            compliance_data = load_file(compliance_file, cached=False)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {
+                "success": False,
+                "not_found": True,
+                "message": f"No compliance data found for project {project_id}"
+            }
+        
+        requirements = {req.get("id"): req for req in compliance_data.get("requirements", [])}
+        missing = [update["id"] for update in updates if update["id"] not in requirements]
+        if missing:
+            return {
+                "success": False,
+                "not_found": True,
+                "message": f"Requirements not found: {', '.join(missing)}"
+            }
+        
+        today = datetime.date.today().isoformat()
+        changed = []
+        for update in updates:
+            requirement = requirements[update["id"]]
+            requirement.update({field: value for field, value in update.items() if field != "id"})
+            # Record when work started and finished unless the dates were given
+            if update.get("status") == "in-progress":
+                requirement.setdefault("started_date", today)
+            elif update.get("status") == "completed":
+                requirement.setdefault("completed_date", today)
+            changed.append(dict(requirement))
+        compliance_data["last_updated"] = datetime.datetime.now().isoformat()
+        
+        try:
+            _write_json_atomic(compliance_file, compliance_data)
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Error saving compliance data: {str(e)}"
+            }
+    
+    _emit_compliance_change({"type": "compliance.updated", "project_id": project_id,
+                             "requirements": changed, "data": compliance_data})
+    
+    return {
+        "success": True,
+        "message": f"Updated {len(changed)} requirements for project {project_id}",
+        "data": compliance_data,
+        "schedule": get_compliance_schedule(project_id, compliance_data)
+    }
+
+def _validate_compliance_update(update: Dict) -> Optional[str]:
+    """Check the values of one requirement update.
+    
+    Returns:
+        str: The reason the update is invalid, or None if it is valid.
+    """
+    if not isinstance(update["id"], str):
+        return "id must be a string"
+    for field in ("status", "notes"):
+        if field in update and not isinstance(update[field], str):
+            return f"{field} must be a string"
+    for field in ("started_date", "completed_date"):
+        if field in update:
+            try:
+                datetime.date.fromisoformat(update[field])
+            except (TypeError, ValueError):
+                return f"{field} must be an ISO date (YYYY-MM-DD)"
+    depends_on = update.get("depends_on", [])
+    if not isinstance(depends_on, list) or not all(isinstance(dep, str) for dep in depends_on):
+        return "depends_on must be a list of requirement ids"
+    return None
+
+def register_compliance_listener(callback: Callable[[Dict], None]) -> None:
+    """Register a callback that receives compliance change events.
+    
+    Args:
+        callback: Called with the change event (``project_id``, ``reset``, the changed
+            ``requirements`` and the full compliance ``data``).
+    """
+    if callback not in _compliance_listeners:
+        _compliance_listeners.append(callback)
+
+register_compliance_listener(handle_compliance_change)
+
 def outcome_measurement(project_id: str = None, measurement_type: str = "survey") -> Dict:
     """Add post-implementation surveys and data collection to measure project success against stated goals.
     
@@ -389,8 +867,7 @@ def outcome_measurement(project_id: str = None, measurement_type: str = "survey"
     outcomes_file = data_dir / f"{project_id}_{measurement_type}.json"
     if outcomes_file.exists():
         try:
-            with open(outcomes_file, 'r') as file:
-                outcomes_data = json.load(file)
+            outcomes_data = load_file(outcomes_file)
                 
             return {
                 "success": True,
@@ -419,8 +896,7 @@ def outcome_measurement(project_id: str = None, measurement_type: str = "survey"
     
     # Save the outcomes data
     try:
-        with open(outcomes_file, 'w') as file:
-            json.dump(outcomes_data, file, indent=2)
+        dump_file(outcomes_data, outcomes_file, atomic=True)
     except Exception as e:
         return {
             "success": False,
@@ -492,6 +968,326 @@ def _calculate_date_difference(start_date_str: str, end_date_str: str) -> float:
         # Return 0 if dates cannot be parsed
         return 0
 
+def _timeline_paths(project_id: str) -> tuple:
+    """Get the snapshot and journal paths of a project timeline.
+    
+    Args:
+        project_id (str): The ID of the project.
+        
+    Returns:
+        tuple: The snapshot file path and the change journal file path.
+    """
+    data_dir = Path("data/implementation")
+    return (data_dir / f"{project_id}_timeline.json",
+            data_dir / f"{project_id}_timeline_changes.jsonl")
+
+def _get_timeline_lock(project_id: str):
+    """Get the write lock for a project timeline, held across all server processes.
+    
+    The timeline is reloaded from disk under the lock, so the revision check sees
+    the writes of the other processes.
+    """
+    return file_lock(Path("data/implementation") / f"{project_id}_timeline.lock")
+
+def _get_compliance_lock(project_id: str):
+    """Get the write lock for a project's compliance data, held across all server processes."""
+    return file_lock(Path("data/regulatory") / f"{project_id}_compliance.lock")
+
+def _timeline_signature(project_id: str) -> Optional[tuple]:
+    """Get a signature identifying the on-disk state of a project timeline.
+    
+    Args:
+        project_id (str): The ID of the project.
+        
+    Returns:
+        tuple: Inode and mtime of both files and the journal size, or None if there is no snapshot.
+    """
+    snapshot_file, journal_file = _timeline_paths(project_id)
+    try:
+        snapshot_stat = snapshot_file.stat()
+    except FileNotFoundError:
+        return None
+    try:
+        journal_stat = journal_file.stat()
+    except FileNotFoundError:
+        return (snapshot_stat.st_ino, snapshot_stat.st_mtime_ns, None)
+    # Files replaced by another process get a new inode even within the mtime granularity
+    return (snapshot_stat.st_ino, snapshot_stat.st_mtime_ns,
+            journal_stat.st_ino, journal_stat.st_mtime_ns, journal_stat.st_size)
+
+def _load_timeline(project_id: str) -> Optional[Dict]:
+    """Load a project timeline with its journaled changes applied.
+    
+    The parsed timeline is cached until either file changes on disk, and a copy
+    is returned so callers can modify it freely.
+    
+    Args:
+        project_id (str): The ID of the project.
+        
+    Returns:
+        Dict: The timeline data including its ``revision``, or None if it doesn't exist.
+        
+    Raises:
+        json.JSONDecodeError: If the snapshot file is not valid JSON.
+    """
+    signature = _timeline_signature(project_id)
+    if signature is None:
+        return None
+    
+    cached = _timeline_cache.get(project_id)
+    if cached and cached[0] == signature:
+        return copy.deepcopy(cached[1])
+    
+    timeline_data, snapshot_revision = _read_timeline(*_timeline_paths(project_id))
+    _timeline_cache[project_id] = (signature, timeline_data, snapshot_revision)
+    return copy.deepcopy(timeline_data)
+
+def read_timeline(snapshot_file: Path, journal_file: Path) -> Dict:
+    """Read a timeline from its files, bypassing the timeline cache.
+    
+    Used to scan many timelines, or timelines outside ``data/implementation``,
+    without keeping them in memory.
+    
+    Args:
+        snapshot_file (Path): The timeline snapshot file.
+        journal_file (Path): The change journal file (it may be missing).
+        
+    Returns:
+        Dict: The timeline data with its journaled changes applied.
+        
+    Raises:
+        FileNotFoundError: If the snapshot file doesn't exist.
+        json.JSONDecodeError: If the snapshot file is not valid JSON.
+    """
+    return _read_timeline(snapshot_file, journal_file)[0]
+
+def _read_timeline(snapshot_file: Path, journal_file: Path) -> tuple:
+    """Read a timeline snapshot and replay its journal.
+    
+    Returns:
+        tuple: The timeline data and the revision of the snapshot.
+    """
+    # The journal is always read from disk, so the snapshot must be too: a cached
+    # snapshot that another process has since compacted would skip trimmed entries
+    timeline_data = load_file(snapshot_file, cached=False)
+    
+    snapshot_revision = timeline_data.get("revision", 0)
+    timeline_data["revision"] = snapshot_revision
+    for entry in _read_timeline_journal(journal_file):
+        if entry["revision"] <= snapshot_revision or entry.get("reset"):
+            continue
+        for operation in entry.get("operations", []):
+            _apply_timeline_operation(timeline_data, operation)
+        timeline_data["revision"] = entry["revision"]
+    return timeline_data, snapshot_revision
+
+def _cache_timeline(project_id: str, timeline_data: Dict, snapshot_revision: int) -> None:
+    """Store a just-written timeline in the cache under the current file signature."""
+    _timeline_cache[project_id] = (_timeline_signature(project_id), copy.deepcopy(timeline_data), snapshot_revision)
+
+def _compact_timeline(project_id: str, timeline_data: Dict) -> None:
+    """Rewrite the timeline snapshot so the journal no longer needs replaying.
+    
+    The most recent journal entries are kept so the change feed can still serve
+    viewers that are only slightly behind.
+    
+    Args:
+        project_id (str): The ID of the project.
+        timeline_data (Dict): The current timeline data.
+    """
+    snapshot_file, journal_file = _timeline_paths(project_id)
+    _write_json_atomic(snapshot_file, timeline_data)
+    
+    entries = _read_timeline_journal(journal_file)[-(TIMELINE_COMPACTION_THRESHOLD // 2):]
+    tmp_file = journal_file.with_name(f"{journal_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_file, 'w') as file:
+        for entry in entries:
+            file.write(json.dumps(entry) + "\n")
+    os.replace(tmp_file, journal_file)
+
+def _read_timeline_journal(journal_file: Path) -> List[Dict]:
+    """Read the entries of a timeline change journal, skipping torn lines."""
+    entries = []
+    if not journal_file.exists():
+        return entries
+    with open(journal_file, 'r') as file:
+        for line in file:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+def _read_snapshot_revision(snapshot_file: Path) -> int:
+    """Read the revision stored in a timeline snapshot."""
+    try:
+        return load_file(snapshot_file, cached=False).get("revision", 0)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return 0
+
+def _validate_timeline_operation(operation: Dict) -> Optional[str]:
+    """Validate a single timeline patch operation.
+    
+    Args:
+        operation (Dict): The operation to validate.
+        
+    Returns:
+        str: An error message, or None if the operation is valid.
+    """
+    if not isinstance(operation, dict):
+        return "Each operation must be an object"
+    op = operation.get("op")
+    collection = operation.get("collection")
+    if op not in ("upsert", "delete"):
+        return f"Unsupported operation: {op}"
+    if collection == "project":
+        if op != "upsert" or not isinstance(operation.get("value"), dict):
+            return "Project changes must be upserts with a value object"
+        return None
+    if collection not in TIMELINE_COLLECTIONS:
+        return f"Unknown timeline collection: {collection}"
+    entity_id = operation.get("id")
+    if entity_id is None:
+        return f"Operation on {collection} requires an id"
+    if isinstance(entity_id, bool) or not isinstance(entity_id, (str, int)):
+        return f"Operation on {collection} has an id that is not a string or integer"
+    if op == "upsert":
+        value = operation.get("value")
+        if not isinstance(value, dict):
+            return f"Upsert on {collection} requires a value object"
+        if collection in SCHEDULED_COLLECTIONS:
+            for field in ("startDate", "endDate"):
+                if field in value and not _is_iso_date(value[field]):
+                    return f"{field} of {collection} entries must be an ISO date (YYYY-MM-DD)"
+            if "status" in value and not isinstance(value["status"], str):
+                return f"status of {collection} entries must be a string"
+    return None
+
+def _missing_entity_fields(timeline_data: Dict, operation: Dict) -> Optional[str]:
+    """Check that an upsert creating a phase or task gives the fields the timeline view needs.
+    
+    Args:
+        timeline_data (Dict): The timeline data the operation applies to.
+        operation (Dict): A validated operation.
+        
+    Returns:
+        str: An error message, or None if the operation may be applied.
+    """
+    collection = operation["collection"]
+    if operation["op"] != "upsert" or collection not in SCHEDULED_COLLECTIONS:
+        return None
+    if any(entity.get("id") == operation["id"] for entity in timeline_data.get(collection, [])):
+        return None
+    missing = [field for field in SCHEDULED_FIELDS if field not in operation["value"]]
+    if missing:
+        return f"New {collection} entry {operation['id']} requires {', '.join(missing)}"
+    return None
+
+def _is_iso_date(value) -> bool:
+    """Check that a value is an ISO format date string."""
+    try:
+        datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def _apply_timeline_operation(timeline_data: Dict, operation: Dict) -> None:
+    """Apply a validated patch operation to timeline data in place.
+    
+    Args:
+        timeline_data (Dict): The timeline data to modify.
+        operation (Dict): The operation to apply.
+    """
+    collection = operation["collection"]
+    if collection == "project":
+        timeline_data["project"] = {**(timeline_data.get("project") or {}), **operation["value"]}
+        return
+    
+    entities = timeline_data.setdefault(collection, [])
+    entity_id = operation["id"]
+    index = next((i for i, entity in enumerate(entities) if entity.get("id") == entity_id), None)
+    
+    if operation["op"] == "delete":
+        if index is not None:
+            del entities[index]
+    elif index is not None:
+        entities[index] = {**entities[index], **operation["value"], "id": entity_id}
+    else:
+        entities.append({**operation["value"], "id": entity_id})
+
+def _emit_timeline_change(event: Dict) -> None:
+    """Notify registered listeners of a timeline change event."""
+    for callback in list(_timeline_listeners):
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"Error in timeline change listener: {e}")
+
+def _emit_compliance_change(event: Dict) -> None:
+    """Notify registered listeners of a compliance change event."""
+    for callback in list(_compliance_listeners):
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"Error in compliance change listener: {e}")
+
+def _write_json_atomic(path: Path, data: Any) -> None:
+    """Write JSON to a file via a temporary file so readers never see a partial write."""
+    dump_file(data, path, atomic=True)
+
+def _assign_funding_greedily(catalog, projects: List[Dict], candidate_pairs: List[tuple],
+                             source_caps: Dict[str, float]) -> tuple:
+    """Assign each project to at most one funding source, best scores first.
+    
+    The requested award is the project budget, limited to the source's maximum
+    award. A pair is skipped if the source no longer has enough funds left.
+    
+    Args:
+        catalog (FundingCatalog): The funding catalog.
+        projects (List[Dict]): The projects being matched.
+        candidate_pairs (List[tuple]): (score, project index, source index) for every match.
+        source_caps (Dict[str, float]): Total funds available per source ID.
+        
+    Returns:
+        tuple: The assignments, the unassigned project IDs and the remaining funds per capped source.
+    """
+    remaining = {}
+    for i, source in enumerate(catalog.sources):
+        cap = source_caps.get(source.get("id"), source.get("available_funding"))
+        if cap is not None:
+            remaining[i] = cap
+    
+    def requested(n, i):
+        budget = projects[n].get("project_characteristics", {}).get("budget", 0)
+        return min(budget, catalog.budget_ranges[i][1])
+    
+    candidate_pairs.sort(key=lambda pair: (-pair[0], requested(pair[1], pair[2]), pair[1], pair[2]))
+    assigned = {}
+    for score, n, i in candidate_pairs:
+        if n in assigned:
+            continue
+        amount = requested(n, i)
+        if i in remaining:
+            if remaining[i] < amount:
+                continue
+            remaining[i] -= amount
+        assigned[n] = (i, score, amount)
+    
+    project_ids = [project.get("project_id", f"project-{n + 1}") for n, project in enumerate(projects)]
+    assignments = [
+        {
+            "project_id": project_ids[n],
+            "source_id": catalog.sources[i].get("id"),
+            "source_name": catalog.sources[i].get("name"),
+            "matching_score": score,
+            "award_amount": amount
+        }
+        for n, (i, score, amount) in sorted(assigned.items())
+    ]
+    unassigned = [project_ids[n] for n in range(len(projects)) if n not in assigned]
+    remaining_funding = {catalog.sources[i].get("id"): amount for i, amount in remaining.items()}
+    return assignments, unassigned, remaining_funding
+
 def _create_sample_funding_database():
     """Create a sample funding sources database."""
     data_dir = Path("data")
@@ -578,110 +1374,22 @@ def _create_sample_funding_database():
     with open(Path("data/funding_sources.json"), 'w') as file:
         json.dump(funding_sources, file, indent=2)
 
-def _generate_regulatory_requirements(project_type: str, location: Optional[Dict]) -> List[Dict]:
+def _generate_regulatory_requirements(project_type: str, location: Optional[Dict],
+                                      funding_sources: Optional[List[str]] = None) -> List[Dict]:
     """Generate regulatory requirements based on project type and location.
     
+    The requirements and the conditions under which they apply are defined in
+    data/regulatory_rules.json (see regulatory_rules.py).
+    
     Args:
         project_type (str): Type of project.
         location (Dict, optional): Location information.
+        funding_sources (List[str], optional): IDs of the funding sources the project uses.
         
     Returns:
         List[Dict]: List of regulatory requirements.
     """
-    # Base requirements that apply to most projects
-    base_requirements = [
-        {
-            "id": "req-001",
-            "name": "Local Building Permit",
-            "description": "Standard permit required for construction activities.",
-            "issuing_authority": "Local Building Department",
-            "timeline": "4-6 weeks",
-            "status": "not-started",
-            "documents_required": ["Project plans", "Site survey", "Engineering calculations"],
-            "estimated_cost": 500,
-            "application_url": "https://example.gov/permits/building"
-        },
-        {
-            "id": "req-002",
-            "name": "Traffic Management Plan",
-            "description": "Plan for managing traffic during construction.",
-            "issuing_authority": "Local Transportation Department",
-            "timeline": "2-4 weeks",
-            "status": "not-started",
-            "documents_required": ["Traffic analysis", "Construction schedule", "Detour plans"],
-            "estimated_cost": 0,
-            "application_url": "https://example.gov/transportation/tmp"
-        }
-    ]
-    
-    # Additional requirements based on project type
-    project_specific_requirements = []
-    
-    if project_type.lower() in ["bicycle", "pedestrian", "road", "bridge"]:
-        project_specific_requirements.extend([
-            {
-                "id": "req-003",
-                "name": "Right-of-Way Permit",
-                "description": "Required for work within public right-of-way.",
-                "issuing_authority": "Public Works Department",
-                "timeline": "3-5 weeks",
-                "status": "not-started",
-                "documents_required": ["Site plan", "Insurance certificate", "Traffic control plan"],
-                "estimated_cost": 350,
-                "application_url": "https://example.gov/public-works/row"
-            }
-        ])
-    
-    if "water" in project_type.lower() or "drainage" in project_type.lower():
-        project_specific_requirements.extend([
-            {
-                "id": "req-004",
-                "name": "Stormwater Management Permit",
-                "description": "Required for projects affecting stormwater runoff.",
-                "issuing_authority": "Environmental Protection Department",
-                "timeline": "6-8 weeks",
-                "status": "not-started",
-                "documents_required": ["Stormwater calculations", "Site plan", "Erosion control plan"],
-                "estimated_cost": 750,
-                "application_url": "https://example.gov/environment/stormwater"
-            }
-        ])
-    
-    if project_type.lower() in ["transit", "terminal", "station"]:
-        project_specific_requirements.extend([
-            {
-                "id": "req-005",
-                "name": "ADA Compliance Review",
-                "description": "Review for compliance with accessibility requirements.",
-                "issuing_authority": "Access Board",
-                "timeline": "4-6 weeks",
-                "status": "not-started",
-                "documents_required": ["Accessibility plan", "Facilities design", "Boarding designs"],
-                "estimated_cost": 0,
-                "application_url": "https://example.gov/ada/compliance"
-            }
-        ])
-    
-    # Location-specific requirements
-    if location and "state" in location:
-        state = location.get("state", "").lower()
-        if state in ["california", "ca"]:
-            project_specific_requirements.extend([
-                {
-                    "id": "req-006",
-                    "name": "CEQA Environmental Review",
-                    "description": "California Environmental Quality Act review.",
-                    "issuing_authority": "State Environmental Agency",
-                    "timeline": "12-24 weeks",
-                    "status": "not-started",
-                    "documents_required": ["Environmental assessment", "Mitigation plan", "Public comments"],
-                    "estimated_cost": 5000,
-                    "application_url": "https://example.gov/california/ceqa"
-                }
-            ])
-    
-    # Combine all requirements
-    all_requirements = base_requirements + project_specific_requirements
+    all_requirements = get_rules_engine().requirements_for(project_type, location, funding_sources)
     
     # Add unique IDs if they don't already have them
     for i, req in enumerate(all_requirements):
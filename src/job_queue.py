@@ -0,0 +1,611 @@
+"""
+Module: job_queue.py
+
+This module implements the background job subsystem for heavy exports and analyses.
+Features:
+- Persistent Queue: Each job is a JSON file under ``data/jobs`` holding its type,
+  parameters, status, progress and result reference, so jobs survive restarts
+- Process Pool Execution: One runner per host (the API process holding ``runner.lock``)
+  claims queued jobs and runs them in a process pool, keeping request workers free; the
+  other processes take over the runner when its owner exits
+- Queue Index: Queued and running jobs have marker files under ``queued/`` and ``running/``,
+  so the runner never re-reads every job record; claiming a job renames its marker, so
+  each job runs once
+- Retention: Finished jobs and results unused for ``JOB_RETENTION_DAYS`` are deleted
+- Progress and Cancellation: Jobs report progress as they run; cancelling a queued
+  job drops it, cancelling a running job stops it at its next progress report
+- Result Caching: Results are stored under a key derived from the job type, its
+  parameters and the revision of its inputs, so repeating a job on unchanged
+  data completes immediately with the cached result
+"""
+
+import os
+import csv
+import time
+import uuid
+import hashlib
+import datetime
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import IO, Callable, Dict, List, Optional
+
+from serialization import dump_file, dumps, load_file
+from conditional_requests import resource_signature
+from file_locks import try_lock
+
+# Processes running jobs on this host (override with JOB_WORKERS)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+
+# Seconds between scans of the queue for jobs submitted by other processes, and between
+# attempts of the other processes to take over the runner
+JOB_POLL_INTERVAL = 1.0
+
+# Days finished jobs and unused results are kept (override with JOB_RETENTION_DAYS)
+JOB_RETENTION_DAYS = float(os.environ.get('JOB_RETENTION_DAYS', 7))
+
+# Seconds between retention sweeps
+JOB_SWEEP_INTERVAL = 3600.0
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+# Maximum number of jobs listed at once
+MAX_LISTED_JOBS = 200
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when its cancellation was requested."""
+
+
+class JobError(ValueError):
+    """Raised when a job cannot be submitted."""
+
+
+class JobQueue:
+    """Persistent job queue with a process-pool runner."""
+
+    def __init__(self, data_dir: str = "data/jobs", workers: int = JOB_WORKERS):
+        """Open the queue.
+
+        Args:
+            data_dir: Directory holding the job files and results
+            workers: Number of job processes
+        """
+        self.data_dir = Path(data_dir)
+        self.results_dir = self.data_dir / "results"
+        self.queued_dir = self.data_dir / "queued"
+        self.running_dir = self.data_dir / "running"
+        for directory in (self.results_dir, self.queued_dir, self.running_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self.lock_file = self.data_dir / "runner.lock"
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._running: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._runner: Optional[threading.Thread] = None
+        # Open runner lock while this process runs the jobs of the host
+        self._runner_lock: Optional[IO] = None
+        self._last_sweep = 0.0
+
+    # Submission and queries
+
+    def submit(self, job_type: str, params: Dict) -> Dict:
+        """Queue a job, or complete it at once from a cached result.
+
+        Args:
+            job_type: One of ``JOB_TYPES``
+            params: The job parameters
+
+        Returns:
+            The job record
+
+        Raises:
+            JobError: If the job type is unknown or the parameters are invalid
+        """
+        definition = JOB_TYPES.get(job_type)
+        if definition is None:
+            raise JobError(f"Unknown job type: {job_type}")
+        params = params or {}
+        error = definition["validate"](params)
+        if error:
+            raise JobError(error)
+
+        revision = definition["revision"](params)
+        cache_key = hashlib.blake2b(dumps([job_type, params, revision], sort_keys=True),
+                                    digest_size=16).hexdigest()
+        now = datetime.datetime.now().isoformat()
+        job = {
+            "id": uuid.uuid4().hex,
+            "type": job_type,
+            "params": params,
+            "status": QUEUED,
+            "progress": 0.0,
+            "message": "Queued",
+            "cache_key": cache_key,
+            "cached": False,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "error": None
+        }
+        if (self.results_dir / f"{cache_key}.json").exists():
+            job.update(status=COMPLETED, progress=1.0, message="Completed (cached result)",
+                       cached=True, started_at=now, finished_at=now)
+            dump_file(job, self._job_path(job["id"]), atomic=True)
+            # Retention counts from the last use of a result
+            for path in self.results_dir.glob(f"{cache_key}.*"):
+                path.touch()
+            return job
+
+        dump_file(job, self._job_path(job["id"]), atomic=True)
+        (self.queued_dir / job["id"]).touch()
+        self.start()
+        self._wake.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Get a job record, or None if there is no such job."""
+        if not _valid_id(job_id):
+            return None
+        try:
+            job = load_file(self._job_path(job_id))
+        except (FileNotFoundError, ValueError):
+            return None
+        if self._cancel_path(job_id).exists() and job["status"] not in FINISHED_STATUSES:
+            job["cancel_requested"] = True
+        return job
+
+    def list(self, status: Optional[str] = None, job_type: Optional[str] = None) -> List[Dict]:
+        """List jobs, newest first.
+
+        Args:
+            status: Only include jobs with this status
+            job_type: Only include jobs of this type
+        """
+        jobs = []
+        for job in self._scan():
+            if (status is None or job["status"] == status) and (job_type is None or job["type"] == job_type):
+                jobs.append(job)
+        jobs.sort(key=lambda job: job["created_at"], reverse=True)
+        return jobs[:MAX_LISTED_JOBS]
+
+    def result(self, job_id: str) -> Optional[Dict]:
+        """Get the result of a completed job, or None if it has none."""
+        job = self.get(job_id)
+        if job is None or job["status"] != COMPLETED:
+            return None
+        try:
+            return load_file(self.results_dir / f"{job['cache_key']}.json")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def result_file(self, job_id: str) -> Optional[Path]:
+        """Get the exported file of a completed job, or None if it has none."""
+        result = self.result(job_id)
+        if not result or not result.get("file"):
+            return None
+        path = self.results_dir / result["file"]
+        return path if path.exists() else None
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a job.
+
+        A queued job is cancelled at once; a running job stops at its next
+        progress report.
+
+        Returns:
+            The job record, or None if there is no such job
+        """
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+        if job["status"] == QUEUED and self._unqueue(job_id):
+            now = datetime.datetime.now().isoformat()
+            job.update(status=CANCELLED, message="Cancelled", finished_at=now)
+            dump_file(job, self._job_path(job_id), atomic=True)
+            return job
+        self._cancel_path(job_id).touch()
+        job["cancel_requested"] = True
+        return job
+
+    # Runner
+
+    def start(self):
+        """Start the runner thread of this process if it is not running.
+
+        Called on submission and when the API warms up, so jobs left queued by a
+        restart are picked up. The thread only dispatches jobs while this process
+        holds the runner lock; until then it retries taking it.
+        """
+        with self._lock:
+            if self._runner is None and not self._stopped:
+                self._runner = threading.Thread(target=self._run, name="job-runner", daemon=True)
+                self._runner.start()
+
+    def _run(self):
+        """Dispatch queued jobs to the process pool while this process owns the runner, until stopped."""
+        while not self._stopped:
+            self._wake.wait(JOB_POLL_INTERVAL)
+            self._wake.clear()
+            try:
+                if self._runner_lock is None:
+                    self._runner_lock = try_lock(self.lock_file)
+                    if self._runner_lock is None:
+                        continue
+                    self._recover()
+                self._dispatch()
+                self._sweep()
+            except Exception as e:
+                print(f"Error in job runner: {e}")
+
+    def _recover(self):
+        """Queue the jobs that have no marker, e.g. because their submitter stopped before writing it."""
+        indexed = {path.name for path in self.queued_dir.iterdir()} | {path.name for path in self.running_dir.iterdir()}
+        for job in self._scan():
+            if job["status"] == QUEUED and job["id"] not in indexed:
+                (self.queued_dir / job["id"]).touch()
+
+    def _dispatch(self):
+        """Claim queued jobs, oldest first, while job processes are free."""
+        self._check_running()
+        queued = []
+        with os.scandir(self.queued_dir) as entries:
+            for entry in entries:
+                try:
+                    queued.append((entry.stat().st_mtime_ns, entry.name))
+                except FileNotFoundError:
+                    continue
+        queued.sort()
+        for _, job_id in queued:
+            with self._lock:
+                if self._stopped or len(self._running) >= self.workers:
+                    return
+            if not self._claim(job_id):
+                continue
+            try:
+                with self._lock:
+                    if self._pool is None:
+                        self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                    future = self._pool.submit(run_job, str(self.data_dir.resolve()), job_id, os.getcwd())
+                    self._running[job_id] = future
+            except Exception:
+                # Leave the job queued for the next attempt
+                os.replace(self.running_dir / job_id, self.queued_dir / job_id)
+                raise
+            future.add_done_callback(lambda future, job_id=job_id: self._finished(job_id, future))
+
+    def _check_running(self):
+        """Settle the running markers of jobs this runner is not running.
+
+        They were dispatched by a previous runner: a job still running in one of its
+        processes is left alone, one whose process is gone is marked failed.
+        """
+        with os.scandir(self.running_dir) as entries:
+            job_ids = [entry.name for entry in entries]
+        for job_id in job_ids:
+            with self._lock:
+                if job_id in self._running:
+                    continue
+            job = self.get(job_id)
+            if job is not None and job["status"] not in FINISHED_STATUSES:
+                if job["status"] == RUNNING and _process_alive(job.get("pid")):
+                    continue
+                self._fail_orphan(job)
+            (self.running_dir / job_id).unlink(missing_ok=True)
+
+    def _finished(self, job_id: str, future):
+        """Release a job process slot, recording jobs lost to a crashed process."""
+        with self._lock:
+            self._running.pop(job_id, None)
+        if future.cancelled() or future.exception() is not None:
+            job = self.get(job_id)
+            if job is not None and job["status"] not in FINISHED_STATUSES:
+                self._fail_orphan(job)
+            with self._lock:
+                # A crashed process breaks the pool; start a new one for the next job
+                if self._pool is not None and getattr(self._pool, "_broken", False):
+                    self._pool = None
+        (self.running_dir / job_id).unlink(missing_ok=True)
+        self._wake.set()
+
+    def _sweep(self):
+        """Delete finished jobs and results unused for the retention period."""
+        now = time.time()
+        if now - self._last_sweep < JOB_SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        cutoff = now - JOB_RETENTION_DAYS * 86400
+        finished_before = datetime.datetime.fromtimestamp(cutoff).isoformat()
+        for job in self._scan():
+            if job["status"] in FINISHED_STATUSES and (job.get("finished_at") or "") < finished_before:
+                self._cancel_path(job["id"]).unlink(missing_ok=True)
+                self._job_path(job["id"]).unlink(missing_ok=True)
+        with os.scandir(self.results_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    continue
+
+    def _fail_orphan(self, job: Dict):
+        """Mark a job whose process exited without finishing it as failed."""
+        job.update(status=FAILED, message="Failed", error="The job process exited unexpectedly",
+                   finished_at=datetime.datetime.now().isoformat())
+        dump_file(job, self._job_path(job["id"]), atomic=True)
+
+    def shutdown(self):
+        """Stop dispatching jobs. Running jobs finish in their processes."""
+        with self._lock:
+            self._stopped = True
+            pool, self._pool = self._pool, None
+        self._wake.set()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if self._runner_lock is not None:
+            # Another process takes over the runner, and settles the jobs still running here
+            self._runner_lock.close()
+            self._runner_lock = None
+
+    # Files
+
+    def _scan(self) -> List[Dict]:
+        """Read every job record."""
+        jobs = []
+        for path in self.data_dir.glob("*.json"):
+            try:
+                jobs.append(load_file(path))
+            except (FileNotFoundError, ValueError):
+                continue
+        return jobs
+
+    def _claim(self, job_id: str) -> bool:
+        """Take exclusive ownership of a queued job by moving its marker to ``running/``."""
+        try:
+            os.rename(self.queued_dir / job_id, self.running_dir / job_id)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _unqueue(self, job_id: str) -> bool:
+        """Take a queued job off the queue before the runner claims it."""
+        try:
+            (self.queued_dir / job_id).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _job_path(self, job_id: str) -> Path:
+        """Get the record file of a job."""
+        return self.data_dir / f"{job_id}.json"
+
+    def _cancel_path(self, job_id: str) -> Path:
+        """Get the cancellation marker of a job."""
+        return self.data_dir / f"{job_id}.cancel"
+
+
+def run_job(data_dir: str, job_id: str, cwd: str):
+    """Run one claimed job. Executed in a job process.
+
+    Args:
+        data_dir: Absolute path of the job directory
+        job_id: The ID of the job
+        cwd: Working directory of the API, which the data paths are relative to
+    """
+    os.chdir(cwd)
+    job_path = Path(data_dir) / f"{job_id}.json"
+    cancel_path = Path(data_dir) / f"{job_id}.cancel"
+    job = load_file(job_path)
+
+    def save(**fields):
+        job.update(fields)
+        dump_file(job, job_path, atomic=True)
+
+    def progress(fraction: float, message: str = "Running"):
+        if cancel_path.exists():
+            raise JobCancelled()
+        save(progress=round(max(0.0, min(1.0, fraction)), 4), message=message)
+
+    save(status=RUNNING, pid=os.getpid(), message="Starting", started_at=datetime.datetime.now().isoformat())
+    try:
+        progress(0.0, "Starting")
+        result = JOB_TYPES[job["type"]]["run"](job["params"], progress,
+                                               Path(data_dir) / "results" / job["cache_key"])
+        dump_file(result, Path(data_dir) / "results" / f"{job['cache_key']}.json", atomic=True)
+    except JobCancelled:
+        save(status=CANCELLED, message="Cancelled", finished_at=datetime.datetime.now().isoformat())
+    except Exception as e:
+        save(status=FAILED, message="Failed", error=str(e), finished_at=datetime.datetime.now().isoformat())
+    else:
+        save(status=COMPLETED, progress=1.0, message="Completed", finished_at=datetime.datetime.now().isoformat())
+
+
+# Job types. Each has ``validate(params)`` returning an error message or None,
+# ``revision(params)`` identifying the state of its inputs, and
+# ``run(params, progress, output_base)`` returning the result, where ``output_base``
+# is the path (without suffix) for any exported file.
+
+def _validate_timeline_export(params: Dict) -> Optional[str]:
+    if not params.get("project_id"):
+        return "project_id is required"
+    if params.get("format", "csv") not in ("csv", "json"):
+        return "format must be csv or json"
+    return None
+
+
+def _timeline_revision(params: Dict):
+    from implementation_tools import _load_timeline
+    timeline = _load_timeline(params["project_id"])
+    return timeline.get("revision") if timeline else None
+
+
+def _run_timeline_export(params: Dict, progress: Callable, output_base: Path) -> Dict:
+    from implementation_tools import _load_timeline
+    timeline = _load_timeline(params["project_id"])
+    if timeline is None:
+        raise ValueError(f"No timeline found for project {params['project_id']}")
+    rows = []
+    for kind in ("phases", "tasks", "milestones"):
+        for item in timeline.get(kind, []):
+            rows.append({
+                "type": kind[:-1],
+                "id": item.get("id"),
+                "name": item.get("name") or item.get("title"),
+                "phase_id": item.get("phaseId"),
+                "start_date": item.get("startDate") or item.get("date"),
+                "end_date": item.get("endDate") or item.get("date"),
+                "status": item.get("status"),
+                "progress": item.get("progress")
+            })
+        progress(len(rows) / max(1, len(rows) + 1), f"Exported {kind}")
+    return _write_export(rows, params.get("format", "csv"), output_base, {
+        "project_id": params["project_id"],
+        "revision": timeline.get("revision")
+    })
+
+
+def _validate_portfolio_export(params: Dict) -> Optional[str]:
+    if params.get("format", "csv") not in ("csv", "json"):
+        return "format must be csv or json"
+    return None
+
+
+def _portfolio_revision(params: Dict):
+    entries, _ = resource_signature([Path("data/implementation")])
+    return [datetime.date.today().isoformat(), entries]
+
+
+def _run_portfolio_export(params: Dict, progress: Callable, output_base: Path) -> Dict:
+    from portfolio_timeline import portfolio_timeline, MAX_PAGE_SIZE
+    rows = []
+    page = 1
+    while True:
+        result = portfolio_timeline(params.get("statuses"), params.get("start"), params.get("end"),
+                                    params.get("phase"), page, MAX_PAGE_SIZE)
+        rows.extend(result["projects"])
+        progress(len(rows) / max(1, result["total"]), f"Exported {len(rows)} of {result['total']} projects")
+        if len(rows) >= result["total"] or not result["projects"]:
+            break
+        page += 1
+    if params.get("format", "csv") == "csv":
+        rows = [{key: value for key, value in row.items() if not isinstance(value, (dict, list))} for row in rows]
+    return _write_export(rows, params.get("format", "csv"), output_base, {"aggregates": result.get("aggregates")})
+
+
+def _validate_indicator_analysis(params: Dict) -> Optional[str]:
+    from outcome_analysis import validate_analysis, DEFAULT_RESAMPLES, DEFAULT_CONFIDENCE
+    return validate_analysis(params.get("indicators"), params.get("resamples", DEFAULT_RESAMPLES),
+                             params.get("confidence", DEFAULT_CONFIDENCE), params.get("seed", 0))
+
+
+def _indicator_revision(params: Dict):
+    paths = set()
+    for indicator in params["indicators"]:
+        for source in [indicator.get("source")] + list(indicator.get("controls") or []):
+            if isinstance(source, dict) and source.get("project_id"):
+                project_id = str(source["project_id"])
+                paths.add(Path("data/outcomes/timeseries") / project_id)
+                paths.add(Path("data/outcomes/responses") / project_id / "aggregates.json")
+    entries, _ = resource_signature(sorted(paths))
+    return entries
+
+
+def _run_indicator_analysis(params: Dict, progress: Callable, output_base: Path) -> Dict:
+    from outcome_analysis import analyze_indicators, DEFAULT_RESAMPLES, DEFAULT_CONFIDENCE
+    total = len(params["indicators"])
+    return analyze_indicators(
+        params["indicators"],
+        params.get("resamples", DEFAULT_RESAMPLES),
+        params.get("confidence", DEFAULT_CONFIDENCE),
+        params.get("seed", 0),
+        progress=lambda done: progress(done / total, f"Evaluated {done} of {total} indicators")
+    )
+
+
+def _write_export(rows: List[Dict], export_format: str, output_base: Path, extra: Dict) -> Dict:
+    """Write exported rows to a CSV or JSON file next to the job result."""
+    path = output_base.with_suffix(f".{export_format}")
+    if export_format == "csv":
+        fields = list(dict.fromkeys(key for row in rows for key in row))
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        dump_file(rows, path)
+    return {"success": True, "rows": len(rows), "file": path.name, "format": export_format, **extra}
+
+
+JOB_TYPES = {
+    "timeline_export": {
+        "validate": _validate_timeline_export,
+        "revision": _timeline_revision,
+        "run": _run_timeline_export
+    },
+    "portfolio_export": {
+        "validate": _validate_portfolio_export,
+        "revision": _portfolio_revision,
+        "run": _run_portfolio_export
+    },
+    "indicator_analysis": {
+        "validate": _validate_indicator_analysis,
+        "revision": _indicator_revision,
+        "run": _run_indicator_analysis
+    }
+}
+
+
+def get_job_queue(data_dir: str = "data/jobs") -> JobQueue:
+    """Get the shared job queue for a data directory, opening it on first use."""
+    with _queues_lock:
+        queue = _queues.get(data_dir)
+        if queue is None:
+            queue = _queues[data_dir] = JobQueue(data_dir)
+        return queue
+
+
+def start_job_runner(data_dir: str = "data/jobs") -> JobQueue:
+    """Start this process's runner for the shared job queue."""
+    queue = get_job_queue(data_dir)
+    queue.start()
+    return queue
+
+
+def shutdown_job_queues():
+    """Stop the job runners of this process."""
+    with _queues_lock:
+        queues = list(_queues.values())
+        _queues.clear()
+    for queue in queues:
+        queue.shutdown()
+
+
+def _valid_id(job_id: str) -> bool:
+    """Check that a job id is a plain hex id (never a path)."""
+    return bool(job_id) and len(job_id) == 32 and all(c in "0123456789abcdef" for c in job_id)
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """Check whether a process exists."""
+    if not pid:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_queues: Dict[str, JobQueue] = {}
+_queues_lock = threading.Lock()
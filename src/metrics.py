@@ -0,0 +1,287 @@
+"""
+Module: metrics.py
+
+This module implements the request and data file I/O instrumentation of the API.
+Features:
+- Route Metrics: Request counts by status, latency histograms, request and response
+  payload size histograms and unhandled exception counts per route template
+- Data I/O Metrics: Read and write time and bytes of the JSON files under ``data/``
+- Low Overhead Recording: Every thread records into its own counters without locking;
+  the per-thread counters are only summed when the metrics are scraped
+- Multi-process Aggregation: With ``API_METRICS_DIR`` set (as the gunicorn config does),
+  each worker periodically writes its totals to ``{pid}.json`` there and a scrape on any
+  worker sums the files of all workers
+- Prometheus Exposition: Renders the totals in the Prometheus text format
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, Response, g, request
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Metric name -> (type, help text, histogram buckets)
+METRICS = {
+    "api_requests_total": ("counter", "Requests handled, by route, method and status", None),
+    "api_request_exceptions_total": ("counter", "Requests that raised an unhandled exception", None),
+    "api_request_duration_seconds": ("histogram", "Request handling time", LATENCY_BUCKETS),
+    "api_request_size_bytes": ("histogram", "Request body size", SIZE_BUCKETS),
+    "api_response_size_bytes": ("histogram", "Response body size as sent", SIZE_BUCKETS),
+    "data_io_duration_seconds": ("histogram", "Time spent reading and writing data files", LATENCY_BUCKETS),
+    "data_io_bytes_total": ("counter", "Bytes read and written in data files", None)
+}
+
+# Seconds between writes of a worker's totals to the shared metrics directory
+FLUSH_INTERVAL = 5.0
+
+# Metric key: (metric name, ((label, value), ...))
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_local = threading.local()
+_thread_stores: List[Dict[MetricKey, list]] = []
+_thread_stores_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def _store() -> Dict[MetricKey, list]:
+    """Get the calling thread's metric store, registering it on first use."""
+    store = getattr(_local, "store", None)
+    if store is None:
+        store = _local.store = {}
+        with _thread_stores_lock:
+            _thread_stores.append(store)
+    return store
+
+
+def inc(name: str, labels: Tuple[Tuple[str, str], ...], amount: float = 1):
+    """Increment a counter.
+
+    Args:
+        name: The counter name
+        labels: (label, value) pairs
+        amount: The increment
+    """
+    store = _store()
+    key = (name, labels)
+    value = store.get(key)
+    if value is None:
+        store[key] = [amount]
+    else:
+        value[0] += amount
+
+
+def observe(name: str, labels: Tuple[Tuple[str, str], ...], value: float):
+    """Record an observation in a histogram.
+
+    Args:
+        name: The histogram name
+        labels: (label, value) pairs
+        value: The observed value
+    """
+    buckets = METRICS[name][2]
+    store = _store()
+    key = (name, labels)
+    # Per-bucket (non-cumulative) counts, then the +Inf bucket, the sum and the count
+    histogram = store.get(key)
+    if histogram is None:
+        histogram = store[key] = [0] * (len(buckets) + 3)
+    histogram[bisect.bisect_left(buckets, value)] += 1
+    histogram[-2] += value
+    histogram[-1] += 1
+
+
+def observe_io(operation: str, path, seconds: float, size: int):
+    """Record a data file read or write.
+
+    Args:
+        operation: "read" or "write"
+        path: The file path
+        seconds: Time spent
+        size: Bytes read or written
+    """
+    labels = (("operation", operation), ("area", _data_area(path)))
+    observe("data_io_duration_seconds", labels, seconds)
+    inc("data_io_bytes_total", labels, size)
+
+
+def snapshot() -> Dict[MetricKey, list]:
+    """Sum the metrics of every thread of this process."""
+    with _thread_stores_lock:
+        stores = list(_thread_stores)
+    totals: Dict[MetricKey, list] = {}
+    for store in stores:
+        for key, values in list(store.items()):
+            _add_values(totals, key, list(values))
+    return totals
+
+
+def flush(metrics_dir: Optional[str] = None):
+    """Write this process's totals to the shared metrics directory.
+
+    Args:
+        metrics_dir: The directory, defaults to ``API_METRICS_DIR``
+    """
+    global _last_flush
+    metrics_dir = metrics_dir or os.environ.get("API_METRICS_DIR")
+    if not metrics_dir or not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _last_flush = time.monotonic()
+        path = Path(metrics_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        entries = [[name, list(map(list, labels)), values] for (name, labels), values in snapshot().items()]
+        tmp_path = path / f"{os.getpid()}.json.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(entries, file)
+        os.replace(tmp_path, path / f"{os.getpid()}.json")
+    finally:
+        _flush_lock.release()
+
+
+def collect(metrics_dir: Optional[str] = None) -> Dict[MetricKey, list]:
+    """Sum the metrics of this process and of every other worker's flushed totals.
+
+    Args:
+        metrics_dir: The shared metrics directory, defaults to ``API_METRICS_DIR``
+
+    Returns:
+        Metric key -> counter value or histogram counts
+    """
+    totals = snapshot()
+    metrics_dir = metrics_dir or os.environ.get("API_METRICS_DIR")
+    if not metrics_dir or not os.path.isdir(metrics_dir):
+        return totals
+    own_file = f"{os.getpid()}.json"
+    for name in os.listdir(metrics_dir):
+        if not name.endswith(".json") or name == own_file:
+            continue
+        try:
+            with open(os.path.join(metrics_dir, name), 'r') as file:
+                entries = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            continue
+        for metric, labels, values in entries:
+            _add_values(totals, (metric, tuple(tuple(label) for label in labels)), values)
+    return totals
+
+
+def render(totals: Dict[MetricKey, list]) -> str:
+    """Render metric totals in the Prometheus text exposition format."""
+    by_name: Dict[str, List[Tuple]] = {}
+    for (name, labels), values in totals.items():
+        by_name.setdefault(name, []).append((labels, values))
+
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, values in sorted(by_name.get(name, []), key=lambda entry: entry[0]):
+            if metric_type == "counter":
+                lines.append(f"{name}{_format_labels(labels)} {_format_number(values[0])}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(values[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_response() -> Response:
+    """Build the Prometheus scrape response of all workers."""
+    flush()
+    return Response(render(collect()), mimetype="text/plain", content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def init_app(app: Flask):
+    """Record route metrics for every request of an application.
+
+    Register before other ``after_request`` hooks (such as compression) so the
+    recorded response size and latency include them.
+
+    Args:
+        app: The Flask application
+    """
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    app.teardown_request(_record_exception)
+
+
+def _start_request():
+    """Note the start time of a request."""
+    g.metrics_start = time.perf_counter()
+
+
+def _record_request(response: Response) -> Response:
+    """Record the metrics of a finished request."""
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return response
+    labels = (("route", _route()), ("method", request.method))
+    inc("api_requests_total", labels + (("status", str(response.status_code)),))
+    observe("api_request_duration_seconds", labels, time.perf_counter() - start)
+    observe("api_request_size_bytes", labels, request.content_length or 0)
+    if response.content_length is not None:
+        observe("api_response_size_bytes", labels, response.content_length)
+    if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+    return response
+
+
+def _record_exception(exception: Optional[BaseException]):
+    """Count a request that ended with an unhandled exception."""
+    if exception is not None:
+        inc("api_request_exceptions_total", (("route", _route()), ("method", request.method)))
+
+
+def _route() -> str:
+    """Get the route template of the current request, bounding label cardinality."""
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _data_area(path) -> str:
+    """Get the ``data/`` subdirectory (or file) a path belongs to."""
+    parts = Path(path).parts
+    if "data" in parts:
+        rest = parts[parts.index("data") + 1:]
+        if len(rest) > 1:
+            return rest[0]
+        if rest:
+            return Path(rest[0]).stem
+    return "other"
+
+
+def _add_values(totals: Dict[MetricKey, list], key: MetricKey, values: list):
+    """Add counter values or histogram counts into the totals."""
+    existing = totals.get(key)
+    if existing is None:
+        totals[key] = values
+    else:
+        for i, value in enumerate(values):
+            existing[i] += value
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    """Format labels as a Prometheus label set."""
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + "}"
+
+
+def _format_number(value: float) -> str:
+    """Format a sample value."""
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
@@ -0,0 +1,376 @@
+"""
+Module: outcome_analysis.py
+
+This module implements before/after impact analysis of outcome indicators.
+Features:
+- Before/After Deltas: Compares baseline and post-implementation means (absolute and percent change)
+- Trend Slopes: Least-squares slope per period of the baseline and post-implementation series
+- Difference-in-Differences: Compares the change at the project against the change at control
+  sites, both as an absolute difference and as a ratio-based percent effect
+- Bootstrap Confidence Intervals: Resamples each group to put an interval on the percent change
+  (or on the difference-in-differences effect when control sites are given); survey scores
+  use the normal interval of the mean computed from the aggregated counts
+- Target Tracking: Parses indicator targets such as "+10% in sustainable modes" or
+  "-30% in crashes" and reports whether each is met
+- Batch Evaluation: Evaluates a whole portfolio of indicators in one call, loading each
+  series once however many indicators use it
+- Request Validation: Bounds the resamples and confidence level, and sizes a batch's bootstrap
+  work so the API can send large batches to the background job queue
+
+Series sources:
+- ``{"type": "values", "baseline": [...], "post": [...]}``: explicit values (e.g. monthly crashes)
+- ``{"type": "timeseries", "project_id": ..., "metric": ..., "series": [...], "resolution": "day",
+  "field": "sum"}``: counter data from the time-series store, split by the indicator's
+  ``baseline`` and ``post`` windows
+- ``{"type": "survey", "project_id": ..., "question": ..., "baseline_mean": ...}``: a Likert or
+  multiple-choice question's post-implementation mean score against a baseline mean
+"""
+
+import re
+import math
+import random
+import statistics
+from typing import Callable, Dict, List, Optional, Tuple
+
+from timeseries_store import get_timeseries_store
+from survey_responses import get_response_store
+
+# Default number of bootstrap resamples and confidence level
+DEFAULT_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+
+# Largest number of bootstrap resamples per indicator
+MAX_RESAMPLES = 20000
+
+# Batches with more bootstrap resamples than this in total (indicators x resamples)
+# run as background jobs instead of within the request
+SYNC_RESAMPLE_BUDGET = 50000
+
+_TARGET_PATTERN = re.compile(r"([+-]?\d+(?:\.\d+)?)\s*(%)?")
+
+
+def before_after(before: List[float], after: List[float]) -> Dict:
+    """Compare the means of a baseline and a post-implementation sample.
+
+    Returns:
+        Baseline and post means, absolute change and percent change
+    """
+    before_mean = statistics.fmean(before) if before else None
+    after_mean = statistics.fmean(after) if after else None
+    change = after_mean - before_mean if before and after else None
+    return {
+        "baseline_mean": before_mean,
+        "post_mean": after_mean,
+        "change": change,
+        "percent_change": _percent(after_mean, before_mean) if change is not None else None,
+        "baseline_n": len(before),
+        "post_n": len(after)
+    }
+
+
+def trend_slope(values: List[float]) -> Optional[float]:
+    """Get the least-squares slope of an evenly spaced series, in units per period."""
+    n = len(values)
+    if n < 2:
+        return None
+    mean_x = (n - 1) / 2
+    mean_y = statistics.fmean(values)
+    numerator = sum((i - mean_x) * (y - mean_y) for i, y in enumerate(values))
+    denominator = n * (n * n - 1) / 12
+    return numerator / denominator
+
+
+def difference_in_differences(treated_before: List[float], treated_after: List[float],
+                              control_before: List[float], control_after: List[float]) -> Dict:
+    """Estimate the project effect net of the change at control sites.
+
+    Returns:
+        The absolute effect ((Ta - Tb) - (Ca - Cb)) and the percent effect
+        relative to the control trend ((Ta / Tb) / (Ca / Cb) - 1)
+    """
+    tb, ta = statistics.fmean(treated_before), statistics.fmean(treated_after)
+    cb, ca = statistics.fmean(control_before), statistics.fmean(control_after)
+    return {
+        "effect": (ta - tb) - (ca - cb),
+        "percent_effect": _did_percent(tb, ta, cb, ca),
+        "control_percent_change": _percent(ca, cb)
+    }
+
+
+def bootstrap_ci(samples: List[List[float]], statistic, resamples: int = DEFAULT_RESAMPLES,
+                 confidence: float = DEFAULT_CONFIDENCE, rng: Optional[random.Random] = None) -> Optional[List[float]]:
+    """Percentile bootstrap confidence interval of a statistic over independent samples.
+
+    Each sample is resampled with replacement on its own, and the statistic is
+    computed from the resampled means.
+
+    Args:
+        samples: The independent samples (e.g. baseline and post values)
+        statistic: Function of the resampled means returning a number or None
+        resamples: Number of bootstrap resamples
+        confidence: Confidence level of the interval
+        rng: Random number generator (seed it for reproducible intervals)
+
+    Returns:
+        [lower, upper] bounds, or None if a sample is empty or the statistic is undefined
+    """
+    if any(not sample for sample in samples) or resamples < 1:
+        return None
+    rng = rng or random.Random()
+    estimates = []
+    for _ in range(resamples):
+        means = [math.fsum(rng.choices(sample, k=len(sample))) / len(sample) for sample in samples]
+        value = statistic(*means)
+        if value is not None:
+            estimates.append(value)
+    if not estimates:
+        return None
+    estimates.sort()
+    alpha = (1 - confidence) / 2
+    return [_quantile(estimates, alpha), _quantile(estimates, 1 - alpha)]
+
+
+def parse_target(target) -> Optional[Dict]:
+    """Parse an indicator target such as "+10% in sustainable modes" or -30.
+
+    Returns:
+        The target ``value`` and whether it is a ``percent`` change, or None if it has no number
+    """
+    if isinstance(target, (int, float)) and not isinstance(target, bool):
+        return {"value": float(target), "percent": True}
+    match = _TARGET_PATTERN.search(str(target or ""))
+    if not match:
+        return None
+    return {"value": float(match.group(1)), "percent": bool(match.group(2))}
+
+
+class IndicatorAnalyzer:
+    """Evaluates indicators, sharing loaded series across a batch."""
+
+    def __init__(self, resamples: int = DEFAULT_RESAMPLES, confidence: float = DEFAULT_CONFIDENCE,
+                 seed: Optional[int] = 0):
+        """Initialize the analyzer.
+
+        Args:
+            resamples: Number of bootstrap resamples per indicator
+            confidence: Confidence level of the intervals
+            seed: Base seed for reproducible intervals, None for unseeded
+        """
+        self.resamples = resamples
+        self.confidence = confidence
+        self.seed = seed
+        self._series_cache: Dict[Tuple, List[float]] = {}
+
+    def _timeseries(self, source: Dict, window: Dict) -> List[float]:
+        """Load a time-series source over a window, once per batch."""
+        series = source.get("series")
+        key = (source.get("project_id"), source.get("metric"), tuple(series or ()),
+               window.get("start"), window.get("end"), source.get("resolution", "day"), source.get("field", "sum"))
+        if key not in self._series_cache:
+            data = get_timeseries_store().query(
+                source["project_id"], source["metric"], series, window.get("start"), window.get("end"),
+                source.get("resolution", "day"), max_points=10 ** 9
+            )
+            field = source.get("field", "sum")
+            self._series_cache[key] = [point[field] for point in data["points"]
+                                       if point.get(field) is not None]
+        return self._series_cache[key]
+
+    def _samples(self, source: Dict, indicator: Dict) -> Tuple[List[float], List[float]]:
+        """Get the baseline and post-implementation samples of a source.
+
+        Raises:
+            ValueError: If the source is invalid
+        """
+        source_type = source.get("type", "values")
+        if source_type == "values":
+            return [float(v) for v in source.get("baseline", [])], [float(v) for v in source.get("post", [])]
+        if source_type == "timeseries":
+            if not source.get("project_id") or not source.get("metric"):
+                raise ValueError("Time-series sources need a project_id and a metric")
+            return (self._timeseries(source, indicator.get("baseline") or {}),
+                    self._timeseries(source, indicator.get("post") or {}))
+        raise ValueError(f"Unknown series source type: {source_type}")
+
+    def _survey(self, source: Dict) -> Dict:
+        """Compare a survey question's post-implementation mean score with its baseline mean.
+
+        The interval uses the normal approximation of the mean, computed from the
+        aggregated option counts without expanding the individual responses.
+
+        Raises:
+            ValueError: If the question has no results
+        """
+        results = get_response_store(source["project_id"]).results()
+        question = results["questions"].get(source.get("question"))
+        if not question or "counts" not in question:
+            raise ValueError(f"No survey results for question {source.get('question')}")
+        counts = list(question["counts"].values())
+        n = sum(counts)
+        if not n:
+            raise ValueError(f"No survey responses for question {source.get('question')}")
+        baseline = float(source.get("baseline_mean", 0))
+        mean = sum(score * count for score, count in enumerate(counts, 1)) / n
+        variance = sum(count * (score - mean) ** 2 for score, count in enumerate(counts, 1)) / max(n - 1, 1)
+        margin = statistics.NormalDist().inv_cdf(0.5 + self.confidence / 2) * math.sqrt(variance / n)
+        bounds = [_percent(mean - margin, baseline), _percent(mean + margin, baseline)]
+        return {
+            "baseline_mean": baseline,
+            "post_mean": mean,
+            "change": mean - baseline,
+            "percent_change": _percent(mean, baseline),
+            "baseline_n": None,
+            "post_n": n,
+            "ci": None if None in bounds else bounds
+        }
+
+    def evaluate(self, indicator: Dict, index: int = 0) -> Dict:
+        """Evaluate one indicator.
+
+        Args:
+            indicator: The indicator (``id``, ``target``, ``source``, optional ``controls``,
+                ``baseline`` and ``post`` windows)
+            index: Position in the batch, used to seed the bootstrap of indicators without an id
+
+        Returns:
+            The before/after, trend, difference-in-differences, interval and target results
+        """
+        # Seeded per indicator so its interval doesn't depend on the rest of the batch
+        rng = random.Random(None if self.seed is None else f"{self.seed}:{indicator.get('id', index)}")
+        source = indicator.get("source") or {}
+        result = {"id": indicator.get("id"), "project_id": indicator.get("project_id", source.get("project_id"))}
+        try:
+            if source.get("type") == "survey":
+                result.update(self._survey(source))
+                controls = []
+            else:
+                before, after = self._samples(source, indicator)
+                result.update(before_after(before, after))
+                result["baseline_slope"] = trend_slope(before)
+                result["post_slope"] = trend_slope(after)
+                controls = [self._samples(control, indicator) for control in indicator.get("controls", [])]
+                controls = [(b, a) for b, a in controls if b and a]
+                if controls and before and after:
+                    control_before = [v for b, _ in controls for v in b]
+                    control_after = [v for _, a in controls for v in a]
+                    result["difference_in_differences"] = difference_in_differences(
+                        before, after, control_before, control_after
+                    )
+                    result["ci"] = bootstrap_ci([before, after, control_before, control_after], _did_percent,
+                                                self.resamples, self.confidence, rng)
+                else:
+                    result["ci"] = bootstrap_ci([before, after], lambda b, a: _percent(a, b),
+                                                self.resamples, self.confidence, rng)
+        except (ValueError, KeyError, TypeError) as e:
+            result["error"] = str(e)
+            return result
+
+        result["ci_measure"] = "percent_effect" if controls else "percent_change"
+        result["significant"] = bool(result["ci"]) and (result["ci"][0] > 0 or result["ci"][1] < 0)
+        result.update(self._target_status(indicator.get("target"), result))
+        return result
+
+    @staticmethod
+    def _target_status(target, result: Dict) -> Dict:
+        """Compare the estimated effect with the indicator target."""
+        parsed = parse_target(target)
+        if parsed is None:
+            return {"target": target, "target_met": None}
+        if parsed["percent"]:
+            did = result.get("difference_in_differences")
+            estimate = did["percent_effect"] if did else result.get("percent_change")
+        else:
+            did = result.get("difference_in_differences")
+            estimate = did["effect"] if did else result.get("change")
+        if estimate is None:
+            met = None
+        elif parsed["value"] >= 0:
+            met = estimate >= parsed["value"]
+        else:
+            met = estimate <= parsed["value"]
+        return {"target": target, "target_value": parsed["value"], "target_is_percent": parsed["percent"],
+                "estimate": estimate, "target_met": met}
+
+
+def analyze_indicators(indicators: List[Dict], resamples: int = DEFAULT_RESAMPLES,
+                       confidence: float = DEFAULT_CONFIDENCE, seed: Optional[int] = 0,
+                       progress: Optional[Callable[[int], None]] = None) -> Dict:
+    """Evaluate a batch of outcome indicators, e.g. a whole portfolio's.
+
+    Args:
+        indicators: The indicators to evaluate (see ``IndicatorAnalyzer.evaluate``)
+        resamples: Number of bootstrap resamples per indicator
+        confidence: Confidence level of the intervals
+        seed: Base seed for reproducible intervals, None for unseeded
+        progress: Called with the number of indicators evaluated so far
+
+    Returns:
+        Dict: One result per indicator and a summary of targets met.
+    """
+    analyzer = IndicatorAnalyzer(resamples, confidence, seed)
+    results = []
+    for i, indicator in enumerate(indicators):
+        results.append(analyzer.evaluate(indicator, i))
+        if progress is not None:
+            progress(i + 1)
+    evaluated = [result for result in results if "error" not in result]
+    return {
+        "success": True,
+        "message": f"Evaluated {len(evaluated)} of {len(indicators)} indicators",
+        "summary": {
+            "evaluated": len(evaluated),
+            "errors": len(results) - len(evaluated),
+            "targets_met": sum(1 for result in evaluated if result.get("target_met")),
+            "targets_not_met": sum(1 for result in evaluated if result.get("target_met") is False),
+            "significant": sum(1 for result in evaluated if result.get("significant"))
+        },
+        "results": results
+    }
+
+
+def validate_analysis(indicators, resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE,
+                      seed=0) -> Optional[str]:
+    """Validate the input of ``analyze_indicators``.
+
+    Returns:
+        An error message, or None if the input is valid
+    """
+    if not isinstance(indicators, list) or not indicators:
+        return "indicators must be a non-empty list"
+    if not all(isinstance(indicator, dict) for indicator in indicators):
+        return "Each indicator must be an object"
+    if isinstance(resamples, bool) or not isinstance(resamples, int) or not 1 <= resamples <= MAX_RESAMPLES:
+        return f"resamples must be an integer between 1 and {MAX_RESAMPLES}"
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 < confidence < 1:
+        return "confidence must be a number between 0 and 1"
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, (int, str))):
+        return "seed must be an integer, a string or null"
+    return None
+
+
+def exceeds_sync_budget(indicators: List[Dict], resamples: int = DEFAULT_RESAMPLES) -> bool:
+    """Whether a batch is too large to evaluate within a request."""
+    return len(indicators) * resamples > SYNC_RESAMPLE_BUDGET
+
+
+def _percent(after: Optional[float], before: Optional[float]) -> Optional[float]:
+    """Percent change from a baseline, None if the baseline is zero."""
+    if after is None or not before:
+        return None
+    return (after - before) / abs(before) * 100
+
+
+def _did_percent(treated_before: float, treated_after: float,
+                 control_before: float, control_after: float) -> Optional[float]:
+    """Percent effect of the treatment relative to the control trend."""
+    if not treated_before or not control_before or not control_after:
+        return None
+    return ((treated_after / treated_before) / (control_after / control_before) - 1) * 100
+
+
+def _quantile(ordered: List[float], q: float) -> float:
+    """Linearly interpolated quantile of sorted values."""
+    position = (len(ordered) - 1) * q
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
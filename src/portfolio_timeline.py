@@ -0,0 +1,418 @@
+"""
+Module: portfolio_timeline.py
+
+This module implements the agency-wide portfolio view over all implementation timelines.
+Features:
+- Maintained Portfolio Index: Keeps a compact summary row per ``data/implementation/*_timeline.json``
+  file, refreshed from file signatures and timeline change events instead of rereading every file
+- Persistent Summaries: Stores the summary rows on disk so a restart only re-reads changed timelines
+- Filtering: Filters projects by status, date window and current phase
+- Server-side Aggregation: Counts projects per phase and status and overdue tasks by month
+- Pagination: Returns one page of Gantt rows at a time
+"""
+
+import os
+import json
+import bisect
+import datetime
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from implementation_tools import read_timeline, register_timeline_listener
+
+# Seconds between directory rescans that pick up timelines written by other processes
+PORTFOLIO_RESCAN_INTERVAL = 5.0
+
+# Default and maximum number of projects per page
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+TIMELINE_SUFFIX = "_timeline.json"
+JOURNAL_SUFFIX = "_timeline_changes.jsonl"
+
+
+class TimelinePortfolioIndex:
+    """Summary index over all project timelines in a data directory."""
+
+    def __init__(self, data_dir: str = "data/implementation"):
+        """Initialize the portfolio index.
+
+        Args:
+            data_dir: Directory holding the project timeline files
+        """
+        self.data_dir = Path(data_dir)
+        self.index_file = self.data_dir / "portfolio_index.json"
+        # Summary rows and the file signature each was built from, keyed by project ID
+        self.rows: Dict[str, Dict] = {}
+        self.signatures: Dict[str, List] = {}
+        # Date-dependent fields of each row, recomputed when the day changes
+        self.derived: Dict[str, Dict] = {}
+        self.derived_day: Optional[str] = None
+        self.dirty: set = set()
+        self.unsaved = False
+        self.last_scan = 0.0
+        self._lock = threading.Lock()
+        self._load_index_file()
+
+    # Index maintenance
+
+    def mark_dirty(self, project_id: str):
+        """Flag a project so its summary row is rebuilt on the next query."""
+        self.dirty.add(project_id)
+
+    def refresh(self, force: bool = False):
+        """Bring the index up to date with the timeline files on disk.
+
+        Args:
+            force: Rescan the directory even if the rescan interval has not elapsed
+        """
+        while self.dirty:
+            project_id = self.dirty.pop()
+            self._update_row(project_id, self._signature(project_id))
+            self.unsaved = True
+
+        now = datetime.datetime.now().timestamp()
+        if force or now - self.last_scan >= PORTFOLIO_RESCAN_INTERVAL:
+            if self._scan():
+                self.unsaved = True
+            # Summaries are persisted at most once per rescan interval
+            if self.unsaved:
+                self._save_index_file()
+                self.unsaved = False
+            self.last_scan = now
+
+        today = datetime.date.today().isoformat()
+        if today != self.derived_day:
+            self.derived = {project_id: _derive(row, today) for project_id, row in self.rows.items()}
+            self.derived_day = today
+
+    def version(self) -> Dict[str, List]:
+        """Rescan the timeline files and get the signatures the index now reflects.
+
+        Returns:
+            Project ID -> [snapshot mtime_ns, journal size] of its indexed timeline
+        """
+        with self._lock:
+            self.refresh(force=True)
+            return dict(self.signatures)
+
+    def _scan(self) -> bool:
+        """Compare timeline file signatures on disk with the indexed ones.
+
+        Returns:
+            True if any summary row was added, updated or removed
+        """
+        if not self.data_dir.exists():
+            return False
+
+        signatures: Dict[str, List] = {}
+        journal_sizes: Dict[str, int] = {}
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(TIMELINE_SUFFIX):
+                    project_id = entry.name[:-len(TIMELINE_SUFFIX)]
+                    signatures[project_id] = [entry.stat().st_mtime_ns, 0]
+                elif entry.name.endswith(JOURNAL_SUFFIX):
+                    journal_sizes[entry.name[:-len(JOURNAL_SUFFIX)]] = entry.stat().st_size
+        for project_id, size in journal_sizes.items():
+            if project_id in signatures:
+                signatures[project_id][1] = size
+
+        changed = False
+        for project_id in list(self.rows):
+            if project_id not in signatures:
+                self._remove_row(project_id)
+                changed = True
+        for project_id, signature in signatures.items():
+            if self.signatures.get(project_id) != signature:
+                self._update_row(project_id, signature)
+                changed = True
+        return changed
+
+    def _signature(self, project_id: str) -> Optional[List]:
+        """Get the on-disk signature of a project timeline."""
+        try:
+            mtime = (self.data_dir / f"{project_id}{TIMELINE_SUFFIX}").stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        try:
+            size = (self.data_dir / f"{project_id}{JOURNAL_SUFFIX}").stat().st_size
+        except FileNotFoundError:
+            size = 0
+        return [mtime, size]
+
+    def _update_row(self, project_id: str, signature: Optional[List]):
+        """Rebuild the summary row of one project from its timeline files.
+
+        The timeline is read directly rather than through the timeline cache, so
+        only the summary row stays in memory.
+        """
+        try:
+            timeline_data = read_timeline(self.data_dir / f"{project_id}{TIMELINE_SUFFIX}",
+                                          self.data_dir / f"{project_id}{JOURNAL_SUFFIX}") if signature else None
+        except (OSError, json.JSONDecodeError):
+            timeline_data = None
+        if timeline_data is None:
+            self._remove_row(project_id)
+            return
+
+        row = _summarize(project_id, timeline_data)
+        self.rows[project_id] = row
+        self.signatures[project_id] = signature
+        if self.derived_day:
+            self.derived[project_id] = _derive(row, self.derived_day)
+
+    def _remove_row(self, project_id: str):
+        """Drop a project from the index."""
+        self.rows.pop(project_id, None)
+        self.signatures.pop(project_id, None)
+        self.derived.pop(project_id, None)
+
+    def _load_index_file(self):
+        """Load the persisted summary rows, if any."""
+        try:
+            with open(self.index_file, 'r') as file:
+                stored = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        for project_id, entry in stored.get("projects", {}).items():
+            self.rows[project_id] = entry["row"]
+            self.signatures[project_id] = entry["signature"]
+
+    def _save_index_file(self):
+        """Persist the summary rows so restarts only re-read changed timelines."""
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        stored = {
+            "projects": {
+                project_id: {"row": row, "signature": self.signatures.get(project_id)}
+                for project_id, row in self.rows.items()
+            }
+        }
+        tmp_file = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_file, 'w') as file:
+            json.dump(stored, file)
+        os.replace(tmp_file, self.index_file)
+
+    # Queries
+
+    def query(self, statuses: Optional[List[str]] = None, window_start: Optional[str] = None,
+              window_end: Optional[str] = None, phase: Optional[str] = None,
+              page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> Dict:
+        """Filter, aggregate and paginate the portfolio.
+
+        Args:
+            statuses: Project statuses to include
+            window_start: Only include projects ending on or after this ISO date
+            window_end: Only include projects starting on or before this ISO date
+            phase: Only include projects whose current phase has this name
+            page: 1-based page number
+            page_size: Number of projects per page
+
+        Returns:
+            The requested page of Gantt rows with aggregates over all matching projects
+        """
+        with self._lock:
+            self.refresh()
+            status_filter = {status.lower() for status in statuses} if statuses else None
+            phase_filter = phase.lower() if phase else None
+
+            matches = []
+            phase_counts: Dict[str, int] = {}
+            status_counts: Dict[str, int] = {}
+            overdue_by_month: Dict[str, int] = {}
+            for project_id, row in self.rows.items():
+                derived = self.derived[project_id]
+                if status_filter and derived["status"] not in status_filter:
+                    continue
+                if window_start and (row["endDate"] or "") < window_start:
+                    continue
+                if window_end and (row["startDate"] or "") > window_end:
+                    continue
+                current_phase = derived["currentPhase"]
+                if phase_filter and (current_phase or "").lower() != phase_filter:
+                    continue
+
+                matches.append(project_id)
+                phase_key = current_phase or "None"
+                phase_counts[phase_key] = phase_counts.get(phase_key, 0) + 1
+                status_counts[derived["status"]] = status_counts.get(derived["status"], 0) + 1
+                for month, count in derived["overdueByMonth"].items():
+                    overdue_by_month[month] = overdue_by_month.get(month, 0) + count
+
+            matches.sort(key=lambda project_id: (self.rows[project_id]["startDate"] or "", project_id))
+            page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+            page = max(1, page)
+            offset = (page - 1) * page_size
+            projects = [
+                _gantt_row(self.rows[project_id], self.derived[project_id])
+                for project_id in matches[offset:offset + page_size]
+            ]
+
+        return {
+            "success": True,
+            "message": f"Found {len(matches)} matching projects",
+            "total": len(matches),
+            "page": page,
+            "page_size": page_size,
+            "projects": projects,
+            "aggregates": {
+                "phase_counts": phase_counts,
+                "status_counts": status_counts,
+                "overdue_tasks_by_month": dict(sorted(overdue_by_month.items()))
+            }
+        }
+
+
+def get_portfolio_index(data_dir: str = "data/implementation") -> TimelinePortfolioIndex:
+    """Get the shared portfolio index for a data directory, creating it on first use.
+
+    Args:
+        data_dir: Directory holding the project timeline files
+
+    Returns:
+        The portfolio index
+    """
+    with _indexes_lock:
+        index = _indexes.get(data_dir)
+        if index is None:
+            index = TimelinePortfolioIndex(data_dir)
+            _indexes[data_dir] = index
+        return index
+
+
+def portfolio_timeline(statuses: Optional[List[str]] = None, window_start: Optional[str] = None,
+                       window_end: Optional[str] = None, phase: Optional[str] = None,
+                       page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> Dict:
+    """Get one page of the agency-wide portfolio timeline with aggregates.
+
+    Args:
+        statuses: Project statuses to include ('not-started', 'in-progress', 'completed', ...)
+        window_start: Only include projects ending on or after this ISO date
+        window_end: Only include projects starting on or before this ISO date
+        phase: Only include projects whose current phase has this name
+        page: 1-based page number
+        page_size: Number of projects per page
+
+    Returns:
+        Dict: The matching projects, total count and aggregates.
+    """
+    return get_portfolio_index().query(statuses, window_start, window_end, phase, page, page_size)
+
+
+def _handle_timeline_change(event: Dict):
+    """Mark the changed project dirty in every portfolio index."""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.mark_dirty(event.get("project_id"))
+
+
+def _summarize(project_id: str, timeline_data: Dict) -> Dict:
+    """Build the date-independent summary row of a timeline.
+
+    Args:
+        project_id: The ID of the project
+        timeline_data: The timeline data
+
+    Returns:
+        The summary row
+    """
+    project = timeline_data.get("project") or {}
+    phases = sorted(
+        (
+            {
+                "id": phase.get("id"),
+                "name": phase.get("name"),
+                "startDate": phase.get("startDate"),
+                "endDate": phase.get("endDate")
+            }
+            for phase in timeline_data.get("phases", [])
+        ),
+        key=lambda phase: phase["startDate"] or ""
+    )
+    tasks = timeline_data.get("tasks", [])
+
+    start_dates = [phase["startDate"] for phase in phases if phase["startDate"]]
+    end_dates = [phase["endDate"] for phase in phases if phase["endDate"]]
+    start_dates += [task["startDate"] for task in tasks if task.get("startDate")]
+    end_dates += [task["endDate"] for task in tasks if task.get("endDate")]
+
+    return {
+        "project_id": project_id,
+        "name": project.get("name", project_id),
+        "revision": timeline_data.get("revision", 0),
+        "projectStatus": project.get("status"),
+        "startDate": project.get("startDate") or (min(start_dates) if start_dates else None),
+        "endDate": project.get("endDate") or (max(end_dates) if end_dates else None),
+        "phases": phases,
+        "taskCount": len(tasks),
+        "completedTaskCount": sum(1 for task in tasks if task.get("status") == "completed"),
+        # End dates of unfinished tasks, sorted so overdue ones form a prefix
+        "openTaskEndDates": sorted(
+            task["endDate"] for task in tasks if task.get("endDate") and task.get("status") != "completed"
+        )
+    }
+
+
+def _gantt_row(row: Dict, derived: Dict) -> Dict:
+    """Combine a summary row and its date-dependent fields into a Gantt row."""
+    return {
+        "project_id": row["project_id"],
+        "name": row["name"],
+        "revision": row["revision"],
+        "status": derived["status"],
+        "startDate": row["startDate"],
+        "endDate": row["endDate"],
+        "currentPhase": derived["currentPhase"],
+        "phases": row["phases"],
+        "taskCount": row["taskCount"],
+        "completedTaskCount": row["completedTaskCount"],
+        "overdueTaskCount": derived["overdueTaskCount"]
+    }
+
+
+def _derive(row: Dict, today: str) -> Dict:
+    """Compute the date-dependent fields of a summary row.
+
+    Args:
+        row: The summary row
+        today: The current date in ISO format
+
+    Returns:
+        The project status, current phase and overdue task counts
+    """
+    if row["projectStatus"]:
+        status = row["projectStatus"].lower()
+    elif row["taskCount"] and row["completedTaskCount"] == row["taskCount"]:
+        status = "completed"
+    elif row["startDate"] and row["startDate"][:10] > today:
+        status = "not-started"
+    elif row["endDate"] and row["endDate"][:10] < today:
+        status = "overdue" if row["openTaskEndDates"] else "completed"
+    else:
+        status = "in-progress"
+
+    current_phase = None
+    for phase in row["phases"]:
+        if (phase["startDate"] or "")[:10] <= today <= (phase["endDate"] or "")[:10]:
+            current_phase = phase["name"]
+            break
+
+    overdue = row["openTaskEndDates"][:bisect.bisect_left(row["openTaskEndDates"], today)]
+    overdue_by_month: Dict[str, int] = {}
+    for end_date in overdue:
+        overdue_by_month[end_date[:7]] = overdue_by_month.get(end_date[:7], 0) + 1
+
+    return {
+        "status": status,
+        "currentPhase": current_phase,
+        "overdueTaskCount": len(overdue),
+        "overdueByMonth": overdue_by_month
+    }
+
+
+_indexes: Dict[str, TimelinePortfolioIndex] = {}
+_indexes_lock = threading.Lock()
+
+register_timeline_listener(_handle_timeline_change)
@@ -0,0 +1,313 @@
+"""
+Module: regulatory_rules.py
+
+This module implements the data-driven rules engine behind regulatory requirement generation.
+Features:
+- Rules File: Loads requirement definitions and their predicates from ``data/regulatory_rules.json``,
+  so adding a state's or county's permits needs no code change
+- Decision Table: Compiles the predicates into per-dimension bitmasks (project type, state,
+  county, water proximity, funding source) that are ANDed to select the applicable rules
+- Memoization: Caches the selected rules per normalized input key
+- Hot Reload: Recompiles the table when the rules file changes on disk
+
+Predicates a rule's ``when`` object may use (all given predicates must hold):
+- ``project_types``: exact project types (case-insensitive)
+- ``project_type_contains``: substrings of the project type (case-insensitive)
+- ``states`` / ``counties``: location state or county names/abbreviations (case-insensitive)
+- ``near_water``: whether the location is flagged ``near_water``
+- ``funding_sources``: funding source ids of which the project uses at least one
+A rule without a ``when`` object applies to every project. A requirement's ``depends_on``
+lists the ids of the requirements that must be completed first (see compliance_scheduling.py).
+"""
+
+import os
+import copy
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Maximum number of memoized input keys per compiled rule set
+MEMO_SIZE = 4096
+
+DEFAULT_RULES = [
+    {
+        "requirement": {
+            "id": "req-001",
+            "name": "Local Building Permit",
+            "description": "Standard permit required for construction activities.",
+            "issuing_authority": "Local Building Department",
+            "timeline": "4-6 weeks",
+            "status": "not-started",
+            "documents_required": ["Project plans", "Site survey", "Engineering calculations"],
+            "estimated_cost": 500,
+            "application_url": "https://example.gov/permits/building",
+            "depends_on": ["req-004", "req-006"]
+        }
+    },
+    {
+        "requirement": {
+            "id": "req-002",
+            "name": "Traffic Management Plan",
+            "description": "Plan for managing traffic during construction.",
+            "issuing_authority": "Local Transportation Department",
+            "timeline": "2-4 weeks",
+            "status": "not-started",
+            "documents_required": ["Traffic analysis", "Construction schedule", "Detour plans"],
+            "estimated_cost": 0,
+            "application_url": "https://example.gov/transportation/tmp"
+        }
+    },
+    {
+        "when": {"project_types": ["bicycle", "pedestrian", "road", "bridge"]},
+        "requirement": {
+            "id": "req-003",
+            "name": "Right-of-Way Permit",
+            "description": "Required for work within public right-of-way.",
+            "issuing_authority": "Public Works Department",
+            "timeline": "3-5 weeks",
+            "status": "not-started",
+            "documents_required": ["Site plan", "Insurance certificate", "Traffic control plan"],
+            "estimated_cost": 350,
+            "application_url": "https://example.gov/public-works/row",
+            "depends_on": ["req-002"]
+        }
+    },
+    {
+        "when": {"project_type_contains": ["water", "drainage"]},
+        "requirement": {
+            "id": "req-004",
+            "name": "Stormwater Management Permit",
+            "description": "Required for projects affecting stormwater runoff.",
+            "issuing_authority": "Environmental Protection Department",
+            "timeline": "6-8 weeks",
+            "status": "not-started",
+            "documents_required": ["Stormwater calculations", "Site plan", "Erosion control plan"],
+            "estimated_cost": 750,
+            "application_url": "https://example.gov/environment/stormwater"
+        }
+    },
+    {
+        "when": {"project_types": ["transit", "terminal", "station"]},
+        "requirement": {
+            "id": "req-005",
+            "name": "ADA Compliance Review",
+            "description": "Review for compliance with accessibility requirements.",
+            "issuing_authority": "Access Board",
+            "timeline": "4-6 weeks",
+            "status": "not-started",
+            "documents_required": ["Accessibility plan", "Facilities design", "Boarding designs"],
+            "estimated_cost": 0,
+            "application_url": "https://example.gov/ada/compliance"
+        }
+    },
+    {
+        "when": {"states": ["california", "ca"]},
+        "requirement": {
+            "id": "req-006",
+            "name": "CEQA Environmental Review",
+            "description": "California Environmental Quality Act review.",
+            "issuing_authority": "State Environmental Agency",
+            "timeline": "12-24 weeks",
+            "status": "not-started",
+            "documents_required": ["Environmental assessment", "Mitigation plan", "Public comments"],
+            "estimated_cost": 5000,
+            "application_url": "https://example.gov/california/ceqa"
+        }
+    }
+]
+
+_engines: Dict[str, "RegulatoryRulesEngine"] = {}
+_engines_lock = threading.Lock()
+
+
+class RegulatoryRulesEngine:
+    """Compiled decision table over a set of regulatory requirement rules."""
+
+    def __init__(self, rules: List[Dict], signature: Optional[Tuple] = None):
+        """Compile the rules into the decision table.
+
+        Args:
+            rules: Rules with a ``requirement`` definition and optional ``when`` predicates
+            signature: The on-disk signature of the file the rules were read from
+        """
+        self.rules = rules
+        self.signature = signature
+        self.requirements = [rule["requirement"] for rule in rules]
+        self.memo: Dict[Tuple, Tuple[int, ...]] = {}
+        self._memo_lock = threading.Lock()
+
+        all_rules = (1 << len(rules)) - 1
+        # Rules that don't constrain a dimension pass for every value of it
+        self.type_wildcard = all_rules
+        self.state_wildcard = all_rules
+        self.county_wildcard = all_rules
+        self.water_wildcard = all_rules
+        self.funding_wildcard = all_rules
+        self.type_exact: Dict[str, int] = {}
+        self.type_contains: Dict[str, int] = {}
+        self.states: Dict[str, int] = {}
+        self.counties: Dict[str, int] = {}
+        self.water: Dict[bool, int] = {True: 0, False: 0}
+        self.funding: Dict[str, int] = {}
+
+        for i, rule in enumerate(rules):
+            bit = 1 << i
+            when = rule.get("when") or {}
+            if "project_types" in when or "project_type_contains" in when:
+                self.type_wildcard &= ~bit
+                for project_type in when.get("project_types", []):
+                    key = project_type.lower()
+                    self.type_exact[key] = self.type_exact.get(key, 0) | bit
+                for fragment in when.get("project_type_contains", []):
+                    key = fragment.lower()
+                    self.type_contains[key] = self.type_contains.get(key, 0) | bit
+            if "states" in when:
+                self.state_wildcard &= ~bit
+                for state in when["states"]:
+                    self.states[state.lower()] = self.states.get(state.lower(), 0) | bit
+            if "counties" in when:
+                self.county_wildcard &= ~bit
+                for county in when["counties"]:
+                    self.counties[county.lower()] = self.counties.get(county.lower(), 0) | bit
+            if "near_water" in when:
+                self.water_wildcard &= ~bit
+                self.water[bool(when["near_water"])] |= bit
+            if "funding_sources" in when:
+                self.funding_wildcard &= ~bit
+                for source_id in when["funding_sources"]:
+                    self.funding[source_id] = self.funding.get(source_id, 0) | bit
+
+    @classmethod
+    def from_file(cls, path: Path) -> "RegulatoryRulesEngine":
+        """Load and compile the rules from a JSON file.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            json.JSONDecodeError: If the file is not valid JSON
+        """
+        signature = _file_signature(path)
+        with open(path, 'r') as file:
+            stored = json.load(file)
+        return cls(stored.get("rules", []), signature)
+
+    def _select(self, key: Tuple) -> Tuple[int, ...]:
+        """Evaluate the decision table for a normalized input key.
+
+        Returns:
+            Indexes of the applicable rules, in rules-file order
+        """
+        project_type, state, county, near_water, funding_sources = key
+
+        type_mask = self.type_wildcard | self.type_exact.get(project_type, 0)
+        for fragment, mask in self.type_contains.items():
+            if fragment in project_type:
+                type_mask |= mask
+        funding_mask = self.funding_wildcard
+        for source_id in funding_sources:
+            funding_mask |= self.funding.get(source_id, 0)
+
+        selected = (type_mask
+                    & (self.state_wildcard | self.states.get(state, 0))
+                    & (self.county_wildcard | self.counties.get(county, 0))
+                    & (self.water_wildcard | self.water[near_water])
+                    & funding_mask)
+        return tuple(i for i in range(len(self.rules)) if selected >> i & 1)
+
+    def requirements_for(self, project_type: str, location: Optional[Dict] = None,
+                         funding_sources: Optional[List[str]] = None) -> List[Dict]:
+        """Get the requirements that apply to a project.
+
+        Args:
+            project_type: Type of project
+            location: Location information ('state', 'county', 'near_water')
+            funding_sources: IDs of the funding sources the project uses
+
+        Returns:
+            Fresh copies of the applicable requirement definitions
+        """
+        key = normalize_inputs(project_type, location, funding_sources)
+        selected = self.memo.get(key)
+        if selected is None:
+            selected = self._select(key)
+            with self._memo_lock:
+                if len(self.memo) >= MEMO_SIZE:
+                    self.memo.clear()
+                self.memo[key] = selected
+        return [_copy_requirement(self.requirements[i]) for i in selected]
+
+
+def normalize_inputs(project_type: str, location: Optional[Dict],
+                     funding_sources: Optional[List[str]] = None) -> Tuple:
+    """Normalize rule inputs into a hashable memoization key.
+
+    Args:
+        project_type: Type of project
+        location: Location information
+        funding_sources: IDs of the funding sources the project uses
+
+    Returns:
+        (project type, state, county, near water, funding sources) key
+    """
+    location = location or {}
+    return (
+        (project_type or "").strip().lower(),
+        str(location.get("state") or "").strip().lower(),
+        str(location.get("county") or "").strip().lower(),
+        bool(location.get("near_water")),
+        frozenset(funding_sources or ())
+    )
+
+
+def get_rules_engine(path: str = "data/regulatory_rules.json") -> RegulatoryRulesEngine:
+    """Get the shared rules engine for a rules file, recompiling it if the file changed.
+
+    The file is created with the default rules if it doesn't exist.
+
+    Args:
+        path: Path to the regulatory rules JSON file
+
+    Returns:
+        The compiled rules engine
+
+    Raises:
+        json.JSONDecodeError: If the rules file is not valid JSON
+    """
+    key = str(path)
+    engine = _engines.get(key)
+    signature = _file_signature(Path(path))
+    if engine is not None and engine.signature == signature:
+        return engine
+
+    with _engines_lock:
+        if _file_signature(Path(path)) is None:
+            _create_default_rules_file(Path(path))
+        engine = _engines.get(key)
+        if engine is None or engine.signature != _file_signature(Path(path)):
+            engine = RegulatoryRulesEngine.from_file(Path(path))
+            _engines[key] = engine
+        return engine
+
+
+def _copy_requirement(requirement: Dict) -> Dict:
+    """Copy a requirement definition deeply enough that callers can modify it."""
+    return {
+        key: copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+        for key, value in requirement.items()
+    }
+
+
+def _create_default_rules_file(path: Path):
+    """Write the default regulatory rules to a new rules file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump({"rules": DEFAULT_RULES}, file, indent=2)
+
+
+def _file_signature(path: Path) -> Optional[Tuple]:
+    """Get the modification time and size of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
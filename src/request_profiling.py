@@ -0,0 +1,384 @@
+"""
+Module: request_profiling.py
+
+This module implements opt-in per-request profiling of the API.
+Features:
+- Request Selection: Profiles one in ``PROFILE_SAMPLE_RATE`` requests at random, and any
+  request carrying a valid ``X-Profile-Token`` header (an expiring HMAC of the request
+  path signed with ``PROFILE_SECRET``)
+- Stack Sampling: A sampler thread records the call stack of the request's thread every
+  ``PROFILE_INTERVAL`` seconds, from the start of the request until its teardown, so the
+  view, serialization, compression and metrics are all included
+- cProfile Mode: ``PROFILE_MODE = "cprofile"`` records exact call counts and times of
+  the request's thread instead
+- Diagnostics Files: Each profile is written under ``data/diagnostics/profiles/`` as
+  collapsed stacks (``.folded``, the input format of flamegraph.pl and speedscope), a
+  self-contained SVG flame graph, a ``.prof`` file (cProfile mode) and a top-function
+  summary (``.txt``); the newest ``PROFILE_KEEP`` profiles are kept
+- No Cost When Off: Without a sample rate or secret no request hooks are installed
+"""
+
+import io
+import os
+import re
+import sys
+import hmac
+import time
+import uuid
+import html
+import random
+import pstats
+import hashlib
+import cProfile
+import threading
+import collections
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, current_app, g, request
+
+# Header carrying a signed profiling request
+PROFILE_HEADER = "X-Profile-Token"
+
+# Response header naming the profile of a profiled request
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Defaults of the settings (Flask config, with API_-prefixed environment variable fallbacks)
+DEFAULT_SETTINGS = {
+    "PROFILE_SAMPLE_RATE": 0,
+    "PROFILE_SECRET": "",
+    "PROFILE_MODE": "sample",
+    "PROFILE_INTERVAL": 0.001,
+    "PROFILE_DIR": os.path.join("data", "diagnostics", "profiles"),
+    "PROFILE_KEEP": 200
+}
+
+# Functions listed in a profile summary
+TOP_FUNCTIONS = 30
+
+# Flame graph geometry, in pixels
+FLAME_WIDTH = 1200
+FLAME_ROW_HEIGHT = 16
+
+# Flask's WSGI entry point; frames below it belong to the server and are dropped
+ROOT_FRAME = "Flask.wsgi_app"
+
+_switch_lock = threading.Lock()
+_active_samplers = 0
+_saved_switch_interval: Optional[float] = None
+
+
+def init_app(app: Flask):
+    """Profile selected requests of an application.
+
+    Register before the other request hooks so a profile covers them. Does nothing
+    unless ``PROFILE_SAMPLE_RATE`` or ``PROFILE_SECRET`` is set.
+
+    Args:
+        app: The Flask application
+    """
+    for name, default in DEFAULT_SETTINGS.items():
+        if name not in app.config:
+            value = os.environ.get(f"API_{name}")
+            app.config[name] = type(default)(value) if value is not None else default
+    if app.config["PROFILE_MODE"] not in ("sample", "cprofile"):
+        raise ValueError(f"PROFILE_MODE must be 'sample' or 'cprofile', not {app.config['PROFILE_MODE']!r}")
+    if not app.config["PROFILE_SAMPLE_RATE"] and not app.config["PROFILE_SECRET"]:
+        return
+    app.before_request(_start_profile)
+    app.after_request(_tag_response)
+    app.teardown_request(_finish_profile)
+
+
+def sign_profile_token(secret: str, path: str, ttl: int = 3600) -> str:
+    """Get an ``X-Profile-Token`` value that requests a profile of a path.
+
+    Args:
+        secret: The server's ``PROFILE_SECRET``
+        path: The request path, without the query string
+        ttl: Seconds the token stays valid
+
+    Returns:
+        The header value
+    """
+    expires = int(time.time()) + ttl
+    return f"{expires}.{_signature(secret, expires, path)}"
+
+
+def verify_profile_token(secret: str, path: str, token: str) -> bool:
+    """Check that a token is unexpired and signed for a path."""
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(secret, int(expires), path))
+
+
+def _signature(secret: str, expires: int, path: str) -> str:
+    return hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+
+
+def _selected() -> bool:
+    """Decide whether to profile the current request."""
+    config = current_app.config
+    token = request.headers.get(PROFILE_HEADER)
+    if token and config["PROFILE_SECRET"] and verify_profile_token(config["PROFILE_SECRET"], request.path, token):
+        return True
+    rate = config["PROFILE_SAMPLE_RATE"]
+    return bool(rate) and random.random() * rate < 1
+
+
+def _start_profile():
+    """Start profiling the request if it is selected."""
+    if not _selected():
+        return
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    if current_app.config["PROFILE_MODE"] == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process; skip overlapping requests
+            return
+    else:
+        profiler = StackSampler(threading.get_ident(), current_app.config["PROFILE_INTERVAL"])
+        profiler.start()
+    g.profile = {"id": profile_id, "profiler": profiler, "start": time.perf_counter(), "status": None}
+
+
+def _tag_response(response):
+    """Name the profile in the response and note its status."""
+    profile = g.get("profile")
+    if profile is not None:
+        profile["status"] = response.status_code
+        response.headers[PROFILE_ID_HEADER] = profile["id"]
+    return response
+
+
+def _finish_profile(exception: Optional[BaseException]):
+    """Stop the request's profiler and write its files."""
+    profile = g.pop("profile", None)
+    if profile is None:
+        return
+    profiler = profile["profiler"]
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+    else:
+        profiler.stop()
+    duration = time.perf_counter() - profile["start"]
+    status = profile["status"] if exception is None else 500
+    try:
+        write_profile(Path(current_app.config["PROFILE_DIR"]), profile["id"], profiler,
+                      f"{request.method} {request.full_path.rstrip('?')}", status, duration,
+                      current_app.config["PROFILE_KEEP"])
+    except OSError as e:
+        current_app.logger.warning("Could not write profile %s: %s", profile["id"], e)
+
+
+class StackSampler(threading.Thread):
+    """Sampler of the call stacks of one thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        """Configure the sampler.
+
+        Args:
+            thread_id: Identifier of the thread to sample
+            interval: Seconds between samples
+        """
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Dict[Tuple[str, ...], int] = collections.Counter()
+        self._stopped = threading.Event()
+        self._labels: Dict[object, str] = {}
+
+    def start(self):
+        _lower_switch_interval(self.interval)
+        super().start()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        _restore_switch_interval()
+
+    def run(self):
+        current_frames = sys._current_frames
+        while not self._stopped.wait(self.interval):
+            frame = current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self._labels[code] = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def collapsed(self) -> Dict[Tuple[str, ...], int]:
+        """Get the sampled stacks from Flask's entry point down, with their sample counts."""
+        stacks: Dict[Tuple[str, ...], int] = collections.Counter()
+        for stack, count in self.stacks.items():
+            for i, label in enumerate(stack):
+                if label.startswith(ROOT_FRAME):
+                    stack = stack[i:]
+                    break
+            stacks[stack] += count
+        return stacks
+
+
+def _lower_switch_interval(interval: float):
+    """Let the sampler thread take the GIL as often as it samples while any sampler runs."""
+    global _active_samplers, _saved_switch_interval
+    with _switch_lock:
+        if _active_samplers == 0:
+            _saved_switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(_saved_switch_interval, interval))
+        _active_samplers += 1
+
+
+def _restore_switch_interval():
+    global _active_samplers
+    with _switch_lock:
+        _active_samplers -= 1
+        if _active_samplers == 0 and _saved_switch_interval is not None:
+            sys.setswitchinterval(_saved_switch_interval)
+
+
+def write_profile(directory: Path, profile_id: str, profiler, request_line: str, status: Optional[int],
+                  duration: float, keep: int = DEFAULT_SETTINGS["PROFILE_KEEP"]) -> List[Path]:
+    """Write the files of a finished profile and remove the oldest profiles.
+
+    Args:
+        directory: The profiles directory
+        profile_id: The profile id (sortable by time)
+        profiler: The stopped ``StackSampler`` or ``cProfile.Profile``
+        request_line: Method, path and query of the request
+        status: The response status
+        duration: Seconds the request took
+        keep: Number of profiles to keep
+
+    Returns:
+        The written files
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    method, _, target = request_line.partition(" ")
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "-", target.split("?")[0].strip("/"))[:80]
+    stem = directory / f"{profile_id}_{method}_{slug}"
+    header = [f"Request: {request_line}", f"Status: {status}", f"Duration: {duration * 1000:.1f} ms"]
+    written = []
+
+    if isinstance(profiler, cProfile.Profile):
+        profiler.dump_stats(f"{stem}.prof")
+        written.append(Path(f"{stem}.prof"))
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        body = header + ["", summary.getvalue()]
+    else:
+        stacks = profiler.collapsed()
+        samples = sum(stacks.values())
+        with open(f"{stem}.folded", 'w') as file:
+            for stack, count in sorted(stacks.items()):
+                file.write(f"{';'.join(stack)} {count}\n")
+        with open(f"{stem}.svg", 'w') as file:
+            file.write(render_flame_graph(stacks, f"{request_line} ({status}, {duration * 1000:.1f} ms)"))
+        written += [Path(f"{stem}.folded"), Path(f"{stem}.svg")]
+        header.append(f"Samples: {samples} every {profiler.interval * 1000:g} ms")
+        body = header + ["", *top_functions(stacks)]
+
+    with open(f"{stem}.txt", 'w') as file:
+        file.write("\n".join(body) + "\n")
+    written.append(Path(f"{stem}.txt"))
+    _prune(directory, keep)
+    return written
+
+
+def top_functions(stacks: Dict[Tuple[str, ...], int], limit: int = TOP_FUNCTIONS) -> List[str]:
+    """Summarize sampled stacks as the functions with the most self and total samples."""
+    samples = sum(stacks.values()) or 1
+    own: Dict[str, int] = collections.Counter()
+    total: Dict[str, int] = collections.Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for label in set(stack):
+            total[label] += count
+    lines = []
+    for title, counts in (("Self (function running)", own), ("Total (function on the stack)", total)):
+        lines += [title, f"{'samples':>8} {'share':>7}  function"]
+        for label, count in counts.most_common(limit):
+            lines.append(f"{count:>8} {count / samples:>7.1%}  {label}")
+        lines.append("")
+    return lines
+
+
+def render_flame_graph(stacks: Dict[Tuple[str, ...], int], title: str) -> str:
+    """Render sampled stacks as a self-contained SVG flame graph (callers at the bottom)."""
+    root = {"children": {}, "count": 0}
+    for stack, count in stacks.items():
+        root["count"] += count
+        node = root
+        for label in stack:
+            node = node["children"].setdefault(label, {"children": {}, "count": 0})
+            node["count"] += count
+
+    def depth(node) -> int:
+        return 1 + max((depth(child) for child in node["children"].values()), default=0)
+
+    levels = depth(root) - 1
+    height = (levels + 2) * FLAME_ROW_HEIGHT + 10
+    scale = FLAME_WIDTH / max(1, root["count"])
+    rects = []
+
+    def draw(node, x: float, level: int):
+        for label, child in sorted(node["children"].items()):
+            width = child["count"] * scale
+            if width >= 0.5:
+                y = height - (level + 1) * FLAME_ROW_HEIGHT - 4
+                hue = int(hashlib.md5(label.split(" (")[0].encode()).hexdigest()[:2], 16) % 60
+                text = html.escape(label)
+                share = child["count"] / root["count"]
+                fits = int(width / 7)
+                name = html.escape(label if len(label) <= fits else label[:max(0, fits - 2)] + "..")
+                rects.append(
+                    f'<g><title>{text} ({child["count"]} samples, {share:.1%})</title>'
+                    f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FLAME_ROW_HEIGHT - 1}" '
+                    f'fill="hsl({hue},90%,60%)" rx="2"/>'
+                    + (f'<text x="{x + 3:.1f}" y="{y + 11}">{name}</text>' if fits >= 4 else "")
+                    + "</g>"
+                )
+                draw(child, x, level + 1)
+            x += width
+
+    draw(root, 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{FLAME_WIDTH}" height="{height}" '
+        f'viewBox="0 0 {FLAME_WIDTH} {height}" font-family="monospace" font-size="11">\n'
+        f'<text x="4" y="14" font-size="13">{html.escape(title)} - {root["count"]} samples</text>\n'
+        + "\n".join(rects) + "\n</svg>\n"
+    )
+
+
+def _prune(directory: Path, keep: int):
+    """Remove the files of all but the newest profiles."""
+    profiles = sorted({path.name.split("_", 1)[0] for path in directory.iterdir() if "_" in path.name})
+    for profile_id in profiles[:max(0, len(profiles) - keep)]:
+        for path in directory.glob(f"{profile_id}_*"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+if __name__ == '__main__':
+    # Print a header requesting a profile: python request_profiling.py /api/implementation-timeline/p1 [ttl]
+    secret = os.environ.get("API_PROFILE_SECRET")
+    if len(sys.argv) < 2 or not secret:
+        sys.exit("Usage: API_PROFILE_SECRET=... python request_profiling.py PATH [TTL_SECONDS]")
+    ttl = int(sys.argv[2]) if len(sys.argv) > 2 else 3600
+    print(f"{PROFILE_HEADER}: {sign_profile_token(secret, sys.argv[1], ttl)}")
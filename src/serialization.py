@@ -0,0 +1,258 @@
+"""
+Module: serialization.py
+
+This module implements the JSON serialization and response compression layer of the API.
+Features:
+- Fast Encoding: Serializes with orjson when it is installed, falling back to the
+  standard library ``json`` module with the same output
+- Flask Integration: A JSON provider so ``jsonify`` and ``request.get_json`` use the
+  selected backend
+- Compact Storage: ``dump_file`` writes data files without indentation or spaces, and
+  ``dump_file``/``load_file`` record their I/O time in the API metrics
+- Shared File Cache: Within ``shared_file_cache()`` (e.g. one batch request), each data
+  file is read from disk once and its bytes are shared by every reader
+- Response Compression: Negotiates brotli (when installed) or gzip from
+  ``Accept-Encoding`` for responses above a size threshold
+"""
+
+import os
+import json
+import gzip
+import time
+import threading
+import contextlib
+import contextvars
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+
+from metrics import observe_io
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Available JSON backends, in order of preference
+JSON_BACKENDS = ("orjson", "json") if orjson is not None else ("json",)
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = 1024
+
+# Compression levels tuned for dynamic responses (speed over ratio)
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# Mimetypes worth compressing
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/html", "text/csv", "text/plain", "image/svg+xml")
+
+# File path -> file bytes shared by the readers of the current cache scope
+_file_cache: contextvars.ContextVar[Optional[Dict[str, bytes]]] = contextvars.ContextVar("file_cache", default=None)
+
+
+def dumps(data: Any, backend: Optional[str] = None, sort_keys: bool = False, default=None) -> bytes:
+    """Serialize data to compact UTF-8 JSON.
+
+    Args:
+        data: The data to serialize
+        backend: "orjson" or "json". Defaults to the fastest available backend.
+        sort_keys: Sort the keys of every object
+        default: Called with objects the backend cannot serialize
+
+    Returns:
+        The JSON document
+    """
+    if (backend or JSON_BACKENDS[0]) == "orjson":
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(data, default=default, option=option)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False,
+                      sort_keys=sort_keys, default=default).encode("utf-8")
+
+
+def loads(data, backend: Optional[str] = None) -> Any:
+    """Parse a JSON document from text or UTF-8 bytes.
+
+    Args:
+        data: The JSON document
+        backend: "orjson" or "json". Defaults to the fastest available backend.
+
+    Returns:
+        The parsed data
+    """
+    if (backend or JSON_BACKENDS[0]) == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_file(data: Any, path: Path, atomic: bool = False):
+    """Write data to a file as compact JSON.
+
+    Args:
+        data: The data to serialize
+        path: Path of the file to write
+        atomic: Write via a temporary file so readers never see a partial write
+    """
+    start = time.perf_counter()
+    body = dumps(data)
+    target = Path(path)
+    # Unique per process and thread, so concurrent writers never rename each other's file
+    write_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp") if atomic else target
+    with open(write_path, 'wb') as file:
+        file.write(body)
+    if atomic:
+        os.replace(write_path, target)
+    cache = _file_cache.get()
+    if cache is not None:
+        cache.pop(str(target), None)
+    observe_io("write", path, time.perf_counter() - start, len(body))
+
+
+def load_file(path: Path, cached: bool = True) -> Any:
+    """Read a JSON file.
+
+    Args:
+        path: Path of the file to read
+        cached: Use the shared file cache of the current scope, if any; writers that
+            re-read a file under its lock pass False to see other processes' writes
+
+    Returns:
+        The parsed data
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    cache = _file_cache.get() if cached else None
+    body = cache.get(str(path)) if cache is not None else None
+    if body is not None:
+        return loads(body)
+
+    start = time.perf_counter()
+    with open(path, 'rb') as file:
+        body = file.read()
+    data = loads(body)
+    observe_io("read", path, time.perf_counter() - start, len(body))
+    if cache is not None:
+        cache[str(path)] = body
+    return data
+
+
+@contextlib.contextmanager
+def shared_file_cache():
+    """Share the bytes of the data files read in this context (and contexts copied from it).
+
+    Files written through ``dump_file`` in the scope are dropped from the cache.
+    Only use it for short scopes, since changes made by other processes are not seen.
+    """
+    token = _file_cache.set({})
+    try:
+        yield
+    finally:
+        _file_cache.reset(token)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by the fastest available JSON backend.
+
+    Output matches the default provider (sorted keys, compact outside debug mode),
+    except that non-ASCII characters are sent as UTF-8 rather than escaped.
+    """
+
+    backend = JSON_BACKENDS[0]
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize data as a JSON string."""
+        if kwargs.get("indent") is not None or kwargs.get("cls") is not None:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, self.backend, kwargs.get("sort_keys", self.sort_keys),
+                     kwargs.get("default", self.default)).decode("utf-8")
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        """Parse a JSON document."""
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s, self.backend)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """Serialize the arguments into a JSON response."""
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = dumps(obj, self.backend, self.sort_keys, self.default) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def negotiate_encoding(accept_encoding) -> Optional[str]:
+    """Choose the response content coding from a parsed ``Accept-Encoding`` header.
+
+    Args:
+        accept_encoding: The request's ``accept_encodings``
+
+    Returns:
+        "br", "gzip" or None for an uncompressed response
+    """
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return accept_encoding.best_match(offered)
+
+
+def compress_response(response: Response) -> Response:
+    """Compress a response body if the client accepts it and it is large enough.
+
+    Args:
+        response: The response to the current request
+
+    Returns:
+        The (possibly compressed) response
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    if response.content_length is not None and response.content_length < COMPRESSION_MIN_SIZE:
+        return response
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+    if encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app: Flask):
+    """Install the JSON provider and response compression on an application.
+
+    Configuration:
+        JSON_BACKEND: "orjson" or "json" (default: the fastest available)
+        COMPRESS_RESPONSES: Compress large responses (default True)
+
+    Args:
+        app: The Flask application
+    """
+    provider = FastJSONProvider(app)
+    backend = app.config.get("JSON_BACKEND")
+    if backend:
+        if backend not in JSON_BACKENDS:
+            raise ValueError(f"Unavailable JSON backend: {backend}")
+        provider.backend = backend
+    app.json = provider
+    if app.config.get("COMPRESS_RESPONSES", True):
+        app.after_request(compress_response)
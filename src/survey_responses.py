@@ -0,0 +1,564 @@
+"""
+Module: survey_responses.py
+
+This module implements post-implementation survey response collection for outcome measurement.
+Features:
+- Bulk Ingestion: Validates and appends batches of responses (JSON objects or CSV rows)
+- Column-wise Storage: Stores each question's answers in its own append-only column under
+  ``data/outcomes/responses/{project_id}``; choice answers as packed option indexes,
+  open-ended answers as JSON lines
+- Running Aggregates: Keeps option counts for multiple-choice questions, Likert
+  distributions and means, and response counts (with Likert distributions) per demographic
+  bucket, updated with each batch so results never rescan the raw responses
+- Rebuild: Recomputes the aggregates from the columns if the aggregates file is missing
+- Multi-process Safety: Batches are ingested under an inter-process lock of the store,
+  and each worker reloads ``aggregates.json`` whenever another worker has rewritten it,
+  so concurrent ingestion never overwrites another worker's counts
+- Screening: Holds back duplicate and suspicious responses for review instead of
+  aggregating them (see ``survey_screening``)
+
+The question set is taken from the project's survey template when the first response is
+ingested and kept in ``schema.json``, so stored option indexes stay stable.
+"""
+
+import os
+import csv
+import io
+import json
+import array
+import datetime
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from implementation_tools import _get_outcome_measurement_templates
+from survey_screening import ResponseScreener
+from file_locks import file_lock
+from serialization import dump_file
+
+# Question types whose answers are one of the question's options
+CHOICE_TYPES = ("multiple_choice", "likert")
+
+# Packed value of a skipped choice question
+MISSING = -1
+
+# Keys of a response record that are not answers
+RESPONSE_META_FIELDS = ("response_id", "submitted_at", "answers", "device_id", "ip", "started_at", "duration_seconds")
+
+_stores: Dict[Tuple[str, str], "SurveyResponseStore"] = {}
+_stores_lock = threading.Lock()
+
+
+class SurveyResponseStore:
+    """Column-wise response storage and running aggregates for one project's survey."""
+
+    def __init__(self, project_id: str, data_dir: str = "data/outcomes"):
+        """Open the response store of a project.
+
+        Args:
+            project_id: The ID of the project
+            data_dir: Directory holding the outcome measurement data
+        """
+        self.project_id = project_id
+        self.outcomes_dir = Path(data_dir)
+        self.store_dir = self.outcomes_dir / "responses" / project_id
+        self.schema_file = self.store_dir / "schema.json"
+        self.aggregates_file = self.store_dir / "aggregates.json"
+        self.lock_file = self.store_dir / "ingest.lock"
+        self._lock = threading.Lock()
+        self.schema: Optional[Dict] = None
+        self.state: Optional[Dict] = None
+        # Signature of the aggregates file the in-memory state was read from or written to
+        self.state_signature: Optional[Tuple] = None
+        self.screener: Optional[ResponseScreener] = None
+        if self._stale():
+            with file_lock(self.lock_file):
+                self._sync()
+
+    # Other processes
+
+    def _stale(self) -> bool:
+        """Check whether another process created the store or rewrote its aggregates."""
+        if self.schema is None:
+            return self.schema_file.exists()
+        return _file_signature(self.aggregates_file) != self.state_signature
+
+    def _sync(self):
+        """Load the schema and the current aggregates from disk. Callers hold the file lock."""
+        if self.schema is None:
+            self.schema = self._load_json(self.schema_file)
+            if self.schema is None:
+                return
+            self.screener = self._create_screener()
+        signature = _file_signature(self.aggregates_file)
+        if self.state is not None and signature == self.state_signature:
+            return
+        state = self._load_json(self.aggregates_file) if signature is not None else None
+        if state is None:
+            state = self._rebuild_state()
+        else:
+            self.state_signature = signature
+        self.state = state
+
+    # Schema
+
+    def _survey_template(self) -> Dict:
+        """Get the project's survey template, falling back to the default template."""
+        stored = self._load_json(self.outcomes_dir / f"{self.project_id}_survey.json") or {}
+        return stored.get("template") or _get_outcome_measurement_templates("survey")
+
+    def _create_schema(self):
+        """Freeze the question set of the survey template into the store schema."""
+        questions = []
+        for section in self._survey_template().get("sections", []):
+            demographic = section.get("title", "").lower().startswith("demographic")
+            for question in section.get("questions", []):
+                questions.append({
+                    "id": question["id"],
+                    "question": question.get("question"),
+                    "type": question.get("type"),
+                    "options": question.get("options", []),
+                    "demographic": question.get("demographic", demographic)
+                })
+        self.schema = {"project_id": self.project_id, "questions": questions}
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        dump_file(self.schema, self.schema_file, atomic=True)
+        self.state = self._empty_state()
+        self.screener = self._create_screener()
+
+    def _create_screener(self) -> ResponseScreener:
+        """Open the duplicate and fraud screener of the survey."""
+        return ResponseScreener(self.store_dir, [q["id"] for q in self._questions() if q["type"] not in CHOICE_TYPES])
+
+    def _questions(self) -> List[Dict]:
+        """Get the questions of the schema."""
+        return self.schema["questions"]
+
+    def _demographic_questions(self) -> List[Dict]:
+        """Get the demographic choice questions of the schema."""
+        return [q for q in self._questions() if q["demographic"] and q["type"] in CHOICE_TYPES]
+
+    # Aggregate state
+
+    def _empty_state(self) -> Dict:
+        """Build the aggregate state of a survey without responses."""
+        likert_ids = [q["id"] for q in self._questions() if q["type"] == "likert" and not q["demographic"]]
+        return {
+            "response_count": 0,
+            "flagged_count": 0,
+            "last_updated": None,
+            "counts": {q["id"]: [0] * len(q["options"]) for q in self._questions() if q["type"] in CHOICE_TYPES},
+            "answered": {q["id"]: 0 for q in self._questions()},
+            # Demographic question -> option -> [responses, {likert question: option counts}]
+            "demographics": {
+                q["id"]: [[0, {lid: [0] * len(self._question(lid)["options"]) for lid in likert_ids}]
+                          for _ in q["options"]]
+                for q in self._demographic_questions()
+            }
+        }
+
+    def _question(self, question_id: str) -> Dict:
+        """Get a question of the schema by id."""
+        for question in self._questions():
+            if question["id"] == question_id:
+                return question
+        raise KeyError(question_id)
+
+    def _accumulate(self, state: Dict, row: Dict[str, object]):
+        """Add one encoded response to the aggregate state.
+
+        Args:
+            state: The aggregate state
+            row: Question id -> option index (choice questions) or text (open-ended)
+        """
+        state["response_count"] += 1
+        likert = []
+        for question in self._questions():
+            value = row.get(question["id"])
+            if value is None or value == MISSING or value == "":
+                continue
+            state["answered"][question["id"]] += 1
+            if question["type"] in CHOICE_TYPES:
+                state["counts"][question["id"]][value] += 1
+                if question["type"] == "likert" and not question["demographic"]:
+                    likert.append((question["id"], value))
+        for question_id, buckets in state["demographics"].items():
+            value = row.get(question_id)
+            if value is None or value == MISSING:
+                continue
+            bucket = buckets[value]
+            bucket[0] += 1
+            for likert_id, option in likert:
+                bucket[1][likert_id][option] += 1
+
+    def _rebuild_state(self) -> Dict:
+        """Recompute the aggregate state from the stored columns."""
+        state = self._empty_state()
+        flagged_file = self.store_dir / "flagged.jsonl"
+        if flagged_file.exists():
+            with open(flagged_file, 'r') as file:
+                state["flagged_count"] = sum(1 for _ in file)
+        columns = {question["id"]: self._read_column(question) for question in self._questions()}
+        count = max((len(column) for column in columns.values()), default=0)
+        for i in range(count):
+            self._accumulate(state, {question_id: column[i] if i < len(column) else None
+                                     for question_id, column in columns.items()})
+        state["last_updated"] = datetime.datetime.now().isoformat()
+        self._save_state(state)
+        return state
+
+    def _save_state(self, state: Dict):
+        """Write the aggregates file and remember its signature."""
+        dump_file(state, self.aggregates_file, atomic=True)
+        self.state_signature = _file_signature(self.aggregates_file)
+
+    # Columns
+
+    def _column_path(self, question: Dict) -> Path:
+        """Get the column file of a question."""
+        suffix = ".col" if question["type"] in CHOICE_TYPES else ".jsonl"
+        return self.store_dir / f"{question['id']}{suffix}"
+
+    def _read_column(self, question: Dict) -> list:
+        """Read all stored answers of a question."""
+        path = self._column_path(question)
+        if not path.exists():
+            return []
+        if question["type"] in CHOICE_TYPES:
+            column = array.array('h')
+            with open(path, 'rb') as file:
+                column.frombytes(file.read())
+            return column
+        with open(path, 'r') as file:
+            return [json.loads(line) for line in file]
+
+    def _append_columns(self, rows: List[Dict[str, object]], submitted_at: List[float]):
+        """Append encoded responses to every column file."""
+        for question in self._questions():
+            values = [row.get(question["id"]) for row in rows]
+            if question["type"] in CHOICE_TYPES:
+                column = array.array('h', (MISSING if value is None else value for value in values))
+                with open(self._column_path(question), 'ab') as file:
+                    column.tofile(file)
+            else:
+                with open(self._column_path(question), 'a') as file:
+                    file.write("".join(json.dumps(value or "") + "\n" for value in values))
+        with open(self.store_dir / "submitted_at.col", 'ab') as file:
+            array.array('d', submitted_at).tofile(file)
+
+    # Ingestion
+
+    def _encode(self, answers: Dict) -> Tuple[Optional[Dict[str, object]], Optional[str]]:
+        """Validate a response's answers and encode them for the columns.
+
+        Returns:
+            (encoded row, None) or (None, the reason the response is invalid)
+        """
+        row: Dict[str, object] = {}
+        for question in self._questions():
+            value = answers.get(question["id"])
+            if value is None or value == "":
+                continue
+            if question["type"] in CHOICE_TYPES:
+                index = _option_index(question, value)
+                if index is None:
+                    return None, f"Invalid answer for {question['id']}: {value}"
+                row[question["id"]] = index
+            else:
+                row[question["id"]] = str(value)
+        if not row:
+            return None, "Response has no answers"
+        return row, None
+
+    def ingest(self, responses: List[Dict]) -> Dict:
+        """Validate, store and aggregate a batch of responses.
+
+        Each response is either an object of question id -> answer, or an object with
+        an ``answers`` mapping and optional ``response_id`` and ``submitted_at``.
+        Choice answers may be the option text or its 0-based index. The optional
+        ``device_id``, ``ip``, ``started_at`` and ``duration_seconds`` fields feed the
+        screening checks; flagged responses are kept for review but not aggregated.
+
+        Args:
+            responses: The responses to ingest
+
+        Returns:
+            The number of accepted responses, and the rejected and flagged ones with reasons
+        """
+        with self._lock, file_lock(self.lock_file):
+            # Another process may have created the store or ingested responses since
+            self._sync()
+            if self.schema is None:
+                self._create_schema()
+            self.screener.sync()
+
+            now = datetime.datetime.now()
+            received_at = now.timestamp()
+            rows = []
+            submitted_at = []
+            rejected = []
+            flagged = []
+            held_back = []
+            charged = {}
+            for i, response in enumerate(responses):
+                if not isinstance(response, dict):
+                    rejected.append({"index": i, "reason": "Response must be an object"})
+                    continue
+                answers = response.get("answers")
+                if not isinstance(answers, dict):
+                    answers = {key: value for key, value in response.items() if key not in RESPONSE_META_FIELDS}
+                row, reason = self._encode(answers)
+                if row is None:
+                    rejected.append({"index": i, "response_id": response.get("response_id"), "reason": reason})
+                    continue
+                # Screening windows use the receive time, which clients cannot backdate, and
+                # charge the batch once per device and address
+                reasons = self.screener.screen(response, row, received_at, charged)
+                if reasons:
+                    flagged.append({"index": i, "response_id": response.get("response_id"), "reasons": reasons})
+                    held_back.append((response, reasons, received_at))
+                    continue
+                rows.append(row)
+                submitted_at.append(_timestamp(response.get("submitted_at")) or received_at)
+
+            if held_back:
+                self.screener.record_flagged(held_back)
+                self.state["flagged_count"] = self.state.get("flagged_count", 0) + len(held_back)
+            if rows or held_back:
+                if rows:
+                    self._append_columns(rows, submitted_at)
+                for row in rows:
+                    self._accumulate(self.state, row)
+                self.state["last_updated"] = now.isoformat()
+                self._save_state(self.state)
+
+            return {
+                "accepted": len(rows),
+                "rejected": rejected,
+                "flagged": flagged,
+                "response_count": self.state["response_count"]
+            }
+
+    # Results
+
+    def results(self) -> Dict:
+        """Get the aggregated survey results.
+
+        Returns:
+            Per-question counts, Likert distributions and means, and demographic breakdowns
+        """
+        with self._lock:
+            if self._stale():
+                with file_lock(self.lock_file):
+                    self._sync()
+            if self.schema is None:
+                return {"project_id": self.project_id, "response_count": 0, "flagged_count": 0,
+                        "questions": {}, "demographics": {}}
+            state = self.state
+            questions = {}
+            for question in self._questions():
+                answered = state["answered"][question["id"]]
+                entry = {
+                    "question": question["question"],
+                    "type": question["type"],
+                    "answered": answered
+                }
+                if question["type"] in CHOICE_TYPES:
+                    counts = state["counts"][question["id"]]
+                    entry["counts"] = dict(zip(question["options"], counts))
+                    if question["type"] == "likert":
+                        entry.update(_likert_summary(counts, question["options"]))
+                questions[question["id"]] = entry
+
+            demographics = {}
+            for question_id, buckets in state["demographics"].items():
+                question = self._question(question_id)
+                demographics[question_id] = {
+                    "question": question["question"],
+                    "buckets": {
+                        option: {
+                            "responses": bucket[0],
+                            "likert": {
+                                likert_id: _likert_summary(counts, self._question(likert_id)["options"])
+                                for likert_id, counts in bucket[1].items()
+                            }
+                        }
+                        for option, bucket in zip(question["options"], buckets)
+                    }
+                }
+
+            return {
+                "project_id": self.project_id,
+                "response_count": state["response_count"],
+                "flagged_count": state.get("flagged_count", 0),
+                "last_updated": state["last_updated"],
+                "questions": questions,
+                "demographics": demographics
+            }
+
+    def flagged(self, page: int = 1, page_size: int = 50) -> Dict:
+        """Get the responses held back by screening.
+
+        Args:
+            page: 1-based page number
+            page_size: Number of flagged responses per page
+
+        Returns:
+            The flagged count, counts per reason and one page of flagged responses
+        """
+        with self._lock:
+            if self.schema is None and self._stale():
+                with file_lock(self.lock_file):
+                    self._sync()
+            screener = self.screener
+        if screener is None:
+            return {"project_id": self.project_id, "total": 0, "reason_counts": {}, "flagged": []}
+        page = max(1, page)
+        page_size = max(1, min(page_size, 500))
+        return {"project_id": self.project_id, "page": page, "page_size": page_size,
+                **screener.flagged((page - 1) * page_size, page_size)}
+
+    def close(self):
+        """Release the screener of the store."""
+        with self._lock:
+            self.screener = None
+
+    @staticmethod
+    def _load_json(path: Path) -> Optional[Dict]:
+        """Load a JSON file, or None if it is missing or invalid."""
+        try:
+            with open(path, 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+
+def get_response_store(project_id: str, data_dir: str = "data/outcomes") -> SurveyResponseStore:
+    """Get the shared response store of a project, opening it on first use."""
+    with _stores_lock:
+        store = _stores.get((data_dir, project_id))
+        if store is None:
+            store = _stores[(data_dir, project_id)] = SurveyResponseStore(project_id, data_dir)
+        return store
+
+
+def close_response_stores():
+    """Flush and close the open response stores."""
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
+
+
+def ingest_survey_responses(project_id: str, responses: List[Dict]) -> Dict:
+    """Ingest a batch of post-implementation survey responses for a project.
+
+    Args:
+        project_id: The ID of the project
+        responses: The responses (see ``SurveyResponseStore.ingest``)
+
+    Returns:
+        Dict: The ingestion summary.
+    """
+    summary = get_response_store(project_id).ingest(responses)
+    return {
+        "success": summary["accepted"] > 0 or bool(summary["flagged"]) or not responses,
+        "message": (f"Accepted {summary['accepted']} of {len(responses)} survey responses"
+                    f" ({len(summary['flagged'])} flagged for review)"),
+        "data": summary
+    }
+
+
+def survey_results(project_id: str) -> Dict:
+    """Get the aggregated survey results of a project.
+
+    Args:
+        project_id: The ID of the project
+
+    Returns:
+        Dict: The aggregated results.
+    """
+    results = get_response_store(project_id).results()
+    return {
+        "success": True,
+        "message": f"Survey results for project {project_id} ({results['response_count']} responses)",
+        "data": results
+    }
+
+
+def flagged_survey_responses(project_id: str, page: int = 1, page_size: int = 50) -> Dict:
+    """Get the survey responses of a project that were flagged for review.
+
+    Args:
+        project_id: The ID of the project
+        page: 1-based page number
+        page_size: Number of flagged responses per page
+
+    Returns:
+        Dict: The flagged responses with their reasons.
+    """
+    flagged = get_response_store(project_id).flagged(page, page_size)
+    return {
+        "success": True,
+        "message": f"{flagged['total']} flagged survey responses for project {project_id}",
+        "data": flagged
+    }
+
+
+def parse_csv_responses(text: str) -> List[Dict]:
+    """Parse CSV survey responses with a header row of question ids.
+
+    Args:
+        text: The CSV text
+
+    Returns:
+        One response object per row, with empty cells omitted
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    return [{key: value for key, value in row.items() if key and value not in (None, "")} for row in reader]
+
+
+def _option_index(question: Dict, value) -> Optional[int]:
+    """Resolve a choice answer (option text or index) to its option index."""
+    options = question["options"]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value if 0 <= value < len(options) else None
+    text = str(value).strip()
+    if text in options:
+        return options.index(text)
+    lowered = text.lower()
+    for i, option in enumerate(options):
+        if option.lower() == lowered:
+            return i
+    return None
+
+
+def _likert_summary(counts: List[int], options: List[str]) -> Dict:
+    """Summarize Likert option counts as a distribution and a 1-based mean score."""
+    answered = sum(counts)
+    return {
+        "distribution": {option: round(count / answered, 4) if answered else 0.0
+                         for option, count in zip(options, counts)},
+        "mean": round(sum((i + 1) * count for i, count in enumerate(counts)) / answered, 3) if answered else None
+    }
+
+
+def _timestamp(value) -> Optional[float]:
+    """Convert an ISO format date string to a POSIX timestamp."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed.timestamp()
+
+
+def _file_signature(path: Path) -> Optional[Tuple]:
+    """Get the inode, modification time and size of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
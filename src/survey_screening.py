@@ -0,0 +1,325 @@
+"""
+Module: survey_screening.py
+
+This module implements ingestion-time deduplication and fraud screening of survey responses.
+Features:
+- Near-duplicate Text: Computes MinHash signatures of open-ended answers' word shingles and
+  finds earlier answers to the same question through locality-sensitive hashing bands,
+  flagging those whose estimated Jaccard similarity reaches a threshold, so lightly edited
+  copies are caught; signatures are appended to a file, so they survive restarts and are
+  shared by all server workers
+- Duplicate Bursts: Counts identical full responses with open-ended text in a rolling time
+  window and flags repeats beyond a small allowance; responses of closed choices only are
+  not compared, since genuine respondents often pick the same options
+- Rate Windows: Limits submissions per device and per IP address in sliding time windows;
+  a bulk upload is charged once per device and address it carries
+- Timing Anomalies: Flags responses completed faster than a plausible reading time per answer
+
+Time windows and completion times use the server's receive time, never a timestamp supplied
+by the client. Flagged responses are kept in ``flagged.jsonl`` for review and excluded from
+the live aggregates. The time windows are held in memory and start empty after a restart.
+"""
+
+import re
+import json
+import array
+import random
+import hashlib
+import datetime
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Open-ended answers shorter than this many characters are too generic to fingerprint
+MIN_TEXT_LENGTH = 20
+
+# Words per shingle of an open-ended answer
+SHINGLE_WORDS = 2
+
+# MinHash signature length, split into LSH bands of MINHASH_PERMUTATIONS // LSH_BANDS rows.
+# Answers sharing a band are compared by their signatures; those whose estimated Jaccard
+# similarity of shingles reaches NEAR_DUPLICATE_SIMILARITY are near duplicates.
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+NEAR_DUPLICATE_SIMILARITY = 0.6
+
+# Identical full responses allowed per window before repeats are flagged
+DUPLICATE_WINDOW_SECONDS = 3600
+DUPLICATE_ALLOWANCE = 5
+
+# Responses allowed per device and per IP address in the rate window
+RATE_WINDOW_SECONDS = 3600
+DEVICE_RATE_LIMIT = 3
+IP_RATE_LIMIT = 20
+
+# Minimum plausible completion time per answered question
+MIN_SECONDS_PER_ANSWER = 2.0
+
+# Number of keys after which expired rate-window keys are pruned
+WINDOW_PRUNE_THRESHOLD = 100000
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [(random.Random(i).randrange(1, _MERSENNE_PRIME), random.Random(-i - 1).randrange(_MERSENNE_PRIME))
+                 for i in range(MINHASH_PERMUTATIONS)]
+# Record of the fingerprint file: question tag followed by the signature, as uint32
+_RECORD_SIZE = 4 * (1 + MINHASH_PERMUTATIONS)
+
+
+def minhash(text: str) -> Optional[Tuple[int, ...]]:
+    """Get the MinHash signature of a text's word shingles.
+
+    Returns:
+        MINHASH_PERMUTATIONS 32-bit values, or None if the text has too few words
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < 3:
+        return None
+    hashes = [int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode(), digest_size=8).digest(),
+                             'little') for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return tuple(min((a * value + b) % _MERSENNE_PRIME for value in hashes) & 0xFFFFFFFF
+                 for a, b in _PERMUTATIONS)
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of open-ended answers in an LSH index, persisted in an append-only file."""
+
+    def __init__(self, path: Path):
+        """Open the index, loading the signatures stored so far.
+
+        Args:
+            path: Path of the fingerprint file
+        """
+        self.path = path
+        self.bands: Dict[int, List[Tuple[int, ...]]] = {}
+        self.offset = 0
+        self.sync()
+
+    def sync(self):
+        """Load the signatures appended since the last sync, e.g. by other processes."""
+        try:
+            with open(self.path, 'rb') as file:
+                file.seek(self.offset)
+                data = file.read()
+        except FileNotFoundError:
+            return
+        data = data[:len(data) // _RECORD_SIZE * _RECORD_SIZE]
+        records = array.array('I')
+        records.frombytes(data)
+        width = 1 + MINHASH_PERMUTATIONS
+        for i in range(0, len(records), width):
+            self._index(records[i], tuple(records[i + 1:i + width]))
+        self.offset += len(data)
+
+    def add(self, question_id: str, text: str) -> bool:
+        """Add an answer to the index.
+
+        Returns:
+            True if a near duplicate of the answer was already present
+        """
+        signature = minhash(text)
+        if signature is None:
+            return False
+        tag = _question_tag(question_id)
+        for key in _band_keys(tag, signature):
+            for other in self.bands.get(key, ()):
+                if sum(x == y for x, y in zip(signature, other)) >= NEAR_DUPLICATE_SIMILARITY * MINHASH_PERMUTATIONS:
+                    return True
+        self._index(tag, signature)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as file:
+            # Unless another process appended since the last sync, this record needs no reload
+            if file.seek(0, 2) == self.offset:
+                self.offset += _RECORD_SIZE
+            array.array('I', (tag,) + signature).tofile(file)
+        return False
+
+    def _index(self, tag: int, signature: Tuple[int, ...]):
+        """Add a signature to the bands of the index."""
+        for key in _band_keys(tag, signature):
+            self.bands.setdefault(key, []).append(signature)
+
+
+class SlidingWindowCounter:
+    """Counts events per key within a sliding time window."""
+
+    def __init__(self, window: float):
+        """Initialize the counter.
+
+        Args:
+            window: Window length in seconds
+        """
+        self.window = window
+        self.events: Dict[str, Deque[float]] = {}
+
+    def add(self, key: str, timestamp: float) -> int:
+        """Record an event and count the key's events within the window.
+
+        Returns:
+            The number of events for the key in the window ending at ``timestamp``
+        """
+        events = self.events.get(key)
+        if events is None:
+            if len(self.events) >= WINDOW_PRUNE_THRESHOLD:
+                self.prune(timestamp)
+            events = self.events[key] = deque()
+        while events and events[0] <= timestamp - self.window:
+            events.popleft()
+        events.append(timestamp)
+        return len(events)
+
+    def prune(self, now: float):
+        """Drop the keys without events in the window ending at ``now``."""
+        self.events = {key: events for key, events in self.events.items()
+                       if events and events[-1] > now - self.window}
+
+
+class ResponseScreener:
+    """Screens the responses of one survey for duplicates and fraud signals."""
+
+    def __init__(self, store_dir: Path, text_questions: List[str]):
+        """Initialize the screener.
+
+        Args:
+            store_dir: Directory of the survey's response store
+            text_questions: Ids of the open-ended questions
+        """
+        self.text_questions = text_questions
+        self.texts = NearDuplicateIndex(store_dir / "text_fingerprints.bin")
+        self.duplicates = SlidingWindowCounter(DUPLICATE_WINDOW_SECONDS)
+        self.devices = SlidingWindowCounter(RATE_WINDOW_SECONDS)
+        self.ips = SlidingWindowCounter(RATE_WINDOW_SECONDS)
+        self.flagged_file = store_dir / "flagged.jsonl"
+        self._lock = threading.Lock()
+
+    def sync(self):
+        """Load the text fingerprints other processes stored. Callers hold the store's ingest lock."""
+        with self._lock:
+            self.texts.sync()
+
+    def screen(self, response: Dict, row: Dict[str, object], received_at: float,
+               charged: Optional[Dict[Tuple[str, str], int]] = None) -> List[str]:
+        """Check one validated response.
+
+        Args:
+            response: The response as submitted (with ``device_id``, ``ip``,
+                ``started_at`` or ``duration_seconds`` when available)
+            row: The encoded answers
+            received_at: Time the server received the response, as a POSIX timestamp
+            charged: Rate window counts of the submission the response belongs to, by
+                (window, key); the responses of one submission share them, so a bulk
+                upload is charged once per device and address
+
+        Returns:
+            The reasons the response is flagged, empty if it passes
+        """
+        reasons = []
+        charged = {} if charged is None else charged
+        with self._lock:
+            texts = [(question_id, row.get(question_id)) for question_id in self.text_questions
+                     if isinstance(row.get(question_id), str) and _normalize_text(row[question_id])]
+            if texts:
+                signature = hashlib.blake2b(json.dumps(
+                    {key: _normalize_text(value) if isinstance(value, str) else value for key, value in row.items()},
+                    sort_keys=True
+                ).encode(), digest_size=16).hexdigest()
+                if self.duplicates.add(signature, received_at) > DUPLICATE_ALLOWANCE:
+                    reasons.append("duplicate_burst")
+
+            for question_id, text in texts:
+                if len(text) < MIN_TEXT_LENGTH:
+                    continue
+                if self.texts.add(question_id, text) and "duplicate_text" not in reasons:
+                    reasons.append("duplicate_text")
+
+            for window, counter, limit, field in (("device", self.devices, DEVICE_RATE_LIMIT, "device_id"),
+                                                  ("ip", self.ips, IP_RATE_LIMIT, "ip")):
+                key = response.get(field)
+                if not key:
+                    continue
+                count = charged.get((window, str(key)))
+                if count is None:
+                    count = charged[(window, str(key))] = counter.add(str(key), received_at)
+                if count > limit:
+                    reasons.append(f"{window}_rate")
+
+        duration = _duration(response, received_at)
+        if duration is not None and duration < MIN_SECONDS_PER_ANSWER * len(row):
+            reasons.append("too_fast")
+        return reasons
+
+    def record_flagged(self, flagged: List[Tuple[Dict, List[str], float]]):
+        """Keep flagged responses for review.
+
+        Args:
+            flagged: (response, reasons, receive timestamp) tuples
+        """
+        if not flagged:
+            return
+        flagged_at = datetime.datetime.now().isoformat()
+        with self._lock, open(self.flagged_file, 'a') as file:
+            for response, reasons, received_at in flagged:
+                file.write(json.dumps({
+                    "flagged_at": flagged_at,
+                    "received_at": datetime.datetime.fromtimestamp(received_at).isoformat(),
+                    "reasons": reasons,
+                    "response": response
+                }) + "\n")
+
+    def flagged(self, offset: int = 0, limit: int = 100) -> Dict:
+        """Get flagged responses for review.
+
+        Args:
+            offset: Number of flagged responses to skip
+            limit: Maximum number of flagged responses to return
+
+        Returns:
+            The total flagged count, counts per reason and one page of flagged responses
+        """
+        total = 0
+        reasons: Dict[str, int] = {}
+        page = []
+        with self._lock:
+            if self.flagged_file.exists():
+                with open(self.flagged_file, 'r') as file:
+                    for line in file:
+                        entry = json.loads(line)
+                        for reason in entry["reasons"]:
+                            reasons[reason] = reasons.get(reason, 0) + 1
+                        if offset <= total < offset + limit:
+                            page.append(entry)
+                        total += 1
+        return {"total": total, "reason_counts": reasons, "flagged": page}
+
+
+def _normalize_text(text: str) -> str:
+    """Normalize text for duplicate comparison."""
+    return " ".join(_WORD_PATTERN.findall(text.lower()))
+
+
+def _question_tag(question_id: str) -> int:
+    """Hash a question id into the 32-bit tag stored with its signatures."""
+    return int.from_bytes(hashlib.blake2b(question_id.encode(), digest_size=4).digest(), 'little')
+
+
+def _band_keys(tag: int, signature: Tuple[int, ...]) -> List[int]:
+    """Get the LSH keys of a signature: a hash of each band's rows, within its question."""
+    return [hash((tag, band) + signature[band * _ROWS:(band + 1) * _ROWS]) for band in range(LSH_BANDS)]
+
+
+def _duration(response: Dict, received_at: float) -> Optional[float]:
+    """Get how long a response took to complete, in seconds, if it is known."""
+    duration = response.get("duration_seconds")
+    if isinstance(duration, (int, float)) and not isinstance(duration, bool):
+        return float(duration)
+    started_at = response.get("started_at")
+    if not started_at:
+        return None
+    try:
+        started = datetime.datetime.fromisoformat(str(started_at).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return received_at - started.timestamp()
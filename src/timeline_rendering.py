@@ -0,0 +1,458 @@
+"""
+Module: timeline_rendering.py
+
+This module implements printable renderings of project implementation timelines.
+Features:
+- HTML Gantt: A self-contained HTML document (inline styles, no scripts) with a bar per
+  phase and task, progress fill, critical-path highlighting, milestones and a today line,
+  laid out to print on landscape pages
+- PDF Gantt: The same chart written directly as a PDF 1.4 document using the standard
+  Helvetica fonts and zlib-compressed page streams, paginated with a repeated header
+- Render Cache: Rendered documents are stored under ``data/exports/timelines`` keyed by
+  project, timeline revision and render day, so repeated downloads are served from disk
+  until the timeline changes or the day (and with it the task statuses) rolls over
+"""
+
+import os
+import re
+import glob
+import html
+import zlib
+import datetime
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Directory holding rendered timeline documents
+RENDER_DIR = Path("data/exports/timelines")
+
+# Output formats that can be rendered, with their media types
+RENDER_FORMATS = {"html": "text/html", "pdf": "application/pdf"}
+
+# Bar colors by status
+STATUS_COLORS = {
+    "completed": "#2e7d32",
+    "in-progress": "#1976d2",
+    "overdue": "#c62828",
+    "not-started": "#9e9e9e"
+}
+PHASE_COLOR = "#37474f"
+MILESTONE_COLOR = "#f9a825"
+CRITICAL_COLOR = "#d50000"
+TODAY_COLOR = "#ff6f00"
+GRID_COLOR = "#e0e0e0"
+
+# PDF page geometry in points (US Letter, landscape)
+PAGE_WIDTH = 792
+PAGE_HEIGHT = 612
+MARGIN = 36
+LABEL_WIDTH = 210
+ROW_HEIGHT = 15
+HEADER_HEIGHT = 70
+FOOTER_HEIGHT = 24
+
+
+def render_timeline(project_id: str, timeline: Dict, schedule: Dict, output_format: str,
+                    render_dir: Path = RENDER_DIR) -> Path:
+    """Render a timeline document, reusing the cached rendering of the same revision and day.
+
+    Args:
+        project_id: The ID of the project
+        timeline: The timeline data with statuses as of today, including its ``revision``
+        schedule: The critical-path schedule of the timeline
+        output_format: "html" or "pdf"
+        render_dir: Directory holding the rendered documents
+
+    Returns:
+        The path of the rendered document
+    """
+    today = datetime.date.today()
+    path = render_path(project_id, timeline.get("revision", 0), output_format, today, render_dir)
+    if path.exists():
+        return path
+
+    rows, start, end = _layout(timeline, schedule)
+    title = (timeline.get("project") or {}).get("name") or f"Project {project_id}"
+    subtitle = f"Implementation timeline, revision {timeline.get('revision', 0)}, as of {today.isoformat()}"
+    if output_format == "html":
+        content = render_html(title, subtitle, rows, start, end, today).encode("utf-8")
+    else:
+        content = render_pdf(title, subtitle, rows, start, end, today)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'wb') as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+    _prune(project_id, path, render_dir)
+    return path
+
+
+def render_path(project_id: str, revision: int, output_format: str, day: datetime.date,
+                render_dir: Path = RENDER_DIR) -> Path:
+    """Get the cache path of a rendered timeline document."""
+    return render_dir / f"{project_id}_r{revision}_{day.isoformat()}.{output_format}"
+
+
+def cached_render(project_id: str, revision: int, output_format: str,
+                  render_dir: Path = RENDER_DIR) -> Optional[Path]:
+    """Get today's cached rendering of a timeline revision, or None if it isn't rendered yet."""
+    path = render_path(project_id, revision, output_format, datetime.date.today(), render_dir)
+    return path if path.exists() else None
+
+
+def _prune(project_id: str, current: Path, render_dir: Path):
+    """Remove the project's renderings of older revisions or days in the same format."""
+    pattern = re.compile(rf"{re.escape(project_id)}_r\d+_\d{{4}}-\d{{2}}-\d{{2}}{re.escape(current.suffix)}")
+    for path in render_dir.glob(f"{glob.escape(project_id)}_r*{current.suffix}"):
+        if path != current and pattern.fullmatch(path.name):
+            path.unlink(missing_ok=True)
+
+
+# Layout
+
+def _layout(timeline: Dict, schedule: Dict) -> Tuple[List[Dict], datetime.date, datetime.date]:
+    """Arrange the phases, tasks and milestones into chart rows.
+
+    Returns:
+        The rows (``kind``, ``label``, ``start``, ``end``, ``status``, ``progress``,
+        ``critical``) and the date range of the chart
+    """
+    critical_tasks = {task_id for task_id, entry in (schedule.get("tasks") or {}).items() if entry.get("critical")}
+    phases = sorted(timeline.get("phases") or [], key=lambda phase: str(phase.get("startDate") or ""))
+    tasks = sorted(timeline.get("tasks") or [], key=lambda task: str(task.get("startDate") or ""))
+    milestones = sorted(timeline.get("milestones") or [], key=lambda milestone: str(milestone.get("date") or ""))
+
+    tasks_by_phase: Dict[Optional[str], List[Dict]] = {}
+    for task in tasks:
+        tasks_by_phase.setdefault(task.get("phaseId"), []).append(task)
+
+    rows = []
+    for phase in phases:
+        rows.append(_row("phase", phase, False))
+        for task in tasks_by_phase.pop(phase.get("id"), []):
+            rows.append(_row("task", task, task.get("id") in critical_tasks or bool(task.get("isCriticalPath"))))
+    orphans = [task for phase_tasks in tasks_by_phase.values() for task in phase_tasks]
+    if orphans:
+        rows.append({"kind": "section", "label": "Other tasks"})
+        for task in orphans:
+            rows.append(_row("task", task, task.get("id") in critical_tasks or bool(task.get("isCriticalPath"))))
+    if milestones:
+        rows.append({"kind": "section", "label": "Milestones"})
+        for milestone in milestones:
+            rows.append(_row("milestone", milestone, False))
+
+    dates = [date for row in rows for date in (row.get("start"), row.get("end")) if date is not None]
+    start = min(dates) if dates else datetime.date.today()
+    end = max(dates) if dates else start
+    # Start on the first of the month and end on the last, at least one month wide
+    start = start.replace(day=1)
+    end = _add_month(end.replace(day=1)) - datetime.timedelta(days=1)
+    return rows, start, end
+
+
+def _row(kind: str, item: Dict, critical: bool) -> Dict:
+    """Build the chart row of a phase, task or milestone."""
+    if kind == "milestone":
+        start = end = _parse_date(item.get("date"))
+    else:
+        start, end = _parse_date(item.get("startDate")), _parse_date(item.get("endDate"))
+        start, end = start or end, end or start
+        if start and end < start:
+            start, end = end, start
+    try:
+        progress = max(0.0, min(100.0, float(item.get("progress") or 0)))
+    except (TypeError, ValueError):
+        progress = 0.0
+    return {
+        "kind": kind,
+        "label": str(item.get("name") or item.get("title") or item.get("id") or ""),
+        "start": start,
+        "end": end,
+        "status": item.get("status") or "not-started",
+        "progress": 100.0 if item.get("status") == "completed" else progress,
+        "critical": critical
+    }
+
+
+def _parse_date(value) -> Optional[datetime.date]:
+    """Parse the date part of an ISO date or datetime string."""
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _add_month(day: datetime.date) -> datetime.date:
+    """Get the first day of the following month."""
+    return datetime.date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _months(start: datetime.date, end: datetime.date) -> List[datetime.date]:
+    """Get the first day of every month in a date range."""
+    months = []
+    month = start.replace(day=1)
+    while month <= end:
+        months.append(month)
+        month = _add_month(month)
+    return months
+
+
+def _fraction(day: datetime.date, start: datetime.date, end: datetime.date) -> float:
+    """Get the position of a date in the chart range, from 0 to 1."""
+    span = (end - start).days + 1
+    return max(0.0, min(1.0, (day - start).days / span))
+
+
+# HTML
+
+def render_html(title: str, subtitle: str, rows: List[Dict], start: datetime.date,
+                end: datetime.date, today: datetime.date) -> str:
+    """Render the chart rows as a self-contained HTML document."""
+    def percent(value: float) -> str:
+        return f"{value * 100:.3f}%"
+
+    months = "".join(
+        f'<div class="month" style="left:{percent(_fraction(month, start, end))}">{month.strftime("%b %Y")}</div>'
+        for month in _months(start, end)
+    )
+    today_line = ""
+    if start <= today <= end:
+        today_line = f'<div class="today" style="left:{percent(_fraction(today, start, end))}"></div>'
+
+    body = []
+    for row in rows:
+        label = html.escape(row["label"])
+        if row["kind"] == "section":
+            body.append(f'<div class="row section"><div class="label">{label}</div><div class="track"></div></div>')
+            continue
+        bar = ""
+        if row["start"] is not None and row["kind"] == "milestone":
+            bar = (f'<div class="milestone" style="left:{percent(_fraction(row["start"], start, end))}" '
+                   f'title="{row["start"].isoformat()}"></div>')
+        elif row["start"] is not None and row["end"] is not None:
+            left = _fraction(row["start"], start, end)
+            width = max(_fraction(row["end"] + datetime.timedelta(days=1), start, end) - left, 0.002)
+            color = PHASE_COLOR if row["kind"] == "phase" else STATUS_COLORS.get(row["status"], STATUS_COLORS["not-started"])
+            classes = "bar critical" if row["critical"] else "bar"
+            bar = (f'<div class="{classes}" style="left:{percent(left)};width:{percent(width)};background:{color}" '
+                   f'title="{row["start"].isoformat()} to {row["end"].isoformat()} ({html.escape(str(row["status"]))})">'
+                   f'<div class="fill" style="width:{row["progress"]:.0f}%"></div></div>')
+        dates = ""
+        if row["start"] is not None:
+            dates = row["start"].isoformat() if row["start"] == row["end"] else f"{row['start'].isoformat()} to {row['end'].isoformat()}"
+        body.append(
+            f'<div class="row {row["kind"]}"><div class="label" title="{label}">{label}'
+            f'<span class="dates">{dates}</span></div><div class="track">{bar}</div></div>'
+        )
+
+    legend = "".join(
+        f'<span><i style="background:{color}"></i>{status.replace("-", " ")}</span>'
+        for status, color in STATUS_COLORS.items()
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<style>
+@page {{ size: letter landscape; margin: 0.5in; }}
+body {{ font-family: Helvetica, Arial, sans-serif; font-size: 11px; color: #212121; margin: 16px; }}
+h1 {{ font-size: 18px; margin: 0 0 2px; }}
+.subtitle {{ color: #616161; margin-bottom: 8px; }}
+.legend span {{ margin-right: 12px; }}
+.legend i {{ display: inline-block; width: 10px; height: 10px; margin-right: 4px; vertical-align: middle; }}
+.legend .crit {{ border: 2px solid {CRITICAL_COLOR}; background: none; }}
+.chart {{ position: relative; margin-top: 8px; }}
+.row, .axis {{ display: flex; border-bottom: 1px solid {GRID_COLOR}; break-inside: avoid; page-break-inside: avoid; }}
+.label {{ flex: 0 0 30%; padding: 2px 6px; overflow: hidden; white-space: nowrap; text-overflow: ellipsis; }}
+.dates {{ color: #757575; margin-left: 6px; font-size: 9px; }}
+.track {{ position: relative; flex: 1; height: 16px; }}
+.axis .track {{ height: 18px; }}
+.phase .label {{ font-weight: bold; }}
+.task .label {{ padding-left: 18px; }}
+.section .label {{ font-weight: bold; color: #616161; }}
+.month {{ position: absolute; top: 2px; padding-left: 3px; border-left: 1px solid #bdbdbd; font-size: 9px; color: #616161; white-space: nowrap; }}
+.bar {{ position: absolute; top: 3px; height: 10px; border-radius: 2px; overflow: hidden; -webkit-print-color-adjust: exact; print-color-adjust: exact; }}
+.bar.critical {{ outline: 2px solid {CRITICAL_COLOR}; }}
+.fill {{ height: 100%; background: rgba(0, 0, 0, 0.3); }}
+.milestone {{ position: absolute; top: 3px; width: 9px; height: 9px; margin-left: -5px; transform: rotate(45deg); background: {MILESTONE_COLOR}; -webkit-print-color-adjust: exact; print-color-adjust: exact; }}
+.today {{ position: absolute; top: 0; bottom: 0; border-left: 2px dashed {TODAY_COLOR}; }}
+.overlay {{ position: absolute; top: 0; bottom: 0; left: 30%; right: 0; pointer-events: none; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<div class="subtitle">{html.escape(subtitle)}</div>
+<div class="legend">{legend}<span><i style="background:{MILESTONE_COLOR}"></i>milestone</span><span><i class="crit"></i>critical path</span><span><i style="background:{TODAY_COLOR}"></i>today</span></div>
+<div class="chart">
+<div class="axis"><div class="label"></div><div class="track">{months}</div></div>
+{chr(10).join(body)}
+<div class="overlay">{today_line}</div>
+</div>
+</body>
+</html>
+"""
+
+
+# PDF
+
+def render_pdf(title: str, subtitle: str, rows: List[Dict], start: datetime.date,
+               end: datetime.date, today: datetime.date) -> bytes:
+    """Render the chart rows as a PDF document."""
+    chart_left = MARGIN + LABEL_WIDTH
+    chart_width = PAGE_WIDTH - MARGIN - chart_left
+    rows_top = PAGE_HEIGHT - MARGIN - HEADER_HEIGHT
+    rows_per_page = max(1, int((rows_top - MARGIN - FOOTER_HEIGHT) // ROW_HEIGHT))
+    pages = [rows[i:i + rows_per_page] for i in range(0, len(rows), rows_per_page)] or [[]]
+
+    def x_of(day: datetime.date) -> float:
+        return chart_left + _fraction(day, start, end) * chart_width
+
+    streams = []
+    for number, page_rows in enumerate(pages, 1):
+        ops: List[str] = []
+        # Header
+        _text(ops, MARGIN, PAGE_HEIGHT - MARGIN - 14, title, 14, bold=True)
+        _text(ops, MARGIN, PAGE_HEIGHT - MARGIN - 30, subtitle, 9, color="#616161")
+        legend_x = MARGIN
+        for label, color in list(STATUS_COLORS.items()) + [("milestone", MILESTONE_COLOR)]:
+            _rect(ops, legend_x, PAGE_HEIGHT - MARGIN - 46, 8, 8, color)
+            _text(ops, legend_x + 11, PAGE_HEIGHT - MARGIN - 45, label.replace("-", " "), 8)
+            legend_x += 22 + _text_width(label, 8) + 11
+        _rect(ops, legend_x, PAGE_HEIGHT - MARGIN - 46, 8, 8, None, stroke=CRITICAL_COLOR)
+        _text(ops, legend_x + 11, PAGE_HEIGHT - MARGIN - 45, "critical path", 8)
+
+        # Month grid
+        grid_bottom = rows_top - len(page_rows) * ROW_HEIGHT
+        for month in _months(start, end):
+            x = x_of(month)
+            _line(ops, x, rows_top + 12, x, grid_bottom, "#bdbdbd")
+            if x + 30 <= PAGE_WIDTH - MARGIN:
+                _text(ops, x + 2, rows_top + 3, month.strftime("%b %Y"), 7, color="#616161")
+
+        # Rows
+        for i, row in enumerate(page_rows):
+            top = rows_top - i * ROW_HEIGHT
+            bottom = top - ROW_HEIGHT
+            _line(ops, MARGIN, bottom, PAGE_WIDTH - MARGIN, bottom, GRID_COLOR)
+            indent = 12 if row["kind"] in ("task", "milestone") else 0
+            bold = row["kind"] in ("phase", "section")
+            _text(ops, MARGIN + indent, bottom + 4, _truncate(row["label"], LABEL_WIDTH - indent - 6, 8, bold), 8,
+                  bold=bold, color="#616161" if row["kind"] == "section" else "#212121")
+            if row["kind"] == "section" or row["start"] is None:
+                continue
+            if row["kind"] == "milestone":
+                x = x_of(row["start"])
+                _diamond(ops, x, bottom + ROW_HEIGHT / 2, 4.5, MILESTONE_COLOR)
+                _text(ops, x + 7, bottom + 4, row["start"].isoformat(), 7, color="#757575")
+                continue
+            left = x_of(row["start"])
+            width = max(x_of(row["end"] + datetime.timedelta(days=1)) - left, 1.5)
+            color = PHASE_COLOR if row["kind"] == "phase" else STATUS_COLORS.get(row["status"], STATUS_COLORS["not-started"])
+            _rect(ops, left, bottom + 3, width, ROW_HEIGHT - 6, color,
+                  stroke=CRITICAL_COLOR if row["critical"] else None)
+            if row["progress"]:
+                _rect(ops, left, bottom + 3, width * row["progress"] / 100, ROW_HEIGHT - 6, "#000000", alpha=True)
+
+        # Today line and footer
+        if start <= today <= end and page_rows:
+            x = x_of(today)
+            _line(ops, x, rows_top + 12, x, grid_bottom, TODAY_COLOR, width=1.2, dash=True)
+        _text(ops, PAGE_WIDTH - MARGIN - 60, MARGIN - 12, f"Page {number} of {len(pages)}", 8, color="#757575")
+        streams.append("\n".join(ops).encode("latin-1"))
+
+    return _pdf_document(streams, title)
+
+
+def _pdf_document(streams: List[bytes], title: str) -> bytes:
+    """Assemble page content streams into a PDF file."""
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # Pages, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /ExtGState /ca 0.3 >>",
+        b"<< /Title " + _pdf_string(title).encode("latin-1") + b" /Producer (TransportVoice) >>"
+    ]
+    page_ids = []
+    for stream in streams:
+        compressed = zlib.compress(stream, 6)
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(compressed) + compressed + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> /ExtGState << /GS1 5 0 R >> >> >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        )
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R /Info 6 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+def _pdf_string(text: str) -> str:
+    """Encode text as a PDF literal string in the WinAnsi encoding."""
+    encoded = text.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + encoded.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").replace("\r", " ").replace("\n", " ") + ")"
+
+
+def _rgb(color: str) -> str:
+    """Convert a #rrggbb color to PDF color components."""
+    return " ".join(f"{int(color[i:i + 2], 16) / 255:.3f}" for i in (1, 3, 5))
+
+
+def _text(ops: List[str], x: float, y: float, text: str, size: float, bold: bool = False, color: str = "#212121"):
+    """Draw a line of text."""
+    ops.append(f"BT {_rgb(color)} rg /{'F2' if bold else 'F1'} {size} Tf {x:.2f} {y:.2f} Td {_pdf_string(text)} Tj ET")
+
+
+def _rect(ops: List[str], x: float, y: float, width: float, height: float, fill: Optional[str],
+          stroke: Optional[str] = None, alpha: bool = False):
+    """Draw a filled and/or outlined rectangle."""
+    ops.append("q")
+    if alpha:
+        ops.append("/GS1 gs")
+    if fill:
+        ops.append(f"{_rgb(fill)} rg")
+    if stroke:
+        ops.append(f"{_rgb(stroke)} RG 1.2 w")
+    paint = "B" if fill and stroke else ("f" if fill else "S")
+    ops.append(f"{x:.2f} {y:.2f} {width:.2f} {height:.2f} re {paint} Q")
+
+
+def _line(ops: List[str], x1: float, y1: float, x2: float, y2: float, color: str,
+          width: float = 0.5, dash: bool = False):
+    """Draw a straight line."""
+    ops.append(f"q {_rgb(color)} RG {width} w {'[3 2] 0 d ' if dash else ''}"
+               f"{x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S Q")
+
+
+def _diamond(ops: List[str], x: float, y: float, radius: float, color: str):
+    """Draw a filled diamond centered on a point."""
+    ops.append(f"q {_rgb(color)} rg {x:.2f} {y + radius:.2f} m {x + radius:.2f} {y:.2f} l "
+               f"{x:.2f} {y - radius:.2f} l {x - radius:.2f} {y:.2f} l h f Q")
+
+
+def _text_width(text: str, size: float, bold: bool = False) -> float:
+    """Estimate the width of Helvetica text (average glyph width)."""
+    return len(text) * size * (0.58 if bold else 0.53)
+
+
+def _truncate(text: str, width: float, size: float, bold: bool = False) -> str:
+    """Shorten text with an ellipsis so it fits a width."""
+    if _text_width(text, size, bold) <= width:
+        return text
+    keep = max(1, int(width / (size * (0.58 if bold else 0.53))) - 3)
+    return text[:keep].rstrip() + "..."
@@ -0,0 +1,364 @@
+"""
+Module: timeline_scheduling.py
+
+This module implements critical-path (CPM) scheduling for implementation timelines.
+Features:
+- Dependency DAG: Builds the task dependency graph from each task's ``dependencies`` list
+- Forward/Backward Passes: Computes earliest/latest start and finish and the slack of every task
+- Critical Path: Identifies the zero-slack tasks that drive the project finish date
+- Phase Rollups: Derives the scheduled window of each phase from its tasks
+- Incremental Rescheduling: Re-propagates only the part of the graph affected by a task change
+
+Task durations are taken from each task's planned ``startDate``/``endDate``. The planned
+start acts as a "start no earlier than" constraint, so a slipping predecessor pushes its
+successors back while an early finish never pulls work forward. Completed tasks keep their
+recorded dates.
+"""
+
+import datetime
+import heapq
+import threading
+from typing import Dict, List, Optional
+
+# Tolerance (in days) under which slack counts as zero
+CRITICAL_SLACK_TOLERANCE = 1e-6
+
+# Fields of a task that affect its schedule
+SCHEDULE_FIELDS = ("startDate", "endDate", "dependencies", "status", "phaseId")
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# Schedulers cached per project, kept current by timeline change events
+_schedulers: Dict[str, "TimelineScheduler"] = {}
+_schedulers_lock = threading.Lock()
+
+
+class DependencyCycleError(ValueError):
+    """Raised when task dependencies contain a cycle."""
+
+
+class TimelineScheduler:
+    """Critical-path scheduler over the tasks of one implementation timeline."""
+
+    def __init__(self, tasks: List[Dict], revision: int = 0):
+        """Build the dependency graph and compute the initial schedule.
+
+        Args:
+            tasks: Timeline tasks with ``id``, ``startDate``, ``endDate`` and ``dependencies``
+            revision: The timeline revision the tasks were read from
+
+        Raises:
+            DependencyCycleError: If the task dependencies contain a cycle
+        """
+        self.revision = revision
+        self.tasks: Dict[str, Dict] = {}
+        for task in tasks:
+            if task.get("id") is not None:
+                self.tasks[task["id"]] = {field: task.get(field) for field in SCHEDULE_FIELDS}
+        self._rebuild()
+
+    # Graph construction
+
+    def _rebuild(self):
+        """Rebuild the graph and topological order, then recompute the whole schedule."""
+        self.duration: Dict[str, float] = {}
+        self.not_before: Dict[str, float] = {}
+        self.fixed: Dict[str, bool] = {}
+        for task_id, task in self.tasks.items():
+            self._load_task_times(task_id, task)
+
+        self.predecessors: Dict[str, List[str]] = {}
+        self.successors: Dict[str, List[str]] = {task_id: [] for task_id in self.tasks}
+        for task_id, task in self.tasks.items():
+            preds = [dep for dep in (task.get("dependencies") or []) if dep in self.tasks and dep != task_id]
+            self.predecessors[task_id] = preds
+            for pred in preds:
+                self.successors[pred].append(task_id)
+
+        self.order = self._topological_order()
+        self.position = {task_id: i for i, task_id in enumerate(self.order)}
+
+        self.early_start: Dict[str, float] = {}
+        self.early_finish: Dict[str, float] = {}
+        for task_id in self.order:
+            self._compute_early(task_id)
+        self.project_finish = max(self.early_finish.values(), default=0.0)
+
+        self.late_start: Dict[str, float] = {}
+        self.late_finish: Dict[str, float] = {}
+        for task_id in reversed(self.order):
+            self._compute_late(task_id)
+
+    def _load_task_times(self, task_id: str, task: Dict):
+        """Derive the duration and start constraint of a task from its dates."""
+        start = _to_days(task.get("startDate"))
+        end = _to_days(task.get("endDate"))
+        if start is None:
+            start = end if end is not None else 0.0
+        if end is None or end < start:
+            end = start
+        self.not_before[task_id] = start
+        self.duration[task_id] = end - start
+        self.fixed[task_id] = task.get("status") == "completed"
+
+    def _topological_order(self) -> List[str]:
+        """Order the tasks so that every task follows all of its predecessors.
+
+        Raises:
+            DependencyCycleError: If the task dependencies contain a cycle
+        """
+        in_degree = {task_id: len(preds) for task_id, preds in self.predecessors.items()}
+        ready = [task_id for task_id, degree in in_degree.items() if degree == 0]
+        order = []
+        while ready:
+            task_id = ready.pop()
+            order.append(task_id)
+            for succ in self.successors[task_id]:
+                in_degree[succ] -= 1
+                if in_degree[succ] == 0:
+                    ready.append(succ)
+
+        if len(order) != len(self.tasks):
+            cyclic = sorted(task_id for task_id, degree in in_degree.items() if degree > 0)
+            raise DependencyCycleError(f"Task dependencies contain a cycle involving: {', '.join(cyclic[:10])}")
+        return order
+
+    # Forward and backward passes
+
+    def _compute_early(self, task_id: str) -> bool:
+        """Compute the earliest start/finish of a task from its predecessors.
+
+        Returns:
+            True if the earliest finish changed
+        """
+        early_start = self.not_before[task_id]
+        if not self.fixed[task_id]:
+            for pred in self.predecessors[task_id]:
+                if self.early_finish[pred] > early_start:
+                    early_start = self.early_finish[pred]
+        early_finish = early_start + self.duration[task_id]
+
+        changed = self.early_finish.get(task_id) != early_finish
+        self.early_start[task_id] = early_start
+        self.early_finish[task_id] = early_finish
+        return changed
+
+    def _compute_late(self, task_id: str) -> bool:
+        """Compute the latest start/finish of a task from its successors.
+
+        Returns:
+            True if the latest start changed
+        """
+        late_finish = self.project_finish
+        for succ in self.successors[task_id]:
+            if self.late_start[succ] < late_finish:
+                late_finish = self.late_start[succ]
+        late_start = late_finish - self.duration[task_id]
+
+        changed = self.late_start.get(task_id) != late_start
+        self.late_start[task_id] = late_start
+        self.late_finish[task_id] = late_finish
+        return changed
+
+    def _propagate_forward(self, seeds: List[str]):
+        """Recompute earliest dates downstream of the seed tasks, stopping where nothing changes."""
+        heap = [(self.position[task_id], task_id) for task_id in seeds]
+        heapq.heapify(heap)
+        queued = set(seeds)
+        while heap:
+            _, task_id = heapq.heappop(heap)
+            if self._compute_early(task_id):
+                for succ in self.successors[task_id]:
+                    if succ not in queued:
+                        queued.add(succ)
+                        heapq.heappush(heap, (self.position[succ], succ))
+
+    def _propagate_backward(self, seeds: List[str]):
+        """Recompute latest dates upstream of the seed tasks, stopping where nothing changes."""
+        heap = [(-self.position[task_id], task_id) for task_id in seeds]
+        heapq.heapify(heap)
+        queued = set(seeds)
+        while heap:
+            _, task_id = heapq.heappop(heap)
+            if self._compute_late(task_id):
+                for pred in self.predecessors[task_id]:
+                    if pred not in queued:
+                        queued.add(pred)
+                        heapq.heappush(heap, (-self.position[pred], pred))
+
+    # Incremental updates
+
+    def apply_operations(self, operations: List[Dict], revision: Optional[int] = None):
+        """Apply timeline patch operations and reschedule only what they affect.
+
+        Changes to dates or status re-propagate through the affected part of the
+        graph; added or removed tasks and changed dependencies rebuild the graph.
+
+        Args:
+            operations: Timeline patch operations (see ``patch_timeline_data``)
+            revision: The timeline revision after the operations
+
+        Raises:
+            DependencyCycleError: If the change introduces a dependency cycle
+        """
+        structural = False
+        changed = []
+        for operation in operations:
+            if operation.get("collection") != "tasks":
+                continue
+            task_id = operation.get("id")
+            if operation.get("op") == "delete":
+                if task_id in self.tasks:
+                    del self.tasks[task_id]
+                    structural = True
+                continue
+
+            value = operation.get("value") or {}
+            if not any(field in value for field in SCHEDULE_FIELDS):
+                continue
+            if task_id not in self.tasks:
+                self.tasks[task_id] = {field: None for field in SCHEDULE_FIELDS}
+                structural = True
+            task = self.tasks[task_id]
+            if "dependencies" in value and (value["dependencies"] or []) != (task.get("dependencies") or []):
+                structural = True
+            for field in SCHEDULE_FIELDS:
+                if field in value:
+                    task[field] = value[field]
+            changed.append(task_id)
+
+        if structural:
+            self._rebuild()
+        elif changed:
+            for task_id in changed:
+                self._load_task_times(task_id, self.tasks[task_id])
+            self._propagate_forward(changed)
+
+            project_finish = max(self.early_finish.values(), default=0.0)
+            if project_finish != self.project_finish:
+                # A new finish date moves every latest date, so redo the backward pass
+                self.project_finish = project_finish
+                for task_id in reversed(self.order):
+                    self._compute_late(task_id)
+            else:
+                self._propagate_backward(changed)
+
+        if revision is not None:
+            self.revision = revision
+
+    # Results
+
+    def slack(self, task_id: str) -> float:
+        """Get the total slack of a task in days."""
+        return self.late_start[task_id] - self.early_start[task_id]
+
+    def critical_path(self) -> List[str]:
+        """Get the zero-slack tasks ordered by earliest start."""
+        critical = [task_id for task_id in self.order if self.slack(task_id) <= CRITICAL_SLACK_TOLERANCE]
+        critical.sort(key=lambda task_id: (self.early_start[task_id], self.position[task_id]))
+        return critical
+
+    def to_dict(self) -> Dict:
+        """Convert the schedule to a dictionary for JSON serialization."""
+        tasks = {}
+        phases: Dict[str, Dict] = {}
+        for task_id in self.order:
+            slack = self.slack(task_id)
+            tasks[task_id] = {
+                "earlyStart": _from_days(self.early_start[task_id]),
+                "earlyFinish": _from_days(self.early_finish[task_id]),
+                "lateStart": _from_days(self.late_start[task_id]),
+                "lateFinish": _from_days(self.late_finish[task_id]),
+                "durationDays": round(self.duration[task_id], 2),
+                "slackDays": round(slack, 2),
+                "critical": slack <= CRITICAL_SLACK_TOLERANCE
+            }
+
+            phase_id = self.tasks[task_id].get("phaseId")
+            if phase_id is not None:
+                window = phases.setdefault(phase_id, {"start": self.early_start[task_id],
+                                                      "finish": self.early_finish[task_id],
+                                                      "critical": False})
+                window["start"] = min(window["start"], self.early_start[task_id])
+                window["finish"] = max(window["finish"], self.early_finish[task_id])
+                window["critical"] = window["critical"] or tasks[task_id]["critical"]
+
+        return {
+            "revision": self.revision,
+            "projectFinish": _from_days(self.project_finish) if self.tasks else None,
+            "criticalPath": self.critical_path(),
+            "tasks": tasks,
+            "phases": {
+                phase_id: {
+                    "scheduledStart": _from_days(window["start"]),
+                    "scheduledFinish": _from_days(window["finish"]),
+                    "critical": window["critical"]
+                }
+                for phase_id, window in phases.items()
+            }
+        }
+
+
+def get_timeline_schedule(project_id: str, timeline_data: Dict) -> Dict:
+    """Get the critical-path schedule for a project timeline.
+
+    The scheduler is cached per project and reused as long as its revision matches
+    the timeline; otherwise it is rebuilt from the timeline tasks.
+
+    Args:
+        project_id: The ID of the project
+        timeline_data: The timeline data, including its ``revision`` and ``tasks``
+
+    Returns:
+        The schedule dictionary, or an ``error`` entry if the dependencies are cyclic
+    """
+    revision = timeline_data.get("revision", 0)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(project_id)
+        if scheduler is None or scheduler.revision != revision:
+            try:
+                scheduler = TimelineScheduler(timeline_data.get("tasks", []), revision)
+            except DependencyCycleError as e:
+                _schedulers.pop(project_id, None)
+                return {"revision": revision, "error": str(e)}
+            _schedulers[project_id] = scheduler
+        return scheduler.to_dict()
+
+
+def handle_timeline_change(event: Dict):
+    """Keep the cached scheduler of a project current with a timeline change event.
+
+    Args:
+        event: A change event emitted by the implementation tools
+    """
+    project_id = event.get("project_id")
+    with _schedulers_lock:
+        scheduler = _schedulers.get(project_id)
+        if scheduler is None:
+            return
+        if event.get("reset") or scheduler.revision != event.get("revision", 0) - 1:
+            # Replaced timelines and missed events are rebuilt on the next read
+            del _schedulers[project_id]
+            return
+        try:
+            scheduler.apply_operations(event.get("operations", []), event.get("revision"))
+        except DependencyCycleError:
+            del _schedulers[project_id]
+
+
+def _to_days(date_str: Optional[str]) -> Optional[float]:
+    """Convert an ISO format date string to days since the epoch."""
+    if not date_str:
+        return None
+    try:
+        value = datetime.datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH).total_seconds() / (24 * 3600)
+
+
+def _from_days(days: float) -> str:
+    """Convert days since the epoch to an ISO format date string."""
+    return (_EPOCH + datetime.timedelta(days=days)).isoformat()
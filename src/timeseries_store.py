@@ -0,0 +1,600 @@
+"""
+Module: timeseries_store.py
+
+This module implements the time-series store for automated counter data used in outcome measurement.
+Features:
+- Compact Append-only Storage: Keeps each counter's readings in packed binary segments
+  (int64 timestamps, float32 values) under ``data/outcomes/timeseries/{project_id}/{metric}/{series_id}``
+- Rollups: Maintains hourly, daily and monthly sum/count/min/max buckets as data is appended,
+  rewriting only the trailing bucket when a batch extends it
+- Range Queries: Returns raw or rolled-up points between two dates, picking the coarsest
+  resolution that fits the requested number of points and merging buckets further if needed
+- Memory-mapped Reads: Range queries binary-search the mapped timestamp segment and rollup
+  files instead of loading whole files
+- Multi-process Safety: Appends hold an exclusive lock of the series and re-read its last
+  timestamp and trailing rollup records from disk; reads hold it shared, so all server
+  workers can append to and query the same series
+
+Timestamps are stored as UTC seconds; buckets are aligned to UTC hours, days and months.
+Readings must arrive in time order per series; readings at or before the last stored
+timestamp of a series are skipped.
+"""
+
+import os
+import re
+import mmap
+import array
+import bisect
+import datetime
+import operator
+import functools
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from file_locks import file_lock
+
+# Rollup resolutions, finest first
+RESOLUTIONS = ("hour", "day", "month")
+
+# Default maximum number of points returned by a range query
+DEFAULT_MAX_POINTS = 1000
+
+# Fields of a rollup record, stored interleaved as float64
+ROLLUP_FIELDS = ("start", "sum", "count", "min", "max")
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+_stores: Dict[str, "TimeSeriesStore"] = {}
+_stores_lock = threading.Lock()
+
+
+class SeriesStore:
+    """Raw segments and rollups of one counter series."""
+
+    def __init__(self, path: Path):
+        """Open a series directory.
+
+        Args:
+            path: Directory of the series
+        """
+        self.path = path
+        self.timestamps_file = path / "timestamps.bin"
+        self.values_file = path / "values.bin"
+        # Other processes append to the same files, so nothing about them is cached
+        self.lock_file = path / "series.lock"
+
+    def _last_timestamp(self) -> Optional[int]:
+        """Read the last stored timestamp. Callers hold the lock."""
+        try:
+            size = self.timestamps_file.stat().st_size
+        except FileNotFoundError:
+            return None
+        if size < 8:
+            return None
+        with open(self.timestamps_file, 'rb') as file:
+            file.seek(size - size % 8 - 8)
+            return array.array('q', file.read(8))[0]
+
+    def append(self, timestamps: array.array, values: array.array, interval: Optional[int] = None) -> int:
+        """Append time-ordered readings and update the rollups.
+
+        Args:
+            timestamps: Strictly increasing UTC timestamps in seconds
+            values: The reading at each timestamp
+            interval: Seconds between readings if they are evenly spaced
+
+        Returns:
+            The number of readings appended
+        """
+        with file_lock(self.lock_file):
+            last_timestamp = self._last_timestamp()
+            if last_timestamp is not None and timestamps and timestamps[0] <= last_timestamp:
+                first = bisect.bisect_right(timestamps, last_timestamp)
+                timestamps, values = timestamps[first:], values[first:]
+            if not timestamps:
+                return 0
+
+            with open(self.timestamps_file, 'ab') as file:
+                timestamps.tofile(file)
+            with open(self.values_file, 'ab') as file:
+                values.tofile(file)
+
+            records = _bucket_readings(timestamps, values, 3600, interval)
+            for resolution in RESOLUTIONS:
+                if resolution == "day":
+                    records = _merge_records(records, _day_start, _next_day)
+                elif resolution == "month":
+                    records = _merge_records(records, _month_start, _next_month)
+                self._extend_rollup(resolution, records)
+            return len(timestamps)
+
+    def _extend_rollup(self, resolution: str, records: array.array):
+        """Merge new rollup records into a resolution, rewriting only its trailing record.
+
+        The trailing record is read from the file, which may have been extended by
+        another process. Callers hold the lock.
+        """
+        width = len(ROLLUP_FIELDS)
+        path = self.path / f"{resolution}.rollup"
+        with open(path, 'r+b' if path.exists() else 'w+b') as file:
+            # Whole records only; a torn trailing record is overwritten
+            offset = file.seek(0, os.SEEK_END) // (8 * width) * width
+            if offset and records:
+                file.seek((offset - width) * 8)
+                last = array.array('d')
+                last.frombytes(file.read(width * 8))
+                if last[0] == records[0]:
+                    # The batch continues the last stored bucket
+                    offset -= width
+                    records = array.array('d', [
+                        last[0], last[1] + records[1], last[2] + records[2],
+                        min(last[3], records[3]), max(last[4], records[4])
+                    ]) + records[width:]
+            file.seek(offset * 8)
+            records.tofile(file)
+            file.truncate()
+
+    def rollup_range(self, resolution: str, start: Optional[int], end: Optional[int]) -> List[Tuple]:
+        """Get the rollup buckets of a resolution that start within a range.
+
+        Returns:
+            (start, sum, count, min, max) tuples
+        """
+        path = self.path / f"{resolution}.rollup"
+        if not path.exists():
+            return []
+        width = len(ROLLUP_FIELDS)
+        with file_lock(self.lock_file, shared=True), open(path, 'rb') as file:
+            count = os.fstat(file.fileno()).st_size // (8 * width)
+            if count == 0:
+                return []
+            with mmap.mmap(file.fileno(), count * width * 8, access=mmap.ACCESS_READ) as mapped:
+                records = memoryview(mapped).cast('d')
+                starts = records[0::width]
+                try:
+                    lo = bisect.bisect_left(starts, start) if start is not None else 0
+                    hi = bisect.bisect_left(starts, end) if end is not None else count
+                finally:
+                    starts.release()
+                    records.release()
+                selected = array.array('d', mapped[lo * width * 8:hi * width * 8])
+        return [tuple(selected[i:i + width]) for i in range(0, len(selected), width)]
+
+    def _raw_bounds(self, start: Optional[int], end: Optional[int],
+                    copy: bool = False) -> Tuple[int, int, Optional[array.array]]:
+        """Binary-search the memory-mapped timestamp segment for a range. Callers hold the lock shared.
+
+        Args:
+            start: First timestamp to include
+            end: Timestamp before which readings are included
+            copy: Also copy the timestamps within the range
+
+        Returns:
+            (first index, end index, the timestamps if copied)
+        """
+        count = self.timestamps_file.stat().st_size // 8 if self.timestamps_file.exists() else 0
+        if count == 0:
+            return 0, 0, array.array('q') if copy else None
+        with open(self.timestamps_file, 'rb') as file, \
+                mmap.mmap(file.fileno(), count * 8, access=mmap.ACCESS_READ) as mapped:
+            timestamps = memoryview(mapped).cast('q')
+            try:
+                lo = bisect.bisect_left(timestamps, start) if start is not None else 0
+                hi = bisect.bisect_left(timestamps, end) if end is not None else count
+            finally:
+                timestamps.release()
+            selected = array.array('q', mapped[lo * 8:hi * 8]) if copy else None
+        return lo, hi, selected
+
+    def raw_count(self, start: Optional[int], end: Optional[int]) -> int:
+        """Count the raw readings within a range."""
+        if not self.timestamps_file.exists():
+            return 0
+        with file_lock(self.lock_file, shared=True):
+            lo, hi, _ = self._raw_bounds(start, end)
+            return hi - lo
+
+    def raw_range(self, start: Optional[int], end: Optional[int]) -> Tuple[array.array, array.array]:
+        """Get the raw readings within a range, reading only that slice of the segments.
+
+        Returns:
+            (timestamps, values) arrays
+        """
+        if not self.timestamps_file.exists():
+            return array.array('q'), array.array('f')
+        with file_lock(self.lock_file, shared=True):
+            lo, hi, selected = self._raw_bounds(start, end, copy=True)
+            values = array.array('f')
+            if hi == lo:
+                return selected, values
+            with open(self.values_file, 'rb') as file:
+                file.seek(lo * values.itemsize)
+                values.frombytes(file.read((hi - lo) * values.itemsize))
+            return selected, values
+
+
+class TimeSeriesStore:
+    """Time-series store for the counter series of all projects."""
+
+    def __init__(self, data_dir: str = "data/outcomes/timeseries"):
+        """Initialize the store.
+
+        Args:
+            data_dir: Root directory of the series
+        """
+        self.data_dir = Path(data_dir)
+        self.series: Dict[Tuple[str, str, str], SeriesStore] = {}
+        self._lock = threading.Lock()
+
+    def _series(self, project_id: str, metric: str, series_id: str) -> SeriesStore:
+        """Get the store of one series, opening it on first use."""
+        key = (project_id, metric, series_id)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = SeriesStore(self.data_dir / project_id / metric / series_id)
+            return series
+
+    def series_ids(self, project_id: str, metric: str) -> List[str]:
+        """List the series stored for a project metric."""
+        path = self.data_dir / project_id / metric
+        if not path.exists():
+            return []
+        return sorted(entry.name for entry in os.scandir(path) if entry.is_dir())
+
+    def ingest(self, project_id: str, metric: str, series: Dict[str, Dict]) -> Dict:
+        """Append readings to the series of a project metric.
+
+        Each series is given either as a regular interval (``start``, ``interval`` in
+        seconds and ``values``) or as explicit ``timestamps`` and ``values``.
+
+        Args:
+            project_id: The ID of the project
+            metric: The metric (e.g. "m1" usage counts)
+            series: Series id -> readings
+
+        Returns:
+            Appended and skipped reading counts per series
+
+        Raises:
+            ValueError: If a name or a series payload is invalid
+        """
+        for name in [project_id, metric, *series]:
+            if not _NAME_PATTERN.match(str(name)):
+                raise ValueError(f"Invalid series name: {name}")
+
+        results = {}
+        for series_id, payload in series.items():
+            timestamps, values, interval = _readings(payload)
+            appended = self._series(project_id, metric, series_id).append(timestamps, values, interval)
+            results[series_id] = {"appended": appended, "skipped": len(timestamps) - appended}
+        return results
+
+    def query(self, project_id: str, metric: str, series_ids: Optional[List[str]] = None,
+              start: Optional[str] = None, end: Optional[str] = None, resolution: str = "auto",
+              max_points: int = DEFAULT_MAX_POINTS) -> Dict:
+        """Get a downsampled series for charting.
+
+        Series are summed bucket by bucket when several are requested.
+
+        Args:
+            project_id: The ID of the project
+            metric: The metric
+            series_ids: Series to include. Defaults to all series of the metric.
+            start: ISO date or datetime of the first reading to include
+            end: ISO date or datetime before which readings are included
+            resolution: "raw", "hour", "day", "month" or "auto" (coarsest fit to ``max_points``)
+            max_points: Maximum number of points to return
+
+        Returns:
+            The chosen resolution and the points
+
+        Raises:
+            ValueError: If the resolution or a date is invalid
+        """
+        if resolution not in ("auto", "raw") + RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        start_ts, end_ts = _parse_timestamp(start), _parse_timestamp(end)
+        max_points = max(1, max_points)
+        series_ids = series_ids or self.series_ids(project_id, metric)
+        stores = [self._series(project_id, metric, series_id) for series_id in series_ids]
+
+        if not stores:
+            return {"resolution": resolution, "series": [], "points": []}
+        if resolution == "raw" or (resolution == "auto" and len(stores) == 1
+                                   and stores[0].raw_count(start_ts, end_ts) <= max_points):
+            if len(stores) == 1:
+                timestamps, values = stores[0].raw_range(start_ts, end_ts)
+            else:
+                timestamps, values = _sum_raw(stores, start_ts, end_ts)
+            return {
+                "resolution": "raw",
+                "series": series_ids,
+                "points": [{"t": _isoformat(t), "value": v} for t, v in zip(timestamps, values)]
+            }
+
+        candidates = RESOLUTIONS if resolution == "auto" else (resolution,)
+        for candidate in candidates:
+            records = _sum_rollups(store.rollup_range(candidate, start_ts, end_ts) for store in stores)
+            if len(records) <= max_points:
+                break
+        resolution = candidate
+        if len(records) > max_points:
+            # Merge consecutive buckets so the series fits the requested number of points
+            group = -(-len(records) // max_points)
+            records = [_merge_group(records[i:i + group]) for i in range(0, len(records), group)]
+
+        return {
+            "resolution": resolution,
+            "series": series_ids,
+            "points": [
+                {
+                    "t": _isoformat(record[0]),
+                    "sum": record[1],
+                    "count": int(record[2]),
+                    "mean": record[1] / record[2] if record[2] else None,
+                    "min": record[3],
+                    "max": record[4]
+                }
+                for record in records
+            ]
+        }
+
+
+def get_timeseries_store(data_dir: str = "data/outcomes/timeseries") -> TimeSeriesStore:
+    """Get the shared time-series store for a data directory, creating it on first use."""
+    with _stores_lock:
+        store = _stores.get(data_dir)
+        if store is None:
+            store = _stores[data_dir] = TimeSeriesStore(data_dir)
+        return store
+
+
+def ingest_timeseries(project_id: str, metric: str, series: Dict[str, Dict]) -> Dict:
+    """Append counter readings to a project metric.
+
+    Args:
+        project_id: The ID of the project
+        metric: The metric (e.g. "m1" usage counts)
+        series: Series id -> readings (see ``TimeSeriesStore.ingest``)
+
+    Returns:
+        Dict: The appended and skipped counts per series.
+    """
+    try:
+        results = get_timeseries_store().ingest(project_id, metric, series)
+    except (ValueError, TypeError) as e:
+        return {"success": False, "message": str(e)}
+    appended = sum(result["appended"] for result in results.values())
+    return {
+        "success": True,
+        "message": f"Appended {appended} readings to {len(results)} series",
+        "data": results
+    }
+
+
+def query_timeseries(project_id: str, metric: str, series_ids: Optional[List[str]] = None,
+                     start: Optional[str] = None, end: Optional[str] = None,
+                     resolution: str = "auto", max_points: int = DEFAULT_MAX_POINTS) -> Dict:
+    """Get a project metric's readings over a date range, downsampled for charting.
+
+    Args:
+        project_id: The ID of the project
+        metric: The metric
+        series_ids: Series to include (summed). Defaults to all series.
+        start: ISO date or datetime of the range start
+        end: ISO date or datetime of the range end (exclusive)
+        resolution: "raw", "hour", "day", "month" or "auto"
+        max_points: Maximum number of points to return
+
+    Returns:
+        Dict: The resolution used and the points.
+    """
+    store = get_timeseries_store()
+    if not (series_ids or store.series_ids(project_id, metric)):
+        return {"success": False, "not_found": True, "message": f"No {metric} data for project {project_id}"}
+    try:
+        data = store.query(project_id, metric, series_ids, start, end, resolution, max_points)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    return {
+        "success": True,
+        "message": f"Retrieved {len(data['points'])} {data['resolution']} points",
+        "data": data
+    }
+
+
+def _readings(payload: Dict) -> Tuple[array.array, array.array, Optional[int]]:
+    """Convert a series payload to sorted timestamp and value arrays.
+
+    Returns:
+        (timestamps, values, seconds between readings or None if they are not evenly spaced)
+
+    Raises:
+        ValueError: If the payload is invalid
+    """
+    if not isinstance(payload, dict) or "values" not in payload:
+        raise ValueError("Each series needs values with a start and interval or timestamps")
+    values = array.array('f', payload["values"])
+    if "timestamps" in payload:
+        timestamps = array.array('q', (_parse_timestamp(t) if isinstance(t, str) else int(t)
+                                       for t in payload["timestamps"]))
+        if len(timestamps) != len(values):
+            raise ValueError("Timestamps and values must have the same length")
+        if any(timestamps[i] >= timestamps[i + 1] for i in range(len(timestamps) - 1)):
+            order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+            # Keep the last reading of duplicate timestamps
+            order = [i for n, i in enumerate(order)
+                     if n + 1 == len(order) or timestamps[order[n + 1]] != timestamps[i]]
+            timestamps = array.array('q', (timestamps[i] for i in order))
+            values = array.array('f', (values[i] for i in order))
+        return timestamps, values, None
+
+    start = payload.get("start")
+    start = _parse_timestamp(start) if isinstance(start, str) else start
+    interval = int(payload.get("interval", 0))
+    if start is None or interval <= 0:
+        raise ValueError("Regular series need a start and a positive interval")
+    start = int(start)
+    return array.array('q', range(start, start + interval * len(values), interval)), values, interval
+
+
+def _bucket_readings(timestamps: array.array, values: array.array, width: int,
+                     step: Optional[int] = None) -> array.array:
+    """Roll time-ordered readings up into fixed-width buckets.
+
+    Args:
+        timestamps: Strictly increasing timestamps
+        values: The reading at each timestamp
+        width: Bucket width in seconds
+        step: Seconds between readings if they are evenly spaced
+
+    Returns:
+        Flattened (start, sum, count, min, max) records
+    """
+    count = len(timestamps)
+    if step and count > 1 and width % step == 0 and timestamps[0] % step == 0:
+        # Regular readings: whole buckets are rolled up column-wise without a Python-level loop
+        per_bucket = width // step
+        head = min((-timestamps[0] % width) // step, count)
+        whole = (count - head) // per_bucket
+        end = head + whole * per_bucket
+        records = _bucket_slice(timestamps, values, width, 0, head)
+        if whole:
+            columns = [values[head + i:end:per_bucket] for i in range(per_bucket)]
+            sums = functools.reduce(lambda a, b: list(map(operator.add, a, b)), columns)
+            first = timestamps[head]
+            fields = len(ROLLUP_FIELDS)
+            body = array.array('d', [0.0]) * (whole * fields)
+            body[0::fields] = array.array('d', range(first, first + whole * width, width))
+            body[1::fields] = array.array('d', sums)
+            body[2::fields] = array.array('d', [per_bucket]) * whole
+            body[3::fields] = array.array('d', map(min, *columns) if per_bucket > 1 else columns[0])
+            body[4::fields] = array.array('d', map(max, *columns) if per_bucket > 1 else columns[0])
+            records.extend(body)
+        records.extend(_bucket_slice(timestamps, values, width, end, count))
+        return records
+    return _bucket_slice(timestamps, values, width, 0, count)
+
+
+def _bucket_slice(timestamps: array.array, values: array.array, width: int, lo: int, end: int) -> array.array:
+    """Roll a slice of time-ordered readings up into fixed-width buckets, one bucket at a time."""
+    records = array.array('d')
+    while lo < end:
+        bucket = timestamps[lo] - timestamps[lo] % width
+        hi = bisect.bisect_left(timestamps, bucket + width, lo, end)
+        chunk = values[lo:hi]
+        records.extend((bucket, sum(chunk), hi - lo, min(chunk), max(chunk)))
+        lo = hi
+    return records
+
+
+def _merge_records(records: array.array, bucket_start, next_start) -> array.array:
+    """Merge time-ordered rollup records into coarser buckets.
+
+    Args:
+        records: Flattened rollup records
+        bucket_start: Function mapping a timestamp to the start of its coarser bucket
+        next_start: Function mapping a coarser bucket start to the next one
+
+    Returns:
+        Flattened rollup records of the coarser buckets
+    """
+    width = len(ROLLUP_FIELDS)
+    starts = records[0::width]
+    merged = array.array('d')
+    lo = 0
+    while lo < len(starts):
+        start = bucket_start(int(starts[lo]))
+        hi = bisect.bisect_left(starts, next_start(start), lo)
+        merged.extend((
+            start,
+            sum(records[lo * width + 1:hi * width:width]),
+            sum(records[lo * width + 2:hi * width:width]),
+            min(records[lo * width + 3:hi * width:width]),
+            max(records[lo * width + 4:hi * width:width])
+        ))
+        lo = hi
+    return merged
+
+
+def _sum_rollups(ranges: Iterable[List[Tuple]]) -> List[Tuple]:
+    """Sum the rollup records of several series bucket by bucket."""
+    ranges = list(ranges)
+    if len(ranges) == 1:
+        return ranges[0]
+    buckets: Dict[float, List[float]] = {}
+    for records in ranges:
+        for start, total, count, low, high in records:
+            bucket = buckets.get(start)
+            if bucket is None:
+                buckets[start] = [start, total, count, low, high]
+            else:
+                bucket[1] += total
+                bucket[2] += count
+                bucket[3] = min(bucket[3], low)
+                bucket[4] = max(bucket[4], high)
+    return [tuple(buckets[start]) for start in sorted(buckets)]
+
+
+def _sum_raw(stores: List[SeriesStore], start: Optional[int], end: Optional[int]) -> Tuple[list, list]:
+    """Sum the raw readings of several series at each timestamp."""
+    totals: Dict[int, float] = {}
+    for store in stores:
+        timestamps, values = store.raw_range(start, end)
+        for t, v in zip(timestamps, values):
+            totals[t] = totals.get(t, 0.0) + v
+    ordered = sorted(totals)
+    return ordered, [totals[t] for t in ordered]
+
+
+def _merge_group(records: List[Tuple]) -> Tuple:
+    """Merge consecutive rollup records into one."""
+    return (
+        records[0][0],
+        sum(record[1] for record in records),
+        sum(record[2] for record in records),
+        min(record[3] for record in records),
+        max(record[4] for record in records)
+    )
+
+
+def _day_start(timestamp: int) -> int:
+    """Get the start of the UTC day containing a timestamp."""
+    return timestamp - timestamp % 86400
+
+
+def _next_day(start: int) -> int:
+    """Get the start of the UTC day after the one starting at a timestamp."""
+    return start + 86400
+
+
+def _month_start(timestamp: int) -> int:
+    """Get the start of the UTC month containing a timestamp."""
+    date = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+    return int(datetime.datetime(date.year, date.month, 1, tzinfo=datetime.timezone.utc).timestamp())
+
+
+def _next_month(start: int) -> int:
+    """Get the start of the UTC month after the one starting at a timestamp."""
+    return _month_start(start + 32 * 86400)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[int]:
+    """Convert an ISO format date or datetime string to UTC seconds (naive values are UTC).
+
+    Raises:
+        ValueError: If the value is not a valid ISO date
+    """
+    if value is None or value == "":
+        return None
+    parsed = datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _isoformat(timestamp: float) -> str:
+    """Convert UTC seconds to an ISO format datetime string."""
+    return datetime.datetime.fromtimestamp(int(timestamp), datetime.timezone.utc).isoformat()
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for the Implementation Tools API.
+
+Run in production with gunicorn from the ``src`` directory:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from api import create_app
+
+app = create_app()
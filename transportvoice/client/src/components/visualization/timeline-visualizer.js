@@ -61,6 +61,7 @@ const ImplementationTimelineVisualizer = ({ projectId, initialData = null }) =>
   const [highlightCriticalPath, setHighlightCriticalPath] = useState(false);
   const [teamMembers, setTeamMembers] = useState([]);
   const [comments, setComments] = useState([]);
+  const [revision, setRevision] = useState(null);
   const [notifyStakeholders, setNotifyStakeholders] = useState(false);
   const [dateView, setDateView] = useState(() => {
     // Default date view is current month and year
@@ -119,6 +120,7 @@ const ImplementationTimelineVisualizer = ({ projectId, initialData = null }) =>
               setMilestones(timelineData.milestones || []);
               setTeamMembers(timelineData.teamMembers || []);
               setComments(timelineData.comments || []);
+              setRevision(timelineData.revision ?? null);
               
               // Set start and end dates
               if (timelineData.project) {
@@ -877,26 +879,48 @@ const ImplementationTimelineVisualizer = ({ projectId, initialData = null }) =>
     }, 1500);
   };
   
-  // Save timeline data to the backend API
-  const saveTimelineData = async () => {
-    if (!projectId) {
-      return { success: false, message: "No project ID provided" };
+  // Reload the stored timeline, replacing local changes the backend rejected
+  const reloadTimelineData = async () => {
+    try {
+      const apiBaseUrl = process.env.REACT_APP_API_URL || 'http://localhost:5001/api';
+      
+      const response = await fetch(`${apiBaseUrl}/implementation-timeline/${projectId}`);
+      const result = await response.json();
+      
+      if (result.success) {
+        const timelineData = result.data;
+        
+        setProject(timelineData.project);
+        setPhases(timelineData.phases || []);
+        setTasks(timelineData.tasks || []);
+        setMilestones(timelineData.milestones || []);
+        setTeamMembers(timelineData.teamMembers || []);
+        setComments(timelineData.comments || []);
+        setRevision(timelineData.revision ?? null);
+      } else {
+        console.error('Error reloading timeline data:', result.message);
+      }
+    } catch (error) {
+      console.error('Error reloading timeline data:', error);
     }
-
+  };
+  
+  // Store the local timeline as a new timeline in the backend API
+  const createTimelineData = async () => {
     try {
       const apiBaseUrl = process.env.REACT_APP_API_URL || 'http://localhost:5001/api';
       
-      // Prepare the data to be saved
+      // Revision 0 makes the save fail with a conflict if another editor created the timeline first
       const timelineData = {
         project: project,
         phases: phases,
         tasks: tasks,
         milestones: milestones,
         teamMembers: teamMembers,
-        comments: comments
+        comments: comments,
+        revision: revision ?? 0
       };
       
-      // Send the data to the API
       const response = await fetch(`${apiBaseUrl}/implementation-timeline/${projectId}`, {
         method: 'POST',
         headers: {
@@ -908,19 +932,59 @@ const ImplementationTimelineVisualizer = ({ projectId, initialData = null }) =>
       const result = await response.json();
       
       if (result.success) {
-        // Show success message (in a real app, you'd use a toast/snackbar)
-        console.log('Timeline data saved successfully');
-        return result;
+        setRevision(result.revision);
+      } else if (response.status === 409) {
+        console.warn('Timeline was created by another editor, reloading:', result.message);
+        await reloadTimelineData();
       } else {
         console.error('Error saving timeline data:', result.message);
-        return result;
       }
+      return result;
     } catch (error) {
       console.error('Error saving timeline data:', error);
       return { success: false, message: error.message };
     }
   };
   
+  // Send only the changed entities to the backend API
+  const patchTimelineData = async (operations, baseRevision = revision) => {
+    if (!projectId) {
+      return { success: false, message: "No project ID provided" };
+    }
+
+    try {
+      const apiBaseUrl = process.env.REACT_APP_API_URL || 'http://localhost:5001/api';
+      
+      const response = await fetch(`${apiBaseUrl}/implementation-timeline/${projectId}`, {
+        method: 'PATCH',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ revision: baseRevision, operations }),
+      });
+      
+      const result = await response.json();
+      
+      if (result.success) {
+        setRevision(result.revision);
+      } else if (response.status === 404) {
+        // A new project has no stored timeline yet: create it, then apply the change to it
+        const created = await createTimelineData();
+        return created.success ? patchTimelineData(operations, created.revision) : created;
+      } else if (response.status === 409) {
+        // Another editor changed the timeline since it was loaded; the local change is dropped
+        console.warn('Timeline changed by another editor, reloading:', result.message);
+        await reloadTimelineData();
+      } else {
+        console.error('Error saving timeline changes:', result.message);
+      }
+      return result;
+    } catch (error) {
+      console.error('Error saving timeline changes:', error);
+      return { success: false, message: error.message };
+    }
+  };
+  
   // Update the handleOpenDialog function to save data when creating/editing items
   const handleOpenDialog = (type, item = null) => {
     setDialogType(type);
@@ -932,7 +996,7 @@ const ImplementationTimelineVisualizer = ({ projectId, initialData = null }) =>
   const handleAddPhase = async (newPhase) => {
     const updatedPhases = [...phases, newPhase];
     setPhases(updatedPhases);
-    await saveTimelineData();
+    await patchTimelineData([{ op: 'upsert', collection: 'phases', id: newPhase.id, value: newPhase }]);
   };
 
   const handleUpdatePhase = async (updatedPhase) => {
@@ -940,19 +1004,19 @@ const ImplementationTimelineVisualizer = ({ projectId, initialData = null }) =>
       phase.id === updatedPhase.id ? updatedPhase : phase
     );
     setPhases(updatedPhases);
-    await saveTimelineData();
+    await patchTimelineData([{ op: 'upsert', collection: 'phases', id: updatedPhase.id, value: updatedPhase }]);
   };
 
   const handleDeletePhase = async (phaseId) => {
     const updatedPhases = phases.filter(phase => phase.id !== phaseId);
     setPhases(updatedPhases);
-    await saveTimelineData();
+    await patchTimelineData([{ op: 'delete', collection: 'phases', id: phaseId }]);
   };
 
   const handleAddTask = async (newTask) => {
     const updatedTasks = [...tasks, newTask];
     setTasks(updatedTasks);
-    await saveTimelineData();
+    await patchTimelineData([{ op: 'upsert', collection: 'tasks', id: newTask.id, value: newTask }]);
   };
 
   const handleUpdateTask = async (updatedTask) => {
@@ -960,19 +1024,19 @@ const ImplementationTimelineVisualizer = ({ projectId, initialData = null }) =>
       task.id === updatedTask.id ? updatedTask : task
     );
     setTasks(updatedTasks);
-    await saveTimelineData();
+    await patchTimelineData([{ op: 'upsert', collection: 'tasks', id: updatedTask.id, value: updatedTask }]);
   };
 
   const handleDeleteTask = async (taskId) => {
     const updatedTasks = tasks.filter(task => task.id !== taskId);
     setTasks(updatedTasks);
-    await saveTimelineData();
+    await patchTimelineData([{ op: 'delete', collection: 'tasks', id: taskId }]);
   };
 
   const handleAddMilestone = async (newMilestone) => {
     const updatedMilestones = [...milestones, newMilestone];
     setMilestones(updatedMilestones);
-    await saveTimelineData();
+    await patchTimelineData([{ op: 'upsert', collection: 'milestones', id: newMilestone.id, value: newMilestone }]);
   };
 
   const handleUpdateMilestone = async (updatedMilestone) => {
@@ -980,13 +1044,13 @@ const ImplementationTimelineVisualizer = ({ projectId, initialData = null }) =>
       milestone.id === updatedMilestone.id ? updatedMilestone : milestone
     );
     setMilestones(updatedMilestones);
-    await saveTimelineData();
+    await patchTimelineData([{ op: 'upsert', collection: 'milestones', id: updatedMilestone.id, value: updatedMilestone }]);
   };
 
   const handleDeleteMilestone = async (milestoneId) => {
     const updatedMilestones = milestones.filter(milestone => milestone.id !== milestoneId);
     setMilestones(updatedMilestones);
-    await saveTimelineData();
+    await patchTimelineData([{ op: 'delete', collection: 'milestones', id: milestoneId }]);
   };
   
   // Render timeline view